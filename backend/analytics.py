@@ -0,0 +1,231 @@
+"""Lead analytics rollups.
+
+``lead_rollups`` holds one document per day x event_type x city x bar_type
+x source with the lead count and the budget_range mix. It is maintained
+over a ``created_at`` watermark: each run groups only the leads from the
+watermark's day (less ``lag``, for leads whose insert landed after a later
+``created_at``) onwards by their raw field values, folds those groups into
+normalized buckets, replaces those days' buckets, and removes buckets on
+those days that no longer have leads. Only ``$match``/``$group`` run in
+Mongo (the normalization is done here), so the same code runs on mongomock.
+Runs are periodic and also triggered (debounced) after lead writes; a lease
+in ``analytics_state`` keeps concurrent workers from running them twice.
+
+Dashboard queries read buckets, never leads, so they cost O(buckets in the
+range) however large the lead history grows.
+"""
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+from pymongo import ReplaceOne
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ("event_type", "city", "bar_type", "source")
+INTERVALS = ("day", "week", "month", "total")
+UNKNOWN = "unknown"
+NO_BUDGET = "unspecified"
+
+
+def _bucket_value(value, lower: bool = False, empty: str = UNKNOWN) -> str:
+    """Bucket key for a lead field: trimmed (and lowercased), ``empty`` when blank."""
+    value = "" if value is None else str(value).strip()
+    return (value.lower() if lower else value) or empty
+
+
+def rollup_pipeline(since: str) -> List[dict]:
+    """Lead counts per day and raw dimension values, for leads created on or after day ``since``."""
+    return [
+        # created_at is an ISO string, so a day prefix compares correctly
+        {"$match": {"created_at": {"$gte": since}}},
+        {"$group": {
+            "_id": {"day": {"$substr": ["$created_at", 0, 10]},
+                    **{name: f"${name}" for name in DIMENSIONS}, "budget": "$budget_range"},
+            "count": {"$sum": 1},
+        }},
+    ]
+
+
+def fold_buckets(groups: List[dict], run_at: datetime) -> List[dict]:
+    """Normalize ``rollup_pipeline`` groups into bucket documents, merging
+    groups that only differed by case or whitespace."""
+    buckets: Dict[tuple, dict] = {}
+    for group in groups:
+        raw = group["_id"]
+        key = {"day": raw["day"], **{name: _bucket_value(raw.get(name), lower=name == "city")
+                                     for name in DIMENSIONS}}
+        bucket = buckets.get(tuple(key.values()))
+        if bucket is None:
+            bucket = buckets[tuple(key.values())] = {"_id": key, **key, "count": 0,
+                                                     "budget_ranges": defaultdict(int), "updated_at": run_at}
+        bucket["count"] += group["count"]
+        bucket["budget_ranges"][_bucket_value(raw.get("budget"), empty=NO_BUDGET)] += group["count"]
+    for bucket in buckets.values():
+        bucket["budget_ranges"] = [{"range": name, "count": count} for name, count in bucket["budget_ranges"].items()]
+    return list(buckets.values())
+
+
+@lru_cache(maxsize=4096)
+def period_start(day: str, interval: str) -> Optional[str]:
+    """The day / ISO week (Monday) / month a bucket's day falls in; None for "total"."""
+    if interval == "day":
+        return day
+    if interval == "total":
+        return None
+    d = date.fromisoformat(day)
+    if interval == "week":
+        return (d - timedelta(days=d.weekday())).isoformat()
+    return d.replace(day=1).isoformat()
+
+
+class LeadRollups:
+    def __init__(self, db, collection: str = "lead_rollups", interval: float = 300.0,
+                 debounce: float = 2.0, lag: float = 600.0, lease_seconds: float = 120.0,
+                 retry_delay: float = 5.0):
+        self.db = db
+        self.collection = db[collection]
+        self.interval = interval
+        self.debounce = debounce
+        self.lag = timedelta(seconds=lag)
+        self.lease_seconds = lease_seconds
+        self.retry_delay = retry_delay
+        self.runs = 0
+        self.failures = 0
+        self.last_run_seconds: Optional[float] = None
+        self.watermark: Optional[str] = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    # ---- maintenance ----
+
+    async def _lease(self, now: datetime) -> Optional[dict]:
+        """Claim the rollup job; None if another worker holds it."""
+        try:
+            return await self.db.analytics_state.find_one_and_update(
+                {"_id": "lead_rollups", "$or": [{"lease_until": {"$lte": now}}, {"lease_until": None}]},
+                {"$set": {"lease_until": now + timedelta(seconds=self.lease_seconds)}},
+                upsert=True,
+            ) or {}
+        except DuplicateKeyError:
+            return None  # Lease held: the filter missed and the upsert collided
+
+    async def run_once(self) -> Optional[dict]:
+        """Roll up leads since the watermark. Returns None when another worker is on it."""
+        now = datetime.now(timezone.utc)
+        state = await self._lease(now)
+        if state is None:
+            return None
+        start = time.perf_counter()
+        try:
+            watermark = state.get("watermark")
+            since = (datetime.fromisoformat(watermark) - self.lag).date().isoformat() if watermark else ""
+            # Read the new watermark first: leads inserted during the run are
+            # picked up again next time
+            newest = await self.db.leads.find_one({}, {"_id": 0, "created_at": 1}, sort=[("created_at", -1)])
+            groups = await self.db.leads.aggregate(rollup_pipeline(since)).to_list(None)
+            buckets = fold_buckets(groups, now)
+            if buckets:
+                await self.collection.bulk_write(
+                    [ReplaceOne({"_id": bucket["_id"]}, bucket, upsert=True) for bucket in buckets], ordered=False)
+            removed = await self.collection.delete_many({"day": {"$gte": since}, "updated_at": {"$lt": now}})
+            watermark = newest["created_at"] if newest else watermark
+            await self.db.analytics_state.update_one(
+                {"_id": "lead_rollups"},
+                {"$set": {"watermark": watermark, "run_at": now, "lease_until": now}},
+            )
+        except BaseException:
+            await self.db.analytics_state.update_one({"_id": "lead_rollups"}, {"$set": {"lease_until": now}})
+            raise
+        self.watermark = watermark
+        self.runs += 1
+        self.last_run_seconds = round(time.perf_counter() - start, 3)
+        return {"since": since or None, "watermark": watermark, "removed": removed.deleted_count,
+                "seconds": self.last_run_seconds}
+
+    def wake(self):
+        """New leads were written: roll them up after the debounce."""
+        self._wakeup.set()
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        failed_in_a_row = 0
+        while True:
+            try:
+                await self.run_once()
+                failed_in_a_row = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Whatever the failure, the loop keeps going (and stop() stays clean)
+                self.failures += 1
+                failed_in_a_row += 1
+                logger.error(f"Lead rollup failed: {e!r}")
+                # Back off, ignoring wake-ups, so a persistent error isn't retried per lead
+                await asyncio.sleep(min(self.interval, self.retry_delay * 2 ** (failed_in_a_row - 1)))
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+                await asyncio.sleep(self.debounce)  # Let a burst of submissions land
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    # ---- queries ----
+
+    async def query(self, start: date, end: date, interval: str = "day",
+                    group_by: Sequence[str] = (), filters: Optional[Dict[str, str]] = None) -> dict:
+        """Lead counts and budget mix per period and ``group_by`` dimensions,
+        for leads created on days ``start`` to ``end`` (inclusive)."""
+        match = {"day": {"$gte": start.isoformat(), "$lte": end.isoformat()}}
+        for name, value in (filters or {}).items():
+            match[name] = value.strip().lower() if name == "city" else value
+        projection = {"_id": 0, "day": 1, "count": 1, "budget_ranges": 1, **{name: 1 for name in group_by}}
+        buckets = await self.collection.find(match, projection).to_list(None)
+        state = await self.db.analytics_state.find_one({"_id": "lead_rollups"}, {"watermark": 1}) or {}
+
+        rows: Dict[tuple, dict] = {}
+        for bucket in buckets:
+            key = (period_start(bucket["day"], interval), *(bucket.get(name) for name in group_by))
+            row = rows.get(key)
+            if row is None:
+                row = rows[key] = {"count": 0, "budget_ranges": defaultdict(int)}
+            row["count"] += bucket["count"]
+            for mix in bucket.get("budget_ranges", ()):
+                row["budget_ranges"][mix["range"]] += mix["count"]
+        ordered = sorted(rows.items(), key=lambda item: (item[0][0] or "", -item[1]["count"], item[0][1:]))
+        return {
+            "watermark": state.get("watermark"),
+            "total": sum(row["count"] for row in rows.values()),
+            "buckets_scanned": len(buckets),
+            "rows": [
+                {"period": key[0], "group": dict(zip(group_by, key[1:])),
+                 "count": row["count"], "budget_ranges": dict(row["budget_ranges"])}
+                for key, row in ordered
+            ],
+        }
+
+    def stats(self) -> dict:
+        return {
+            "watermark": self.watermark,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_run_seconds": self.last_run_seconds,
+        }
@@ -0,0 +1,528 @@
+"""Crew and bar-unit availability per city and day.
+
+Capacity is configured per pool in the ``capacity`` collection: a pool
+(e.g. Delhi NCR) serves a list of cities with a base number of crew and bar
+units, and the ``default`` pool (the travelling team) serves every other
+city. A document with a ``date`` overrides a pool's capacity for that day.
+
+Active bookings (``hold`` or ``confirmed``) are kept in an in-memory index:
+one segment tree per pool and resource over day ordinals, supporting range
+add and range max. A booking adds its crew/units over its dates in
+O(log n); "how much is free between these dates" is a range max in
+O(log n), and a day-by-day calendar is O(days + log n). Bookings written
+through the API are applied directly; a change stream (or, without one, a
+periodic rebuild) picks up changes made elsewhere, so requests never
+aggregate over the bookings collection.
+
+The index answers "is there room" quickly, but each worker has its own, so
+it can't decide a booking on its own: two workers (or two requests in one)
+could both see the last crew free. Bookings are decided by
+``CapacityLedger``, per-day usage counters in Mongo that a booking takes
+with one conditional update per day.
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+RESOURCES = ("crew", "bar_units")
+ACTIVE_STATUSES = ("hold", "confirmed")
+# Share of a pool's base capacity below which a day is reported as limited
+LIMITED_SHARE = 0.25
+
+DEFAULT_CAPACITY = [
+    {"pool": "delhi-ncr", "cities": ["delhi", "new delhi", "gurgaon", "gurugram", "noida", "greater noida",
+                                     "faridabad", "ghaziabad"], "crew": 40, "bar_units": 12},
+    {"pool": "outstation", "default": True, "crew": 16, "bar_units": 5},
+]
+
+
+class OutOfRange(ValueError):
+    pass
+
+
+def normalize_city(city: Optional[str]) -> str:
+    return " ".join((city or "").lower().split())
+
+
+class _MaxTree:
+    """Range add / range max over ``size`` slots.
+
+    Adds aren't pushed down: each node's max already includes its own
+    pending add, so updates and queries only touch O(log n) nodes.
+    """
+
+    def __init__(self, size: int):
+        self.n = 1
+        while self.n < size:
+            self.n *= 2
+        self.max = [0] * (2 * self.n)
+        self.add = [0] * (2 * self.n)
+
+    def update(self, lo: int, hi: int, value: int, node: int = 1, nlo: int = 0, nhi: int = -1):
+        """Add ``value`` to every slot in [lo, hi]."""
+        if nhi < 0:
+            nhi = self.n - 1
+        if hi < nlo or nhi < lo:
+            return
+        if lo <= nlo and nhi <= hi:
+            self.max[node] += value
+            self.add[node] += value
+            return
+        mid = (nlo + nhi) // 2
+        self.update(lo, hi, value, 2 * node, nlo, mid)
+        self.update(lo, hi, value, 2 * node + 1, mid + 1, nhi)
+        self.max[node] = max(self.max[2 * node], self.max[2 * node + 1]) + self.add[node]
+
+    def range_max(self, lo: int, hi: int, node: int = 1, nlo: int = 0, nhi: int = -1) -> float:
+        if nhi < 0:
+            nhi = self.n - 1
+        if hi < nlo or nhi < lo:
+            return -math.inf
+        if lo <= nlo and nhi <= hi:
+            return self.max[node]
+        mid = (nlo + nhi) // 2
+        return max(self.range_max(lo, hi, 2 * node, nlo, mid),
+                   self.range_max(lo, hi, 2 * node + 1, mid + 1, nhi)) + self.add[node]
+
+    def values(self, lo: int, hi: int) -> List[int]:
+        """Per-slot values for [lo, hi]."""
+        out: List[int] = []
+        self._collect(lo, hi, 1, 0, self.n - 1, 0, out)
+        return out
+
+    def _collect(self, lo, hi, node, nlo, nhi, acc, out):
+        if hi < nlo or nhi < lo:
+            return
+        acc += self.add[node]
+        if nlo == nhi:
+            out.append(acc)
+            return
+        mid = (nlo + nhi) // 2
+        self._collect(lo, hi, 2 * node, nlo, mid, acc, out)
+        self._collect(lo, hi, 2 * node + 1, mid + 1, nhi, acc, out)
+
+
+def booking_days(start: str, end: str) -> List[str]:
+    """ISO dates from ``start`` to ``end``, inclusive."""
+    first, last = date.fromisoformat(start), date.fromisoformat(end)
+    return [(first + timedelta(days=i)).isoformat() for i in range((last - first).days + 1)]
+
+
+class _Pool:
+    __slots__ = ("name", "capacity", "overrides", "used")
+
+    def __init__(self, name: str, capacity: Dict[str, int], size: int):
+        self.name = name
+        self.capacity = capacity
+        # day -> capacity for that day, from dated capacity documents
+        self.overrides: Dict[int, Dict[str, int]] = {}
+        # Booked units per day; capacity overrides are folded in as
+        # (possibly negative) reservations
+        self.used = {resource: _MaxTree(size) for resource in RESOURCES}
+
+
+class AvailabilityIndex:
+    def __init__(self, db, *, history_days: int = 60, horizon_days: int = 1100,
+                 rebuild_interval: float = 300.0, watch: bool = True, retry_delay: float = 60.0):
+        self.db = db
+        self.history_days = history_days
+        self.horizon_days = horizon_days
+        self.rebuild_interval = rebuild_interval
+        self.watch = watch
+        self.retry_delay = retry_delay
+        self.watching = False
+        self.rebuilds = 0
+        self.updates = 0
+        self.epoch = date.today() - timedelta(days=history_days)
+        self._size = history_days + horizon_days
+        self._pools: Dict[str, _Pool] = {}
+        self._cities: Dict[str, str] = {}
+        self._default_pool: Optional[str] = None
+        # booking id -> (pool, first day, last day, crew, bar units) currently applied
+        self._applied: Dict[str, Tuple[str, int, int, int, int]] = {}
+        # Bookings applied while a rebuild is reading, replayed on top of it
+        self._replay: Optional[Dict[str, dict]] = None
+        self._ready = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    # ---- building ----
+
+    async def rebuild(self):
+        """Reload capacity and every active booking from Mongo."""
+        async with self._lock:
+            start = time.perf_counter()
+            epoch = date.today() - timedelta(days=self.history_days)
+            self._replay = {}
+            try:
+                capacity = await self.db.capacity.find({}, {"_id": 0}).to_list(None)
+                bookings = await self.db.bookings.find(
+                    {"status": {"$in": list(ACTIVE_STATUSES)}, "end": {"$gte": epoch.isoformat()}},
+                    {"_id": 0, "id": 1, "city": 1, "start": 1, "end": 1, "crew": 1, "bar_units": 1, "status": 1},
+                ).to_list(None)
+                replay = self._replay
+            finally:
+                self._replay = None
+
+            # Everything below is synchronous, so readers never see a half-built index
+            self.epoch = epoch
+            self._configure(capacity or DEFAULT_CAPACITY)
+            self._applied = {}
+            for booking in bookings:
+                self._apply(booking)
+            for booking in replay.values():
+                self._apply(booking)
+            self.rebuilds += 1
+            self._ready.set()
+            logger.info(f"Availability index built: {len(self._pools)} pools, {len(self._applied)} bookings "
+                        f"in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    def _configure(self, capacity: List[dict]):
+        base = [doc for doc in capacity if not doc.get("date")]
+        self._pools = {}
+        self._cities = {}
+        self._default_pool = None
+        for doc in base:
+            name = doc["pool"]
+            self._pools[name] = _Pool(name, {r: int(doc.get(r, 0)) for r in RESOURCES}, self._size)
+            for city in doc.get("cities", ()):
+                self._cities[normalize_city(city)] = name
+            if doc.get("default"):
+                self._default_pool = name
+        for doc in capacity:
+            pool = self._pools.get(doc.get("pool"))
+            if doc.get("date") and pool is not None:
+                day = self._day(date.fromisoformat(doc["date"]))
+                if 0 <= day < self._size:
+                    for resource in RESOURCES:
+                        if resource in doc:
+                            pool.overrides.setdefault(day, {})[resource] = int(doc[resource])
+                            pool.used[resource].update(day, day, pool.capacity[resource] - int(doc[resource]))
+
+    def pool_for(self, city: Optional[str]) -> Optional[_Pool]:
+        name = self._cities.get(normalize_city(city), self._default_pool)
+        return self._pools.get(name) if name else None
+
+    def _day(self, value: date) -> int:
+        return value.toordinal() - self.epoch.toordinal()
+
+    # ---- incremental updates ----
+
+    def apply(self, booking: dict):
+        """Make the index reflect ``booking``'s current state (create, change or cancel)."""
+        self._apply(booking)
+        if self._replay is not None:
+            self._replay[booking["id"]] = booking
+        self.updates += 1
+
+    def _apply(self, booking: dict):
+        self._remove(booking["id"])
+        if booking.get("status") not in ACTIVE_STATUSES:
+            return
+        pool = self.pool_for(booking.get("city"))
+        if pool is None:
+            return
+        lo = max(self._day(date.fromisoformat(booking["start"])), 0)
+        hi = min(self._day(date.fromisoformat(booking["end"])), self._size - 1)
+        if lo > hi:
+            return
+        crew, units = int(booking.get("crew", 0)), int(booking.get("bar_units", 0))
+        pool.used["crew"].update(lo, hi, crew)
+        pool.used["bar_units"].update(lo, hi, units)
+        self._applied[booking["id"]] = (pool.name, lo, hi, crew, units)
+
+    def _remove(self, booking_id: str):
+        applied = self._applied.pop(booking_id, None)
+        if applied is None:
+            return
+        name, lo, hi, crew, units = applied
+        pool = self._pools.get(name)
+        if pool is not None:
+            pool.used["crew"].update(lo, hi, -crew)
+            pool.used["bar_units"].update(lo, hi, -units)
+
+    # ---- queries ----
+
+    def _range(self, start: date, end: date) -> Tuple[int, int]:
+        lo, hi = self._day(start), self._day(end)
+        if lo < 0 or hi >= self._size:
+            first = self.epoch
+            last = self.epoch + timedelta(days=self._size - 1)
+            raise OutOfRange(f"Dates must be between {first.isoformat()} and {last.isoformat()}")
+        return lo, hi
+
+    def free(self, city: Optional[str], start: date, end: date) -> Dict[str, int]:
+        """Fewest free crew / bar units on any day in [start, end]."""
+        pool = self.pool_for(city)
+        if pool is None:
+            return {resource: 0 for resource in RESOURCES}
+        lo, hi = self._range(start, end)
+        return {r: pool.capacity[r] - int(pool.used[r].range_max(lo, hi)) for r in RESOURCES}
+
+    def limits(self, city: Optional[str], start: date, end: date) -> Tuple[Optional[str], List[Tuple[str, int, int]]]:
+        """The pool serving ``city`` and its (date, crew, bar units) capacity per day."""
+        lo, hi = self._range(start, end)
+        pool = self.pool_for(city)
+        if pool is None:
+            return None, []
+        return pool.name, [
+            ((self.epoch + timedelta(days=day)).isoformat(),
+             *(pool.overrides.get(day, {}).get(r, pool.capacity[r]) for r in RESOURCES))
+            for day in range(lo, hi + 1)
+        ]
+
+    def calendar(self, city: Optional[str], start: date, end: date,
+                 crew: int = 1, bar_units: int = 1) -> dict:
+        lo, hi = self._range(start, end)
+        pool = self.pool_for(city)
+        needed = {"crew": crew, "bar_units": bar_units}
+        if pool is None:
+            return {"pool": None, "available": False, "free": {r: 0 for r in RESOURCES},
+                    "days": [{"date": (start + timedelta(days=i)).isoformat(), "crew": 0, "bar_units": 0,
+                              "status": "full"} for i in range(hi - lo + 1)]}
+
+        used = {r: pool.used[r].values(lo, hi) for r in RESOURCES}
+        days = []
+        for i in range(hi - lo + 1):
+            free = {r: pool.capacity[r] - used[r][i] for r in RESOURCES}
+            if any(free[r] < needed[r] for r in RESOURCES):
+                status = "full"
+            elif any(free[r] < pool.capacity[r] * LIMITED_SHARE for r in RESOURCES):
+                status = "limited"
+            else:
+                status = "available"
+            days.append({"date": (start + timedelta(days=i)).isoformat(), **free, "status": status})
+        free = {r: min(day[r] for day in days) for r in RESOURCES}
+        return {
+            "pool": pool.name,
+            "available": all(free[r] >= needed[r] for r in RESOURCES),
+            "free": free,
+            "days": days,
+        }
+
+    # ---- lifecycle ----
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.watching = False
+
+    async def wait_ready(self, timeout: float = 10.0):
+        await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.rebuild()
+                if self.watch:
+                    await self._watch()
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                logger.warning(f"Availability index: change stream unavailable ({e}); "
+                               f"rebuilding every {self.rebuild_interval:.0f}s")
+            except Exception as e:
+                logger.error(f"Availability index rebuild failed: {str(e)}")
+            self.watching = False
+            await asyncio.sleep(self.rebuild_interval if self._ready.is_set() else self.retry_delay)
+
+    async def _watch(self):
+        pipeline = [{"$match": {"ns.coll": {"$in": ["bookings", "capacity"]}}}]
+        async with self.db.watch(pipeline, full_document="updateLookup") as stream:
+            self.watching = True
+            # Changes made between the rebuild and the stream opening
+            await self.rebuild()
+            logger.info("Availability index: change stream active")
+            async for change in stream:
+                doc = change.get("fullDocument")
+                if change.get("ns", {}).get("coll") == "bookings" and doc and doc.get("id"):
+                    self.apply(doc)
+                else:
+                    # Capacity changes and hard deletes (which only carry _id)
+                    await self.rebuild()
+        logger.warning("Availability index: change stream closed")
+
+    def stats(self) -> dict:
+        return {
+            "mode": "change_stream" if self.watching else "rebuild",
+            "ready": self._ready.is_set(),
+            "pools": len(self._pools),
+            "bookings": len(self._applied),
+            "rebuilds": self.rebuilds,
+            "updates": self.updates,
+        }
+
+
+class CapacityLedger:
+    """Booked crew and bar units per pool and day, shared by every worker.
+
+    One document per pool and day (``{"_id": "delhi-ncr:2025-11-22",
+    "crew": 12, "bar_units": 3}``). ``reserve`` takes a booking's crew and
+    units day by day, each with a single update that only matches while
+    the day still has room. A day without room fails the upsert with a
+    duplicate key, and the days already taken are given back, so
+    concurrent bookings can't overbook even across workers.
+
+    Bookings made before the ledger existed are counted once, by whichever
+    worker claims the build marker first; bookings wait (``wait_ready``)
+    until it is built.
+    """
+
+    MARKER = "_built"
+
+    def __init__(self, collection, bookings, index: AvailabilityIndex,
+                 stale_after: float = 300.0, poll_interval: float = 1.0):
+        self.collection = collection
+        self.bookings = bookings
+        self.index = index
+        self.stale_after = stale_after
+        self.poll_interval = poll_interval
+        self.reserved = 0
+        self.rejected = 0
+        self.released = 0
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _id(pool: str, day: str) -> str:
+        return f"{pool}:{day}"
+
+    async def reserve(self, pool: str, days: List[Tuple[str, int, int]], crew: int, bar_units: int) -> Optional[str]:
+        """Take ``crew`` and ``bar_units`` on every day; returns None, or the
+        first day without room (having taken nothing)."""
+        taken: List[str] = []
+        for day, crew_capacity, units_capacity in days:
+            room = crew <= crew_capacity and bar_units <= units_capacity
+            if room:
+                try:
+                    await self.collection.update_one(
+                        {"_id": self._id(pool, day), "crew": {"$lte": crew_capacity - crew},
+                         "bar_units": {"$lte": units_capacity - bar_units}},
+                        {"$inc": {"crew": crew, "bar_units": bar_units}, "$setOnInsert": {"pool": pool, "date": day}},
+                        upsert=True,
+                    )
+                except DuplicateKeyError:
+                    room = False
+            if not room:
+                await self._add(pool, taken, -crew, -bar_units)
+                self.rejected += 1
+                return day
+            taken.append(day)
+        self.reserved += 1
+        return None
+
+    async def release(self, pool: str, days: List[str], crew: int, bar_units: int):
+        await self._add(pool, days, -crew, -bar_units)
+        self.released += 1
+
+    async def _add(self, pool: str, days: List[str], crew: int, bar_units: int):
+        if days:
+            await self.collection.update_many({"_id": {"$in": [self._id(pool, day) for day in days]}},
+                                              {"$inc": {"crew": crew, "bar_units": bar_units}})
+
+    # ---- building ----
+
+    async def ensure_built(self):
+        while True:
+            marker = await self.collection.find_one({"_id": self.MARKER})
+            if marker and marker.get("state") == "built":
+                self._ready.set()
+                return
+            now = datetime.now(timezone.utc)
+            claimed = False
+            if marker is None:
+                try:
+                    await self.collection.insert_one({"_id": self.MARKER, "state": "building", "at": now})
+                    claimed = True
+                except DuplicateKeyError:
+                    pass
+            elif (now - marker["at"]).total_seconds() > self.stale_after:
+                # The worker building it went away
+                claimed = await self.collection.find_one_and_update(
+                    {"_id": self.MARKER, "state": "building", "at": marker["at"]}, {"$set": {"at": now}},
+                ) is not None
+            if claimed:
+                await self._build()
+                continue
+            await asyncio.sleep(self.poll_interval)
+
+    async def _build(self):
+        await self.index.wait_ready(timeout=self.stale_after)
+        start = time.perf_counter()
+        usage: Dict[Tuple[str, str], List[int]] = defaultdict(lambda: [0, 0])
+        async for booking in self.bookings.find(
+            {"status": {"$in": list(ACTIVE_STATUSES)}, "end": {"$gte": self.index.epoch.isoformat()}},
+            {"_id": 0, "city": 1, "pool": 1, "start": 1, "end": 1, "crew": 1, "bar_units": 1},
+        ):
+            pool = booking.get("pool") or getattr(self.index.pool_for(booking.get("city")), "name", None)
+            if pool is None:
+                continue
+            for day in booking_days(booking["start"], booking["end"]):
+                counts = usage[(pool, day)]
+                counts[0] += int(booking.get("crew", 0))
+                counts[1] += int(booking.get("bar_units", 0))
+        await self.collection.delete_many({"_id": {"$ne": self.MARKER}})
+        if usage:
+            await self.collection.bulk_write([
+                UpdateOne({"_id": self._id(pool, day)},
+                          {"$set": {"pool": pool, "date": day, "crew": crew, "bar_units": units}}, upsert=True)
+                for (pool, day), (crew, units) in usage.items()
+            ], ordered=False)
+        await self.collection.update_one({"_id": self.MARKER}, {"$set": {"state": "built",
+                                                                        "at": datetime.now(timezone.utc)}})
+        logger.info(f"Capacity ledger built from existing bookings: {len(usage)} pool-days "
+                    f"in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    # ---- lifecycle ----
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def wait_ready(self, timeout: float = 10.0):
+        await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+
+    async def _run(self):
+        while not self._ready.is_set():
+            try:
+                await self.ensure_built()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Capacity ledger build failed: {e!r}")
+                await asyncio.sleep(self.poll_interval * 30)
+
+    def stats(self) -> dict:
+        return {
+            "ready": self._ready.is_set(),
+            "reserved": self.reserved,
+            "rejected": self.rejected,
+            "released": self.released,
+        }
@@ -0,0 +1,151 @@
+import json
+from typing import Any, Dict, List, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+from pymongo.errors import BulkWriteError
+from starlette.requests import Request
+
+
+class TooManyRows(ValueError):
+    pass
+
+
+class BodyTooLarge(ValueError):
+    pass
+
+
+class InsertInterrupted(Exception):
+    """A chunk failed with something other than per-document write errors.
+
+    ``inserted`` holds the documents acknowledged before it; the failing
+    chunk may be partly written.
+    """
+
+    def __init__(self, inserted: List[dict], unconfirmed: int, cause: Exception):
+        super().__init__(f"{len(inserted)} inserted, {unconfirmed} unconfirmed: {cause!r}")
+        self.inserted = inserted
+        self.unconfirmed = unconfirmed
+
+
+RowErrors = Dict[int, List[str]]
+
+
+def _add_error(errors: RowErrors, row: int, message: str):
+    errors.setdefault(row, []).append(message)
+
+
+async def _stream(request: Request, max_bytes: int):
+    """The body's chunks, failing as soon as more than ``max_bytes`` arrive
+    (or are announced), before they are buffered or parsed."""
+    if int(request.headers.get("content-length") or 0) > max_bytes:
+        raise BodyTooLarge(f"body larger than {max_bytes} bytes")
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > max_bytes:
+            raise BodyTooLarge(f"body larger than {max_bytes} bytes")
+        yield chunk
+
+
+async def read_rows(request: Request, max_rows: int, max_bytes: int,
+                    max_line_bytes: int) -> Tuple[List[Tuple[int, Any]], RowErrors]:
+    """Parse a JSON array or an NDJSON stream into ``(row, value)`` pairs.
+
+    NDJSON is decoded line by line as the body streams in; a malformed line
+    becomes an error for that row rather than failing the whole upload.
+    Bodies over ``max_bytes`` and NDJSON lines over ``max_line_bytes`` raise
+    ``BodyTooLarge`` while streaming.
+    """
+    rows: List[Tuple[int, Any]] = []
+    errors: RowErrors = {}
+    content_type = request.headers.get("content-type", "")
+
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        row = 0
+        pending = b""
+
+        def take(line: bytes):
+            nonlocal row
+            if not line.strip():
+                return
+            if row >= max_rows:
+                raise TooManyRows(f"more than {max_rows} rows")
+            try:
+                rows.append((row, json.loads(line)))
+            except ValueError as e:
+                _add_error(errors, row, f"invalid JSON: {e}")
+            row += 1
+
+        async for chunk in _stream(request, max_bytes):
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                if len(line) > max_line_bytes:
+                    raise BodyTooLarge(f"row {row} longer than {max_line_bytes} bytes")
+                take(line)
+            if len(pending) > max_line_bytes:
+                raise BodyTooLarge(f"row {row} longer than {max_line_bytes} bytes")
+        take(pending)
+        return rows, errors
+
+    body = b"".join([chunk async for chunk in _stream(request, max_bytes)])
+    try:
+        payload = json.loads(body)
+    except ValueError as e:
+        raise ValueError(f"invalid JSON: {e}")
+    if not isinstance(payload, list):
+        raise ValueError("expected a JSON array of leads")
+    if len(payload) > max_rows:
+        raise TooManyRows(f"more than {max_rows} rows")
+    return list(enumerate(payload)), errors
+
+
+def validate_rows(adapter: TypeAdapter, rows: List[Tuple[int, Any]],
+                  errors: RowErrors) -> List[Tuple[int, Any]]:
+    """Validate every row with one list-level ``adapter`` call.
+
+    ``adapter`` validates a list (e.g. ``TypeAdapter(List[LeadCreate])``).
+    On failure, the error locations identify the bad rows; those are
+    recorded in ``errors`` and the remaining rows are validated again in one
+    more call.
+    """
+    values = [value for _, value in rows]
+    try:
+        return list(zip((row for row, _ in rows), adapter.validate_python(values)))
+    except ValidationError as e:
+        bad = set()
+        for err in e.errors():
+            position = err["loc"][0]
+            bad.add(position)
+            field = ".".join(str(part) for part in err["loc"][1:]) or "row"
+            _add_error(errors, rows[position][0], f"{field}: {err['msg']}")
+
+    good = [pair for position, pair in enumerate(rows) if position not in bad]
+    if not good:
+        return []
+    return list(zip((row for row, _ in good), adapter.validate_python([value for _, value in good])))
+
+
+async def insert_chunks(collection, docs: List[Tuple[int, dict]], errors: RowErrors,
+                        chunk_size: int = 1000) -> List[dict]:
+    """``insert_many(ordered=False)`` in chunks; returns the documents written.
+
+    Any other failure raises ``InsertInterrupted`` with what was written
+    so far, so the caller can record the partial import.
+    """
+    inserted = []
+    for start in range(0, len(docs), chunk_size):
+        chunk = docs[start:start + chunk_size]
+        try:
+            await collection.insert_many([doc for _, doc in chunk], ordered=False)
+            inserted.extend(doc for _, doc in chunk)
+        except BulkWriteError as e:
+            failed = set()
+            for write_error in e.details.get("writeErrors", []):
+                row, _ = chunk[write_error["index"]]
+                failed.add(write_error["index"])
+                _add_error(errors, row, write_error.get("errmsg", "write failed"))
+            inserted.extend(doc for i, (_, doc) in enumerate(chunk) if i not in failed)
+        except Exception as e:
+            raise InsertInterrupted(inserted, len(docs) - start, e) from e
+    return inserted
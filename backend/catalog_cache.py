@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Catalog collections served by the read endpoints, with the sort order each
+# one is loaded in (mirrors the sort the routes used to push down to Mongo).
+CATALOG_COLLECTIONS = {
+    "setups": None,
+    "menus": None,
+    "testimonials": None,
+    "gallery": None,
+    "packages": None,
+    "faqs": [("order", 1)],
+    "rate_cards": None,
+    "scoring_rules": None,
+}
+
+
+class _Entry:
+    __slots__ = ("name", "docs", "version", "generation", "loaded_at", "views")
+
+    def __init__(self, name: str, docs: List[dict], version: int, generation: int, loaded_at: float):
+        self.name = name
+        self.docs = docs
+        self.version = version
+        self.generation = generation
+        self.loaded_at = loaded_at
+        self.views: Dict[str, Any] = {}
+
+
+class CatalogCache:
+    """Loads each catalog collection once and serves it from memory.
+
+    Entries are invalidated by a MongoDB change stream when the deployment
+    supports one (replica sets / Atlas). Otherwise, or while the stream is
+    down, entries expire after ``ttl`` seconds.
+    """
+
+    def __init__(self, db, collections: Optional[Dict[str, Optional[list]]] = None,
+                 ttl: float = 300.0, watch: bool = True, retry_delay: float = 60.0):
+        self.db = db
+        self.collections = dict(collections or CATALOG_COLLECTIONS)
+        self.ttl = ttl
+        self.watch = watch
+        self.retry_delay = retry_delay
+        self.watching = False
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: Dict[str, _Entry] = {}
+        self._generations = {name: 0 for name in self.collections}
+        self._versions = {name: 0 for name in self.collections}
+        self._locks = {name: asyncio.Lock() for name in self.collections}
+        self._watch_task: Optional[asyncio.Task] = None
+
+    # ---- reads ----
+
+    async def get(self, name: str) -> List[dict]:
+        """Return every document of ``name`` (without ``_id``). Treat as read-only."""
+        entry = self._entries.get(name)
+        if entry is not None and self._fresh(entry):
+            self.hits += 1
+            return entry.docs
+
+        async with self._locks[name]:
+            entry = self._entries.get(name)
+            if entry is not None and self._fresh(entry):
+                self.hits += 1
+                return entry.docs
+            self.misses += 1
+            entry = await self._load(name)
+            return entry.docs
+
+    async def view(self, name: str, key: str, build: Callable[[List[dict]], Any]) -> Any:
+        """Return ``build(docs)`` for ``name``, computed once per cached version."""
+        docs = await self.get(name)
+        entry = self._entries[name]
+        if key not in entry.views:
+            entry.views[key] = build(docs)
+        return entry.views[key]
+
+    def version(self, name: str) -> int:
+        """Version of the currently cached copy of ``name`` (0 if never loaded)."""
+        entry = self._entries.get(name)
+        return entry.version if entry is not None else 0
+
+    def _fresh(self, entry: _Entry) -> bool:
+        if entry.generation != self._generations[entry.name]:
+            return False
+        if self.watching:
+            return True
+        return time.monotonic() - entry.loaded_at < self.ttl
+
+    async def _load(self, name: str) -> _Entry:
+        generation = self._generations[name]
+        cursor = self.db[name].find({}, {"_id": 0})
+        sort = self.collections[name]
+        if sort:
+            cursor = cursor.sort(sort)
+        docs = await cursor.to_list(None)
+
+        self._versions[name] += 1
+        entry = _Entry(name, docs, self._versions[name], generation, time.monotonic())
+        self._entries[name] = entry
+        logger.info(f"Catalog cache loaded {name}: {len(docs)} docs (v{entry.version})")
+        return entry
+
+    # ---- invalidation ----
+
+    def invalidate(self, names: Optional[Iterable[str]] = None):
+        """Drop cached copies so the next read goes back to Mongo."""
+        for name in names if names is not None else list(self.collections):
+            if name in self._generations:
+                self._generations[name] += 1
+                self.invalidations += 1
+
+    async def start(self):
+        if self.watch and self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._watch_loop())
+
+    async def stop(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+        self.watching = False
+
+    async def _watch_loop(self):
+        pipeline = [{"$match": {"ns.coll": {"$in": list(self.collections)}}}]
+        while True:
+            try:
+                async with self.db.watch(pipeline) as stream:
+                    self.watching = True
+                    # Anything cached before the stream opened may have missed events
+                    self.invalidate()
+                    logger.info("Catalog cache: change stream active")
+                    async for change in stream:
+                        coll = change.get("ns", {}).get("coll")
+                        self.invalidate([coll] if coll else None)
+                logger.warning("Catalog cache: change stream closed")
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                logger.warning(f"Catalog cache: change stream unavailable ({e}); "
+                               f"falling back to {self.ttl:.0f}s TTL")
+            if self.watching:
+                self.watching = False
+                self.invalidate()
+            await asyncio.sleep(self.retry_delay)
+
+    # ---- monitoring ----
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations,
+            "mode": "change_stream" if self.watching else "ttl",
+            "ttl_seconds": self.ttl,
+            "collections": {
+                name: {"version": entry.version, "docs": len(entry.docs)}
+                for name, entry in self._entries.items()
+            },
+        }
@@ -0,0 +1,217 @@
+"""Declarative MongoDB index registry and query-plan check.
+
+The registry is applied on app startup. Run from the backend directory:
+
+    python db_indexes.py apply      # create/update every index
+    python db_indexes.py explain    # explain() every query shape; exit 1 on COLLSCAN
+"""
+import asyncio
+import logging
+import os
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Index option conflicts: same keys, different options / name
+_CONFLICT_CODES = {85, 86}
+
+
+def index_registry(dedup_window_seconds: int = 86400) -> Dict[str, List[IndexModel]]:
+    notify_queue = [
+        IndexModel([("notify.status", ASCENDING), ("notify.next_attempt_at", ASCENDING)], name="notify_pending"),
+        IndexModel([("notify.status", ASCENDING), ("notify.lease_until", ASCENDING)], name="notify_lease"),
+    ]
+    return {
+        "leads": [
+            IndexModel([("id", ASCENDING)], name="id", unique=True),
+            IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+            *notify_queue,
+        ],
+        "lead_imports": [
+            IndexModel([("id", ASCENDING)], name="id", unique=True),
+            *notify_queue,
+        ],
+        "lead_claims": [
+            IndexModel([("created_at", ASCENDING)], name="ttl", expireAfterSeconds=dedup_window_seconds),
+        ],
+        "setups": [
+            IndexModel([("slug", ASCENDING)], name="slug", unique=True),
+            IndexModel([("occasion", ASCENDING)], name="occasion"),
+            IndexModel([("style", ASCENDING)], name="style"),
+        ],
+        "menus": [
+            IndexModel([("type", ASCENDING), ("molecular", ASCENDING)], name="type_molecular"),
+            IndexModel([("flavor_profile", ASCENDING)], name="flavor_profile"),
+        ],
+        "gallery": [IndexModel([("category", ASCENDING)], name="category")],
+        "faqs": [IndexModel([("order", ASCENDING)], name="order")],
+        "bookings": [
+            IndexModel([("id", ASCENDING)], name="id", unique=True),
+            IndexModel([("status", ASCENDING), ("end", ASCENDING)], name="status_end"),
+        ],
+        "lead_rollups": [IndexModel([("day", ASCENDING)], name="day")],
+        # Shared rate-limit buckets; a bucket is full again once it expires
+        "rate_limits": [IndexModel([("expires_at", ASCENDING)], name="ttl", expireAfterSeconds=0)],
+    }
+
+
+async def apply_indexes(db, registry: Dict[str, List[IndexModel]]) -> Dict[str, List[str]]:
+    """Create every registered index. Failures are logged, not raised, so a
+    conflicting legacy index can't keep the API from starting."""
+    created = {}
+    for name, models in registry.items():
+        collection = db[name]
+        try:
+            created[name] = await collection.create_indexes(models)
+        except OperationFailure as e:
+            if e.code not in _CONFLICT_CODES:
+                logger.error(f"Index bootstrap failed for {name}: {e}")
+                continue
+            created[name] = []
+            for model in models:
+                try:
+                    created[name].extend(await collection.create_indexes([model]))
+                except OperationFailure as conflict:
+                    await _resolve_conflict(db, name, model, conflict)
+    logger.info(f"Indexes ensured on {len(created)} collections")
+    return created
+
+
+async def _resolve_conflict(db, name: str, model: IndexModel, error: OperationFailure):
+    spec = model.document
+    if "expireAfterSeconds" in spec:
+        # TTL windows can be changed in place
+        await db.command("collMod", name, index={
+            "keyPattern": dict(spec["key"]), "expireAfterSeconds": spec["expireAfterSeconds"],
+        })
+        logger.info(f"Updated TTL on {name}.{spec['name']} to {spec['expireAfterSeconds']}s")
+    else:
+        logger.error(f"Index {name}.{spec['name']} conflicts with an existing index: {error}")
+
+
+# ============ QUERY SHAPES ============
+
+@dataclass
+class QueryShape:
+    """A query the API issues, with representative values for explain()."""
+    name: str
+    collection: str
+    filter: dict
+    sort: Optional[list] = None
+    limit: int = 0
+    projection: dict = field(default_factory=lambda: {"_id": 0})
+    # Loads of whole (small) catalog collections are scans by design
+    allow_collscan: bool = False
+
+
+def query_shapes() -> List[QueryShape]:
+    now = datetime.now(timezone.utc)
+    iso = now.isoformat()
+    lead_sort = [("created_at", DESCENDING), ("id", DESCENDING)]
+    claim = {"notify.lane": None, "$or": [
+        {"notify.status": "pending", "notify.next_attempt_at": {"$lte": now}},
+        {"notify.status": "sending", "notify.lease_until": {"$lte": now}, "notify.attempts": {"$lt": 8}},
+    ]}
+    shapes = [
+        QueryShape("leads: first page", "leads", {}, lead_sort, 101),
+        QueryShape("leads: next page", "leads", {"$or": [
+            {"created_at": {"$lt": iso}},
+            {"created_at": iso, "id": {"$lt": "ffffffff"}},
+        ]}, lead_sort, 101),
+        QueryShape("leads: export range", "leads", {"created_at": {"$gte": iso, "$lt": iso}}, lead_sort),
+        QueryShape("leads: by id", "leads", {"id": "lead-id"}, limit=1),
+        QueryShape("leads: by ids", "leads", {"id": {"$in": ["a", "b"]}}),
+        QueryShape("leads: outbox claim", "leads", claim, [("notify.next_attempt_at", ASCENDING)], 1),
+        QueryShape("leads: fast lane outbox claim", "leads", {**claim, "notify.lane": "fast"},
+                   [("notify.next_attempt_at", ASCENDING)], 1),
+        QueryShape("lead_imports: outbox claim", "lead_imports", claim, [("notify.next_attempt_at", ASCENDING)], 1),
+        QueryShape("leads: outbox expired leases", "leads",
+                   {"notify.lane": None, "notify.status": "sending", "notify.lease_until": {"$lte": now},
+                    "notify.attempts": {"$gte": 8}}),
+        QueryShape("lead_claims: by key", "lead_claims", {"_id": {"$in": ["lead:x", "idem:y"]}}, limit=1),
+        QueryShape("leads: newest", "leads", {}, [("created_at", DESCENDING)], 1),
+        QueryShape("leads: rollup since watermark", "leads", {"created_at": {"$gte": iso[:10]}}),
+        QueryShape("lead_rollups: dashboard range", "lead_rollups",
+                   {"day": {"$gte": iso[:10], "$lte": iso[:10]}, "event_type": "Wedding"}),
+        QueryShape("rate_limits: bucket", "rate_limits", {"_id": "ip:0123456789abcdef01234567"}, limit=1),
+        QueryShape("faqs: catalog load", "faqs", {}, [("order", ASCENDING)]),
+        QueryShape("bookings: availability load", "bookings",
+                   {"status": {"$in": ["hold", "confirmed"]}, "end": {"$gte": now.date().isoformat()}}),
+        QueryShape("bookings: by id", "bookings", {"id": "booking-id"}, limit=1),
+        QueryShape("capacity: availability load", "capacity", {}, allow_collscan=True),
+        QueryShape("capacity_usage: reserve day", "capacity_usage",
+                   {"_id": "delhi-ncr:" + now.date().isoformat(), "crew": {"$lte": 10}}, limit=1),
+    ]
+    for name in ("setups", "menus", "testimonials", "gallery", "packages"):
+        shapes.append(QueryShape(f"{name}: catalog load", name, {}, allow_collscan=True))
+    return shapes
+
+
+def _stages(plan: dict):
+    yield plan.get("stage")
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+async def explain_shapes(db, shapes: List[QueryShape]) -> List[dict]:
+    results = []
+    for shape in shapes:
+        cursor = db[shape.collection].find(shape.filter, shape.projection)
+        if shape.sort:
+            cursor = cursor.sort(shape.sort)
+        if shape.limit:
+            cursor = cursor.limit(shape.limit)
+        plan = (await cursor.explain())["queryPlanner"]["winningPlan"]
+        stages = [stage for stage in _stages(plan) if stage]
+        results.append({
+            "shape": shape.name,
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages,
+            "allowed": shape.allow_collscan,
+        })
+    return results
+
+
+async def _main(command: str) -> int:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(os.path.join(os.path.dirname(__file__), ".env"))
+    client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+    db = client[os.environ.get("DB_NAME", "hqd_drinks")]
+    registry = index_registry(int(os.environ.get("LEAD_DEDUP_WINDOW_SECONDS", "86400")))
+    try:
+        await apply_indexes(db, registry)
+        if command == "apply":
+            return 0
+
+        failures = 0
+        for result in await explain_shapes(db, query_shapes()):
+            if result["collscan"] and not result["allowed"]:
+                failures += 1
+                status = "FAIL"
+            else:
+                status = "ok  "
+            print(f"{status} {result['shape']}: {' <- '.join(result['stages'])}")
+        if failures:
+            print(f"{failures} query shape(s) use a COLLSCAN")
+        return 1 if failures else 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in ("apply", "explain"):
+        print(__doc__)
+        sys.exit(2)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    sys.exit(asyncio.run(_main(sys.argv[1])))
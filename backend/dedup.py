@@ -0,0 +1,79 @@
+import asyncio
+import hashlib
+import re
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from pymongo.errors import BulkWriteError
+
+_NON_DIGITS = re.compile(r"\D+")
+
+
+def lead_dedup_key(email: str, phone: str, event_date: Optional[str]) -> str:
+    """Normalized identity of an inquiry: same person, same phone, same date."""
+    digits = _NON_DIGITS.sub("", phone or "")[-10:]
+    parts = [(email or "").strip().lower(), digits, (event_date or "").strip().lower()]
+    return "lead:" + hashlib.sha256("|".join(parts).encode()).hexdigest()[:32]
+
+
+def idempotency_claim(key: str) -> str:
+    return "idem:" + key.strip()
+
+
+class LeadClaims:
+    """Unique claims on dedup / idempotency keys, stored in their own collection.
+
+    Each claim's ``_id`` is the key, so a duplicate submit is detected by the
+    primary-key index in the same round trip that records a new claim. The
+    TTL index on ``created_at`` (see ``db_indexes``) expires claims after the
+    dedup window.
+    """
+
+    def __init__(self, collection, window_seconds: int = 86400):
+        self.collection = collection
+        self.window_seconds = window_seconds
+
+    async def claim(self, keys: List[str], lead_id: str) -> Optional[str]:
+        """Record ``keys`` for ``lead_id``.
+
+        Returns ``None`` if every key was new, otherwise the id of the lead
+        that already holds one of them (new keys are re-pointed at it).
+        """
+        now = datetime.now(timezone.utc)
+        try:
+            await self.collection.insert_many(
+                [{"_id": key, "lead_id": lead_id, "created_at": now} for key in keys],
+                ordered=False,
+            )
+            return None
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(err.get("code") != 11000 for err in errors):
+                raise
+            duplicates = {keys[err["index"]] for err in errors}
+
+        existing = await self.collection.find_one({"_id": {"$in": list(duplicates)}})
+        if existing is None:
+            # The original claim expired between our insert and this read
+            return None
+        fresh = [key for key in keys if key not in duplicates]
+        if fresh:
+            await self.collection.update_many(
+                {"_id": {"$in": fresh}}, {"$set": {"lead_id": existing["lead_id"]}}
+            )
+        return existing["lead_id"]
+
+    async def release(self, keys: List[str], lead_id: str):
+        """Drop claims made for a lead that was never written."""
+        await self.collection.delete_many({"_id": {"$in": keys}, "lead_id": lead_id})
+
+
+async def wait_for_lead(collection, lead_id: str, projection: dict,
+                        attempts: int = 10, delay: float = 0.05) -> Optional[dict]:
+    """Fetch the original lead; it may still be in flight from a concurrent submit."""
+    for _ in range(attempts):
+        doc = await collection.find_one({"id": lead_id}, projection)
+        if doc is not None:
+            return doc
+        await asyncio.sleep(delay)
+    return None
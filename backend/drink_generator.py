@@ -0,0 +1,138 @@
+"""Signature drink generator: ranks the drinks catalog against guest preferences.
+
+Each catalog version is turned into a dense feature matrix once (one-hot
+flavours, spirit bases and molecular techniques, plus sweetness, molecular
+and signature columns). A request builds a weight vector from the
+preferences and scores every drink with a single matrix-vector product.
+A seeded jitter breaks near-ties, so the same preferences and seed always
+give the same drinks and a card can be shared as a URL.
+"""
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+SWEETNESS_LEVELS = {"dry": 0.0, "balanced": 0.5, "sweet": 1.0}
+
+# Estimated sweetness when a drink doesn't carry an explicit ``sweetness``
+_FLAVOR_SWEETNESS = {
+    "sweet": 0.9, "fruity": 0.65, "creamy": 0.6, "floral": 0.55, "tropical": 0.6,
+    "citrus": 0.35, "sour": 0.2, "herbal": 0.25, "spicy": 0.25, "smoky": 0.15, "bitter": 0.05,
+}
+_SWEET_INGREDIENTS = ("syrup", "honey", "liqueur", "puree", "sugar", "grand marnier", "maple", "vanilla")
+
+WEIGHTS = {
+    "flavor": 3.0,
+    "spirit": 1.5,
+    "technique": 2.0,
+    "molecular": 0.75,  # any molecular drink when a technique was asked for
+    "sweetness": 2.0,   # scaled by closeness to the requested level
+    "signature": 0.25,
+}
+# Jitter amplitude: enough to reorder drinks within ~a third of a point,
+# never enough to lift a weak match over a strong one
+VARIETY = 0.35
+
+
+def _norm(value: Optional[str]) -> str:
+    return (value or "").strip().lower()
+
+
+def drink_sweetness(drink: dict) -> float:
+    explicit = drink.get("sweetness")
+    if isinstance(explicit, (int, float)):
+        return max(0.0, min(1.0, float(explicit)))
+    if isinstance(explicit, str) and explicit in SWEETNESS_LEVELS:
+        return SWEETNESS_LEVELS[explicit]
+    flavors = [_FLAVOR_SWEETNESS.get(_norm(f), 0.4) for f in drink.get("flavor_profile") or []]
+    base = sum(flavors) / len(flavors) if flavors else 0.4
+    ingredients = " ".join(drink.get("ingredients") or []).lower()
+    bonus = 0.1 * sum(1 for hint in _SWEET_INGREDIENTS if hint in ingredients)
+    return max(0.0, min(1.0, base + bonus))
+
+
+def preference_seed(type: str, flavor: Optional[str], sweetness: str,
+                    molecular: Optional[str], spirit: Optional[str]) -> int:
+    """Default seed: stable per preference tuple, so an unseeded request is reproducible too."""
+    key = "|".join(_norm(v) for v in (type, flavor, sweetness, molecular, spirit))
+    return zlib.crc32(key.encode())
+
+
+@dataclass
+class Match:
+    drink: dict
+    score: float
+    reasons: List[str]
+
+
+class DrinkFeatures:
+    def __init__(self, drinks: List[dict]):
+        self.drinks = drinks
+        self.flavors = sorted({_norm(f) for d in drinks for f in d.get("flavor_profile") or []})
+        self.spirits = sorted({_norm(d.get("spirit_base")) for d in drinks if d.get("spirit_base")})
+        self.techniques = sorted({_norm(d.get("molecular_technique")) for d in drinks if d.get("molecular_technique")})
+        self.columns: Dict[tuple, int] = {}
+        for group, values in (("flavor", self.flavors), ("spirit", self.spirits), ("technique", self.techniques)):
+            for value in values:
+                self.columns[(group, value)] = len(self.columns)
+
+        self.matrix = np.zeros((len(drinks), len(self.columns)), dtype=np.float32)
+        for row, drink in enumerate(drinks):
+            for flavor in drink.get("flavor_profile") or []:
+                self.matrix[row, self.columns[("flavor", _norm(flavor))]] = 1
+            if drink.get("spirit_base"):
+                self.matrix[row, self.columns[("spirit", _norm(drink["spirit_base"]))]] = 1
+            if drink.get("molecular_technique"):
+                self.matrix[row, self.columns[("technique", _norm(drink["molecular_technique"]))]] = 1
+        self.types = np.array([_norm(d.get("type")) for d in drinks])
+        self.sweetness = np.array([drink_sweetness(d) for d in drinks], dtype=np.float32)
+        self.molecular = np.array([bool(d.get("molecular")) for d in drinks], dtype=np.float32)
+        self.signature = np.array([bool(d.get("signature")) for d in drinks], dtype=np.float32)
+
+    def scores(self, type: str, flavor: Optional[str], sweetness: str,
+               molecular: Optional[str], spirit: Optional[str]) -> np.ndarray:
+        weights = np.zeros(len(self.columns), dtype=np.float32)
+        for group, value in (("flavor", flavor), ("spirit", spirit), ("technique", molecular)):
+            column = self.columns.get((group, _norm(value)))
+            if column is not None:
+                weights[column] = WEIGHTS[group]
+
+        scores = self.matrix @ weights
+        scores += WEIGHTS["sweetness"] * (1 - np.abs(self.sweetness - SWEETNESS_LEVELS[sweetness]))
+        scores += WEIGHTS["signature"] * self.signature
+        if molecular:
+            scores += WEIGHTS["molecular"] * self.molecular
+        scores[self.types != _norm(type)] = -np.inf
+        return scores
+
+    def rank(self, type: str, flavor: Optional[str] = None, sweetness: str = "balanced",
+             molecular: Optional[str] = None, spirit: Optional[str] = None,
+             seed: int = 0, limit: int = 3) -> List[Match]:
+        if not self.drinks:
+            return []
+        scores = self.scores(type, flavor, sweetness, molecular, spirit)
+        jitter = np.random.default_rng(seed).random(len(self.drinks), dtype=np.float32) * VARIETY
+        order = np.argsort(-(scores + jitter), kind="stable")
+        matches = []
+        for row in order[:limit]:
+            if not np.isfinite(scores[row]):
+                break
+            drink = self.drinks[row]
+            matches.append(Match(drink, round(float(scores[row]), 3),
+                                 self._reasons(drink, flavor, sweetness, molecular, spirit)))
+        return matches
+
+    def _reasons(self, drink: dict, flavor, sweetness, molecular, spirit) -> List[str]:
+        reasons = []
+        if flavor and _norm(flavor) in {_norm(f) for f in drink.get("flavor_profile") or []}:
+            reasons.append(f"{_norm(flavor)} profile")
+        if spirit and _norm(spirit) == _norm(drink.get("spirit_base")):
+            reasons.append(f"{drink['spirit_base']} base")
+        if molecular and _norm(molecular) == _norm(drink.get("molecular_technique")):
+            reasons.append(drink["molecular_technique"])
+        elif molecular and drink.get("molecular"):
+            reasons.append(f"molecular ({drink.get('molecular_technique') or 'house technique'})")
+        if abs(drink_sweetness(drink) - SWEETNESS_LEVELS[sweetness]) <= 0.2:
+            reasons.append(f"{sweetness} sweetness")
+        return reasons
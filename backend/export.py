@@ -0,0 +1,49 @@
+import csv
+import io
+import json
+from typing import AsyncIterator, Sequence
+
+
+async def ndjson_chunks(cursor, rows_per_chunk: int = 500) -> AsyncIterator[bytes]:
+    """Encode documents from a Motor cursor as NDJSON, a chunk at a time."""
+    buffer = []
+    async for doc in cursor:
+        buffer.append(json.dumps(doc, default=str, ensure_ascii=False))
+        if len(buffer) >= rows_per_chunk:
+            yield ("\n".join(buffer) + "\n").encode()
+            buffer = []
+    if buffer:
+        yield ("\n".join(buffer) + "\n").encode()
+
+
+# Spreadsheets evaluate a cell starting with one of these as a formula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def csv_safe(value):
+    """``value``, with a leading ``'`` if a spreadsheet would read it as a formula."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+async def csv_chunks(cursor, fields: Sequence[str], rows_per_chunk: int = 500) -> AsyncIterator[bytes]:
+    """Encode documents from a Motor cursor as CSV with a fixed header.
+
+    Form fields are visitor input, so text cells are escaped against
+    formula injection (see ``csv_safe``).
+    """
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=list(fields), extrasaction="ignore")
+    writer.writeheader()
+    rows = 0
+    async for doc in cursor:
+        writer.writerow({key: csv_safe(value) for key, value in doc.items()})
+        rows += 1
+        if rows >= rows_per_chunk:
+            yield out.getvalue().encode()
+            out.seek(0)
+            out.truncate()
+            rows = 0
+    if out.tell():
+        yield out.getvalue().encode()
@@ -0,0 +1,69 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+
+def facet_key(value: Any) -> str:
+    """JSON-friendly label for a facet value (``True`` -> ``"true"``)."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+class FacetIndex:
+    """Inverted index from facet values to bitsets of document positions.
+
+    Built once per catalog version. Bit ``i`` of a posting is set when
+    ``docs[i]`` carries that value, so a multi-facet filter is a handful of
+    integer ANDs and a facet count is a popcount. List-valued fields
+    (``occasion``, ``flavor_profile``) post every element, matching Mongo's
+    ``$in`` semantics on arrays.
+    """
+
+    def __init__(self, docs: List[dict], fields: Iterable[str]):
+        self.docs = docs
+        self.fields = tuple(fields)
+        self.all = (1 << len(docs)) - 1
+        self._postings: Dict[str, Dict[Any, int]] = {field: {} for field in self.fields}
+
+        for i, doc in enumerate(docs):
+            bit = 1 << i
+            for field in self.fields:
+                value = doc.get(field)
+                postings = self._postings[field]
+                for v in value if isinstance(value, list) else (value,):
+                    if v is not None:
+                        postings[v] = postings.get(v, 0) | bit
+
+    def match(self, **criteria) -> int:
+        """Bitset of documents matching every non-``None`` criterion."""
+        mask = self.all
+        for field, value in criteria.items():
+            if value is None:
+                continue
+            mask &= self._postings[field].get(value, 0)
+            if not mask:
+                break
+        return mask
+
+    def select(self, mask: int, limit: Optional[int] = None) -> List[dict]:
+        """Documents whose bit is set in ``mask``, in catalog order."""
+        docs = []
+        while mask and (limit is None or len(docs) < limit):
+            low = mask & -mask
+            docs.append(self.docs[low.bit_length() - 1])
+            mask ^= low
+        return docs
+
+    def filter(self, limit: Optional[int] = None, **criteria) -> List[dict]:
+        return self.select(self.match(**criteria), limit)
+
+    def counts(self, mask: Optional[int] = None) -> Dict[str, Dict[str, int]]:
+        """Per-field value counts within ``mask`` (the whole catalog by default)."""
+        mask = self.all if mask is None else mask
+        counts = {}
+        for field, postings in self._postings.items():
+            counts[field] = {
+                facet_key(value): n
+                for value, bits in postings.items()
+                if (n := (bits & mask).bit_count())
+            }
+        return counts
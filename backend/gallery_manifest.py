@@ -0,0 +1,165 @@
+"""Gallery manifest generated from the image directory.
+
+Every ``<source_dir>/gallary-images/<CATEGORY>/**/*.webp`` becomes a gallery
+item. Scans are incremental: files whose mtime and size match the previous
+manifest are reused as-is, and changed files are re-hashed, so a touched but
+identical file keeps its entry. The manifest is persisted so restarts only
+stat the directory. Run from the backend directory to regenerate by hand:
+
+    python gallery_manifest.py
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+GALLERY_DIR = "gallary-images"
+MANIFEST_VERSION = 1
+
+
+def _image_size(path: Path) -> tuple:
+    try:
+        from PIL import Image
+        with Image.open(path) as image:  # reads the header only
+            return image.size
+    except Exception:
+        return (None, None)
+
+
+class GalleryManifest:
+    """``items`` is swapped wholesale on each scan that changes anything, and
+    ``version`` bumps with it, so readers can key caches on it."""
+
+    def __init__(self, source_dir: Path, path: Path, *, suffixes=(".webp",), rescan_interval: float = 0):
+        self.source_dir = Path(source_dir)
+        self.path = Path(path)
+        self.suffixes = {s.lower() for s in suffixes}
+        self.rescan_interval = rescan_interval
+        self.items: List[dict] = []
+        self.version = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def load(self):
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return
+        if data.get("version") == MANIFEST_VERSION:
+            self.items = data["items"]
+            self.version += 1
+
+    def scan(self) -> Dict[str, int]:
+        """Rescan the image directory. Returns added/changed/removed/unchanged counts."""
+        root = self.source_dir / GALLERY_DIR
+        if not root.is_dir():
+            # Nothing to scan (e.g. the API is deployed without the frontend);
+            # keep serving the persisted manifest
+            return {}
+
+        previous = {item["path"]: item for item in self.items}
+        counts = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0}
+        touched = False
+        items = []
+        for category_dir in sorted(p for p in root.iterdir() if p.is_dir()):
+            files = sorted(p for p in category_dir.rglob("*") if p.suffix.lower() in self.suffixes and p.is_file())
+            for file in files:
+                rel = file.relative_to(self.source_dir).as_posix()
+                st = file.stat()
+                old = previous.pop(rel, None)
+                if old and old["mtime_ns"] == st.st_mtime_ns and old["size"] == st.st_size:
+                    items.append(old)
+                    counts["unchanged"] += 1
+                    continue
+
+                digest = hashlib.sha256(file.read_bytes()).hexdigest()[:32]
+                if old and old["sha256"] == digest:
+                    items.append({**old, "mtime_ns": st.st_mtime_ns})
+                    counts["unchanged"] += 1
+                    touched = True
+                    continue
+
+                width, height = _image_size(file)
+                items.append({
+                    "id": hashlib.sha256(rel.encode()).hexdigest()[:12],
+                    "title": file.stem,
+                    "category": category_dir.name,
+                    "image_url": f"/{rel}",
+                    "width": width,
+                    "height": height,
+                    "path": rel,
+                    "sha256": digest,
+                    "mtime_ns": st.st_mtime_ns,
+                    "size": st.st_size,
+                })
+                counts["changed" if old else "added"] += 1
+        counts["removed"] = len(previous)
+
+        if counts["added"] or counts["changed"] or counts["removed"]:
+            self.items = items
+            self.version += 1
+            self._save()
+        elif touched or not self.path.exists():
+            # Only mtimes moved (e.g. a fresh checkout): persist so the next
+            # scan doesn't re-hash, but the content and version stay the same
+            self.items = items
+            self._save()
+        return counts
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.tmp")
+        tmp.write_text(json.dumps({"version": MANIFEST_VERSION, "items": self.items}))
+        os.replace(tmp, self.path)
+
+    async def refresh(self) -> Dict[str, int]:
+        counts = await asyncio.to_thread(self.scan)
+        if counts.get("added") or counts.get("changed") or counts.get("removed"):
+            logger.info(f"Gallery manifest updated: {counts} ({len(self.items)} items, v{self.version})")
+        return counts
+
+    async def start(self):
+        """Load the persisted manifest, then rescan in the background."""
+        self.load()
+        if self._task is None:
+            self._task = asyncio.create_task(self._scan_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _scan_loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Gallery manifest scan failed: {str(e)}")
+            if self.rescan_interval <= 0:
+                return
+            await asyncio.sleep(self.rescan_interval)
+
+    def stats(self) -> dict:
+        return {"items": len(self.items), "version": self.version}
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    backend = Path(__file__).parent
+    load_dotenv(backend / ".env")
+    manifest = GalleryManifest(
+        Path(os.environ.get("IMAGE_SOURCE_DIR", backend.parent / "frontend" / "public")),
+        Path(os.environ.get("GALLERY_MANIFEST_PATH", backend / "gallery_manifest.json")),
+    )
+    manifest.load()
+    print(json.dumps(manifest.scan()))
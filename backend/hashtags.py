@@ -0,0 +1,164 @@
+"""Wedding hashtag generator.
+
+Template families are compiled once into a token trie: templates that share
+a prefix (``{a}{b}...``, ``The{a}...``) share trie nodes, so for a name pair
+each shared prefix is rendered once and every template is a walk from the
+root. Both name orders are expanded, candidates are deduplicated across
+families and ranked by length and readability, and results are memoized per
+(names, vibe, year) in a bounded LRU.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+# {a}/{b}: names, {a1}/{b1}: initials, {blend}: portmanteau, {year}/{yy}: event year
+FAMILIES: Dict[str, List[str]] = {
+    "elegant": [
+        "{a}{b}Forever", "The{a}{b}Wedding", "{a}And{b}", "{a}{b}SayIDo", "TogetherForever{a}{b}",
+        "Celebrating{a}{b}", "{a}{b}LoveStory", "{a}{b}Chapter", "The{blend}Affair", "Ever{blend}",
+        "{a}{b}{year}", "TheHouseOf{blend}",
+    ],
+    "playful": [
+        "Finally{a}{b}", "{a}{b}Hitched", "{a}Got{b}", "{a}{b}Party", "{a}{b}Vibes", "{a}Says{b}Yes",
+        "{a}{b}Goals", "Cheers{a}{b}", "{blend}Bash", "GettingHitched{blend}", "{a}Locked{b}",
+        "{blend}GotMarried",
+    ],
+    "short": [
+        "{a}{b}", "{a}Weds{b}", "{a}{b1}", "We{a}{b}", "{a}{b}{yy}", "{blend}", "{a1}{b1}Wed",
+        "{a1}And{b1}", "{blend}{yy}",
+    ],
+    "themed": [
+        "{a}{b}Signature", "House{a}{b}", "{a}{b}Affair", "{a}{b}Union", "{blend}Soiree",
+        "{a}{b}Sangeet", "{a}{b}Mehendi", "{blend}Baraat",
+    ],
+    "filmy": [
+        "Dilwale{a}Le{b}", "{a}{b}KiShaadi", "BandBaajaBaraat{a}{b}", "DDLJ{a}{b}", "{a}Ka{b}",
+        "KuchKuch{blend}", "{blend}KiShaadi", "{a}{b}KaDamDum", "ShubhAarambh{a}{b}",
+    ],
+}
+
+GROUPS = ("elegant", "playful", "short", "themed")
+# Which family fills each output group, and the family order used for "top"
+VIBES: Dict[str, Tuple[Dict[str, str], Tuple[str, ...]]] = {
+    "classic": ({}, ("elegant", "short", "playful", "themed")),
+    "fun": ({}, ("playful", "short", "elegant", "themed")),
+    "filmy": ({"themed": "filmy"}, ("filmy", "playful", "short", "elegant")),
+    "minimal": ({}, ("short", "elegant", "playful", "themed")),
+}
+
+_TOKEN = re.compile(r"\{(\w+)\}|([^{]+)")
+_NON_LETTERS = re.compile(r"[^\w]|[\d_]")
+_WORDS = re.compile(r"[A-Z][a-z]*|\d+")
+_TRIPLES = re.compile(r"(.)\1\1", re.IGNORECASE)
+
+
+class _Node:
+    __slots__ = ("children", "terminals")
+
+    def __init__(self):
+        self.children: Dict[Tuple[str, str], "_Node"] = {}
+        # (family, template position) for templates that end here
+        self.terminals: List[Tuple[str, int]] = []
+
+
+def _compile(families: Dict[str, List[str]]) -> _Node:
+    root = _Node()
+    for family, templates in families.items():
+        for position, template in enumerate(templates):
+            node = root
+            for slot, literal in _TOKEN.findall(template):
+                key = ("slot", slot) if slot else ("lit", literal)
+                node = node.children.setdefault(key, _Node())
+            node.terminals.append((family, position))
+    return root
+
+
+_TRIE = _compile(FAMILIES)
+
+
+def normalize_name(name: str) -> str:
+    """Letters only, each word capitalized: ``"anya  d'souza"`` -> ``"AnyaDsouza"``."""
+    words = [_NON_LETTERS.sub("", w) for w in name.split()]
+    return "".join(w[:1].upper() + w[1:].lower() for w in words if w)
+
+
+def _blend(a: str, b: str) -> str:
+    # First half of one name plus the second half of the other: Priya + Rahul -> Prihul
+    return a[: (len(a) + 1) // 2] + b[len(b) // 2:].lower()
+
+
+def readability(tag: str) -> float:
+    """Lower is better: long tags, seam-doubled letters and long runs read badly."""
+    length = len(tag)
+    score = max(0, length - 16) * 0.6 + max(0, 6 - length) * 0.8
+    parts = _WORDS.findall(tag)
+    for left, right in zip(parts, parts[1:]):
+        if left[-1:].lower() == right[:1].lower():
+            score += 1.5  # "RahulLove" reads as "RahullOve"
+    score += 2 * len(_TRIPLES.findall(tag))
+    score += 0.3 * max(0, len(parts) - 4)
+    return score
+
+
+def _expand(a: str, b: str, year: Optional[int]) -> Dict[str, List[Tuple[int, str]]]:
+    values = {
+        "a": a, "b": b, "a1": a[:1], "b1": b[:1], "blend": _blend(a, b),
+        "year": str(year) if year else None, "yy": f"{year % 100:02d}" if year else None,
+    }
+    out: Dict[str, List[Tuple[int, str]]] = {family: [] for family in FAMILIES}
+    stack = [(_TRIE, "")]
+    while stack:
+        node, prefix = stack.pop()
+        for family, position in node.terminals:
+            out[family].append((position, prefix))
+        for (kind, value), child in node.children.items():
+            if kind == "lit":
+                stack.append((child, prefix + value))
+            elif values.get(value):
+                stack.append((child, prefix + values[value]))
+            # Templates needing a missing slot (no year) are skipped
+    return out
+
+
+@lru_cache(maxsize=4096)
+def generate(name1: str, name2: str, vibe: str = "classic", year: Optional[int] = None,
+             limit: int = 8) -> Dict[str, Tuple[str, ...]]:
+    """Ranked hashtags per group plus an overall ``top`` list. Memoized; the
+    returned tuples are shared, don't mutate them."""
+    a, b = normalize_name(name1), normalize_name(name2)
+    if not a or not b:
+        return {**{group: () for group in GROUPS}, "top": ()}
+    overrides, order = VIBES[vibe]
+    families = [overrides.get(group, group) for group in GROUPS]
+
+    # family -> tag -> best score over both name orders
+    scored: Dict[str, Dict[str, float]] = {family: {} for family in families}
+    for first, second, penalty in ((a, b, 0.0), (b, a, 1.0)):
+        # The swapped order is a fallback and ranks behind the given one
+        for family, candidates in _expand(first, second, year).items():
+            if family not in scored:
+                continue
+            best = scored[family]
+            for position, tag in candidates:
+                score = readability(tag) + position * 0.05 + penalty
+                if score < best.get(tag, float("inf")):
+                    best[tag] = score
+
+    # Each tag is kept once, in the first group that ranks it
+    seen = set()
+    picked: Dict[str, List[Tuple[float, str]]] = {}
+    for family in families:
+        picked[family] = []
+        for tag, score in sorted(scored[family].items(), key=lambda item: (item[1], item[0])):
+            if len(picked[family]) == limit:
+                break
+            if tag.lower() not in seen:
+                seen.add(tag.lower())
+                picked[family].append((score, f"#{tag}"))
+
+    weighted = sorted((score + order.index(family) * 0.5, tag)
+                      for family in families for score, tag in picked[family])
+    return {
+        **{group: tuple(tag for _, tag in picked[family]) for group, family in zip(GROUPS, families)},
+        "top": tuple(tag for _, tag in weighted[:limit]),
+    }
@@ -0,0 +1,126 @@
+import gzip
+import hashlib
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Hashable, Optional
+
+from pydantic import TypeAdapter
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # optional: gzip is always available
+    brotli = None
+
+# Bodies smaller than this are not worth a Content-Encoding round trip
+MIN_COMPRESS_SIZE = 512
+# (gzip level, brotli quality): maximum for catalog bodies, which are built
+# once per catalog version and served many times; cheap for per-request
+# bodies that are rarely reused
+COMPRESS_MAX = (9, 11)
+COMPRESS_FAST = (1, 1)
+
+
+@lru_cache(maxsize=None)
+def _adapter(model: Any) -> TypeAdapter:
+    return TypeAdapter(model)
+
+
+class CachedBody:
+    """A JSON response body serialized (and compressed) once, with a strong ETag."""
+
+    __slots__ = ("etag", "encodings")
+
+    def __init__(self, body: bytes, fast: bool = False):
+        gzip_level, brotli_quality = COMPRESS_FAST if fast else COMPRESS_MAX
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.encodings = {"identity": body}
+        if len(body) >= MIN_COMPRESS_SIZE:
+            gz = gzip.compress(body, compresslevel=gzip_level, mtime=0)
+            if len(gz) < len(body):
+                self.encodings["gzip"] = gz
+            if brotli is not None:
+                br = brotli.compress(body, quality=brotli_quality)
+                if len(br) < len(body):
+                    self.encodings["br"] = br
+
+    @classmethod
+    def from_model(cls, model: Any, data: Any, fast: bool = False) -> "CachedBody":
+        """Validate ``data`` against ``model`` (e.g. ``List[BarSetup]``) and encode it."""
+        adapter = _adapter(model)
+        return cls(adapter.dump_json(adapter.validate_python(data)), fast=fast)
+
+    def tag(self, encoding: str) -> str:
+        # Each representation gets its own strong validator
+        return self.etag if encoding == "identity" else f'{self.etag[:-1]}-{encoding}"'
+
+
+class BodyCache:
+    """Bounded LRU of ``CachedBody`` keyed by (collection, version, filters)."""
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self._bodies: "OrderedDict[Hashable, CachedBody]" = OrderedDict()
+
+    def get_or_build(self, key: Hashable, build: Callable[[], CachedBody]) -> CachedBody:
+        body = self._bodies.get(key)
+        if body is not None:
+            self._bodies.move_to_end(key)
+            return body
+        body = build()
+        self._bodies[key] = body
+        if len(self._bodies) > self.maxsize:
+            self._bodies.popitem(last=False)
+        return body
+
+    def __len__(self):
+        return len(self._bodies)
+
+
+def _pick_encoding(accept_encoding: str, available) -> str:
+    accepted = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token.strip().lower()] = q
+    for encoding in ("br", "gzip"):
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return "identity"
+
+
+def _etag_matches(if_none_match: str, body: CachedBody) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    ours = {body.tag(encoding) for encoding in body.encodings}
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag in ours:
+            return True
+    return False
+
+
+def conditional_response(request: Request, body: CachedBody,
+                         cache_control: Optional[str] = None) -> Response:
+    """Serve ``body`` with content negotiation, ETag and If-None-Match -> 304."""
+    encoding = _pick_encoding(request.headers.get("accept-encoding", ""), body.encodings)
+    headers = {"ETag": body.tag(encoding), "Vary": "Accept-Encoding"}
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, body):
+        return Response(status_code=304, headers=headers)
+
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=body.encodings[encoding], media_type="application/json", headers=headers)
@@ -0,0 +1,320 @@
+"""Responsive image derivatives.
+
+Local source images (``/gallary-images/...`` under the frontend's public
+directory) are resized to a ladder of widths and re-encoded as AVIF, WebP and
+JPEG in a worker process pool. Derivatives live in a content-addressed on-disk
+cache: the directory name is a hash of the source bytes and the encoding
+settings, so an edited image or a settings change gets a new address and the
+old one can be cached by browsers forever.
+
+Remote Unsplash URLs are not downloaded; their CDN resizes on request, so they
+only get a srcset built from its ``w`` / ``fm`` parameters.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WIDTHS = (320, 640, 960, 1280, 1920)
+MIME_TYPES = {"avif": "image/avif", "webp": "image/webp", "jpeg": "image/jpeg"}
+SOURCE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".avif"}
+# Bump when the encoding code changes so every derivative gets a new address
+PIPELINE_VERSION = 1
+
+_DIGEST = re.compile(r"^[0-9a-f]{24}$")
+_DERIVATIVE = re.compile(r"^(\d+)\.(avif|webp|jpeg)$")
+
+
+def available_formats() -> Tuple[str, ...]:
+    """Formats this Pillow build can encode, best first (AVIF needs Pillow >= 11.2)."""
+    from PIL import features
+    return tuple(f for f in ("avif", "webp") if features.check(f)) + ("jpeg",)
+
+
+# ============ BLURHASH ============
+
+_BASE83 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+
+
+def _base83(value: int, length: int) -> str:
+    return "".join(_BASE83[(value // 83 ** (length - i)) % 83] for i in range(1, length + 1))
+
+
+def _to_linear(value: int) -> float:
+    v = value / 255
+    return v / 12.92 if v <= 0.04045 else ((v + 0.055) / 1.055) ** 2.4
+
+
+def _to_srgb(value: float) -> int:
+    v = max(0.0, min(1.0, value))
+    if v <= 0.0031308:
+        return int(v * 12.92 * 255 + 0.5)
+    return int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def blurhash(image, x_components: int = 4, y_components: int = 3) -> Tuple[str, str]:
+    """Encode a small RGB image as a BlurHash. Returns ``(hash, "#rrggbb")``,
+    the second being the average colour for clients that don't decode hashes."""
+    width, height = image.size
+    pixels = [tuple(_to_linear(c) for c in px) for px in image.getdata()]
+    cos_x = [[math.cos(math.pi * i * x / width) for x in range(width)] for i in range(x_components)]
+    cos_y = [[math.cos(math.pi * j * y / height) for y in range(height)] for j in range(y_components)]
+
+    factors = []
+    for j in range(y_components):
+        for i in range(x_components):
+            r = g = b = 0.0
+            for y in range(height):
+                row = y * width
+                cy = cos_y[j][y]
+                for x in range(width):
+                    basis = cos_x[i][x] * cy
+                    pr, pg, pb = pixels[row + x]
+                    r += basis * pr
+                    g += basis * pg
+                    b += basis * pb
+            scale = (1 if i == j == 0 else 2) / (width * height)
+            factors.append((r * scale, g * scale, b * scale))
+
+    dc, ac = factors[0], factors[1:]
+    dc_rgb = [_to_srgb(c) for c in dc]
+    parts = [_base83((x_components - 1) + (y_components - 1) * 9, 1)]
+    if ac:
+        actual_max = max(abs(c) for f in ac for c in f)
+        quantised_max = int(max(0, min(82, math.floor(actual_max * 166 - 0.5))))
+        max_value = (quantised_max + 1) / 166
+        parts.append(_base83(quantised_max, 1))
+    else:
+        max_value = 1
+        parts.append(_base83(0, 1))
+    parts.append(_base83((dc_rgb[0] << 16) + (dc_rgb[1] << 8) + dc_rgb[2], 4))
+
+    def quantise(v: float) -> int:
+        v /= max_value
+        return int(max(0, min(18, math.floor(math.copysign(abs(v) ** 0.5, v) * 9 + 9.5))))
+
+    for r, g, b in ac:
+        parts.append(_base83(quantise(r) * 19 * 19 + quantise(g) * 19 + quantise(b), 2))
+    return "".join(parts), "#{:02x}{:02x}{:02x}".format(*dc_rgb)
+
+
+# ============ WORKER ============
+
+def _write_atomic(path: Path, write):
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def build_derivatives(source: str, cache_dir: str, widths: Tuple[int, ...],
+                      formats: Tuple[str, ...], quality: int) -> dict:
+    """Runs in a worker process. Returns the image's metadata, re-using the
+    on-disk derivatives when another process (or a previous run) made them."""
+    from PIL import Image, ImageOps
+
+    data = Path(source).read_bytes()
+    settings = json.dumps([PIPELINE_VERSION, widths, formats, quality]).encode()
+    digest = hashlib.sha256(settings + data).hexdigest()[:24]
+    out_dir = Path(cache_dir) / digest[:2] / digest
+    meta_path = out_dir / "meta.json"
+    if meta_path.exists():
+        return json.loads(meta_path.read_text())
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original).convert("RGB")
+    width, height = image.size
+    # Never upscale: widths above the original collapse into the original
+    targets = sorted({min(w, width) for w in widths})
+    for target in targets:
+        resized = image if target == width else image.resize(
+            (target, max(1, round(height * target / width))), Image.LANCZOS)
+        for fmt in formats:
+            options = {"quality": quality}
+            if fmt == "jpeg":
+                options.update(optimize=True, progressive=True)
+            elif fmt == "avif":
+                # AVIF's quality scale runs high: -15 lands near WebP's size and
+                # look; speed 8 is ~3x faster than the default for ~1% larger files
+                options.update(quality=max(1, quality - 15), speed=8)
+            _write_atomic(out_dir / f"{target}.{fmt}",
+                          lambda tmp, im=resized, fmt=fmt, opts=options: im.save(tmp, fmt.upper(), **opts))
+
+    thumb = image.copy()
+    thumb.thumbnail((32, 32))
+    hash_, color = blurhash(thumb)
+    meta = {
+        "digest": digest,
+        "width": width,
+        "height": height,
+        "widths": targets,
+        "formats": list(formats),
+        "blurhash": hash_,
+        "color": color,
+    }
+    _write_atomic(meta_path, lambda tmp: tmp.write_text(json.dumps(meta)))
+    return meta
+
+
+# ============ PIPELINE ============
+
+class ImagePipeline:
+    """Async front end to ``build_derivatives``.
+
+    ``lookup`` never blocks a request: it returns metadata when derivatives
+    are ready and otherwise schedules them in the process pool and returns
+    ``None`` (callers fall back to ``image_url``). ``version`` bumps whenever
+    a new image becomes ready, so response caches keyed on it refresh.
+    """
+
+    def __init__(self, source_dir: Path, cache_dir: Path, *, url_prefix: str = "/api/images",
+                 widths: Iterable[int] = DEFAULT_WIDTHS, formats: Optional[Iterable[str]] = None,
+                 quality: int = 70, max_workers: Optional[int] = None):
+        self.source_dir = Path(source_dir).resolve()
+        self.cache_dir = Path(cache_dir).resolve()
+        self.url_prefix = url_prefix.rstrip("/")
+        self.widths = tuple(sorted(widths))
+        self.formats = tuple(formats) if formats else available_formats()
+        self.quality = quality
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.version = 0
+        self.built = 0
+        self.errors = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # relative path -> ((mtime_ns, size), metadata or None if it failed)
+        self._ready: Dict[str, Tuple[Tuple[int, int], Optional[dict]]] = {}
+        self._pending: Dict[str, asyncio.Task] = {}
+
+    def _source(self, url: str) -> Optional[Path]:
+        if not url.startswith("/") or url.startswith("//"):
+            return None
+        path = (self.source_dir / unquote(urlsplit(url).path).lstrip("/")).resolve()
+        if self.source_dir not in path.parents or path.suffix.lower() not in SOURCE_SUFFIXES:
+            return None
+        return path
+
+    def lookup(self, url: Optional[str]) -> Optional[dict]:
+        """Responsive metadata for ``url`` if available right now."""
+        if not url:
+            return None
+        if "images.unsplash.com" in url:
+            return unsplash_image(url, self.widths)
+        path = self._source(url)
+        if path is None:
+            return None
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        stamp = (st.st_mtime_ns, st.st_size)
+        rel = str(path.relative_to(self.source_dir))
+        ready = self._ready.get(rel)
+        if ready and ready[0] == stamp:
+            return self._describe(ready[1]) if ready[1] else None
+        if rel not in self._pending:
+            self._pending[rel] = asyncio.get_running_loop().create_task(self._build(rel, path, stamp))
+        return None
+
+    async def ensure(self, urls: Iterable[str]) -> int:
+        """Build derivatives for ``urls`` and wait for them. Returns how many are ready."""
+        urls = list(urls)
+        for url in urls:
+            self.lookup(url)
+        if self._pending:
+            await asyncio.gather(*list(self._pending.values()), return_exceptions=True)
+        return sum(1 for url in urls if self.lookup(url))
+
+    async def _build(self, rel: str, path: Path, stamp: Tuple[int, int]):
+        if self._executor is None:
+            # Spawned, not forked: a fork would copy the event loop, Mongo
+            # client and any locks held by other threads into the worker
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        loop = asyncio.get_running_loop()
+        try:
+            meta = await loop.run_in_executor(
+                self._executor, build_derivatives,
+                str(path), str(self.cache_dir), self.widths, self.formats, self.quality,
+            )
+            self.built += 1
+        except Exception as e:
+            # Remembered until the file changes, so a bad upload isn't retried per request
+            logger.error(f"Image derivatives failed for {rel}: {e!r}")
+            meta = None
+            self.errors += 1
+        finally:
+            self._pending.pop(rel, None)
+        self._ready[rel] = (stamp, meta)
+        self.version += 1
+
+    def _describe(self, meta: dict) -> dict:
+        base = f"{self.url_prefix}/{meta['digest']}"
+        return {
+            "width": meta["width"],
+            "height": meta["height"],
+            "blurhash": meta["blurhash"],
+            "color": meta["color"],
+            "src": f"{base}/{meta['widths'][-1]}.jpeg",
+            "sources": [
+                {"type": MIME_TYPES[fmt],
+                 "srcset": ", ".join(f"{base}/{w}.{fmt} {w}w" for w in meta["widths"])}
+                for fmt in meta["formats"]
+            ],
+        }
+
+    def derivative_path(self, digest: str, name: str) -> Optional[Path]:
+        """File for ``/images/{digest}/{name}``, or ``None`` for anything else."""
+        if not _DIGEST.match(digest) or not _DERIVATIVE.match(name):
+            return None
+        path = self.cache_dir / digest[:2] / digest / name
+        return path if path.is_file() else None
+
+    async def close(self):
+        for task in list(self._pending.values()):
+            task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "formats": list(self.formats),
+            "ready": sum(1 for _, meta in self._ready.values() if meta),
+            "pending": len(self._pending),
+            "built": self.built,
+            "errors": self.errors,
+        }
+
+
+def unsplash_image(url: str, widths: Iterable[int]) -> dict:
+    """srcset for an Unsplash URL using its on-the-fly ``w`` / ``fm`` resizing."""
+    parts = urlsplit(url)
+    query = {k: v for k, v in parse_qsl(parts.query) if k not in ("w", "fm", "auto")}
+
+    def sized(width: int, fmt: str) -> str:
+        return urlunsplit(parts._replace(query=urlencode({**query, "w": width, "fm": fmt, "q": query.get("q", 70)})))
+
+    widths = list(widths)
+    formats: List[str] = ["avif", "webp", "jpg"]
+    return {
+        "width": None,
+        "height": None,
+        "blurhash": None,
+        "color": None,
+        "src": sized(widths[len(widths) // 2], "jpg"),
+        "sources": [
+            {"type": "image/jpeg" if fmt == "jpg" else f"image/{fmt}",
+             "srcset": ", ".join(f"{sized(w, fmt)} {w}w" for w in widths)}
+            for fmt in formats
+        ],
+    }
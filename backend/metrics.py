@@ -0,0 +1,196 @@
+import threading
+import time
+from typing import Callable
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, REGISTRY, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from pymongo import monitoring
+from starlette.requests import Request
+from starlette.responses import Response
+
+# ============ HTTP ============
+
+HTTP_REQUESTS = Counter(
+    "hqd_http_requests_total", "HTTP requests by route template and status",
+    ["method", "route", "status"],
+)
+HTTP_LATENCY = Histogram(
+    "hqd_http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+HTTP_IN_FLIGHT = Gauge(
+    "hqd_http_requests_in_flight", "HTTP requests currently being served", ["method"],
+)
+
+
+class PrometheusMiddleware:
+    """ASGI middleware recording per-route counts, latency and in-flight requests.
+
+    Routes are labelled by their template (``/api/setups/{slug}``), never the
+    raw path, so label cardinality stays bounded.
+    """
+
+    def __init__(self, app, skip_paths=("/metrics",)):
+        self.app = app
+        self.skip_paths = set(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_flight.dec()
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUESTS.labels(method, template, str(status)).inc()
+            HTTP_LATENCY.labels(method, template).observe(elapsed)
+
+
+# ============ MONGO ============
+
+MONGO_LATENCY = Histogram(
+    "hqd_mongo_command_duration_seconds", "MongoDB command latency by collection and operation",
+    ["collection", "command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+MONGO_FAILURES = Counter(
+    "hqd_mongo_command_failures_total", "Failed MongoDB commands", ["collection", "command"],
+)
+MONGO_POOL_OPEN = Gauge("hqd_mongo_pool_connections_open", "Open pooled MongoDB connections")
+MONGO_POOL_IN_USE = Gauge("hqd_mongo_pool_connections_in_use", "MongoDB connections checked out")
+
+# Commands whose first value is not a collection name
+_NO_COLLECTION = {"ping", "hello", "ismaster", "isMaster", "endSessions", "buildInfo", "killCursors"}
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Times every command the driver sends, labelled by collection and op."""
+
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        command = event.command
+        name = event.command_name
+        if name == "getMore":
+            collection = command.get("collection", "")
+        elif name in _NO_COLLECTION:
+            collection = ""
+        else:
+            value = command.get(name)
+            collection = value if isinstance(value, str) else ""
+        self._collections[(event.connection_id, event.request_id)] = collection
+
+    def _labels(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        return collection or "-", event.command_name
+
+    def succeeded(self, event):
+        MONGO_LATENCY.labels(*self._labels(event)).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        labels = self._labels(event)
+        MONGO_LATENCY.labels(*labels).observe(event.duration_micros / 1e6)
+        MONGO_FAILURES.labels(*labels).inc()
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """Tracks open and checked-out connections across the client's pools.
+
+    Listeners are called from the driver's threads, hence the lock.
+    """
+
+    def __init__(self):
+        self.open = 0
+        self.in_use = 0
+        self._lock = threading.Lock()
+
+    def _update(self, open_delta: int = 0, in_use_delta: int = 0):
+        with self._lock:
+            self.open += open_delta
+            self.in_use += in_use_delta
+            MONGO_POOL_OPEN.set(self.open)
+            MONGO_POOL_IN_USE.set(self.in_use)
+
+    def connection_created(self, event):
+        self._update(open_delta=1)
+
+    def connection_closed(self, event):
+        self._update(open_delta=-1)
+
+    def connection_checked_out(self, event):
+        self._update(in_use_delta=1)
+
+    def connection_checked_in(self, event):
+        self._update(in_use_delta=-1)
+
+    def stats(self) -> dict:
+        return {"open": self.open, "in_use": self.in_use}
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_check_out_started(self, event): pass
+    def connection_check_out_failed(self, event): pass
+
+
+# ============ EMAIL ============
+
+EMAIL_DISPATCH = Counter(
+    "hqd_email_dispatch_total", "Notification emails by provider and outcome", ["provider", "outcome"],
+)
+EMAIL_LATENCY = Histogram(
+    "hqd_email_dispatch_duration_seconds", "Email provider call latency", ["provider"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+
+def record_email(provider: str, outcome: str, seconds: float):
+    EMAIL_DISPATCH.labels(provider, outcome).inc()
+    EMAIL_LATENCY.labels(provider).observe(seconds)
+
+
+# ============ CALLBACK COLLECTORS ============
+
+class StatsCollector:
+    """Exposes counters kept elsewhere (e.g. ``CatalogCache.stats()``) at scrape time."""
+
+    def __init__(self, prefix: str, stats: Callable[[], dict], counters=(), gauges=()):
+        self.prefix = prefix
+        self.stats = stats
+        self.counters = counters
+        self.gauges = gauges
+
+    def collect(self):
+        stats = self.stats()
+        for key in self.counters:
+            yield CounterMetricFamily(f"{self.prefix}_{key}", f"{self.prefix} {key}", value=stats.get(key) or 0)
+        for key in self.gauges:
+            yield GaugeMetricFamily(f"{self.prefix}_{key}", f"{self.prefix} {key}", value=stats.get(key) or 0)
+
+
+def register_stats(prefix: str, stats: Callable[[], dict], counters=(), gauges=()):
+    REGISTRY.register(StatsCollector(prefix, stats, counters, gauges))
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,182 @@
+"""Notification channels over one pooled HTTP client.
+
+Every channel is an ``EmailProvider`` (see ``outbox``), so the outbox
+dispatchers don't care where a notification goes:
+
+* ``ResendEmail``: Resend's REST API; ``message.html`` to ``message.to``
+* ``ChatWebhook``: a Slack-style incoming webhook; ``message.text``
+* ``MessagingWebhook``: a WhatsApp / SMS gateway webhook, one request per
+  recipient; ``message.text``
+* ``Fanout``: one required channel plus best-effort extras
+
+All of them send through ``HttpPool``, a single ``httpx.AsyncClient``
+with keep-alive connections, so a burst of notifications reuses a few TLS
+connections instead of opening one per send. ``FakeTransport`` answers
+every request locally with a simulated latency and failure rate: swapped
+in for the network, it load-tests the real channel code without sending
+anything.
+"""
+import asyncio
+import json
+import logging
+import random
+from collections import deque
+from typing import List, Optional
+
+import httpx
+
+from outbox import EmailMessage, EmailProvider
+
+logger = logging.getLogger(__name__)
+
+
+class DeliveryError(Exception):
+    pass
+
+
+class FakeTransport(httpx.AsyncBaseTransport):
+    """Local stand-in for every endpoint: 200 with a message id, or a 503."""
+
+    def __init__(self, latency: float = 0.05, failure_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.sent = 0
+        self.failed = 0
+        self.requests = deque(maxlen=1000)
+        self._random = random.Random(seed)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self._random.random() < self.failure_rate:
+            self.failed += 1
+            return httpx.Response(503, json={"message": "fake transport: simulated failure"})
+        self.sent += 1
+        self.requests.append((request.url.host, json.loads(request.content or b"null")))
+        return httpx.Response(200, json={"id": f"fake-{self.sent}"})
+
+    def stats(self) -> dict:
+        return {"sent": self.sent, "failed": self.failed}
+
+
+class HttpPool:
+    """The shared client, created on first use so each worker owns its own
+    connections, and closed in the lifespan."""
+
+    def __init__(self, max_connections: int = 10, timeout: float = 10.0,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_connections)
+        self.timeout = timeout
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout,
+                                             transport=self.transport)
+        return self._client
+
+    async def post(self, url: str, payload: dict, headers: Optional[dict] = None) -> httpx.Response:
+        response = await self.client.post(url, json=payload, headers=headers)
+        if response.status_code >= 400:
+            raise DeliveryError(f"{url}: HTTP {response.status_code} {response.text[:200]}")
+        return response
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        return {
+            "open": self._client is not None,
+            "max_connections": self.limits.max_connections,
+            "transport": "fake" if isinstance(self.transport, FakeTransport) else "http",
+            **({"fake": self.transport.stats()} if isinstance(self.transport, FakeTransport) else {}),
+        }
+
+
+# ============ CHANNELS ============
+
+class ResendEmail(EmailProvider):
+    name = "resend"
+
+    def __init__(self, pool: HttpPool, api_key: str, base_url: str = "https://api.resend.com"):
+        self.pool = pool
+        self.url = base_url.rstrip("/") + "/emails"
+        self.headers = {"Authorization": f"Bearer {api_key}"}
+
+    async def send(self, message: EmailMessage) -> Optional[str]:
+        payload = {"from": message.sender, "to": message.to, "subject": message.subject, "html": message.html}
+        if message.text:
+            payload["text"] = message.text
+        response = await self.pool.post(self.url, payload, self.headers)
+        return response.json().get("id")
+
+
+def slack_escape(text: str) -> str:
+    """Slack treats ``<...>`` as links and mentions; these three are all it escapes."""
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+class ChatWebhook(EmailProvider):
+    name = "chat"
+
+    def __init__(self, pool: HttpPool, url: str):
+        self.pool = pool
+        self.url = url
+
+    async def send(self, message: EmailMessage) -> Optional[str]:
+        await self.pool.post(self.url, {"text": slack_escape(message.text or message.subject)})
+        return None
+
+
+class MessagingWebhook(EmailProvider):
+    """A WhatsApp / SMS gateway taking ``{"to": ..., "body": ...}`` per recipient."""
+
+    name = "messaging"
+
+    def __init__(self, pool: HttpPool, url: str, recipients: List[str], token: str = ""):
+        self.pool = pool
+        self.url = url
+        self.recipients = recipients
+        self.headers = {"Authorization": f"Bearer {token}"} if token else None
+
+    async def send(self, message: EmailMessage) -> Optional[str]:
+        body = message.text or message.subject
+        await asyncio.gather(*(self.pool.post(self.url, {"to": to, "body": body}, self.headers)
+                               for to in self.recipients))
+        return None
+
+
+class Fanout(EmailProvider):
+    """Sends through ``primary``, then through each extra channel.
+
+    Only the primary channel decides the outcome: its failure raises, so
+    the outbox retries the notification. Extras run once the primary has
+    succeeded (a retry never pings a chat twice) and their failures are
+    logged and counted, not retried.
+    """
+
+    def __init__(self, primary: EmailProvider, extras: List[EmailProvider]):
+        self.primary = primary
+        self.extras = extras
+        self.name = "+".join([primary.name, *(extra.name for extra in extras)])
+        self.sent = dict.fromkeys((extra.name for extra in extras), 0)
+        self.failed = dict.fromkeys((extra.name for extra in extras), 0)
+
+    async def send(self, message: EmailMessage) -> Optional[str]:
+        provider_id = await self.primary.send(message)
+        results = await asyncio.gather(*(extra.send(message) for extra in self.extras), return_exceptions=True)
+        for extra, result in zip(self.extras, results):
+            if isinstance(result, BaseException):
+                self.failed[extra.name] += 1
+                logger.warning(f"{extra.name} notification failed for {message.lead_ids}: {result!r}")
+            else:
+                self.sent[extra.name] += 1
+        return provider_id
+
+    def stats(self) -> dict:
+        return {"channels": self.name, "sent": self.sent, "failed": self.failed}
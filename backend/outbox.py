@@ -0,0 +1,287 @@
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class EmailMessage:
+    subject: str
+    html: str
+    to: List[str]
+    sender: str
+    lead_ids: List[str] = field(default_factory=list)
+    # Plain-text rendering, for chat and messaging channels
+    text: str = ""
+
+
+# ============ PROVIDERS ============
+
+class EmailProvider:
+    """Interface for anything that can deliver an ``EmailMessage`` (the
+    channels themselves live in ``notify``).
+
+    ``send`` returns the provider's message id and raises on failure; the
+    dispatcher owns retries.
+    """
+
+    name = "base"
+
+    async def send(self, message: EmailMessage) -> Optional[str]:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class DisabledProvider(EmailProvider):
+    """Placeholder mode: log the notification instead of sending it."""
+
+    name = "disabled"
+
+    async def send(self, message: EmailMessage) -> Optional[str]:
+        logger.info(f"Email disabled - {message.subject} ({len(message.lead_ids)} lead(s))")
+        return None
+
+
+# ============ DISPATCHER ============
+
+def new_notification(now: Optional[datetime] = None, lane: Optional[str] = None) -> dict:
+    """Outbox state stored on the lead document, so one insert writes both.
+
+    ``lane`` picks the dispatcher that sends it (see ``OutboxDispatcher``).
+    """
+    now = now or datetime.now(timezone.utc)
+    notification = {"status": "pending", "attempts": 0, "next_attempt_at": now}
+    if lane is not None:
+        notification["lane"] = lane
+    return notification
+
+
+class _TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class OutboxDispatcher:
+    """Drains pending notifications from ``collection`` (``leads``, ``lead_imports``).
+
+    Workers atomically claim documents whose ``notify.status`` is pending (or
+    whose claim lease has expired after a crash), send them through the
+    provider, and either mark them sent or schedule a retry with exponential
+    backoff. Delivery is at-least-once. When a backlog builds up, up to
+    ``digest_size`` documents are folded into a single email. The provider
+    is owned by the caller and is not closed on ``stop``.
+
+    A dispatcher only claims notifications queued for its ``lane`` (the
+    default, ``None``, being those queued without one), so a separate
+    dispatcher can serve a lane with its own workers, rate and renderer.
+    """
+
+    def __init__(self, collection, provider: EmailProvider,
+                 render: Callable[[List[dict]], EmailMessage], *,
+                 concurrency: int = 4, rate_per_sec: float = 2.0, digest_size: int = 1,
+                 max_attempts: int = 8, base_backoff: float = 5.0, max_backoff: float = 900.0,
+                 lease_seconds: float = 120.0, poll_interval: float = 5.0,
+                 on_send: Optional[Callable[[str, str, float], None]] = None,
+                 lane: Optional[str] = None):
+        self.collection = collection
+        self.lane = lane
+        self.provider = provider
+        self.render = render
+        self.concurrency = concurrency
+        self.digest_size = max(1, digest_size)
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        # on_send(provider, "success" | "failure", seconds), e.g. for metrics
+        self.on_send = on_send
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.emails = 0
+        self._bucket = _TokenBucket(rate_per_sec, burst=max(1.0, rate_per_sec))
+        self._swept_at = 0.0
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        lane = f" ({self.lane} lane)" if self.lane else ""
+        logger.info(f"Outbox dispatcher started{lane}: {self.concurrency} workers via {self.provider.name}")
+
+    async def stop(self, timeout: float = 10.0):
+        """Let in-flight sends finish (up to ``timeout``), then cancel."""
+        self._stopping = True
+        self._wakeup.set()
+        if self._tasks:
+            _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+        self._tasks = []
+
+    def wake(self):
+        """Hint that new work was written, so idle workers skip the poll wait."""
+        self._wakeup.set()
+
+    async def run_once(self) -> int:
+        """Claim and deliver one batch. Returns the number of leads handled."""
+        docs = await self._claim()
+        if docs:
+            await self._bucket.acquire()
+            await self._deliver(docs)
+        return len(docs)
+
+    async def _worker(self):
+        while not self._stopping:
+            try:
+                handled = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Outbox worker error: {str(e)}")
+                handled = 0
+            if not handled and not self._stopping:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    async def _expire_leases(self):
+        """Fail notifications whose last allowed attempt never finished (the
+        worker died, or keeps dying, mid-send) instead of reclaiming them."""
+        now = datetime.now(timezone.utc)
+        result = await self.collection.update_many(
+            {"notify.lane": self.lane, "notify.status": "sending", "notify.lease_until": {"$lte": now},
+             "notify.attempts": {"$gte": self.max_attempts}},
+            {"$set": {"notify.status": "failed",
+                      "notify.last_error": f"lease expired on attempt {self.max_attempts}"},
+             "$unset": {"notify.lease_until": ""}},
+        )
+        self.failed += result.modified_count
+
+    async def _claim(self) -> List[dict]:
+        if time.monotonic() - self._swept_at >= self.lease_seconds:
+            self._swept_at = time.monotonic()
+            await self._expire_leases()
+        docs = []
+        for _ in range(self.digest_size):
+            now = datetime.now(timezone.utc)
+            doc = await self.collection.find_one_and_update(
+                {"notify.lane": self.lane, "$or": [
+                    {"notify.status": "pending", "notify.next_attempt_at": {"$lte": now}},
+                    {"notify.status": "sending", "notify.lease_until": {"$lte": now},
+                     "notify.attempts": {"$lt": self.max_attempts}},
+                ]},
+                {
+                    "$set": {"notify.status": "sending",
+                             "notify.lease_until": now + timedelta(seconds=self.lease_seconds)},
+                    "$inc": {"notify.attempts": 1},
+                },
+                projection={"_id": 0},
+                sort=[("notify.next_attempt_at", 1)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if doc is None:
+                break
+            docs.append(doc)
+        return docs
+
+    async def _deliver(self, docs: List[dict]):
+        ids = [doc["id"] for doc in docs]
+        try:
+            message = self.render(docs)
+        except Exception as e:
+            if len(docs) > 1:
+                # Don't let one bad document hold back the rest of its digest
+                for doc in docs:
+                    await self._deliver([doc])
+                return
+            logger.error(f"Failed to render email for {ids[0]}: {e!r}")
+            await self._reschedule(docs[0], f"render failed: {e!r}")
+            return
+        start = time.perf_counter()
+        try:
+            provider_id = await self.provider.send(message)
+        except Exception as e:
+            self._observe("failure", start)
+            logger.error(f"Failed to send email for {len(ids)} lead(s): {str(e)}")
+            for doc in docs:
+                await self._reschedule(doc, str(e))
+            return
+        self._observe("success", start)
+
+        await self.collection.update_many(
+            {"id": {"$in": ids}},
+            {
+                "$set": {"notify.status": "sent",
+                         "notify.sent_at": datetime.now(timezone.utc),
+                         "notify.provider_id": provider_id},
+                "$unset": {"notify.lease_until": "", "notify.last_error": ""},
+            },
+        )
+        self.emails += 1
+        self.sent += len(ids)
+        logger.info(f"Email sent successfully: {provider_id} ({len(ids)} lead(s))")
+
+    def _observe(self, outcome: str, start: float):
+        if self.on_send is not None:
+            self.on_send(self.provider.name, outcome, time.perf_counter() - start)
+
+    async def _reschedule(self, doc: dict, error: str):
+        attempts = doc.get("notify", {}).get("attempts", 1)
+        if attempts >= self.max_attempts:
+            update = {"notify.status": "failed", "notify.last_error": error}
+            self.failed += 1
+        else:
+            delay = min(self.max_backoff, self.base_backoff * 2 ** (attempts - 1))
+            delay *= random.uniform(0.8, 1.2)
+            update = {
+                "notify.status": "pending",
+                "notify.next_attempt_at": datetime.now(timezone.utc) + timedelta(seconds=delay),
+                "notify.last_error": error,
+            }
+            self.retried += 1
+        await self.collection.update_one({"id": doc["id"]}, {"$set": update, "$unset": {"notify.lease_until": ""}})
+
+    def stats(self) -> dict:
+        return {
+            "provider": self.provider.name,
+            "lane": self.lane,
+            "running": bool(self._tasks),
+            "emails": self.emails,
+            "leads_sent": self.sent,
+            "retries": self.retried,
+            "failed": self.failed,
+        }
@@ -0,0 +1,43 @@
+import base64
+import json
+from typing import Any, List, Optional, Sequence, Tuple
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Opaque, URL-safe token for the sort key of the last item on a page."""
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> List[Any]:
+    """The sort key in ``cursor``, which must have one value of each of ``types``."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(str(e))
+    if (not isinstance(values, list) or len(values) != len(types)
+            or not all(isinstance(value, t) and not isinstance(value, bool) for value, t in zip(values, types))):
+        raise InvalidCursor("cursor does not match the sort key")
+    return values
+
+
+def keyset_filter(sort: Sequence[Tuple[str, int]], after: Optional[Sequence[Any]]) -> dict:
+    """Mongo filter selecting documents strictly after ``after`` in ``sort`` order.
+
+    For ``[("created_at", -1), ("id", -1)]`` this expands to
+    ``created_at < c OR (created_at == c AND id < i)``, which a compound
+    index on the same keys answers with a single range scan.
+    """
+    if after is None:
+        return {}
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {prev: after[j] for j, (prev, _) in enumerate(sort[:i])}
+        clause[field] = {"$lt" if direction < 0 else "$gt": after[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
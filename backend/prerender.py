@@ -0,0 +1,494 @@
+"""Prerendered catalog pages and the sitemap.
+
+Every setup (``/bar-setups/{slug}``), drink (``/menus/{slug}``) and package
+(``/packages/{tier}``) gets an HTML snapshot: the SPA shell (the built
+``index.html``) with the record's title, description, canonical URL, Open
+Graph / Twitter tags and JSON-LD in the head, and its content already in
+``#root``. Crawlers and link previews get a complete page, and browsers
+paint before the bundle loads (React then renders over it).
+
+Snapshots are cached on disk, one file per content digest. ``sync`` runs
+when a collection's catalog cache version changes and re-renders only the
+records whose digest (record, path, shell, site URL and ``RENDER_VERSION``)
+changed since the manifest was written, so restarts and unrelated catalog
+edits render nothing. ``sitemap.xml`` is built from the same manifest.
+
+The reverse proxy sends page requests to the backend first and falls back
+to the SPA on 404, e.g. with nginx::
+
+    location ~ ^/(bar-setups|menus|packages)/[^/]+$ {
+        proxy_pass http://backend:8001/prerender$uri;
+        proxy_intercept_errors on;
+        error_page 404 = @spa;
+    }
+    location = /sitemap.xml { proxy_pass http://backend:8001/sitemap.xml; }
+
+Run from the backend directory to regenerate the static fallback
+``frontend/public/sitemap.xml`` from the seed dataset:
+
+    python prerender.py sitemap
+"""
+import asyncio
+import hashlib
+import html
+import json
+import logging
+import os
+import re
+import sys
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bump when the page markup changes, to re-render every snapshot
+RENDER_VERSION = 2
+SITE_NAME = "HQ.D - Headquarters of Drinks"
+
+# SPA routes listed in the sitemap besides the catalog pages:
+# (path, changefreq, priority, collection whose changes date it)
+STATIC_ROUTES: Sequence[Tuple[str, str, float, Optional[str]]] = (
+    ("/", "weekly", 1.0, None),
+    ("/services", "monthly", 0.9, None),
+    ("/bar-setups", "weekly", 0.9, "setups"),
+    ("/molecular", "monthly", 0.8, None),
+    ("/menus", "monthly", 0.7, "menus"),
+    ("/packages", "monthly", 0.8, "packages"),
+    ("/gallery", "weekly", 0.7, None),
+    ("/reviews", "weekly", 0.6, None),
+    ("/about", "monthly", 0.6, None),
+    ("/faqs", "monthly", 0.5, None),
+    ("/contact", "monthly", 0.8, None),
+    ("/tools/hashtag-generator", "monthly", 0.6, None),
+    ("/tools/drink-generator", "monthly", 0.6, None),
+)
+
+FRONTEND_SITEMAP = Path(__file__).parent.parent / "frontend" / "public" / "sitemap.xml"
+
+_SLUG = re.compile(r"[^a-z0-9]+")
+# Head tags the snapshot replaces in the shell
+_SHELL_HEAD_TAGS = re.compile(
+    r"\s*(<title>.*?</title>"
+    r"|<meta\s+(?:name=\"(?:title|description|twitter:[^\"]*)\"|property=\"og:[^\"]*\")[^>]*>"
+    r"|<link\s+rel=\"canonical\"[^>]*>)",
+    re.S,
+)
+_SHELL_ROOT = re.compile(r"<div id=\"root\">\s*</div>")
+_FALLBACK_SHELL = """<!doctype html>
+<html lang="en">
+<head>
+<meta charset="utf-8" />
+<meta name="viewport" content="width=device-width, initial-scale=1" />
+</head>
+<body>
+<div id="root"></div>
+</body>
+</html>
+"""
+
+
+def slugify(text: str) -> str:
+    return _SLUG.sub("-", (text or "").lower()).strip("-")
+
+
+@dataclass(frozen=True)
+class Page:
+    path: str
+    title: str
+    description: str
+    body: str  # HTML for #root
+    json_ld: Tuple[dict, ...]
+    image: Optional[str] = None
+    changefreq: str = "monthly"
+    priority: float = 0.7
+
+
+def _e(value) -> str:
+    return html.escape(str(value or ""), quote=True)
+
+
+def _list(items: Iterable[str]) -> str:
+    return "".join(f"<li>{_e(item)}</li>" for item in items if item)
+
+
+def _breadcrumbs(site_url: str, crumbs: Sequence[Tuple[str, str]]) -> dict:
+    return {
+        "@context": "https://schema.org",
+        "@type": "BreadcrumbList",
+        "itemListElement": [
+            {"@type": "ListItem", "position": i, "name": name, "item": site_url + path}
+            for i, (name, path) in enumerate(crumbs, 1)
+        ],
+    }
+
+
+# ============ PAGES ============
+
+def setup_paths(docs: Sequence[dict]) -> List[str]:
+    return [f"/bar-setups/{doc['slug']}" for doc in docs]
+
+
+def setup_page(doc: dict, path: str, site_url: str) -> Page:
+    title = f"{doc['title']} | Bar Setup for {doc.get('best_for') or 'Events'} | HQ.D"
+    occasions = ", ".join(o.replace("-", " ").title() for o in doc.get("occasion", []))
+    body = (
+        f"<main><nav><a href=\"/bar-setups\">Bar Setups</a></nav>"
+        f"<h1>{_e(doc['title'])}</h1>"
+        + (f"<img src=\"{_e(doc['image_url'])}\" alt=\"{_e(doc['title'])}\" width=\"600\" />" if doc.get("image_url") else "")
+        + f"<p>{_e(doc['description'])}</p>"
+        f"<dl><dt>Best for</dt><dd>{_e(doc.get('best_for'))}</dd>"
+        f"<dt>Occasions</dt><dd>{_e(occasions)}</dd>"
+        f"<dt>Style</dt><dd>{_e(doc.get('style'))}</dd>"
+        f"<dt>Format</dt><dd>{_e(doc.get('format'))}</dd>"
+        + (f"<dt>Molecular</dt><dd>{_e(doc['molecular_tag'])}</dd>" if doc.get("molecular_tag") else "")
+        + f"</dl><h2>Menu highlights</h2><ul>{_list(doc.get('menu_highlights', []))}</ul>"
+        f"<p><a href=\"/contact?setup={_e(doc['slug'])}\">Get this setup</a></p></main>"
+    )
+    return Page(
+        path=path,
+        title=title,
+        description=doc["description"],
+        body=body,
+        image=doc.get("image_url"),
+        changefreq="weekly",
+        priority=0.8,
+        json_ld=(
+            {
+                "@context": "https://schema.org",
+                "@type": "Service",
+                "name": doc["title"],
+                "description": doc["description"],
+                "serviceType": "Event bar setup",
+                "url": site_url + path,
+                **({"image": doc["image_url"]} if doc.get("image_url") else {}),
+                "audience": {"@type": "Audience", "audienceType": doc.get("best_for") or ""},
+                "provider": {"@type": "LocalBusiness", "name": SITE_NAME, "url": site_url},
+            },
+            _breadcrumbs(site_url, [("Home", "/"), ("Bar Setups", "/bar-setups"), (doc["title"], path)]),
+        ),
+    )
+
+
+def drink_paths(docs: Sequence[dict]) -> List[str]:
+    # Slugs from names; a name shared by two drinks gets the id appended
+    slugs = [slugify(doc["name"]) or str(doc["id"]) for doc in docs]
+    counts: Dict[str, int] = {}
+    for slug in slugs:
+        counts[slug] = counts.get(slug, 0) + 1
+    return [f"/menus/{slug}" if counts[slug] == 1 else f"/menus/{slug}-{slugify(str(doc['id']))}"
+            for slug, doc in zip(slugs, docs)]
+
+
+def drink_page(doc: dict, path: str, site_url: str) -> Page:
+    kind = "Mocktail" if doc.get("type") == "mocktail" else "Cocktail"
+    title = f"{doc['name']} | Signature {kind} | HQ.D"
+    body = (
+        f"<main><nav><a href=\"/menus\">Menus</a></nav>"
+        f"<h1>{_e(doc['name'])}</h1>"
+        + (f"<img src=\"{_e(doc['image_url'])}\" alt=\"{_e(doc['name'])}\" width=\"600\" />" if doc.get("image_url") else "")
+        + f"<p>{_e(doc['description'])}</p>"
+        f"<h2>Ingredients</h2><ul>{_list(doc.get('ingredients', []))}</ul>"
+        f"<p>Garnish: {_e(doc.get('garnish'))}</p>"
+        f"<p>Flavor: {_e(', '.join(doc.get('flavor_profile', [])))}</p>"
+        + (f"<p>Molecular technique: {_e(doc['molecular_technique'])}</p>" if doc.get("molecular_technique") else "")
+        + "</main>"
+    )
+    return Page(
+        path=path,
+        title=title,
+        description=doc["description"],
+        body=body,
+        image=doc.get("image_url"),
+        priority=0.6,
+        json_ld=(
+            {
+                "@context": "https://schema.org",
+                "@type": "MenuItem",
+                "name": doc["name"],
+                "description": doc["description"],
+                "url": site_url + path,
+                **({"image": doc["image_url"]} if doc.get("image_url") else {}),
+            },
+            _breadcrumbs(site_url, [("Home", "/"), ("Menus", "/menus"), (doc["name"], path)]),
+        ),
+    )
+
+
+def package_paths(docs: Sequence[dict]) -> List[str]:
+    return [f"/packages/{slugify(doc.get('tier') or doc['name'])}" for doc in docs]
+
+
+def package_page(doc: dict, path: str, site_url: str) -> Page:
+    title = f"{doc['name']} Package | {doc['tagline']} | HQ.D"
+    body = (
+        f"<main><nav><a href=\"/packages\">Packages</a></nav>"
+        f"<h1>{_e(doc['name'])}</h1><p>{_e(doc['tagline'])}</p>"
+        f"<p>{_e(doc['description'])}</p>"
+        f"<h2>Included</h2><ul>{_list(doc.get('inclusions', []))}</ul>"
+        f"<p>Best for: {_e(doc.get('best_for'))}</p>"
+        f"<p><a href=\"/contact\">Get a quote</a></p></main>"
+    )
+    return Page(
+        path=path,
+        title=title,
+        description=f"{doc['tagline']}. {doc['description']}",
+        body=body,
+        priority=0.7,
+        json_ld=(
+            {
+                "@context": "https://schema.org",
+                "@type": "Service",
+                "name": f"{doc['name']} bar package",
+                "description": doc["description"],
+                "serviceType": "Event bar service package",
+                "url": site_url + path,
+                "hasOfferCatalog": {
+                    "@type": "OfferCatalog",
+                    "name": "Inclusions",
+                    "itemListElement": [{"@type": "Offer", "itemOffered": {"@type": "Service", "name": item}}
+                                        for item in doc.get("inclusions", [])],
+                },
+                "provider": {"@type": "LocalBusiness", "name": SITE_NAME, "url": site_url},
+            },
+            _breadcrumbs(site_url, [("Home", "/"), ("Packages", "/packages"), (doc["name"], path)]),
+        ),
+    )
+
+
+# collection -> (paths for its records, page for one record)
+PAGE_KINDS: Dict[str, Tuple[Callable[[Sequence[dict]], List[str]], Callable[[dict, str, str], Page]]] = {
+    "setups": (setup_paths, setup_page),
+    "menus": (drink_paths, drink_page),
+    "packages": (package_paths, package_page),
+}
+
+
+# ============ RENDERING ============
+
+class Shell:
+    """The SPA's ``index.html``, with the head tags a snapshot overrides removed."""
+
+    def __init__(self, template: Optional[str]):
+        template = template or _FALLBACK_SHELL
+        if not _SHELL_ROOT.search(template) or "</head>" not in template:
+            raise ValueError("shell needs a </head> and an empty <div id=\"root\"></div>")
+        self.template = _SHELL_HEAD_TAGS.sub("", template)
+        self.digest = hashlib.blake2b(self.template.encode(), digest_size=8).hexdigest()
+
+    @classmethod
+    def load(cls, path: Optional[Path]) -> "Shell":
+        try:
+            return cls(path.read_text(encoding="utf-8") if path else None)
+        except FileNotFoundError:
+            logger.info(f"No prerender shell at {path} (frontend not built), using a bare shell")
+            return cls(None)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Prerender shell {path} unusable, using a bare shell: {e!r}")
+            return cls(None)
+
+    def render(self, page: Page, site_url: str) -> str:
+        url = site_url + page.path
+        image = page.image if not page.image or "://" in page.image else site_url + page.image
+        head = [
+            f"<title>{_e(page.title)}</title>",
+            f"<meta name=\"description\" content=\"{_e(page.description)}\" />",
+            f"<link rel=\"canonical\" href=\"{_e(url)}\" />",
+            "<meta property=\"og:type\" content=\"website\" />",
+            f"<meta property=\"og:site_name\" content=\"{_e(SITE_NAME)}\" />",
+            f"<meta property=\"og:url\" content=\"{_e(url)}\" />",
+            f"<meta property=\"og:title\" content=\"{_e(page.title)}\" />",
+            f"<meta property=\"og:description\" content=\"{_e(page.description)}\" />",
+            f"<meta name=\"twitter:card\" content=\"{'summary_large_image' if image else 'summary'}\" />",
+            f"<meta name=\"twitter:title\" content=\"{_e(page.title)}\" />",
+            f"<meta name=\"twitter:description\" content=\"{_e(page.description)}\" />",
+        ]
+        if image:
+            head += [f"<meta property=\"og:image\" content=\"{_e(image)}\" />",
+                     f"<meta name=\"twitter:image\" content=\"{_e(image)}\" />"]
+        for data in page.json_ld:
+            # No "<" at all inside the script element: "</script" would close
+            # it and "<!--" changes how the rest of it is parsed
+            payload = json.dumps(data, ensure_ascii=False).replace("<", "\\u003c").replace(">", "\\u003e")
+            head.append(f"<script type=\"application/ld+json\">{payload}</script>")
+        document = self.template.replace("</head>", "\n".join(head) + "\n</head>", 1)
+        return _SHELL_ROOT.sub(lambda _: f"<div id=\"root\">{page.body}</div>", document, count=1)
+
+
+def render_sitemap(site_url: str, pages: Iterable[dict], lastmods: Dict[str, str]) -> str:
+    """``pages``: manifest entries (path, changefreq, priority, lastmod, image)."""
+    def url(path, changefreq, priority, lastmod=None, image=None):
+        parts = [f"    <loc>{_e(site_url + path)}</loc>"]
+        if lastmod:
+            parts.append(f"    <lastmod>{lastmod}</lastmod>")
+        parts += [f"    <changefreq>{changefreq}</changefreq>", f"    <priority>{priority:.1f}</priority>"]
+        if image:
+            image = image if "://" in image else site_url + image
+            parts.append(f"    <image:image><image:loc>{_e(image)}</image:loc></image:image>")
+        return "  <url>\n" + "\n".join(parts) + "\n  </url>"
+
+    urls = [url(path, changefreq, priority, lastmods.get(kind)) for path, changefreq, priority, kind in STATIC_ROUTES]
+    urls += [url(p["path"], p["changefreq"], p["priority"], p["lastmod"], p.get("image"))
+             for p in sorted(pages, key=lambda p: p["path"])]
+    return (
+        "<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n"
+        "<urlset xmlns=\"http://www.sitemaps.org/schemas/sitemap/0.9\"\n"
+        "        xmlns:image=\"http://www.google.com/schemas/sitemap-image/1.1\">\n"
+        + "\n".join(urls) + "\n</urlset>\n"
+    )
+
+
+def _write(path: Path, text: str):
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+class PrerenderCache:
+    """Page snapshots on disk, kept in step with the catalog one collection at a time."""
+
+    def __init__(self, directory: Path, site_url: str, shell: Shell):
+        self.directory = Path(directory)
+        self.site_url = site_url.rstrip("/")
+        self.shell = shell
+        self.rendered = 0
+        self.removed = 0
+        # path -> {kind, digest, lastmod, changefreq, priority, image}
+        self._pages: Dict[str, dict] = {}
+        self._versions: Dict[str, int] = {}
+        # One sync at a time: they share the manifest
+        self._lock = asyncio.Lock()
+        self._sitemap: Optional[Tuple[bytes, str]] = None
+        self._loaded = False
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.directory / "manifest.json"
+
+    def _load_manifest(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        try:
+            return json.loads(self.manifest_path.read_text(encoding="utf-8"))["pages"]
+        except (OSError, ValueError, KeyError):
+            return {}
+
+    def _digest(self, path: str, doc: dict) -> str:
+        key = json.dumps([RENDER_VERSION, self.shell.digest, self.site_url, path, doc],
+                         sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+    def _file(self, digest: str) -> Path:
+        return self.directory / f"{digest}.html"
+
+    async def sync(self, kind: str, docs: Sequence[dict], version: int) -> Optional[dict]:
+        """Bring ``kind``'s snapshots up to date with ``docs`` (catalog cache
+        ``version``). A no-op when that version has already been synced."""
+        if self._versions.get(kind) == version:
+            return None
+        async with self._lock:
+            if self._versions.get(kind) == version:
+                return None
+            result = await asyncio.to_thread(self._sync, kind, list(docs))
+            self._versions[kind] = version
+        if result["rendered"] or result["removed"]:
+            logger.info(f"Prerendered {kind}: {result['rendered']} rendered, {result['removed']} removed, "
+                        f"{result['unchanged']} unchanged")
+        return result
+
+    def _sync(self, kind: str, docs: List[dict]) -> dict:
+        # Built on a copy and swapped in, as requests read the manifest meanwhile
+        pages = dict(self._pages if self._loaded else self._load_manifest())
+        paths_for, page_for = PAGE_KINDS[kind]
+        today = date.today().isoformat()
+        current = {}
+        rendered = unchanged = 0
+        for path, doc in zip(paths_for(docs), docs):
+            if path in current:
+                continue  # Duplicate slug: the first record wins, as on the API
+            digest = self._digest(path, doc)
+            entry = pages.get(path)
+            if entry and entry["digest"] == digest and self._file(digest).exists():
+                current[path] = entry
+                unchanged += 1
+                continue
+            try:
+                page = page_for(doc, path, self.site_url)
+            except (KeyError, TypeError, AttributeError) as e:
+                logger.error(f"Cannot prerender {path}: {e!r}")
+                continue
+            _write(self._file(digest), self.shell.render(page, self.site_url))
+            current[path] = {"kind": kind, "digest": digest, "lastmod": today, "image": page.image,
+                             "changefreq": page.changefreq, "priority": page.priority}
+            rendered += 1
+
+        stale = [(path, entry) for path, entry in pages.items()
+                 if entry["kind"] == kind and current.get(path) is not entry]
+        for path, entry in stale:
+            del pages[path]
+        pages.update(current)
+        live = {entry["digest"] for entry in pages.values()}
+        for _, entry in stale:
+            if entry["digest"] not in live:
+                self._file(entry["digest"]).unlink(missing_ok=True)
+        removed = sum(1 for path, _ in stale if path not in current)
+
+        _write(self.manifest_path, json.dumps({"pages": pages}, sort_keys=True))
+        self._pages = pages
+        self._loaded = True
+        self._sitemap = None
+        self.rendered += rendered
+        self.removed += removed
+        return {"rendered": rendered, "removed": removed, "unchanged": unchanged}
+
+    def lookup(self, path: str) -> Optional[Tuple[Path, str]]:
+        """Snapshot file and digest (an ETag) for a page path."""
+        entry = self._pages.get(path.rstrip("/") or "/")
+        if entry is None:
+            return None
+        return self._file(entry["digest"]), entry["digest"]
+
+    def sitemap(self) -> Tuple[bytes, str]:
+        """``sitemap.xml`` and its digest."""
+        if self._sitemap is None:
+            lastmods: Dict[str, str] = {}
+            for entry in self._pages.values():
+                lastmods[entry["kind"]] = max(lastmods.get(entry["kind"], ""), entry["lastmod"])
+            pages = [{"path": path, **entry} for path, entry in self._pages.items()]
+            body = render_sitemap(self.site_url, pages, lastmods).encode()
+            self._sitemap = (body, hashlib.blake2b(body, digest_size=16).hexdigest())
+        return self._sitemap
+
+    def stats(self) -> dict:
+        return {
+            "pages": len(self._pages),
+            "synced": dict(self._versions),
+            "rendered": self.rendered,
+            "removed": self.removed,
+        }
+
+
+def main() -> int:
+    """Write the static fallback sitemap from the seed dataset."""
+    from seed import read_seed
+
+    site_url = os.environ.get("SITE_URL", "https://headquartersofdrinks.com").rstrip("/")
+    collections = read_seed()["collections"]
+    today = date.today().isoformat()
+    pages = []
+    for kind, (paths_for, page_for) in PAGE_KINDS.items():
+        docs = collections[kind]
+        for path, doc in zip(paths_for(docs), docs):
+            page = page_for(doc, path, site_url)
+            pages.append({"path": path, "lastmod": today, "image": page.image,
+                          "changefreq": page.changefreq, "priority": page.priority})
+    FRONTEND_SITEMAP.write_text(render_sitemap(site_url, pages, dict.fromkeys(PAGE_KINDS, today)), encoding="utf-8")
+    print(f"Wrote {FRONTEND_SITEMAP} ({len(pages)} catalog pages)")
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] != "sitemap":
+        print(__doc__)
+        sys.exit(2)
+    sys.exit(main())
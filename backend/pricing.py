@@ -0,0 +1,249 @@
+"""Instant quote estimates from a rate card.
+
+A rate card (the newest document in the ``rate_cards`` collection, or
+``DEFAULT_RATE_CARD``) is compiled once into per-tier numpy arrays. Pricing
+is one broadcast over ``leads x tiers``: a single form submission is a batch
+of one, and re-pricing the whole lead backlog after a rate card change is
+the same calculation over every lead.
+
+Lead fields are free text from the contact form ("50-100", "6 hours",
+"₹3-5 Lakhs"); the parsers below are memoized because real traffic only
+ever uses a handful of distinct values.
+"""
+import math
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+TIERS = ("good", "better", "best", "ultra")
+BAR_TYPES = ("cocktail", "mocktail", "both")
+
+DEFAULT_RATE_CARD = {
+    "version": "2025-01",
+    "currency": "INR",
+    "tax_rate": 0.18,
+    "rounding": 1000,
+    "default_guests": 100,
+    # Bartenders per tier for guest counts up to ``max_guests``; beyond the
+    # last band one more bartender per ``extra_guests_per_bartender``
+    "guest_bands": [
+        {"max_guests": 50, "bartenders": [2, 2, 3, 4], "tier": "good"},
+        {"max_guests": 100, "bartenders": [2, 3, 4, 5], "tier": "good"},
+        {"max_guests": 200, "bartenders": [3, 4, 5, 7], "tier": "better"},
+        {"max_guests": 300, "bartenders": [4, 5, 6, 9], "tier": "better"},
+        {"max_guests": 500, "bartenders": [5, 6, 8, 12], "tier": "best"},
+    ],
+    "extra_guests_per_bartender": [100, 90, 70, 50],
+    "open_band_tier": "ultra",
+    "base_fee": [25000, 60000, 150000, 350000],
+    "bartender_hourly": [1500, 1800, 2200, 3000],
+    "included_hours": [4, 6, 8, 10],
+    "overtime_multiplier": 1.5,
+    "per_guest": {
+        "cocktail": [450, 650, 900, 1400],
+        "mocktail": [250, 350, 500, 800],
+        "both": [500, 700, 1000, 1500],
+    },
+    # Per guest on top when molecular drinks are asked for; Luxe and Ultra include them
+    "molecular_per_guest": [250, 120, 0, 0],
+    "home_cities": ["delhi", "new delhi", "gurgaon", "gurugram", "noida", "greater noida",
+                    "faridabad", "ghaziabad"],
+    "travel_flat": [30000, 40000, 60000, 100000],
+    "travel_per_bartender": [3500, 3500, 4500, 6000],
+}
+
+COMPONENTS = ("base", "staff", "consumables", "molecular", "travel")
+
+# Guest counts above this are typos or junk ("9999999"); pricing clamps to it
+# so stored totals stay meaningful and within int64
+MAX_GUESTS = 10_000
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+
+@lru_cache(maxsize=1024)
+def parse_guests(value: Optional[str]) -> float:
+    """Guest count from form text: "Up to 50" -> 50, "50-100" -> 100, "500+" -> 600.
+
+    NaN when there's no number (the rate card default applies).
+    """
+    numbers = [float(n) for n in _NUMBER.findall((value or "").replace(",", ""))]
+    if not numbers:
+        return math.nan
+    guests = max(numbers)
+    if value.strip().endswith("+"):
+        guests *= 1.2
+    return guests
+
+
+@lru_cache(maxsize=1024)
+def parse_hours(value: Optional[str]) -> float:
+    """"6 hours" -> 6, "4-5 hrs" -> 5; NaN when unknown (the tier's included hours apply)."""
+    numbers = [float(n) for n in _NUMBER.findall(value or "")]
+    return max(numbers) if numbers and max(numbers) <= 24 else math.nan
+
+
+@lru_cache(maxsize=1024)
+def parse_budget(value: Optional[str]) -> float:
+    """Upper bound of a budget range in rupees; inf for open ranges, NaN for none/flexible."""
+    text = (value or "").lower().replace(",", "")
+    numbers = [float(n) for n in _NUMBER.findall(text)]
+    if not numbers:
+        return math.nan
+    if "+" in text or "above" in text:
+        return math.inf
+    scale = 1e5 if "lakh" in text or "lac" in text else 1e7 if "cr" in text else 1
+    return max(numbers) * scale
+
+
+def wants_molecular(lead: dict) -> bool:
+    text = " ".join(lead.get(f) or "" for f in ("theme", "message", "setup_interest"))
+    return "molecular" in text.lower()
+
+
+class RateCard:
+    """A rate card compiled to arrays with one column per tier (``TIERS`` order)."""
+
+    def __init__(self, card: dict):
+        self.version = str(card["version"])
+        self.currency = card.get("currency", "INR")
+        self.tax_rate = float(card.get("tax_rate", 0))
+        self.rounding = float(card.get("rounding", 1))
+        self.default_guests = float(card.get("default_guests", 100))
+
+        def tiered(key):
+            values = np.asarray(card[key], dtype=np.float64)
+            if values.shape != (len(TIERS),):
+                raise ValueError(f"rate card {key!r} needs one value per tier {TIERS}")
+            return values
+
+        bands = sorted(card["guest_bands"], key=lambda band: band["max_guests"])
+        if not bands:
+            raise ValueError("rate card needs at least one guest band")
+        self.band_max = np.array([band["max_guests"] for band in bands], dtype=np.float64)
+        self.band_bartenders = np.array([band["bartenders"] for band in bands], dtype=np.float64)
+        if self.band_bartenders.shape != (len(bands), len(TIERS)):
+            raise ValueError(f"each guest band needs one bartender count per tier {TIERS}")
+        # One more entry for guests beyond the last band
+        self.band_tier = np.array([TIERS.index(band["tier"]) for band in bands]
+                                  + [TIERS.index(card.get("open_band_tier", TIERS[-1]))])
+        self.extra_guests = tiered("extra_guests_per_bartender")
+        self.base_fee = tiered("base_fee")
+        self.hourly = tiered("bartender_hourly")
+        self.included_hours = tiered("included_hours")
+        self.overtime = float(card.get("overtime_multiplier", 1))
+        self.per_guest = np.stack([np.asarray(card["per_guest"][bar], dtype=np.float64) for bar in BAR_TYPES])
+        self.molecular_per_guest = tiered("molecular_per_guest")
+        self.home_cities = frozenset(city.strip().lower() for city in card.get("home_cities", ()))
+        self.travel_flat = tiered("travel_flat")
+        self.travel_per_bartender = tiered("travel_per_bartender")
+
+    # ---- vectorized core ----
+
+    def price(self, guests: np.ndarray, hours: np.ndarray, bar_type: np.ndarray,
+              molecular: np.ndarray, outstation: np.ndarray) -> Dict[str, np.ndarray]:
+        """Price N events for every tier. Inputs are length-N arrays (``hours`` may
+        be NaN, ``bar_type`` indexes ``BAR_TYPES``); outputs are (N, tiers)."""
+        # Unknown or non-finite counts get the default, the rest are clamped
+        guests = np.where(np.isfinite(guests), np.clip(guests, 1, MAX_GUESTS), self.default_guests)[:, None]
+        band = np.searchsorted(self.band_max, guests[:, 0], side="left")
+        overflow = np.maximum(guests - self.band_max[-1], 0)
+        bartenders = self.band_bartenders[np.minimum(band, len(self.band_max) - 1)] \
+            + np.ceil(overflow / self.extra_guests)
+
+        hours = np.where(np.isnan(hours)[:, None], self.included_hours, hours[:, None])
+        billed = np.minimum(hours, self.included_hours) \
+            + np.maximum(hours - self.included_hours, 0) * self.overtime
+
+        parts = {
+            "base": np.broadcast_to(self.base_fee, bartenders.shape),
+            "staff": bartenders * self.hourly * billed,
+            "consumables": guests * self.per_guest[bar_type],
+            "molecular": (guests * molecular[:, None]) * self.molecular_per_guest,
+            "travel": outstation[:, None] * (self.travel_flat + bartenders * self.travel_per_bartender),
+        }
+        subtotal = sum(parts.values())
+        total = np.round(subtotal * (1 + self.tax_rate) / self.rounding) * self.rounding
+        return {**parts, "subtotal": subtotal, "tax": total - subtotal, "total": total,
+                "bartenders": bartenders, "hours": hours, "band": band, "guests": guests[:, 0]}
+
+    def recommend(self, totals: np.ndarray, budgets: np.ndarray, band: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Recommended tier index per row and whether any tier fits the budget.
+
+        With a budget: the highest tier that fits, else the cheapest. Without
+        one: the tier the guest band suggests.
+        """
+        fits = totals <= budgets[:, None]  # NaN budgets compare False
+        has_budget = ~np.isnan(budgets)
+        best_fit = len(TIERS) - 1 - np.argmax(fits[:, ::-1], axis=1)
+        any_fit = fits.any(axis=1)
+        tier = np.where(has_budget, np.where(any_fit, best_fit, 0), self.band_tier[band])
+        return tier, any_fit
+
+    # ---- leads ----
+
+    def features(self, leads: List[dict]) -> Tuple[np.ndarray, ...]:
+        n = len(leads)
+        guests = np.fromiter((parse_guests(lead.get("guest_count")) for lead in leads), np.float64, n)
+        hours = np.fromiter((parse_hours(lead.get("duration")) for lead in leads), np.float64, n)
+        bar_type = np.fromiter((BAR_TYPES.index(lead.get("bar_type")) if lead.get("bar_type") in BAR_TYPES
+                                else BAR_TYPES.index("both") for lead in leads), np.intp, n)
+        molecular = np.fromiter((bool(lead.get("molecular")) or wants_molecular(lead) for lead in leads), bool, n)
+        outstation = np.fromiter((self.is_outstation(lead.get("city")) for lead in leads), bool, n)
+        budgets = np.fromiter((parse_budget(lead.get("budget_range")) for lead in leads), np.float64, n)
+        return guests, hours, bar_type, molecular, outstation, budgets
+
+    def is_outstation(self, city: Optional[str]) -> bool:
+        city = (city or "").strip().lower()
+        return bool(city) and city not in self.home_cities
+
+    def estimate_leads(self, leads: List[dict]) -> List[dict]:
+        """Compact estimate per lead, as stored on the lead document."""
+        if not leads:
+            return []
+        guests, hours, bar_type, molecular, outstation, budgets = self.features(leads)
+        quote = self.price(guests, hours, bar_type, molecular, outstation)
+        tier, fits = self.recommend(quote["total"], budgets, quote["band"])
+        totals = quote["total"].astype(np.int64).tolist()
+        fits = [None if math.isnan(b) else f for b, f in zip(budgets.tolist(), fits.tolist())]
+        return [
+            {
+                "rate_card": self.version,
+                "totals": dict(zip(TIERS, row)),
+                "recommended": TIERS[t],
+                "within_budget": f,  # None when the lead gave no budget
+            }
+            for row, t, f in zip(totals, tier.tolist(), fits)
+        ]
+
+    def quote(self, lead: dict) -> dict:
+        """Itemized estimate for every tier, for the instant quote endpoint."""
+        guests, hours, bar_type, molecular, outstation, budgets = self.features([lead])
+        quote = self.price(guests, hours, bar_type, molecular, outstation)
+        tier, fits = self.recommend(quote["total"], budgets, quote["band"])
+        budget = budgets[0]
+        tiers = []
+        for col, name in enumerate(TIERS):
+            total = int(quote["total"][0, col])
+            tiers.append({
+                "tier": name,
+                "bartenders": int(quote["bartenders"][0, col]),
+                "hours": float(quote["hours"][0, col]),
+                "breakdown": {part: int(round(quote[part][0, col])) for part in COMPONENTS},
+                "subtotal": int(round(quote["subtotal"][0, col])),
+                "tax": int(round(quote["tax"][0, col])),
+                "total": total,
+                "within_budget": None if math.isnan(budget) else bool(total <= budget),
+            })
+        return {
+            "rate_card": self.version,
+            "currency": self.currency,
+            "guests": int(quote["guests"][0]),
+            "outstation": bool(outstation[0]),
+            "molecular": bool(molecular[0]),
+            "recommended": TIERS[int(tier[0])],
+            "within_budget": None if math.isnan(budget) else bool(fits[0]),
+            "tiers": tiers,
+        }
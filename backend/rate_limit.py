@@ -0,0 +1,173 @@
+"""Token-bucket rate limiting.
+
+A ``Limit`` lets a key make ``burst`` requests at once, refilling at ``rate``
+tokens per second. Buckets live in a backend:
+
+* ``MemoryBackend``: a bounded LRU of buckets in this process. No I/O, but
+  each worker enforces the limit on its own.
+* ``MongoBackend``: one document per bucket, refilled and debited in a
+  single atomic pipeline update, so every worker (and host) shares the
+  budget. Expired buckets are removed by a TTL index on ``expires_at``.
+
+Any object with an ``async take(key, limit, cost)`` method can be plugged
+into ``RateLimiter``.
+
+Per-client limits need the client's address, not the ingress's:
+``TrustedProxies`` reads it from ``X-Forwarded-For`` when the request
+came through a proxy we trust.
+"""
+import hashlib
+import ipaddress
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Limit:
+    name: str
+    rate: float  # tokens per second
+    burst: float
+
+
+class MemoryBackend:
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        # (limit name, key) -> [tokens, last refill (monotonic)]
+        self._buckets: "OrderedDict[tuple, list]" = OrderedDict()
+
+    async def take(self, key: str, limit: Limit, cost: float = 1.0) -> float:
+        """Debit ``cost`` tokens. Returns 0 if allowed, else seconds until enough have refilled."""
+        now = time.monotonic()
+        bucket = self._buckets.get((limit.name, key))
+        if bucket is None:
+            bucket = self._buckets[(limit.name, key)] = [limit.burst, now]
+            if len(self._buckets) > self.max_keys:
+                # Dropping the least recently used bucket resets it to full
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end((limit.name, key))
+            bucket[0] = min(limit.burst, bucket[0] + (now - bucket[1]) * limit.rate)
+            bucket[1] = now
+        if bucket[0] >= cost:
+            bucket[0] -= cost
+            return 0.0
+        return (cost - bucket[0]) / limit.rate
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class MongoBackend:
+    def __init__(self, collection):
+        self.collection = collection
+
+    @staticmethod
+    def bucket_id(key: str, limit: Limit) -> str:
+        # Keys are IPs and emails: store a digest, not the value
+        return f"{limit.name}:{hashlib.blake2b(key.encode(), digest_size=12).hexdigest()}"
+
+    async def take(self, key: str, limit: Limit, cost: float = 1.0) -> float:
+        now = datetime.now(timezone.utc)
+        elapsed = {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated", now]}]}, 1000]}
+        refilled = {"$min": [limit.burst, {"$add": [
+            {"$ifNull": ["$tokens", limit.burst]}, {"$multiply": [elapsed, limit.rate]},
+        ]}]}
+        pipeline = [
+            {"$set": {"tokens": refilled, "updated": now}},
+            {"$set": {"allowed": {"$gte": ["$tokens", cost]}}},
+            {"$set": {
+                "tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", cost]}, "$tokens"]},
+                # A bucket left alone this long is full again, same as no document
+                "expires_at": now + timedelta(seconds=limit.burst / limit.rate),
+            }},
+        ]
+        for attempt in range(2):
+            try:
+                doc = await self.collection.find_one_and_update(
+                    {"_id": self.bucket_id(key, limit)}, pipeline,
+                    projection={"_id": 0, "tokens": 1, "allowed": 1},
+                    upsert=True, return_document=ReturnDocument.AFTER,
+                )
+                break
+            except DuplicateKeyError:
+                # Two first requests upserted the same bucket; the retry updates it
+                if attempt:
+                    raise
+        if doc["allowed"]:
+            return 0.0
+        return (cost - doc["tokens"]) / limit.rate
+
+
+class RateLimiter:
+    """Named limits over one backend. Backend failures fail open: a Mongo
+    outage must not take the contact form down with it."""
+
+    def __init__(self, backend, limits: Iterable[Limit]):
+        self.backend = backend
+        self.limits: Dict[str, Limit] = {limit.name: limit for limit in limits}
+        self.allowed = 0
+        self.limited = 0
+        self.errors = 0
+
+    async def check(self, name: str, key: str, cost: float = 1.0) -> float:
+        """Take from ``name``'s bucket for ``key``: 0 if allowed, else seconds to wait."""
+        try:
+            wait = await self.backend.take(key, self.limits[name], cost)
+        except PyMongoError as e:
+            self.errors += 1
+            logger.warning(f"Rate limit backend failed, allowing request: {e!r}")
+            return 0.0
+        if wait:
+            self.limited += 1
+        else:
+            self.allowed += 1
+        return wait
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "errors": self.errors,
+        }
+
+
+class TrustedProxies:
+    """Resolves the client address behind a chain of trusted proxies.
+
+    Each proxy appends the address it received the request from to
+    ``X-Forwarded-For``, so the header is read right to left, skipping
+    trusted hops: the first untrusted address is the client. Entries to
+    its left were supplied by the client and are ignored. A request whose
+    peer is not a trusted proxy is taken at its peer address, so the
+    header can't be spoofed by connecting directly.
+    """
+
+    def __init__(self, networks: Iterable[str]):
+        self.networks = [ipaddress.ip_network(n.strip(), strict=False) for n in networks if n.strip()]
+
+    def trusted(self, address: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.networks)
+
+    def client_ip(self, peer: Optional[str], forwarded_for: Optional[str]) -> str:
+        if not peer:
+            return "unknown"
+        if not forwarded_for or not self.trusted(peer):
+            return peer
+        for hop in reversed([h.strip() for h in forwarded_for.split(",") if h.strip()]):
+            if not self.trusted(hop):
+                return hop
+        return peer
@@ -0,0 +1,250 @@
+"""Lead scoring and fast-lane routing.
+
+A rule set (the newest document in the ``scoring_rules`` collection, or
+``DEFAULT_SCORING_RULES``) is compiled once into arrays: per rule, its
+points and its conditions as (feature, comparison, operand) triples.
+Scoring is then one pass over ``leads x rules``: each condition is a
+vectorized comparison over a feature column, a lead's score is the sum of
+the points of the rules it matches, and its tier is the first whose
+``min_score`` it reaches. A form submission is a batch of one; re-scoring
+the whole collection after a rule change is the same calculation over
+every lead, spread over a process pool by ``ScoringPool``.
+
+Features, parsed from the free-text form fields with the pricing parsers:
+
+* ``guests``: guest count ("300-500" -> 500, "500+" -> 600)
+* ``budget``: upper bound of the budget range in rupees (inf for open ranges)
+* ``days_to_event``: days from the scoring date to ``event_date``
+* ``city``, ``bar_type``, ``setup_interest``, ``event_type``: lowercased text
+
+Numeric features are NaN when missing, so no comparison matches them.
+
+A rule::
+
+    {"name": "300+ guests", "points": 20,
+     "when": {"guests": {"gte": 300}, "city": {"not_in": ["delhi"]}}}
+
+matches when all of its conditions hold. Numeric operators: ``gt``,
+``gte``, ``lt``, ``lte``, ``eq``. Text operators: ``in``, ``not_in``,
+``contains`` (any of the substrings), ``present`` (true / false).
+"""
+import asyncio
+import json
+import math
+import multiprocessing
+import operator
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from pricing import parse_budget, parse_guests
+
+NUMERIC_FEATURES = ("guests", "budget", "days_to_event")
+TEXT_FEATURES = ("city", "bar_type", "setup_interest", "event_type")
+
+DESTINATION_CITIES = ["udaipur", "jaipur", "jodhpur", "jaisalmer", "goa", "mussoorie", "rishikesh",
+                      "shimla", "kerala", "kochi", "andaman", "coorg"]
+
+DEFAULT_SCORING_RULES = {
+    "version": "2025-01",
+    "rules": [
+        {"name": "500+ guests", "when": {"guests": {"gt": 500}}, "points": 35},
+        {"name": "200-500 guests", "when": {"guests": {"gt": 200, "lte": 500}}, "points": 20},
+        {"name": "100-200 guests", "when": {"guests": {"gt": 100, "lte": 200}}, "points": 10},
+        {"name": "budget ₹10L+", "when": {"budget": {"gt": 1000000}}, "points": 35},
+        {"name": "budget ₹5-10L", "when": {"budget": {"gt": 500000, "lte": 1000000}}, "points": 20},
+        {"name": "budget ₹3-5L", "when": {"budget": {"gt": 300000, "lte": 500000}}, "points": 10},
+        {"name": "event within 30 days", "when": {"days_to_event": {"gte": 0, "lte": 30}}, "points": 15},
+        {"name": "event in 1-3 months", "when": {"days_to_event": {"gt": 30, "lte": 90}}, "points": 10},
+        {"name": "event date passed", "when": {"days_to_event": {"lt": 0}}, "points": -30},
+        {"name": "destination wedding", "when": {"city": {"in": DESTINATION_CITIES},
+                                                 "event_type": {"contains": ["wedding"]}}, "points": 20},
+        {"name": "destination city", "when": {"city": {"in": DESTINATION_CITIES}}, "points": 10},
+        {"name": "asked for a setup", "when": {"setup_interest": {"present": True}}, "points": 10},
+        {"name": "cocktail bar", "when": {"bar_type": {"in": ["cocktail", "both"]}}, "points": 5},
+    ],
+    # Highest first; the last tier takes every lead below the others
+    "tiers": [
+        {"name": "hot", "min_score": 60},
+        {"name": "warm", "min_score": 30},
+        {"name": "cold"},
+    ],
+    # Tiers whose notifications skip the standard queue
+    "fast_lane": ["hot"],
+}
+
+_NUMERIC_OPS: Dict[str, Callable[[np.ndarray, float], np.ndarray]] = {
+    "gt": operator.gt, "gte": operator.ge, "lt": operator.lt, "lte": operator.le, "eq": operator.eq,
+}
+
+
+@lru_cache(maxsize=4096)
+def parse_event_day(value: Optional[str]) -> float:
+    """Ordinal of an ISO ``event_date`` ("2025-11-22"); NaN when missing or invalid."""
+    try:
+        return float(date.fromisoformat((value or "").strip()[:10]).toordinal())
+    except ValueError:
+        return math.nan
+
+
+def _text(value) -> str:
+    return str(value or "").strip().lower()
+
+
+def _text_condition(op: str, operand) -> Callable[[List[str]], np.ndarray]:
+    if op in ("in", "not_in"):
+        values = frozenset(_text(v) for v in operand)
+        negate = op == "not_in"
+
+        def hit(s):
+            return (s in values) is not negate
+    elif op == "contains":
+        needles = tuple(_text(v) for v in ([operand] if isinstance(operand, str) else operand))
+
+        def hit(s):
+            return any(needle in s for needle in needles)
+    elif op == "present":
+        wanted = bool(operand)
+
+        def hit(s):
+            return bool(s) is wanted
+    else:
+        raise ValueError(f"unknown text operator {op!r}")
+    return lambda column: np.fromiter(map(hit, column), bool, len(column))
+
+
+class ScoringRules:
+    """A rule set compiled to a points vector and per-rule condition lists."""
+
+    def __init__(self, spec: dict):
+        self.version = str(spec["version"])
+        # Canonical form, shipped to the process pool (and its compile cache)
+        self.spec_json = json.dumps(spec, sort_keys=True, default=str)
+        rules = spec["rules"]
+        if not rules:
+            raise ValueError("scoring rules need at least one rule")
+        self.names = [str(rule["name"]) for rule in rules]
+        self.points = np.array([float(rule["points"]) for rule in rules], dtype=np.float64)
+        self.conditions: List[List[Tuple[str, Callable]]] = []
+        for rule in rules:
+            compiled = []
+            for feature, ops in rule["when"].items():
+                for op, operand in ops.items():
+                    if feature in NUMERIC_FEATURES:
+                        if op not in _NUMERIC_OPS:
+                            raise ValueError(f"unknown numeric operator {op!r} in rule {rule['name']!r}")
+                        compiled.append((feature, lambda column, f=_NUMERIC_OPS[op], v=float(operand): f(column, v)))
+                    elif feature in TEXT_FEATURES:
+                        compiled.append((feature, _text_condition(op, operand)))
+                    else:
+                        raise ValueError(f"unknown feature {feature!r} in rule {rule['name']!r}")
+            self.conditions.append(compiled)
+
+        tiers = spec["tiers"]
+        if not tiers or any("min_score" not in tier for tier in tiers[:-1]):
+            raise ValueError("every tier but the last needs a min_score")
+        self.tiers = [str(tier["name"]) for tier in tiers]
+        # Ascending thresholds for searchsorted; the last tier has none
+        self.thresholds = np.array([float(tier["min_score"]) for tier in tiers[:-1]][::-1], dtype=np.float64)
+        if np.any(np.diff(self.thresholds) < 0):
+            raise ValueError("tiers must be ordered by descending min_score")
+        self.fast_lane = frozenset(spec.get("fast_lane", ()))
+
+    # ---- vectorized core ----
+
+    def features(self, leads: List[dict], today: date) -> Dict[str, object]:
+        n = len(leads)
+        days = np.fromiter((parse_event_day(lead.get("event_date")) for lead in leads), np.float64, n)
+        return {
+            "guests": np.fromiter((parse_guests(lead.get("guest_count")) for lead in leads), np.float64, n),
+            "budget": np.fromiter((parse_budget(lead.get("budget_range")) for lead in leads), np.float64, n),
+            "days_to_event": days - today.toordinal(),
+            **{name: [_text(lead.get(name)) for lead in leads] for name in TEXT_FEATURES},
+        }
+
+    def match(self, features: Dict[str, object], n: int) -> np.ndarray:
+        """(N, rules) matrix of which rules each lead matches."""
+        matched = np.ones((n, len(self.names)), dtype=bool)
+        with np.errstate(invalid="ignore"):
+            for j, conditions in enumerate(self.conditions):
+                for feature, condition in conditions:
+                    matched[:, j] &= condition(features[feature])
+        return matched
+
+    # ---- leads ----
+
+    def score_leads(self, leads: List[dict], today: Optional[date] = None) -> List[dict]:
+        """Score per lead, as stored on the lead document."""
+        if not leads:
+            return []
+        today = today or date.today()
+        matched = self.match(self.features(leads, today), len(leads))
+        scores = matched.astype(np.float64) @ self.points
+        tier = len(self.tiers) - 1 - np.searchsorted(self.thresholds, scores, side="right")
+        scored_on = today.isoformat()
+        return [
+            {
+                "rules": self.version,
+                "score": int(round(score)),
+                "tier": self.tiers[t],
+                "fast_lane": self.tiers[t] in self.fast_lane,
+                "reasons": [self.names[j] for j in np.flatnonzero(row)],
+                "scored_on": scored_on,
+            }
+            for score, t, row in zip(scores.tolist(), tier.tolist(), matched)
+        ]
+
+
+@lru_cache(maxsize=8)
+def _compiled(spec_json: str) -> ScoringRules:
+    return ScoringRules(json.loads(spec_json))
+
+
+def score_batch(spec_json: str, leads: List[dict], today_ordinal: int) -> List[dict]:
+    """Process pool entry point: each worker compiles a rule set once."""
+    return _compiled(spec_json).score_leads(leads, date.fromordinal(today_ordinal))
+
+
+class ScoringPool:
+    """Scores large batches in worker processes, off the event loop.
+
+    Batches smaller than ``inline_below`` are scored in-process: shipping
+    them to a worker costs more than scoring them.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, inline_below: int = 500):
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.inline_below = inline_below
+        self.batches = 0
+        self.leads = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    async def score(self, rules: ScoringRules, leads: List[dict], today: date) -> List[dict]:
+        self.batches += 1
+        self.leads += len(leads)
+        if len(leads) < self.inline_below:
+            return rules.score_leads(leads, today)
+        if self._executor is None:
+            # Spawned, not forked, so workers don't inherit the server's event
+            # loop, Mongo client or thread locks
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, score_batch, rules.spec_json, leads, today.toordinal())
+
+    async def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "started": self._executor is not None,
+            "batches": self.batches,
+            "leads": self.leads,
+        }
@@ -0,0 +1,250 @@
+"""Full-text search over the catalog: BM25 with typo tolerance and type-ahead.
+
+Each catalog collection is indexed as its own ``Segment`` (built once per
+catalog version, so a change to the drinks only re-indexes the drinks).
+A segment is an inverted index of field-weighted term frequencies plus two
+lookup structures over its vocabulary:
+
+* a sorted term list, so the last (still being typed) query word expands
+  to every term it prefixes with a bisect;
+* a deletion neighbourhood (SymSpell): every term is stored under each
+  variant with up to ``max_edits`` characters deleted. A misspelt query
+  word is looked up under its own deletions and candidates are verified
+  with a bounded edit distance, without scanning the vocabulary.
+
+``search`` combines segments with shared corpus statistics, so scores are
+comparable across drinks, setups, FAQs and packages.
+"""
+import bisect
+import math
+import re
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+K1 = 1.2
+B = 0.75
+# Score multipliers for expanded query words
+PREFIX_WEIGHT = 0.8
+TYPO_WEIGHT = 0.6
+MAX_EXPANSIONS = 12
+
+_WORD = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me my of on or our the to we what "
+    "when with you your".split()
+)
+
+
+def _fold(text: str) -> str:
+    # "Crème brûlée" -> "creme brulee"
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode().lower()
+
+
+def stem(word: str) -> str:
+    """Light plural folding: "mocktails" -> "mocktail", "berries" -> "berry"."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [stem(w) for w in _WORD.findall(_fold(text)) if w not in STOPWORDS]
+
+
+def _deletes(word: str, max_edits: int) -> set:
+    out = {word}
+    frontier = {word}
+    for _ in range(max_edits):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        out |= frontier
+    return out
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, or ``limit + 1`` once it exceeds ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+def allowed_edits(word: str) -> int:
+    return 0 if len(word) < 4 else 1 if len(word) < 8 else 2
+
+
+@dataclass
+class Hit:
+    kind: str
+    doc: dict
+    score: float
+    matched: List[str] = field(default_factory=list)
+
+
+class Segment:
+    """One collection's inverted index. ``fields`` maps field -> weight;
+    list-valued fields (ingredients, inclusions) are indexed element-wise.
+
+    Postings are numpy arrays (doc positions, weighted term frequencies), so
+    scoring a term is a few vector operations however many docs contain it.
+    """
+
+    def __init__(self, kind: str, docs: Sequence[dict], fields: Dict[str, float], max_edits: int = 2):
+        self.kind = kind
+        self.docs = list(docs)
+        counts: Dict[str, Dict[int, float]] = defaultdict(dict)
+        lengths = []
+        for i, doc in enumerate(self.docs):
+            length = 0.0
+            for name, weight in fields.items():
+                value = doc.get(name)
+                if value is None or isinstance(value, bool):
+                    continue
+                for part in value if isinstance(value, list) else (value,):
+                    for term in tokenize(str(part)):
+                        posting = counts[term]
+                        posting[i] = posting.get(i, 0.0) + weight
+                        length += weight
+            lengths.append(length)
+        self.lengths = np.asarray(lengths, dtype=np.float64)
+        self.total_length = float(self.lengths.sum())
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {
+            term: (np.fromiter(posting.keys(), np.intp, len(posting)),
+                   np.fromiter(posting.values(), np.float64, len(posting)))
+            for term, posting in counts.items()
+        }
+        self.terms = sorted(self.postings)
+        deletes: Dict[str, List[str]] = defaultdict(list)
+        for term in self.terms:
+            for variant in _deletes(term, min(max_edits, allowed_edits(term))):
+                deletes[variant].append(term)
+        # Tuples rather than lists: far fewer objects for the GC to track
+        self.deletes = {variant: tuple(terms) for variant, terms in deletes.items()}
+
+    def df(self, term: str) -> int:
+        posting = self.postings.get(term)
+        return len(posting[0]) if posting else 0
+
+    def prefixed(self, prefix: str) -> List[str]:
+        start = bisect.bisect_left(self.terms, prefix)
+        end = bisect.bisect_left(self.terms, prefix + "\x7f")
+        return self.terms[start:end]
+
+    def near(self, word: str) -> List[Tuple[str, int]]:
+        limit = allowed_edits(word)
+        candidates = set()
+        for variant in _deletes(word, limit):
+            candidates.update(self.deletes.get(variant, ()))
+        out = []
+        for term in candidates:
+            if term != word:
+                distance = edit_distance(word, term, limit)
+                if distance <= limit:
+                    out.append((term, distance))
+        return out
+
+
+def _expand(segments: Sequence[Segment], word: str, is_prefix: bool) -> Tuple[Dict[str, float], Optional[str]]:
+    """Index terms a query word stands for, with their score multipliers, and
+    the closest correction when the word only matched as a typo."""
+    terms: Dict[str, float] = {}
+    if any(word in s.postings for s in segments):
+        terms[word] = 1.0
+    if is_prefix and len(word) >= 2:
+        prefixed = {t for s in segments for t in s.prefixed(word) if t != word}
+        ranked = sorted(prefixed, key=lambda t: (-sum(s.df(t) for s in segments), t))
+        for term in ranked[:MAX_EXPANSIONS]:
+            # Closer completions score higher: "whis" ranks "whisky" over "whiskey"
+            terms.setdefault(term, PREFIX_WEIGHT * len(word) / len(term))
+    if terms:
+        return terms, None
+    near: Dict[str, int] = {}
+    for s in segments:
+        for term, distance in s.near(word):
+            near[term] = min(distance, near.get(term, distance))
+    ranked = sorted(near.items(), key=lambda item: (item[1], -sum(s.df(item[0]) for s in segments), item[0]))
+    for term, distance in ranked[:MAX_EXPANSIONS]:
+        terms[term] = TYPO_WEIGHT / distance
+    return terms, ranked[0][0] if ranked else None
+
+
+def search(segments: Sequence[Segment], query: str, limit: int = 10,
+           kinds: Optional[Iterable[str]] = None) -> Tuple[List[Hit], Dict[str, str]]:
+    """BM25 over ``segments`` (optionally only those whose kind is in ``kinds``).
+
+    The last query word is treated as a prefix unless the query ends in
+    whitespace. Returns hits and the typo corrections that were applied.
+    """
+    words = tokenize(query)
+    if not words:
+        return [], {}
+    kinds = set(kinds) if kinds else None
+    searched = [s for s in segments if kinds is None or s.kind in kinds]
+    # Corpus statistics span every segment, so scores don't depend on the filter
+    n_docs = sum(len(s.docs) for s in segments)
+    avg_length = sum(s.total_length for s in segments) / n_docs if n_docs else 0.0
+    if not searched or not avg_length:
+        return [], {}
+
+    sizes = [len(seg.docs) for seg in searched]
+    offsets = np.cumsum([0] + sizes)
+    total = offsets[-1]
+    # Scores over every searched doc, segments laid end to end
+    scores = np.zeros(total)
+    words_matched = np.zeros(total, dtype=np.intp)
+    word_terms = []  # per query word: index into its expansions for each doc, -1 if none
+    corrections: Dict[str, str] = {}
+    prefix_last = not query[-1:].isspace()
+    for position, word in enumerate(words):
+        terms, correction = _expand(segments, word, prefix_last and position == len(words) - 1)
+        if correction:
+            corrections[word] = correction
+        expansions = list(terms)
+        # A doc matching several expansions of one word counts its best match once
+        best = np.zeros(total)
+        best_term = np.full(total, -1, dtype=np.intp)
+        for ti, term in enumerate(expansions):
+            df = sum(s.df(term) for s in segments)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for si, segment in enumerate(searched):
+                posting = segment.postings.get(term)
+                if posting is None:
+                    continue
+                docs, tf = posting
+                score = idf * terms[term] * tf * (K1 + 1) / (
+                    tf + K1 * (1 - B + B * segment.lengths[docs] / avg_length))
+                docs = docs + offsets[si]
+                better = score > best[docs]
+                best[docs[better]] = score[better]
+                best_term[docs[better]] = ti
+        found = best_term >= 0
+        scores[found] += best[found]
+        words_matched[found] += 1
+        word_terms.append((expansions, best_term))
+
+    # Documents matching more of the query words come first
+    candidates = np.nonzero(words_matched)[0]
+    order = np.lexsort((-scores[candidates], -words_matched[candidates]))[:limit]
+    hits = []
+    for position in candidates[order].tolist():
+        si = int(np.searchsorted(offsets, position, side="right")) - 1
+        matched = [expansions[best_term[position]] for expansions, best_term in word_terms if best_term[position] >= 0]
+        hits.append(Hit(searched[si].kind, searched[si].docs[position - offsets[si]],
+                        round(float(scores[position]), 4), matched))
+    return hits, corrections
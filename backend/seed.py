@@ -0,0 +1,161 @@
+"""Default catalog: one versioned seed dataset, ``seed_data.json``.
+
+The file is the only copy of the default setups, drinks, testimonials,
+gallery items, packages and FAQs:
+
+* ``load_seed`` validates it once per process into frozen models (and
+  read-only dicts), which the catalog routes fall back to while a
+  collection is empty;
+* ``seed_catalog`` inserts it into Mongo on startup. Documents are upserted
+  by ``id`` with ``$setOnInsert``, so edits made in the database are never
+  overwritten, and each collection is seeded once per dataset version;
+* the frontend's static fallbacks (``frontend/src/lib/staticData.js``) are
+  generated from it. Run from the backend directory after editing the
+  dataset (and bump its ``version``):
+
+    python seed.py export   # regenerate staticData.js
+    python seed.py check    # exit 1 if staticData.js is out of date
+"""
+import json
+import logging
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Iterable, Mapping, Tuple, Type
+
+from pydantic import BaseModel
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+SEED_PATH = Path(__file__).parent / "seed_data.json"
+FRONTEND_PATH = Path(__file__).parent.parent / "frontend" / "src" / "lib" / "staticData.js"
+
+# Mongo collection -> export name in staticData.js
+FRONTEND_EXPORTS = {
+    "setups": "defaultSetups",
+    "menus": "defaultDrinks",
+    "testimonials": "defaultTestimonials",
+    "gallery": "defaultGallery",
+    "packages": "defaultPackages",
+    "faqs": "defaultFaqs",
+}
+
+
+class SeedData:
+    """A validated seed dataset. ``models[name]`` are frozen model instances,
+    ready to serialize without re-validation; ``docs[name]`` are the same
+    records as read-only mappings, for the indexes built over dicts."""
+
+    def __init__(self, version: int, models: Dict[str, Tuple[BaseModel, ...]]):
+        self.version = version
+        self.models: Mapping[str, Tuple[BaseModel, ...]] = MappingProxyType(models)
+        self.docs: Mapping[str, Tuple[Mapping, ...]] = MappingProxyType({
+            name: tuple(MappingProxyType(m.model_dump(exclude_unset=True)) for m in items)
+            for name, items in models.items()
+        })
+
+
+def read_seed(path: Path = SEED_PATH) -> dict:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data.get("version"), int) or not isinstance(data.get("collections"), dict):
+        raise ValueError(f"{path}: expected an integer 'version' and a 'collections' object")
+    return data
+
+
+def load_seed(path: Path, models: Dict[str, Type[BaseModel]]) -> SeedData:
+    """Read and validate ``path``; ``models`` maps each collection to its model."""
+    data = read_seed(path)
+    missing = set(models) - set(data["collections"])
+    if missing:
+        raise ValueError(f"{path}: no seed data for {sorted(missing)}")
+    return SeedData(data["version"], {
+        name: tuple(model.model_validate(doc) for doc in data["collections"][name])
+        for name, model in models.items()
+    })
+
+
+async def seed_catalog(db, seed: SeedData, collections: Iterable[str]) -> Dict[str, int]:
+    """Insert the seed records missing from each collection, once per version.
+
+    Safe to run from every worker at once: a collection's entry in
+    ``catalog_seed`` is claimed atomically, and only the claimant writes. If
+    the write fails the claim is given back, so the next startup retries.
+    Returns the number of documents inserted per collection.
+    """
+    inserted = {}
+    now = datetime.now(timezone.utc)
+    for name in collections:
+        try:
+            previous = await db.catalog_seed.find_one_and_update(
+                {"_id": name, "version": {"$lt": seed.version}},
+                {"$set": {"version": seed.version, "seeded_at": now}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            continue  # Already at this version, or another worker has it
+        ops = [
+            UpdateOne({"id": doc["id"]}, {"$setOnInsert": {k: v for k, v in doc.items() if k != "id"}}, upsert=True)
+            for doc in seed.docs[name]
+        ]
+        try:
+            result = await db[name].bulk_write(ops, ordered=False)
+            inserted[name] = result.upserted_count
+        except BulkWriteError as e:
+            # e.g. a setup whose slug is already taken by a document with another id
+            inserted[name] = e.details.get("nUpserted", 0)
+            logger.warning(f"Seeding {name}: {len(e.details.get('writeErrors', []))} documents skipped")
+        except BaseException:
+            await _release_claim(db, name, seed.version, previous)
+            raise
+    if inserted:
+        logger.info(f"Catalog seed v{seed.version} applied: {inserted}")
+    return inserted
+
+
+async def _release_claim(db, name: str, version: int, previous):
+    """Undo a ``seed_catalog`` claim; the upserts are idempotent, so a retry is safe."""
+    try:
+        if previous is None:
+            await db.catalog_seed.delete_one({"_id": name, "version": version})
+        else:
+            restore = {k: v for k, v in previous.items() if k != "_id"}
+            await db.catalog_seed.update_one({"_id": name, "version": version}, {"$set": restore})
+    except Exception as e:
+        logger.error(f"Seeding {name}: could not release the v{version} claim: {e!r}")
+
+
+def render_frontend(data: dict) -> str:
+    """``staticData.js`` for a seed dataset, one record per line."""
+    parts = [
+        "// Generated from backend/seed_data.json by `python seed.py export`. Do not edit by hand.\n",
+        f"export const SEED_VERSION = {data['version']};\n",
+    ]
+    for name, export in FRONTEND_EXPORTS.items():
+        rows = ",\n".join(f"    {json.dumps(doc, ensure_ascii=False)}" for doc in data["collections"][name])
+        parts.append(f"\nexport const {export} = [\n{rows}\n];\n")
+    return "".join(parts)
+
+
+def main(command: str) -> int:
+    expected = render_frontend(read_seed())
+    if command == "export":
+        FRONTEND_PATH.write_text(expected, encoding="utf-8")
+        print(f"Wrote {FRONTEND_PATH}")
+        return 0
+    current = FRONTEND_PATH.read_text(encoding="utf-8") if FRONTEND_PATH.exists() else ""
+    if current != expected:
+        print(f"{FRONTEND_PATH} is out of date: run `python seed.py export`")
+        return 1
+    print(f"{FRONTEND_PATH} is up to date")
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in ("export", "check"):
+        print(__doc__)
+        sys.exit(2)
+    sys.exit(main(sys.argv[1]))
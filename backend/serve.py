@@ -0,0 +1,69 @@
+"""Production entry point: ``python serve.py``.
+
+Runs ``server:create_app`` under uvicorn with one process per worker. Each
+worker imports the app itself and, in its lifespan, opens its own Mongo
+pool, loads its own catalog cache and indexes, and starts its own change
+streams and outbox workers; nothing is shared or inherited across the fork.
+A worker only accepts connections once its warm-up has finished, and on
+SIGTERM it stops accepting, finishes in-flight requests (up to
+``GRACEFUL_TIMEOUT``), lets claimed emails go out, then closes its pool.
+The listening socket closes as soon as SIGTERM arrives, so there is no
+"draining" health state to probe: readiness checks fail to connect, and the
+load balancer should stop routing on termination (e.g. a Kubernetes preStop
+sleep covering its endpoint propagation delay) rather than wait for them.
+
+Environment:
+
+* ``WEB_CONCURRENCY``: worker processes (default: one per CPU)
+* ``HOST`` / ``PORT``: bind address (default ``0.0.0.0:8001``)
+* ``GRACEFUL_TIMEOUT``: seconds to drain in-flight requests on shutdown (default 30)
+* ``KEEPALIVE_TIMEOUT``: idle keep-alive seconds; keep above the load balancer's (default 75)
+* ``FORWARDED_ALLOW_IPS``: proxies uvicorn trusts for X-Forwarded-* (default
+  ``127.0.0.1``). The lead rate limits don't depend on it: they resolve the
+  client from X-Forwarded-For themselves, trusting ``TRUSTED_PROXIES``
+  (default: loopback and private ranges, where the ingress runs). Set that
+  to the ingress's addresses if it isn't on a private network.
+* ``MONGO_MAX_POOL_SIZE`` and the other ``MONGO_*`` settings in ``server.py``
+  apply per worker: size them so ``WEB_CONCURRENCY * MONGO_MAX_POOL_SIZE``
+  stays within the cluster's connection limit.
+* ``IMAGE_WORKERS``: image resize processes per worker (default: CPUs / workers)
+
+Per-process state to keep in mind when scaling out: ``/metrics`` reports
+the worker that served the scrape, and ``/api/health`` includes the worker
+pid. Outbox sends and lead dedup claims go through Mongo, so they are safe
+across workers and hosts. With ``LEAD_WRITE_BATCHING`` each worker batches
+its own lead inserts, so a batch holds at most one worker's submissions.
+
+gunicorn works as well, with the same per-worker startup::
+
+    gunicorn -k uvicorn.workers.UvicornWorker -w 4 -b 0.0.0.0:8001 \\
+        --graceful-timeout 30 'server:create_app()'
+"""
+import os
+
+import uvicorn
+
+
+def main():
+    workers = int(os.environ.get('WEB_CONCURRENCY', '0')) or os.cpu_count() or 1
+    # Workers inherit the environment, so split the image process pools
+    # between them instead of each one starting a pool per CPU
+    os.environ.setdefault('IMAGE_WORKERS', str(max(1, (os.cpu_count() or 1) // workers)))
+    uvicorn.run(
+        "server:create_app",
+        factory=True,
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+        host=os.environ.get('HOST', '0.0.0.0'),
+        port=int(os.environ.get('PORT', '8001')),
+        workers=workers,
+        timeout_graceful_shutdown=int(os.environ.get('GRACEFUL_TIMEOUT', '30')),
+        timeout_keep_alive=int(os.environ.get('KEEPALIVE_TIMEOUT', '75')),
+        proxy_headers=True,
+        forwarded_allow_ips=os.environ.get('FORWARDED_ALLOW_IPS', '127.0.0.1'),
+        lifespan="on",
+        access_log=os.environ.get('ACCESS_LOG', 'false').lower() == 'true',
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,153 @@
-from fastapi import FastAPI, APIRouter, HTTPException, BackgroundTasks
+from fastapi import FastAPI, APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateMany
 import os
+import asyncio
+import bisect
+import hmac
 import logging
+import math
+import time
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, TypeAdapter
+from typing import Dict, List, Literal, Optional, Tuple
 import uuid
-from datetime import datetime, timezone
-import asyncio
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timezone
+
+from analytics import DIMENSIONS, INTERVALS, LeadRollups
+from availability import ACTIVE_STATUSES, AvailabilityIndex, CapacityLedger, OutOfRange, booking_days
+from bulk_ingest import BodyTooLarge, InsertInterrupted, TooManyRows, insert_chunks, read_rows, validate_rows
+from catalog_cache import CatalogCache
+from db_indexes import apply_indexes, index_registry
+from drink_generator import DrinkFeatures, preference_seed
+from dedup import LeadClaims, idempotency_claim, lead_dedup_key, wait_for_lead
+from export import csv_chunks, ndjson_chunks
+from facets import FacetIndex
+from gallery_manifest import GalleryManifest
+import hashtags
+from http_cache import BodyCache, CachedBody, conditional_response
+from images import MIME_TYPES, ImagePipeline
+from metrics import (MongoCommandMetrics, MongoPoolMetrics, PrometheusMiddleware,
+                     metrics_endpoint, record_email, register_stats)
+from notify import ChatWebhook, Fanout, FakeTransport, HttpPool, MessagingWebhook, ResendEmail
+from outbox import DisabledProvider, EmailMessage, EmailProvider, OutboxDispatcher, new_notification
+from pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_filter
+from prerender import PAGE_KINDS, PrerenderCache, Shell
+from pricing import DEFAULT_RATE_CARD, RateCard
+from rate_limit import Limit, MemoryBackend, MongoBackend, RateLimiter, TrustedProxies
+from scoring import DEFAULT_SCORING_RULES, ScoringPool, ScoringRules
+from search import Segment, search
+from seed import load_seed, seed_catalog
+from templates import TemplateSet
+from write_behind import BatchWriter, WriterOverloaded
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# MongoDB connection. Pool limits are per worker process: with N workers the
+# deployment opens up to N * MONGO_MAX_POOL_SIZE connections.
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '50'))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '0'))
+MONGO_MAX_IDLE_MS = int(os.environ.get('MONGO_MAX_IDLE_MS', '300000'))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '5000'))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000'))
+# 0 = no limit
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', '0')) or None
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '0')) or None
+
+mongo_pool_metrics = MongoPoolMetrics()
+# connect=False: no monitor threads or sockets until the first operation, which
+# happens in the lifespan of each worker. A client built in a process that
+# later forks (gunicorn --preload) is therefore safe to inherit.
+client = AsyncIOMotorClient(
+    mongo_url,
+    connect=False,
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    maxIdleTimeMS=MONGO_MAX_IDLE_MS,
+    connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+    waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    event_listeners=[MongoCommandMetrics(), mongo_pool_metrics],
+)
 db = client[os.environ.get('DB_NAME', 'hqd_drinks')]
 
-# Email configuration (placeholder mode)
+# Catalog cache: change-stream invalidation with a TTL fallback
+catalog_cache = CatalogCache(
+    db,
+    ttl=float(os.environ.get('CATALOG_CACHE_TTL', '300')),
+    watch=os.environ.get('CATALOG_CACHE_WATCH', 'true').lower() == 'true',
+)
+register_stats('hqd_catalog_cache', catalog_cache.stats, counters=('hits', 'misses', 'invalidations'))
+
+# Responsive image derivatives for local catalog images (see images.py)
+IMAGE_SOURCE_DIR = Path(os.environ.get('IMAGE_SOURCE_DIR', ROOT_DIR.parent / 'frontend' / 'public'))
+image_pipeline = ImagePipeline(
+    IMAGE_SOURCE_DIR,
+    Path(os.environ.get('IMAGE_CACHE_DIR', ROOT_DIR / 'image_cache')),
+    quality=int(os.environ.get('IMAGE_QUALITY', '70')),
+    max_workers=int(os.environ.get('IMAGE_WORKERS', '0')) or None,
+)
+
+# Gallery items generated from the image directory (see gallery_manifest.py)
+gallery_manifest = GalleryManifest(
+    IMAGE_SOURCE_DIR,
+    Path(os.environ.get('GALLERY_MANIFEST_PATH', ROOT_DIR / 'gallery_manifest.json')),
+    rescan_interval=float(os.environ.get('GALLERY_RESCAN_SECONDS', '0')),
+)
+
+# Prerendered setup / drink / package pages and the sitemap (see prerender.py)
+SITE_URL = os.environ.get('SITE_URL', 'https://headquartersofdrinks.com')
+prerender_cache = PrerenderCache(
+    Path(os.environ.get('PRERENDER_DIR', ROOT_DIR / 'prerender_cache')),
+    SITE_URL,
+    Shell.load(Path(os.environ.get('PRERENDER_SHELL', ROOT_DIR.parent / 'frontend' / 'build' / 'index.html'))),
+)
+
+# Crew / bar-unit availability, kept in memory and updated per booking (see availability.py)
+availability = AvailabilityIndex(
+    db,
+    rebuild_interval=float(os.environ.get('AVAILABILITY_REBUILD_SECONDS', '300')),
+    watch=os.environ.get('CATALOG_CACHE_WATCH', 'true').lower() == 'true',
+)
+AVAILABILITY_MAX_DAYS = int(os.environ.get('AVAILABILITY_MAX_DAYS', '366'))
+# Bookings take capacity through per-day counters in Mongo, shared by all workers
+capacity_ledger = CapacityLedger(db.capacity_usage, db.bookings, availability)
+
+# Lead analytics rollups, refreshed in the background (see analytics.py)
+lead_rollups = LeadRollups(
+    db,
+    interval=float(os.environ.get('LEAD_ROLLUP_INTERVAL_SECONDS', '300')),
+    lag=float(os.environ.get('LEAD_ROLLUP_LAG_SECONDS', '600')),
+)
+ANALYTICS_MAX_DAYS = int(os.environ.get('ANALYTICS_MAX_DAYS', '1100'))
+
+# Readiness probe: how long /health waits on a Mongo ping before reporting 503
+HEALTH_MONGO_TIMEOUT = float(os.environ.get('HEALTH_MONGO_TIMEOUT', '2'))
+
+# Email configuration (placeholder mode unless EMAIL_ENABLED)
 EMAIL_ENABLED = os.environ.get('EMAIL_ENABLED', 'false').lower() == 'true'
 RESEND_API_KEY = os.environ.get('RESEND_API_KEY', '')
 EMAIL_TO = os.environ.get('EMAIL_TO', 'Rupesh@Headquartersofdrinks.co.in')
 EMAIL_FROM = os.environ.get('EMAIL_FROM', 'onboarding@resend.dev')
+# Fast-lane (high-scoring) leads: comma-separated recipients, EMAIL_TO by default
+EMAIL_FAST_LANE_TO = [a.strip() for a in os.environ.get('EMAIL_FAST_LANE_TO', EMAIL_TO).split(',') if a.strip()]
+EMAIL_PROVIDER = os.environ.get('EMAIL_PROVIDER', 'resend')  # resend, fake
+# Chat / messaging channels, sent alongside the email (best effort) for the
+# lanes in NOTIFY_CHAT_LANES: standard, fast, imports
+SLACK_WEBHOOK_URL = os.environ.get('SLACK_WEBHOOK_URL', '')
+MESSAGING_WEBHOOK_URL = os.environ.get('MESSAGING_WEBHOOK_URL', '')  # WhatsApp / SMS gateway
+MESSAGING_WEBHOOK_TOKEN = os.environ.get('MESSAGING_WEBHOOK_TOKEN', '')
+MESSAGING_TO = [n.strip() for n in os.environ.get('MESSAGING_TO', '').split(',') if n.strip()]
+NOTIFY_CHAT_LANES = {lane.strip() for lane in os.environ.get('NOTIFY_CHAT_LANES', 'fast').split(',') if lane.strip()}
+NOTIFY_MAX_CONNECTIONS = int(os.environ.get('NOTIFY_MAX_CONNECTIONS', '10'))
+NOTIFY_TIMEOUT = float(os.environ.get('NOTIFY_TIMEOUT', '10'))
 
 # Configure logging
 logging.basicConfig(
@@ -31,13 +155,44 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
+# httpx logs every notification request at INFO; failures surface in the outbox
+logging.getLogger('httpx').setLevel(logging.WARNING)
 
-app = FastAPI(title="HQ.D API", description="Headquarters of Drinks - Luxury Bar Services")
 api_router = APIRouter(prefix="/api")
+# Served at the site root (via the reverse proxy), not under /api
+page_router = APIRouter(include_in_schema=False)
+
+# Ops endpoints (bookings, lead listing, export and analytics, batch
+# maintenance) take ADMIN_TOKEN as a bearer token; with no token set they are
+# disabled.
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+
+async def require_admin(authorization: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Admin credential required",
+                            headers={"WWW-Authenticate": "Bearer"})
 
 # ============ MODELS ============
 
-class Lead(BaseModel):
+class LeadEstimate(BaseModel):
+    rate_card: str
+    totals: Dict[str, int]  # tier -> estimated total incl. tax
+    recommended: str
+    within_budget: Optional[bool] = None
+
+class LeadScore(BaseModel):
+    rules: str
+    score: int
+    tier: str  # hot, warm, cold with the default rules
+    fast_lane: bool
+    reasons: List[str]  # names of the rules that matched
+    scored_on: str
+
+class PublicLead(BaseModel):
+    """The lead as returned to the visitor who submitted the form."""
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
@@ -58,6 +213,11 @@ class Lead(BaseModel):
     status: str = "new"
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+class Lead(PublicLead):
+    """The stored lead, as ops see it (list, export)."""
+    estimate: Optional[LeadEstimate] = None
+    score: Optional[LeadScore] = None
+
 class LeadCreate(BaseModel):
     name: str
     email: EmailStr
@@ -66,7 +226,7 @@ class LeadCreate(BaseModel):
     event_date: Optional[str] = None
     city: Optional[str] = None
     venue: Optional[str] = None
-    guest_count: Optional[str] = None
+    guest_count: Optional[str] = Field(None, max_length=40)
     duration: Optional[str] = None
     bar_type: str = "both"
     theme: Optional[str] = None
@@ -74,8 +234,20 @@ class LeadCreate(BaseModel):
     message: Optional[str] = None
     setup_interest: Optional[str] = None
 
+class ImageSource(BaseModel):
+    type: str  # image/avif, image/webp, image/jpeg
+    srcset: str
+
+class ResponsiveImage(BaseModel):
+    width: Optional[int] = None
+    height: Optional[int] = None
+    blurhash: Optional[str] = None
+    color: Optional[str] = None
+    src: str
+    sources: List[ImageSource]
+
 class BarSetup(BaseModel):
-    model_config = ConfigDict(extra="ignore")
+    model_config = ConfigDict(extra="ignore", frozen=True)
     id: str
     title: str
     slug: str
@@ -88,11 +260,12 @@ class BarSetup(BaseModel):
     menu_highlights: List[str]
     molecular_tag: Optional[str] = None
     image_url: str
+    image: Optional[ResponsiveImage] = None
     video_url: Optional[str] = None
     featured: bool = False
 
 class Drink(BaseModel):
-    model_config = ConfigDict(extra="ignore")
+    model_config = ConfigDict(extra="ignore", frozen=True)
     id: str
     name: str
     type: str  # cocktail, mocktail
@@ -104,10 +277,11 @@ class Drink(BaseModel):
     molecular: bool = False
     molecular_technique: Optional[str] = None
     image_url: Optional[str] = None
+    image: Optional[ResponsiveImage] = None
     signature: bool = False
 
 class Testimonial(BaseModel):
-    model_config = ConfigDict(extra="ignore")
+    model_config = ConfigDict(extra="ignore", frozen=True)
     id: str
     name: str
     event_type: str
@@ -119,18 +293,21 @@ class Testimonial(BaseModel):
     featured: bool = False
 
 class GalleryItem(BaseModel):
-    model_config = ConfigDict(extra="ignore")
+    model_config = ConfigDict(extra="ignore", frozen=True)
     id: str
     title: str
     category: str  # wedding, corporate, private
     image_url: str
+    image: Optional[ResponsiveImage] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
     video_url: Optional[str] = None
     event_name: Optional[str] = None
     location: Optional[str] = None
     featured: bool = False
 
 class Package(BaseModel):
-    model_config = ConfigDict(extra="ignore")
+    model_config = ConfigDict(extra="ignore", frozen=True)
     id: str
     name: str
     tier: str  # good, better, best, ultra
@@ -141,69 +318,363 @@ class Package(BaseModel):
     highlight: Optional[str] = None
 
 class FAQ(BaseModel):
-    model_config = ConfigDict(extra="ignore")
+    model_config = ConfigDict(extra="ignore", frozen=True)
     id: str
     question: str
     answer: str
     category: str  # booking, service, logistics
     order: int = 0
 
-# ============ EMAIL SERVICE (Placeholder) ============
+class FacetCounts(BaseModel):
+    total: int
+    facets: Dict[str, Dict[str, int]]
+
+class DrinkPreferences(BaseModel):
+    type: Literal["cocktail", "mocktail"] = "cocktail"
+    flavor: Optional[str] = Field(None, max_length=40)
+    sweetness: Literal["dry", "balanced", "sweet"] = "balanced"
+    molecular: Optional[str] = Field(None, max_length=60)  # technique, e.g. "Smoke Bubble"
+    spirit: Optional[str] = Field(None, max_length=40)
+    seed: Optional[int] = Field(None, ge=0, le=2**32 - 1)
+    limit: int = Field(3, ge=1, le=12)
+
+class GeneratedDrink(Drink):
+    score: float
+    reasons: List[str]
+
+class DrinkGeneratorResult(BaseModel):
+    seed: int
+    drinks: List[GeneratedDrink]
+
+class HashtagRequest(BaseModel):
+    name1: str = Field(..., min_length=1, max_length=60)
+    name2: str = Field(..., min_length=1, max_length=60)
+    vibe: Literal["classic", "fun", "filmy", "minimal"] = "classic"
+    year: Optional[int] = Field(None, ge=2000, le=2100)
+    limit: int = Field(8, ge=1, le=20)
+
+class HashtagResult(BaseModel):
+    name1: str
+    name2: str
+    vibe: str
+    elegant: List[str]
+    playful: List[str]
+    short: List[str]
+    themed: List[str]  # filmy templates when vibe == "filmy"
+    top: List[str]
+
+class HashtagBatchRequest(BaseModel):
+    couples: List[HashtagRequest] = Field(..., min_length=1, max_length=int(os.environ.get('HASHTAG_BATCH_MAX', '500')))
+
+class HashtagBatchResult(BaseModel):
+    results: List[HashtagResult]
+
+class QuoteRequest(BaseModel):
+    guest_count: Optional[str] = Field(None, max_length=40)  # "100-200", "350"
+    duration: Optional[str] = Field(None, max_length=40)
+    bar_type: Literal["cocktail", "mocktail", "both"] = "both"
+    city: Optional[str] = Field(None, max_length=80)
+    budget_range: Optional[str] = Field(None, max_length=40)
+    molecular: bool = False
+
+class TierQuote(BaseModel):
+    tier: str
+    package: Optional[str] = None
+    bartenders: int
+    hours: float
+    breakdown: Dict[str, int]  # base, staff, consumables, molecular, travel
+    subtotal: int
+    tax: int
+    total: int
+    within_budget: Optional[bool] = None
+
+class QuoteResult(BaseModel):
+    rate_card: str
+    currency: str
+    guests: int
+    outstation: bool
+    molecular: bool
+    recommended: str
+    within_budget: Optional[bool] = None
+    tiers: List[TierQuote]
+
+class Booking(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    city: str
+    pool: Optional[str] = None  # capacity pool the booking was taken from
+    start: str  # YYYY-MM-DD, inclusive
+    end: str
+    crew: int
+    bar_units: int
+    status: str  # hold, confirmed, cancelled
+    lead_id: Optional[str] = None
+    note: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+class BookingCreate(BaseModel):
+    city: str = Field(..., min_length=1, max_length=80)
+    start: date
+    end: date
+    crew: int = Field(..., ge=1, le=200)
+    bar_units: int = Field(1, ge=0, le=50)
+    status: Literal["hold", "confirmed"] = "hold"
+    lead_id: Optional[str] = None
+    note: Optional[str] = Field(None, max_length=500)
+
+class BookingUpdate(BaseModel):
+    status: Literal["hold", "confirmed", "cancelled"]
+
+class AvailabilityDay(BaseModel):
+    date: str
+    crew: int
+    bar_units: int
+    status: str  # available, limited, full
+
+class AvailabilityResult(BaseModel):
+    city: Optional[str] = None
+    pool: Optional[str] = None
+    start: str
+    end: str
+    available: bool
+    free: Dict[str, int]  # fewest free crew / bar units on any day in the range
+    days: List[AvailabilityDay]
+
+class LeadAnalyticsRow(BaseModel):
+    period: Optional[str] = None  # first day of the day/week/month; None for interval=total
+    group: Dict[str, str]
+    count: int
+    budget_ranges: Dict[str, int]
+
+class LeadAnalytics(BaseModel):
+    start: str
+    end: str
+    interval: str
+    group_by: List[str]
+    total: int
+    buckets_scanned: int
+    watermark: Optional[str] = None  # leads created after this may not be counted yet
+    rows: List[LeadAnalyticsRow]
 
-async def send_lead_email(lead: Lead):
-    """Send email notification for new lead (placeholder mode)"""
+class RepriceResult(BaseModel):
+    rate_card: str
+    repriced: int
+    seconds: float
+
+class RescoreResult(BaseModel):
+    rules: str
+    rescored: int
+    tiers: Dict[str, int]
+    seconds: float
+
+class SearchHit(BaseModel):
+    type: str  # drink, setup, faq, package
+    id: str
+    title: str
+    snippet: Optional[str] = None
+    url: str
+    score: float
+    matched: List[str]
+
+class SearchResult(BaseModel):
+    query: str
+    corrections: Dict[str, str]  # misspelt query word -> the term it was matched as
+    hits: List[SearchHit]
+
+class BulkLeadError(BaseModel):
+    row: int
+    errors: List[str]
+
+class BulkLeadResult(BaseModel):
+    import_id: str
+    received: int
+    inserted: int
+    rejected: int
+    errors: List[BulkLeadError]
+
+# Default catalog (seed_data.json, see seed.py): validated once here, served
+# while a collection is empty and inserted into Mongo on startup
+catalog_seed = load_seed(Path(os.environ.get('SEED_PATH', ROOT_DIR / 'seed_data.json')), {
+    "setups": BarSetup, "menus": Drink, "testimonials": Testimonial,
+    "gallery": GalleryItem, "packages": Package, "faqs": FAQ,
+})
+SEED_CATALOG = os.environ.get('SEED_CATALOG', 'true').lower() == 'true'
+# Not the gallery: its defaults are stock photos, only shown while there are
+# neither curated items nor manifest images
+SEED_COLLECTIONS = [c for c in os.environ.get('SEED_COLLECTIONS', 'setups,menus,testimonials,packages,faqs').split(',') if c]
+
+# ============ EMAIL SERVICE ============
+
+notification_templates = TemplateSet(ROOT_DIR / 'notification_templates')
+
+def lead_context(lead: Lead) -> dict:
+    """Template values for a lead; ``.html`` templates escape them."""
+    return {
+        "name": lead.name,
+        "email": lead.email,
+        "phone": lead.phone,
+        "event_type": lead.event_type,
+        "event_date": lead.event_date or 'Not specified',
+        "city_venue": f"{lead.city or ''} {lead.venue or ''}".strip() or 'Not specified',
+        "guest_count": lead.guest_count or 'Not specified',
+        "duration": lead.duration or 'Not specified',
+        "bar_type": lead.bar_type,
+        "theme": lead.theme or 'Not specified',
+        "budget_range": lead.budget_range or 'Not specified',
+    }
+
+def render_lead_html(lead: Lead) -> str:
+    # Score, estimate and setup lines repeat across leads: rendered once each
+    score_line = notification_templates.fragment(
+        'score_line.html', score=lead.score.score, tier=lead.score.tier,
+        reasons=", ".join(lead.score.reasons) or "no rules matched",
+    ) if lead.score else ''
+    estimate_line = notification_templates.fragment(
+        'estimate_line.html', tier=lead.estimate.recommended, rate_card=lead.estimate.rate_card,
+        total=f"{lead.estimate.totals[lead.estimate.recommended]:,}",
+    ) if lead.estimate else ''
+    setup_section = notification_templates.fragment(
+        'section.html', heading="Setup Interest", body=lead.setup_interest,
+    ) if lead.setup_interest else ''
+    message_section = notification_templates.render(
+        'section.html', heading="Message", body=lead.message,
+    ) if lead.message else ''
+    return notification_templates.render(
+        'lead.html', **lead_context(lead), score_line=score_line, estimate_line=estimate_line,
+        setup_section=setup_section, message_section=message_section,
+    )
+
+def render_lead_text(lead: Lead, headline: str) -> str:
+    return notification_templates.render(
+        'lead.txt', **lead_context(lead), headline=headline,
+        score_line=f"Score {lead.score.score} ({lead.score.tier})\n" if lead.score else '',
+        message=lead.message or '',
+    ).strip()
+
+def render_lead_notification(docs: List[dict]) -> EmailMessage:
+    """One email per lead, or a digest when the dispatcher batches a backlog."""
+    leads = [Lead(**doc) for doc in docs]
+    if len(leads) == 1:
+        lead = leads[0]
+        subject = f"HQ.D | New {lead.event_type} Inquiry from {lead.name}"
+    else:
+        subject = f"HQ.D | {len(leads)} New Event Inquiries"
+    return EmailMessage(
+        subject=subject,
+        html="".join(render_lead_html(lead) for lead in leads),
+        to=[EMAIL_TO],
+        sender=EMAIL_FROM,
+        lead_ids=[lead.id for lead in leads],
+        text="\n\n".join(render_lead_text(lead, subject if len(leads) == 1 else f"HQ.D | {lead.event_type} Inquiry")
+                          for lead in leads),
+    )
+
+def render_fast_lane_notification(docs: List[dict]) -> EmailMessage:
+    """High-scoring leads: always one email per lead, flagged in the subject."""
+    lead = Lead(**docs[0])
+    tier = lead.score.tier.upper() if lead.score else "PRIORITY"
+    subject = (f"HQ.D | {tier} {lead.event_type} Inquiry from {lead.name}"
+               + (f" ({lead.guest_count} guests)" if lead.guest_count else ""))
+    return EmailMessage(
+        subject=subject,
+        html=render_lead_html(lead),
+        to=EMAIL_FAST_LANE_TO,
+        sender=EMAIL_FROM,
+        lead_ids=[lead.id],
+        text=render_lead_text(lead, subject),
+    )
+
+def render_import_notification(docs: List[dict]) -> EmailMessage:
+    """One summary email per bulk upload instead of one per lead."""
+    rows = "".join(
+        notification_templates.render('import_row.html', source=doc['source'], inserted=doc['inserted'],
+                                      rejected=doc['rejected'], created_at=doc['created_at'])
+        for doc in docs
+    )
+    total = sum(doc['inserted'] for doc in docs)
+    return EmailMessage(
+        subject=f"HQ.D | {total} Leads Imported",
+        html=notification_templates.render('import.html', rows=rows),
+        to=[EMAIL_TO],
+        sender=EMAIL_FROM,
+        lead_ids=[doc['id'] for doc in docs],
+        text=notification_templates.render('import.txt', total=total, uploads=len(docs)).strip(),
+    )
+
+# One keep-alive client for every channel; EMAIL_PROVIDER=fake answers all
+# of them locally, so load tests run the real channel code
+http_pool = HttpPool(
+    max_connections=NOTIFY_MAX_CONNECTIONS,
+    timeout=NOTIFY_TIMEOUT,
+    transport=FakeTransport(
+        latency=float(os.environ.get('FAKE_EMAIL_LATENCY', '0.05')),
+        failure_rate=float(os.environ.get('FAKE_EMAIL_FAILURE_RATE', '0')),
+    ) if EMAIL_PROVIDER == 'fake' else None,
+)
+
+def build_email_provider() -> EmailProvider:
+    if EMAIL_PROVIDER == 'fake':
+        return ResendEmail(http_pool, 'fake')
     if not EMAIL_ENABLED or not RESEND_API_KEY:
-        logger.info(f"Email disabled - Lead saved: {lead.name} ({lead.email})")
-        return {"status": "skipped", "message": "Email disabled"}
-    
-    try:
-        import resend
-        resend.api_key = RESEND_API_KEY
-        
-        html_content = f"""
-        <div style="font-family: 'Helvetica Neue', Arial, sans-serif; max-width: 600px; margin: 0 auto; background: #0A0A0A; color: #FAF8F5; padding: 40px;">
-            <div style="text-align: center; margin-bottom: 30px;">
-                <h1 style="color: #D4AF37; font-size: 24px; margin: 0;">HQ.D | New Event Inquiry</h1>
-            </div>
-            <div style="border-top: 1px solid #D4AF37; padding-top: 20px;">
-                <h2 style="color: #D4AF37; font-size: 18px;">Contact Details</h2>
-                <p><strong>Name:</strong> {lead.name}</p>
-                <p><strong>Email:</strong> {lead.email}</p>
-                <p><strong>Phone:</strong> {lead.phone}</p>
-            </div>
-            <div style="border-top: 1px solid rgba(212,175,55,0.3); padding-top: 20px; margin-top: 20px;">
-                <h2 style="color: #D4AF37; font-size: 18px;">Event Details</h2>
-                <p><strong>Event Type:</strong> {lead.event_type}</p>
-                <p><strong>Date:</strong> {lead.event_date or 'Not specified'}</p>
-                <p><strong>City/Venue:</strong> {lead.city or ''} {lead.venue or ''}</p>
-                <p><strong>Guests:</strong> {lead.guest_count or 'Not specified'}</p>
-                <p><strong>Duration:</strong> {lead.duration or 'Not specified'}</p>
-                <p><strong>Bar Type:</strong> {lead.bar_type}</p>
-                <p><strong>Theme:</strong> {lead.theme or 'Not specified'}</p>
-                <p><strong>Budget Range:</strong> {lead.budget_range or 'Not specified'}</p>
-            </div>
-            {f'<div style="border-top: 1px solid rgba(212,175,55,0.3); padding-top: 20px; margin-top: 20px;"><h2 style="color: #D4AF37; font-size: 18px;">Setup Interest</h2><p>{lead.setup_interest}</p></div>' if lead.setup_interest else ''}
-            {f'<div style="border-top: 1px solid rgba(212,175,55,0.3); padding-top: 20px; margin-top: 20px;"><h2 style="color: #D4AF37; font-size: 18px;">Message</h2><p>{lead.message}</p></div>' if lead.message else ''}
-            <div style="text-align: center; margin-top: 30px; padding-top: 20px; border-top: 1px solid #D4AF37;">
-                <p style="color: #D4AF37; font-size: 12px;">Headquarters of Drinks | We Take Drinks Seriously</p>
-            </div>
-        </div>
-        """
-        
-        email = await asyncio.to_thread(
-            resend.Emails.send,
-            {
-                "from": EMAIL_FROM,
-                "to": [EMAIL_TO],
-                "subject": f"HQ.D | New {lead.event_type} Inquiry from {lead.name}",
-                "html": html_content
-            }
-        )
-        logger.info(f"Email sent successfully: {email.get('id')}")
-        return {"status": "success", "email_id": email.get('id')}
-    except Exception as e:
-        logger.error(f"Failed to send email: {str(e)}")
-        return {"status": "error", "message": str(e)}
+        return DisabledProvider()
+    return ResendEmail(http_pool, RESEND_API_KEY)
+
+def build_chat_channels() -> List[EmailProvider]:
+    channels: List[EmailProvider] = []
+    if SLACK_WEBHOOK_URL:
+        channels.append(ChatWebhook(http_pool, SLACK_WEBHOOK_URL))
+    if MESSAGING_WEBHOOK_URL and MESSAGING_TO:
+        channels.append(MessagingWebhook(http_pool, MESSAGING_WEBHOOK_URL, MESSAGING_TO, MESSAGING_WEBHOOK_TOKEN))
+    return channels
+
+email_provider = build_email_provider()
+chat_channels = build_chat_channels()
+
+def lane_provider(lane: str) -> EmailProvider:
+    if lane in NOTIFY_CHAT_LANES and chat_channels:
+        return Fanout(email_provider, chat_channels)
+    return email_provider
+
+lead_dispatcher = OutboxDispatcher(
+    db.leads,
+    lane_provider('standard'),
+    render_lead_notification,
+    concurrency=int(os.environ.get('OUTBOX_CONCURRENCY', '4')),
+    rate_per_sec=float(os.environ.get('OUTBOX_RATE_PER_SEC', '2')),
+    digest_size=int(os.environ.get('OUTBOX_DIGEST_SIZE', '1')),
+    max_attempts=int(os.environ.get('OUTBOX_MAX_ATTEMPTS', '8')),
+    on_send=record_email,
+)
+
+# High-scoring leads are queued on the "fast" lane: their own workers and
+# send rate, never folded into a digest, so a backlog of standard leads
+# can't delay them
+lead_fast_dispatcher = OutboxDispatcher(
+    db.leads,
+    lane_provider('fast'),
+    render_fast_lane_notification,
+    concurrency=int(os.environ.get('OUTBOX_FAST_LANE_CONCURRENCY', '2')),
+    rate_per_sec=float(os.environ.get('OUTBOX_FAST_LANE_RATE_PER_SEC', '2')),
+    digest_size=1,
+    max_attempts=int(os.environ.get('OUTBOX_MAX_ATTEMPTS', '8')),
+    base_backoff=1.0,
+    poll_interval=1.0,
+    on_send=record_email,
+    lane="fast",
+)
+
+# Bulk uploads queue one summary notification on their lead_imports record
+import_dispatcher = OutboxDispatcher(
+    db.lead_imports,
+    lane_provider('imports'),
+    render_import_notification,
+    concurrency=1,
+    rate_per_sec=float(os.environ.get('OUTBOX_RATE_PER_SEC', '2')),
+    digest_size=10,
+    max_attempts=int(os.environ.get('OUTBOX_MAX_ATTEMPTS', '8')),
+    on_send=record_email,
+)
 
 # ============ API ROUTES ============
 
@@ -212,200 +683,993 @@ async def root():
     return {"message": "HQ.D API - Headquarters of Drinks", "status": "operational"}
 
 @api_router.get("/health")
-async def health_check():
-    return {
-        "status": "healthy",
+async def health_check(request: Request):
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(db.command("ping"), timeout=HEALTH_MONGO_TIMEOUT)
+        mongo = {"status": "ok", "latency_ms": round((time.perf_counter() - start) * 1000, 2)}
+    except Exception as e:
+        logger.error(f"Health check: MongoDB ping failed: {e!r}")
+        mongo = {"status": "unavailable", "error": type(e).__name__}
+    mongo["pool"] = {
+        **mongo_pool_metrics.stats(),
+        "max_size": MONGO_MAX_POOL_SIZE,
+    }
+
+    healthy = mongo["status"] == "ok"
+    body = {
+        "status": "healthy" if healthy else "unhealthy",
+        "worker": {"pid": os.getpid(), "warmup": getattr(request.app.state, "warmup", None)},
+        "mongo": mongo,
         "email_enabled": EMAIL_ENABLED,
+        "catalog_cache": catalog_cache.stats(),
+        "images": image_pipeline.stats(),
+        "gallery_manifest": gallery_manifest.stats(),
+        "availability": {**availability.stats(), "ledger": capacity_ledger.stats()},
+        "hashtags": hashtags.generate.cache_info()._asdict(),
+        "lead_limiter": {**lead_limiter.stats(), **lead_rejections},
+        "lead_writer": lead_writer.stats(),
+        "lead_rollups": lead_rollups.stats(),
+        "prerender": prerender_cache.stats(),
+        "lead_scoring": scoring_pool.stats(),
+        "outbox": lead_dispatcher.stats(),
+        "fast_lane_outbox": lead_fast_dispatcher.stats(),
+        "import_outbox": import_dispatcher.stats(),
+        "notifications": {
+            "templates": notification_templates.stats(),
+            "http": http_pool.stats(),
+            "chat": {d.lane or "standard": d.provider.stats() for d in (lead_dispatcher, lead_fast_dispatcher)
+                     if isinstance(d.provider, Fanout)},
+        },
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
+    # Load balancers route away from an instance that can't reach Mongo
+    return body if healthy else JSONResponse(body, status_code=503)
+
+# Quotes: instant estimates per package tier from the current rate card
+def build_rate_card(docs: List[dict]) -> RateCard:
+    # The newest version wins, so a rate card change is a plain insert
+    for doc in sorted(docs, key=lambda d: str(d.get("version", "")), reverse=True):
+        try:
+            return RateCard(doc)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.error(f"Ignoring invalid rate card {doc.get('version')}: {str(e)}")
+    return RateCard(DEFAULT_RATE_CARD)
+
+async def get_rate_card() -> RateCard:
+    return await catalog_cache.view("rate_cards", "rate_card", build_rate_card)
+
+# Lead scoring: rules compiled once per version of the scoring_rules collection
+def build_scoring_rules(docs: List[dict]) -> ScoringRules:
+    # Same convention as rate cards: the newest version wins
+    for doc in sorted(docs, key=lambda d: str(d.get("version", "")), reverse=True):
+        try:
+            return ScoringRules(doc)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.error(f"Ignoring invalid scoring rules {doc.get('version')}: {str(e)}")
+    return ScoringRules(DEFAULT_SCORING_RULES)
+
+async def get_scoring_rules() -> ScoringRules:
+    return await catalog_cache.view("scoring_rules", "scoring_rules", build_scoring_rules)
+
+# Re-scoring the whole collection runs batches in worker processes
+scoring_pool = ScoringPool(max_workers=int(os.environ.get('SCORING_WORKERS', '0')) or None)
+
+@api_router.post("/quotes/estimate", response_model=QuoteResult)
+async def estimate_quote(input: QuoteRequest):
+    card = await get_rate_card()
+    quote = card.quote(input.model_dump())
+    packages = {p["tier"]: p["name"] for p in await catalog_cache.get("packages") or catalog_seed.docs["packages"]}
+    for tier in quote["tiers"]:
+        tier["package"] = packages.get(tier["tier"])
+    return quote
+
+# Availability: answered from the in-memory index, never by aggregating bookings
+async def availability_ready():
+    try:
+        await availability.wait_ready()
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Availability is still loading")
+
+@api_router.get("/availability", response_model=AvailabilityResult)
+async def get_availability(start: date = Query(..., alias="from"), end: date = Query(..., alias="to"),
+                           city: Optional[str] = Query(None, max_length=80),
+                           crew: int = Query(1, ge=0, le=200), bar_units: int = Query(1, ge=0, le=50)):
+    if end < start:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if (end - start).days >= AVAILABILITY_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Ranges are limited to {AVAILABILITY_MAX_DAYS} days")
+    await availability_ready()
+    try:
+        result = availability.calendar(city, start, end, crew=crew, bar_units=bar_units)
+    except OutOfRange as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"city": city, "start": start.isoformat(), "end": end.isoformat(), **result}
+
+async def ledger_ready():
+    try:
+        await capacity_ledger.wait_ready()
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Bookings are still loading")
+
+async def reserve_capacity(booking: dict) -> str:
+    """Take the booking's crew and units in the ledger; 409 when any day is full."""
+    try:
+        pool, days = availability.limits(booking["city"], date.fromisoformat(booking["start"]),
+                                         date.fromisoformat(booking["end"]))
+    except OutOfRange as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if pool is None:
+        raise HTTPException(status_code=409, detail="No crew serves this city")
+    full = await capacity_ledger.reserve(pool, days, booking["crew"], booking["bar_units"])
+    if full is not None:
+        raise HTTPException(status_code=409, detail=f"Not enough capacity on {full}")
+    return pool
+
+async def release_capacity(booking: dict):
+    pool = booking.get("pool") or getattr(availability.pool_for(booking["city"]), "name", None)
+    if pool is not None:
+        await capacity_ledger.release(pool, booking_days(booking["start"], booking["end"]),
+                                      booking["crew"], booking["bar_units"])
+
+@api_router.post("/bookings", response_model=Booking, status_code=201, dependencies=[Depends(require_admin)])
+async def create_booking(input: BookingCreate):
+    if input.end < input.start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    if (input.end - input.start).days >= AVAILABILITY_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Bookings are limited to {AVAILABILITY_MAX_DAYS} days")
+    await availability_ready()
+    await ledger_ready()
+
+    now = datetime.now(timezone.utc)
+    doc = {**input.model_dump(), "id": str(uuid.uuid4()), "start": input.start.isoformat(),
+           "end": input.end.isoformat(), "created_at": now, "updated_at": now}
+    # Capacity is taken before the booking exists, so concurrent requests
+    # (in any worker) can't both get the last crew
+    doc["pool"] = await reserve_capacity(doc)
+    try:
+        await db.bookings.insert_one(doc)
+    except Exception:
+        await release_capacity(doc)
+        raise
+    doc.pop("_id", None)
+    availability.apply(doc)
+    return doc
+
+@api_router.patch("/bookings/{booking_id}", response_model=Booking, dependencies=[Depends(require_admin)])
+async def update_booking(booking_id: str, input: BookingUpdate):
+    current = await db.bookings.find_one({"id": booking_id}, {"_id": 0})
+    if current is None:
+        raise HTTPException(status_code=404, detail="Booking not found")
+    was_active = current["status"] in ACTIVE_STATUSES
+    active = input.status in ACTIVE_STATUSES
+    if active and not was_active:
+        # Re-activating a cancelled booking needs its capacity back
+        await ledger_ready()
+        current["pool"] = await reserve_capacity(current)
+    # Only from the state read above, so a concurrent change can't release or take twice
+    changes = {"status": input.status, "pool": current.get("pool"), "updated_at": datetime.now(timezone.utc)}
+    before = await db.bookings.find_one_and_update(
+        {"id": booking_id, "status": current["status"]}, {"$set": changes},
+        projection={"_id": 0}, return_document=ReturnDocument.BEFORE,
+    )
+    if before is None:
+        if active and not was_active:
+            await release_capacity(current)
+        raise HTTPException(status_code=409, detail="Booking was changed concurrently, please retry")
+    if was_active and not active:
+        await release_capacity(current)
+    doc = {**before, **changes}
+    availability.apply(doc)
+    return doc
 
 # Leads
-@api_router.post("/leads", response_model=Lead)
-async def create_lead(input: LeadCreate, background_tasks: BackgroundTasks):
+LEAD_SORT = [("created_at", -1), ("id", -1)]
+LEAD_PROJECTION = {"_id": 0, "notify": 0}
+
+lead_claims = LeadClaims(db.lead_claims, window_seconds=int(os.environ.get('LEAD_DEDUP_WINDOW_SECONDS', '86400')))
+
+# Opt-in group commit for lead inserts (see write_behind.py): during submit
+# bursts, leads queued within a few milliseconds share one insert_many, and
+# each request still returns only after its own lead is acknowledged
+LEAD_WRITE_BATCHING = os.environ.get('LEAD_WRITE_BATCHING', 'false').lower() == 'true'
+lead_writer = BatchWriter(
+    db.leads,
+    max_batch=int(os.environ.get('LEAD_WRITE_BATCH_SIZE', '100')),
+    max_latency=float(os.environ.get('LEAD_WRITE_MAX_LATENCY_MS', '5')) / 1000,
+    max_pending=int(os.environ.get('LEAD_WRITE_MAX_PENDING', '2000')),
+    max_inflight=int(os.environ.get('LEAD_WRITE_MAX_INFLIGHT', '2')),
+    queue_timeout=float(os.environ.get('LEAD_WRITE_QUEUE_TIMEOUT', '2')),
+)
+register_stats('hqd_lead_writer', lead_writer.stats, counters=('batches', 'inserted', 'failed', 'overloaded'),
+               gauges=('queued', 'in_flight'))
+
+# Abuse protection for the public lead form: token buckets per client IP and
+# per email (see rate_limit.py), a honeypot field and a minimum fill time
+LEAD_LIMITS = [
+    Limit("ip", rate=float(os.environ.get('LEAD_LIMIT_IP_PER_HOUR', '20')) / 3600,
+          burst=float(os.environ.get('LEAD_LIMIT_IP_BURST', '5'))),
+    Limit("email", rate=float(os.environ.get('LEAD_LIMIT_EMAIL_PER_HOUR', '6')) / 3600,
+          burst=float(os.environ.get('LEAD_LIMIT_EMAIL_BURST', '3'))),
+]
+# Bulk uploads: per client IP, counted per upload
+LEAD_BULK_LIMIT = Limit("bulk_ip", rate=float(os.environ.get('LEAD_LIMIT_BULK_PER_HOUR', '10')) / 3600,
+                        burst=float(os.environ.get('LEAD_LIMIT_BULK_BURST', '2')))
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')  # memory, mongo (shared by all workers)
+lead_limiter = RateLimiter(
+    MongoBackend(db.rate_limits) if RATE_LIMIT_BACKEND == 'mongo' else MemoryBackend(),
+    [*LEAD_LIMITS, LEAD_BULK_LIMIT],
+)
+# Proxies (the ingress / load balancer) whose X-Forwarded-For is believed for
+# the per-IP limits; the default covers private ranges, where ingresses run
+TRUSTED_PROXIES = TrustedProxies(os.environ.get(
+    'TRUSTED_PROXIES', '127.0.0.1/32,::1/128,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16,fc00::/7').split(','))
+LEAD_HONEYPOT_FIELD = 'website'  # hidden on the form; only bots fill it in
+LEAD_MIN_FILL_SECONDS = float(os.environ.get('LEAD_MIN_FILL_SECONDS', '3'))
+LEAD_MAX_BODY_BYTES = int(os.environ.get('LEAD_MAX_BODY_BYTES', '16384'))
+lead_rejections = {"too_large": 0, "honeypot": 0, "too_fast": 0}
+register_stats('hqd_lead_limiter', lambda: {**lead_limiter.stats(), **lead_rejections},
+               counters=('allowed', 'limited', 'errors', *lead_rejections))
+
+async def enforce_lead_limit(name: str, key: str):
+    wait = await lead_limiter.check(name, key)
+    if wait:
+        raise HTTPException(status_code=429, detail="Too many submissions, please try again later",
+                            headers={"Retry-After": str(math.ceil(wait))})
+
+def client_ip(request: Request) -> str:
+    return TRUSTED_PROXIES.client_ip(request.client.host if request.client else None,
+                                     request.headers.get("x-forwarded-for"))
+
+async def lead_guard(request: Request):
+    """Cheap checks that run before the body is validated or anything is
+    written. The JSON body is already parsed (and cached) by this point."""
+    if int(request.headers.get("content-length") or 0) > LEAD_MAX_BODY_BYTES:
+        lead_rejections["too_large"] += 1
+        raise HTTPException(status_code=413, detail="Request body too large")
+    await enforce_lead_limit("ip", client_ip(request))
+    try:
+        body = await request.json()
+    except ValueError:
+        return  # Reported by the regular validation
+    if not isinstance(body, dict):
+        return
+    if body.get(LEAD_HONEYPOT_FIELD):
+        lead_rejections["honeypot"] += 1
+        raise HTTPException(status_code=400, detail="Submission rejected")
+    # Milliseconds between the form rendering and submit; API clients may omit it
+    elapsed = body.get("form_elapsed_ms")
+    if isinstance(elapsed, (int, float)) and elapsed < LEAD_MIN_FILL_SECONDS * 1000:
+        lead_rejections["too_fast"] += 1
+        raise HTTPException(status_code=400, detail="Submission rejected")
+    email = body.get("email")
+    if isinstance(email, str) and email.strip():
+        await enforce_lead_limit("email", email.strip().lower())
+
+@api_router.post("/leads", response_model=PublicLead, dependencies=[Depends(lead_guard)])
+async def create_lead(input: LeadCreate, response: Response,
+                      idempotency_key: Optional[str] = Header(None, max_length=200)):
     lead_obj = Lead(**input.model_dump())
+    fields = input.model_dump()
+    lead_obj.estimate = LeadEstimate(**(await get_rate_card()).estimate_leads([fields])[0])
+    lead_obj.score = LeadScore(**(await get_scoring_rules()).score_leads([fields])[0])
+
+    # Double submits and client retries resolve to the original lead via a
+    # unique claim on the normalized contact + date (and the Idempotency-Key)
+    keys = [lead_dedup_key(lead_obj.email, lead_obj.phone, lead_obj.event_date)]
+    if idempotency_key:
+        keys.append(idempotency_claim(idempotency_key))
+    original_id = await lead_claims.claim(keys, lead_obj.id)
+    if original_id is not None:
+        original = await wait_for_lead(db.leads, original_id, LEAD_PROJECTION)
+        if original is None:
+            raise HTTPException(status_code=409, detail="Duplicate submission is still being processed")
+        response.headers["Idempotent-Replayed"] = "true"
+        return PublicLead(**original)
+
     doc = lead_obj.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
-    
-    await db.leads.insert_one(doc)
-    background_tasks.add_task(send_lead_email, lead_obj)
-    
-    return lead_obj
-
-@api_router.get("/leads", response_model=List[Lead])
-async def get_leads():
-    leads = await db.leads.find({}, {"_id": 0}).sort("created_at", -1).to_list(100)
-    for lead in leads:
-        if isinstance(lead.get('created_at'), str):
-            lead['created_at'] = datetime.fromisoformat(lead['created_at'])
+    doc['notify'] = new_notification(lane="fast" if lead_obj.score.fast_lane else None)
+
+    # The notification is queued on the lead document itself, so a crash
+    # after this insert can't lose it; the dispatcher picks it up.
+    try:
+        await lead_writer.insert(doc)
+    except WriterOverloaded as e:
+        await lead_claims.release(keys, lead_obj.id)
+        logger.warning(f"Lead insert shed: {e}")
+        raise HTTPException(status_code=503, detail="We're receiving a lot of requests, please try again",
+                            headers={"Retry-After": "1"})
+    except Exception:
+        await lead_claims.release(keys, lead_obj.id)
+        raise
+    (lead_fast_dispatcher if lead_obj.score.fast_lane else lead_dispatcher).wake()
+    lead_rollups.wake()
+
+    # The estimate (rate-card pricing) and score are for ops only
+    return PublicLead(**lead_obj.model_dump())
+
+LEADS_BULK_MAX_ROWS = int(os.environ.get('LEADS_BULK_MAX_ROWS', '10000'))
+LEADS_BULK_MAX_BYTES = int(os.environ.get('LEADS_BULK_MAX_BYTES', str(10 * 1024 * 1024)))
+lead_create_list = TypeAdapter(List[LeadCreate])
+
+async def bulk_lead_guard(request: Request):
+    """Uploads skip the form checks (honeypot, fill time) but not the per-IP budget."""
+    await enforce_lead_limit("bulk_ip", client_ip(request))
+
+@api_router.post("/leads/bulk", response_model=BulkLeadResult, dependencies=[Depends(bulk_lead_guard)])
+async def create_leads_bulk(request: Request, source: str = "bulk"):
+    """Import many leads from a JSON array or an NDJSON stream.
+
+    Valid rows are written with unordered insert_many in chunks; invalid rows
+    are reported by their 0-based position. A single summary notification
+    is queued for the whole upload.
+    """
+    try:
+        # A row may be as large as a form submission
+        rows, errors = await read_rows(request, LEADS_BULK_MAX_ROWS, LEADS_BULK_MAX_BYTES, LEAD_MAX_BODY_BYTES)
+    except (TooManyRows, BodyTooLarge) as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    received = len(rows) + len(errors)
+
+    created_at = datetime.now(timezone.utc).isoformat()
+    docs = []
+    for row, lead in validate_rows(lead_create_list, rows, errors):
+        doc = lead.model_dump()
+        doc.update(id=str(uuid.uuid4()), source=source, status="new", created_at=created_at)
+        docs.append((row, doc))
+    # One vectorized pricing pass for the whole upload
+    card = await get_rate_card()
+    for (_, doc), estimate in zip(docs, card.estimate_leads([doc for _, doc in docs])):
+        doc["estimate"] = estimate
+    # Scored for the dashboards; imports still notify with one summary email
+    rules = await get_scoring_rules()
+    for (_, doc), score in zip(docs, await scoring_pool.score(rules, [doc for _, doc in docs], date.today())):
+        doc["score"] = score
+
+    import_id = str(uuid.uuid4())
+    record = {
+        "id": import_id,
+        "source": source,
+        "received": received,
+        "created_at": created_at,
+    }
+    try:
+        inserted = await insert_chunks(db.leads, docs, errors)
+    except InsertInterrupted as e:
+        # Leads already written must not go unrecorded (or unnotified)
+        logger.error(f"Bulk import {import_id} interrupted: {e}")
+        await db.lead_imports.insert_one({
+            **record, "inserted": len(e.inserted), "rejected": len(errors), "unconfirmed": e.unconfirmed,
+            "status": "interrupted", "error": repr(e.__cause__), "notify": new_notification(),
+        })
+        import_dispatcher.wake()
+        lead_rollups.wake()
+        raise HTTPException(status_code=500, detail=f"Import {import_id} interrupted after "
+                                                    f"{len(e.inserted)} leads were written") from e
+
+    if inserted:
+        await db.lead_imports.insert_one({
+            **record, "inserted": len(inserted), "rejected": len(errors), "notify": new_notification(),
+        })
+        import_dispatcher.wake()
+        lead_rollups.wake()
+
+    return BulkLeadResult(
+        import_id=import_id,
+        received=received,
+        inserted=len(inserted),
+        rejected=len(errors),
+        errors=[BulkLeadError(row=row, errors=msgs) for row, msgs in sorted(errors.items())],
+    )
+
+@api_router.get("/leads", response_model=List[Lead], dependencies=[Depends(require_admin)])
+async def get_leads(response: Response, limit: int = Query(100, ge=1, le=500), cursor: Optional[str] = None):
+    """Newest leads first, paged by keyset on (created_at, id).
+
+    The next page's cursor is returned in the ``X-Next-Cursor`` header.
+    """
+    try:
+        after = decode_cursor(cursor, (str, str)) if cursor else None  # LEAD_SORT: created_at, id
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    leads = await db.leads.find(keyset_filter(LEAD_SORT, after), LEAD_PROJECTION) \
+        .sort(LEAD_SORT).limit(limit + 1).to_list(limit + 1)
+    if len(leads) > limit:
+        leads = leads[:limit]
+        last = leads[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor([last["created_at"], last["id"]])
     return leads
 
+LEAD_CSV_FIELDS = [name for name in Lead.model_fields if name not in ("estimate", "score")]
+
+def export_bound(name: str, value: str) -> str:
+    """``value`` as a UTC ISO timestamp, comparable with the stored created_at."""
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be an ISO date or datetime")
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).isoformat()
+
+@api_router.get("/leads/export", dependencies=[Depends(require_admin)])
+async def export_leads(format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+                       since: Optional[str] = None, until: Optional[str] = None):
+    """Stream every lead (optionally within [since, until)) without buffering the result.
+
+    ``since`` and ``until`` are ISO dates or datetimes, UTC unless they
+    carry an offset.
+    """
+    bounds = {op: export_bound(name, value)
+              for op, name, value in (("$gte", "since", since), ("$lt", "until", until)) if value}
+    query = {"created_at": bounds} if bounds else {}
+    cursor = db.leads.find(query, LEAD_PROJECTION).sort(LEAD_SORT).batch_size(1000)
+
+    filename = f"leads-{datetime.now(timezone.utc):%Y%m%d}.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if format == "csv":
+        return StreamingResponse(csv_chunks(cursor, LEAD_CSV_FIELDS), media_type="text/csv", headers=headers)
+    return StreamingResponse(ndjson_chunks(cursor), media_type="application/x-ndjson", headers=headers)
+
+# Only the fields the pricing engine reads
+PRICING_PROJECTION = {"_id": 0, "id": 1, "guest_count": 1, "duration": 1, "bar_type": 1, "city": 1,
+                      "budget_range": 1, "theme": 1, "message": 1, "setup_interest": 1}
+REPRICE_BATCH = int(os.environ.get('REPRICE_BATCH', '5000'))
+
+@api_router.post("/leads/reprice", response_model=RepriceResult, dependencies=[Depends(require_admin)])
+async def reprice_leads(force: bool = False):
+    """Re-estimate every lead priced with an older rate card (all leads with ``force``).
+
+    Leads are read in batches with a narrow projection and priced in one
+    vectorized pass per batch. Form fields only take a few distinct values,
+    so leads with identical estimates share a single update_many. Leads
+    already on the current rate card are skipped, so an interrupted run can
+    simply be repeated.
+    """
+    start = time.perf_counter()
+    card = await get_rate_card()
+    query = {} if force else {"estimate.rate_card": {"$ne": card.version}}
+    cursor = db.leads.find(query, PRICING_PROJECTION).batch_size(REPRICE_BATCH)
+    repriced = 0
+    batch = []
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= REPRICE_BATCH:
+            repriced += await apply_estimates(card, batch)
+            batch = []
+    if batch:
+        repriced += await apply_estimates(card, batch)
+
+    seconds = time.perf_counter() - start
+    logger.info(f"Repriced {repriced} leads with rate card {card.version} in {seconds:.2f}s")
+    return RepriceResult(rate_card=card.version, repriced=repriced, seconds=round(seconds, 3))
+
+async def apply_estimates(card: RateCard, docs: List[dict]) -> int:
+    groups: Dict[tuple, Tuple[dict, List[str]]] = {}
+    for doc, estimate in zip(docs, card.estimate_leads(docs)):
+        key = (tuple(estimate["totals"].values()), estimate["recommended"], estimate["within_budget"])
+        groups.setdefault(key, (estimate, []))[1].append(doc["id"])
+    await db.leads.bulk_write(
+        [UpdateMany({"id": {"$in": ids}}, {"$set": {"estimate": estimate}}) for estimate, ids in groups.values()],
+        ordered=False,
+    )
+    return len(docs)
+
+# Only the fields the scoring rules read
+SCORING_PROJECTION = {"_id": 0, "id": 1, "guest_count": 1, "budget_range": 1, "event_date": 1, "city": 1,
+                      "bar_type": 1, "setup_interest": 1, "event_type": 1}
+RESCORE_BATCH = int(os.environ.get('RESCORE_BATCH', '5000'))
+
+@api_router.post("/leads/rescore", response_model=RescoreResult, dependencies=[Depends(require_admin)])
+async def rescore_leads(force: bool = False):
+    """Re-score every lead not yet scored today with the current rules (all
+    leads with ``force``).
+
+    Event-date proximity depends on the day, so a lead scored on an earlier
+    day is stale too. Batches are scored in worker processes while the next
+    batch is read; leads with identical scores share one update_many, as in
+    the reprice. Re-scoring updates ``score`` only: notifications already
+    queued keep their lane.
+    """
+    start = time.perf_counter()
+    rules = await get_scoring_rules()
+    today = date.today()
+    query = {} if force else {"$or": [{"score.rules": {"$ne": rules.version}},
+                                      {"score.scored_on": {"$ne": today.isoformat()}}]}
+    cursor = db.leads.find(query, SCORING_PROJECTION).batch_size(RESCORE_BATCH)
+    tiers: Dict[str, int] = dict.fromkeys(rules.tiers, 0)
+    pending = set()
+    rescored = 0
+
+    async def rescore(batch: List[dict]) -> int:
+        scores = await scoring_pool.score(rules, batch, today)
+        for score in scores:
+            tiers[score["tier"]] += 1
+        return await apply_scores(batch, scores)
+
+    async def submit(batch: List[dict]):
+        nonlocal rescored, pending
+        # One batch per worker process in flight; reading continues meanwhile
+        if len(pending) >= scoring_pool.max_workers:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            rescored += sum(task.result() for task in done)
+        pending.add(asyncio.create_task(rescore(batch)))
+
+    batch = []
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= RESCORE_BATCH:
+            await submit(batch)
+            batch = []
+    if batch:
+        await submit(batch)
+    if pending:
+        rescored += sum(await asyncio.gather(*pending))
+
+    seconds = time.perf_counter() - start
+    logger.info(f"Rescored {rescored} leads with rules {rules.version} in {seconds:.2f}s: {tiers}")
+    return RescoreResult(rules=rules.version, rescored=rescored, tiers=tiers, seconds=round(seconds, 3))
+
+async def apply_scores(docs: List[dict], scores: List[dict]) -> int:
+    groups: Dict[tuple, Tuple[dict, List[str]]] = {}
+    for doc, score in zip(docs, scores):
+        key = (score["score"], score["tier"], tuple(score["reasons"]))
+        groups.setdefault(key, (score, []))[1].append(doc["id"])
+    await db.leads.bulk_write(
+        [UpdateMany({"id": {"$in": ids}}, {"$set": {"score": score}}) for score, ids in groups.values()],
+        ordered=False,
+    )
+    return len(docs)
+
+# Analytics: dashboards read the lead rollups, never the leads themselves
+@api_router.get("/analytics/leads", response_model=LeadAnalytics, dependencies=[Depends(require_admin)])
+async def get_lead_analytics(start: date = Query(..., alias="from"), end: date = Query(..., alias="to"),
+                             interval: str = Query("week", pattern=f"^({'|'.join(INTERVALS)})$"),
+                             group_by: Optional[str] = Query(None, description="Comma-separated: " + ",".join(DIMENSIONS)),
+                             event_type: Optional[str] = None, city: Optional[str] = None,
+                             bar_type: Optional[str] = None, source: Optional[str] = None):
+    """Lead counts and budget_range mix per period (by ``created_at`` day, UTC),
+    optionally split by dimensions and filtered on them."""
+    if end < start:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if (end - start).days >= ANALYTICS_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Ranges are limited to {ANALYTICS_MAX_DAYS} days")
+    dims = [d.strip() for d in group_by.split(",") if d.strip()] if group_by else []
+    if not set(dims) <= set(DIMENSIONS) or len(set(dims)) != len(dims):
+        raise HTTPException(status_code=400, detail=f"group_by must be distinct values among {', '.join(DIMENSIONS)}")
+    filters = {name: value for name, value in
+               (("event_type", event_type), ("city", city), ("bar_type", bar_type), ("source", source)) if value}
+    result = await lead_rollups.query(start, end, interval, dims, filters)
+    return {"start": start.isoformat(), "end": end.isoformat(), "interval": interval, "group_by": dims, **result}
+
+@api_router.post("/analytics/leads/refresh", dependencies=[Depends(require_admin)])
+async def refresh_lead_analytics():
+    """Roll up new leads now instead of waiting for the background run."""
+    result = await lead_rollups.run_once()
+    if result is None:
+        raise HTTPException(status_code=409, detail="A rollup is already running")
+    return result
+
+# Facet indexes: built once per catalog version. An empty collection falls
+# back to an index over the seed data, built once per process.
+SETUP_FACETS = ("occasion", "style", "featured")
+DRINK_FACETS = ("type", "flavor_profile", "molecular")
+
+_default_facet_indexes: Dict[str, FacetIndex] = {}
+
+async def get_facet_index(name: str, fields) -> FacetIndex:
+    index = await catalog_cache.view(name, "facets", lambda docs: FacetIndex(docs, fields))
+    if index.docs:
+        return index
+    if name not in _default_facet_indexes:
+        _default_facet_indexes[name] = FacetIndex(list(catalog_seed.docs[name]), fields)
+    return _default_facet_indexes[name]
+
+def facet_counts(index: FacetIndex, **criteria) -> FacetCounts:
+    mask = index.match(**criteria)
+    return FacetCounts(total=mask.bit_count(), facets=index.counts(mask))
+
+# Catalog responses are validated and encoded once per catalog version and
+# filter combination, then served as bytes with a strong ETag.
+CATALOG_CACHE_CONTROL = os.environ.get('CATALOG_CACHE_CONTROL', 'public, max-age=60, stale-while-revalidate=600')
+body_cache = BodyCache(maxsize=int(os.environ.get('CATALOG_BODY_CACHE_SIZE', '512')))
+
+def catalog_response(request: Request, name: str, params: tuple, model, build) -> Response:
+    # image_pipeline.version moves as derivatives finish, refreshing their srcsets
+    key = (name, catalog_cache.version(name), image_pipeline.version, model, params)
+    body = body_cache.get_or_build(key, lambda: CachedBody.from_model(model, build()))
+    return conditional_response(request, body, CATALOG_CACHE_CONTROL)
+
+def with_images(docs: List[dict]) -> List[dict]:
+    """Attach srcset metadata; items whose derivatives aren't ready yet keep just image_url."""
+    return [{**doc, "image": image_pipeline.lookup(doc.get("image_url"))} for doc in docs]
+
+@api_router.get("/images/{digest}/{name}")
+async def get_image(digest: str, name: str):
+    path = image_pipeline.derivative_path(digest, name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    # Content-addressed, so a URL never changes meaning
+    return FileResponse(path, media_type=MIME_TYPES[path.suffix[1:]],
+                        headers={"Cache-Control": "public, max-age=31536000, immutable"})
+
 # Bar Setups
 @api_router.get("/setups", response_model=List[BarSetup])
-async def get_setups(occasion: Optional[str] = None, style: Optional[str] = None, featured: Optional[bool] = None):
-    query = {}
-    if occasion:
-        query["occasion"] = {"$in": [occasion]}
-    if style:
-        query["style"] = style
-    if featured is not None:
-        query["featured"] = featured
-    
-    setups = await db.setups.find(query, {"_id": 0}).to_list(50)
-    if not setups:
-        return get_default_setups()
-    return setups
+async def get_setups(request: Request, occasion: Optional[str] = None, style: Optional[str] = None, featured: Optional[bool] = None):
+    index = await get_facet_index("setups", SETUP_FACETS)
+    return catalog_response(
+        request, "setups", (occasion, style, featured), List[BarSetup],
+        lambda: with_images(index.filter(limit=50, occasion=occasion or None, style=style or None, featured=featured)),
+    )
+
+@api_router.get("/setups/facets", response_model=FacetCounts)
+async def get_setup_facets(request: Request, occasion: Optional[str] = None, style: Optional[str] = None, featured: Optional[bool] = None):
+    index = await get_facet_index("setups", SETUP_FACETS)
+    return catalog_response(
+        request, "setups", (occasion, style, featured), FacetCounts,
+        lambda: facet_counts(index, occasion=occasion or None, style=style or None, featured=featured),
+    )
 
 @api_router.get("/setups/{slug}", response_model=BarSetup)
-async def get_setup_by_slug(slug: str):
-    setup = await db.setups.find_one({"slug": slug}, {"_id": 0})
+async def get_setup_by_slug(request: Request, slug: str):
+    setup = next((s for s in await catalog_cache.get("setups") if s.get("slug") == slug), None)
     if not setup:
-        default_setups = get_default_setups()
-        for s in default_setups:
-            if s["slug"] == slug:
-                return s
-        raise HTTPException(status_code=404, detail="Setup not found")
-    return setup
+        setup = next((s for s in catalog_seed.docs["setups"] if s["slug"] == slug), None)
+        if not setup:
+            raise HTTPException(status_code=404, detail="Setup not found")
+    return catalog_response(request, "setups", (slug,), BarSetup, lambda: with_images([setup])[0])
 
 # Drinks/Menus
 @api_router.get("/menus", response_model=List[Drink])
-async def get_menus(type: Optional[str] = None, flavor: Optional[str] = None, molecular: Optional[bool] = None):
-    query = {}
-    if type:
-        query["type"] = type
-    if flavor:
-        query["flavor_profile"] = {"$in": [flavor]}
-    if molecular is not None:
-        query["molecular"] = molecular
-    
-    drinks = await db.menus.find(query, {"_id": 0}).to_list(100)
-    if not drinks:
-        return get_default_drinks()
-    return drinks
+async def get_menus(request: Request, type: Optional[str] = None, flavor: Optional[str] = None, molecular: Optional[bool] = None):
+    index = await get_facet_index("menus", DRINK_FACETS)
+    return catalog_response(
+        request, "menus", (type, flavor, molecular), List[Drink],
+        lambda: with_images(index.filter(limit=100, type=type or None, flavor_profile=flavor or None, molecular=molecular)),
+    )
+
+@api_router.get("/menus/facets", response_model=FacetCounts)
+async def get_menu_facets(request: Request, type: Optional[str] = None, flavor: Optional[str] = None, molecular: Optional[bool] = None):
+    index = await get_facet_index("menus", DRINK_FACETS)
+    return catalog_response(
+        request, "menus", (type, flavor, molecular), FacetCounts,
+        lambda: facet_counts(index, type=type or None, flavor_profile=flavor or None, molecular=molecular),
+    )
 
 # Testimonials
 @api_router.get("/testimonials", response_model=List[Testimonial])
-async def get_testimonials(featured: Optional[bool] = None):
-    query = {}
-    if featured is not None:
-        query["featured"] = featured
-    
-    testimonials = await db.testimonials.find(query, {"_id": 0}).to_list(50)
-    if not testimonials:
-        return get_default_testimonials()
-    return testimonials
-
-# Gallery
+async def get_testimonials(request: Request, featured: Optional[bool] = None):
+    docs = await catalog_cache.get("testimonials")
+
+    def build():
+        testimonials = [t for t in docs if featured is None or t.get("featured") == featured][:50]
+        return testimonials or catalog_seed.models["testimonials"]
+
+    return catalog_response(request, "testimonials", (featured,), List[Testimonial], build)
+
+# Gallery: curated docs from the gallery collection plus every image in the
+# manifest, ordered by (category, image_url, id) so cursors survive rescans
+GALLERY_FACETS = ("category", "featured")
+_gallery_index: Optional[Tuple[tuple, FacetIndex, List[tuple]]] = None
+
+def gallery_sort_key(item: dict) -> tuple:
+    return (item.get("category", ""), item.get("image_url", ""), item.get("id", ""))
+
+async def get_gallery_index() -> Tuple[FacetIndex, List[tuple]]:
+    global _gallery_index
+    docs = await catalog_cache.get("gallery")
+    version = (catalog_cache.version("gallery"), gallery_manifest.version)
+    if _gallery_index is None or _gallery_index[0] != version:
+        curated = {doc.get("image_url") for doc in docs}
+        items = docs + [item for item in gallery_manifest.items if item["image_url"] not in curated]
+        items = sorted(items or catalog_seed.docs["gallery"], key=gallery_sort_key)
+        _gallery_index = (version, FacetIndex(items, GALLERY_FACETS), [gallery_sort_key(i) for i in items])
+    return _gallery_index[1], _gallery_index[2]
+
 @api_router.get("/gallery", response_model=List[GalleryItem])
-async def get_gallery(category: Optional[str] = None, featured: Optional[bool] = None):
-    query = {}
-    if category:
-        query["category"] = category
-    if featured is not None:
-        query["featured"] = featured
-    
-    items = await db.gallery.find(query, {"_id": 0}).to_list(100)
-    if not items:
-        return get_default_gallery()
-    return items
+async def get_gallery(request: Request, category: Optional[str] = None, featured: Optional[bool] = None,
+                      limit: int = Query(48, ge=1, le=100), cursor: Optional[str] = None):
+    """One page of the gallery; the next page's cursor is in ``X-Next-Cursor``."""
+    index, keys = await get_gallery_index()
+    mask = index.match(category=category or None, featured=featured)
+    if cursor:
+        try:
+            after = tuple(decode_cursor(cursor, (str, str, str)))  # gallery_sort_key
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        mask &= ~((1 << bisect.bisect_right(keys, after)) - 1)
+
+    page = index.select(mask, limit + 1)
+    response = catalog_response(
+        request, "gallery", (gallery_manifest.version, category, featured, limit, cursor), List[GalleryItem],
+        lambda: with_images(page[:limit]),
+    )
+    if len(page) > limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(gallery_sort_key(page[limit - 1]))
+    return response
+
+@api_router.get("/gallery/facets", response_model=FacetCounts)
+async def get_gallery_facets(request: Request, category: Optional[str] = None, featured: Optional[bool] = None):
+    index, _ = await get_gallery_index()
+    return catalog_response(
+        request, "gallery", (gallery_manifest.version, category, featured), FacetCounts,
+        lambda: facet_counts(index, category=category or None, featured=featured),
+    )
 
 # Packages
 @api_router.get("/packages", response_model=List[Package])
-async def get_packages():
-    packages = await db.packages.find({}, {"_id": 0}).to_list(10)
-    if not packages:
-        return get_default_packages()
-    return packages
+async def get_packages(request: Request):
+    docs = await catalog_cache.get("packages")
+    return catalog_response(request, "packages", (), List[Package], lambda: docs[:10] or catalog_seed.models["packages"])
 
 # FAQs
 @api_router.get("/faqs", response_model=List[FAQ])
-async def get_faqs(category: Optional[str] = None):
-    query = {}
-    if category:
-        query["category"] = category
-    
-    faqs = await db.faqs.find(query, {"_id": 0}).sort("order", 1).to_list(50)
-    if not faqs:
-        return get_default_faqs()
-    return faqs
-
-# ============ DEFAULT DATA ============
-
-def get_default_setups():
-    return [
-        {"id": "1", "title": "Mehendi Soirée", "slug": "mehendi-soiree", "description": "Vibrant bar setup with colorful cocktails and traditional aesthetics. Perfect for your mehendi celebration with folk-inspired decor.", "best_for": "150-250 guests", "guest_range": "150-250", "occasion": ["mehendi", "haldi"], "style": "Royal", "format": "Both", "menu_highlights": ["Kufri", "Mango Tango", "Rose Lassi Mocktail"], "molecular_tag": "Aromatic Mists", "image_url": "https://images.unsplash.com/photo-1551024709-8f23befc6f87?w=600", "video_url": "https://customer-assets.emergentagent.com/job_ac6c9480-7211-41d1-abd8-0c6fb67adb33/artifacts/5if3jo8e_6ed5da08-8e47-4c62-95e1-594fc854688c.mp4", "featured": True},
-        {"id": "2", "title": "Sangeet Spectacular", "slug": "sangeet-spectacular", "description": "High-energy bar with LED accents and signature cocktails. Dance the night away with premium drinks and dramatic presentations.", "best_for": "200-400 guests", "guest_range": "200-400", "occasion": ["sangeet", "cocktail-night"], "style": "Bollywood", "format": "Both", "menu_highlights": ["Bollywood Blast", "Disco Daiquiri", "Starlight Spritz"], "molecular_tag": "Smoke Bubbles", "image_url": "https://images.unsplash.com/photo-1470337458703-46ad1756a187?w=600", "video_url": "https://customer-assets.emergentagent.com/job_ac6c9480-7211-41d1-abd8-0c6fb67adb33/artifacts/91amfrgt_c839badf-d007-42a6-ad69-487b21abdaa8.mp4", "featured": True},
-        {"id": "3", "title": "Reception Royale", "slug": "reception-royale", "description": "Elegant champagne-tower bar with gold accents. The perfect finale for your wedding with signature couple cocktails.", "best_for": "300-500 guests", "guest_range": "300-500", "occasion": ["reception", "engagement"], "style": "Minimal Luxe", "format": "Both", "menu_highlights": ["Forever New", "His & Hers", "Golden Toast"], "molecular_tag": "Champagne Foam", "image_url": "https://images.unsplash.com/photo-1574096079513-d8259312b785?w=600", "video_url": "https://customer-assets.emergentagent.com/job_ac6c9480-7211-41d1-abd8-0c6fb67adb33/artifacts/9lwf5b60_652a3209-9aa4-4751-8442-eaa11e571476.mp4", "featured": True},
-        {"id": "4", "title": "Cocktail Night Noir", "slug": "cocktail-night-noir", "description": "Moody, sophisticated setup with dark aesthetics and premium spirits. For the discerning couple who loves drama.", "best_for": "100-200 guests", "guest_range": "100-200", "occasion": ["cocktail-night", "after-party"], "style": "Modern Monochrome", "format": "Cocktail", "menu_highlights": ["Midnight Noir", "Velvet Kiss", "Smoky Old Fashioned"], "molecular_tag": "Smoke Bubbles", "image_url": "https://images.unsplash.com/photo-1514362545857-3bc16c4c7d1b?w=600", "video_url": "https://customer-assets.emergentagent.com/job_ac6c9480-7211-41d1-abd8-0c6fb67adb33/artifacts/jbuu83v8_97efb419-8fda-4ece-b870-1fbb600cb81c.mp4", "featured": True},
-        {"id": "5", "title": "Pool Party Paradise", "slug": "pool-party-paradise", "description": "Tropical vibes with refreshing cocktails and mocktails. Waterside bar setup with island-inspired drinks.", "best_for": "50-150 guests", "guest_range": "50-150", "occasion": ["pool-party", "brunch"], "style": "Tropical", "format": "Both", "menu_highlights": ["Tropical Thunder", "Coconut Cloud", "Blue Lagoon"], "molecular_tag": "Aromatic Mists", "image_url": "https://images.unsplash.com/photo-1560963689-b5682b6440f8?w=600", "featured": False},
-        {"id": "6", "title": "Corporate Excellence", "slug": "corporate-excellence", "description": "Professional setup with brandable elements and high-volume service. Impress your clients with sophisticated beverages.", "best_for": "100-500 guests", "guest_range": "100-500", "occasion": ["corporate"], "style": "Minimal Luxe", "format": "Both", "menu_highlights": ["Executive Espresso Martini", "The Boardroom", "Sparkling Success"], "molecular_tag": "Foam Art", "image_url": "https://images.unsplash.com/photo-1566417713940-fe7c737a9ef2?w=600", "video_url": "https://customer-assets.emergentagent.com/job_ac6c9480-7211-41d1-abd8-0c6fb67adb33/artifacts/ju2ki38n_6abda637-ea97-4d01-8861-eb67f7787ef2.mp4", "featured": True},
-        {"id": "7", "title": "After-Party Lounge", "slug": "after-party-lounge", "description": "Intimate setup for the inner circle. Late-night vibes with premium shots and signature cocktails.", "best_for": "30-80 guests", "guest_range": "30-80", "occasion": ["after-party"], "style": "Modern Monochrome", "format": "Cocktail", "menu_highlights": ["Night Owl", "Last Dance", "Shooter Selection"], "molecular_tag": "Smoke Bubbles", "image_url": "https://images.unsplash.com/photo-1572116469696-31de0f17cc34?w=600", "featured": False},
-        {"id": "8", "title": "Garden Elegance", "slug": "garden-elegance", "description": "Rustic-chic outdoor setup with floral accents. Perfect for garden ceremonies and daytime events.", "best_for": "100-300 guests", "guest_range": "100-300", "occasion": ["engagement", "reception"], "style": "Royal", "format": "Both", "menu_highlights": ["Garden Spritz", "Lavender Dreams", "Rosemary Gin Fizz"], "molecular_tag": "Aromatic Mists", "image_url": "https://images.unsplash.com/photo-1519671482749-fd09be7ccebf?w=600", "featured": False}
-    ]
-
-def get_default_drinks():
-    return [
-        {"id": "1", "name": "Kufri", "type": "cocktail", "flavor_profile": ["citrus", "herbal"], "spirit_base": "Gin", "description": "A refreshing Himalayan-inspired cocktail with botanicals and a hint of mountain mist. Our signature house creation.", "ingredients": ["Premium Gin", "Fresh Lime", "Elderflower", "Himalayan Herbs", "Tonic"], "garnish": "Dehydrated lime wheel & rosemary sprig", "molecular": True, "molecular_technique": "Aromatic Mist", "signature": True, "image_url": "https://images.unsplash.com/photo-1551024709-8f23befc6f87?w=400"},
-        {"id": "2", "name": "Forever New", "type": "cocktail", "flavor_profile": ["floral", "sweet"], "spirit_base": "Champagne", "description": "A romantic champagne cocktail for the couple. Rose petals meet bubbles in this ethereal creation.", "ingredients": ["Champagne", "Rose Syrup", "Elderflower Liqueur", "Fresh Strawberry"], "garnish": "Edible rose petals & gold dust", "molecular": True, "molecular_technique": "Champagne Foam", "signature": True, "image_url": "https://images.unsplash.com/photo-1470337458703-46ad1756a187?w=400"},
-        {"id": "3", "name": "Midnight Noir", "type": "cocktail", "flavor_profile": ["smoky", "spicy"], "spirit_base": "Whiskey", "description": "Dark, mysterious, and unforgettable. A smoky whiskey creation with activated charcoal and spice.", "ingredients": ["Bourbon", "Activated Charcoal", "Maple Syrup", "Angostura Bitters", "Orange Zest"], "garnish": "Flamed orange peel", "molecular": True, "molecular_technique": "Smoke Bubble", "signature": True, "image_url": "https://images.unsplash.com/photo-1514362545857-3bc16c4c7d1b?w=400"},
-        {"id": "4", "name": "Mango Tango", "type": "mocktail", "flavor_profile": ["fruity", "sweet"], "spirit_base": None, "description": "A tropical dance of Alphonso mango and passion fruit. Refreshingly festive.", "ingredients": ["Alphonso Mango Puree", "Passion Fruit", "Lime Juice", "Coconut Water", "Mint"], "garnish": "Mango slice & mint bouquet", "molecular": False, "signature": False, "image_url": "https://images.unsplash.com/photo-1546171753-97d7676e4602?w=400"},
-        {"id": "5", "name": "Rose Lassi Cloud", "type": "mocktail", "flavor_profile": ["floral", "creamy"], "spirit_base": None, "description": "Traditional lassi meets modern presentation. Creamy, rose-infused, topped with a cloud of foam.", "ingredients": ["Fresh Yogurt", "Rose Water", "Cardamom", "Saffron", "Honey"], "garnish": "Dried rose petals & pistachio", "molecular": True, "molecular_technique": "Rose Foam", "signature": True, "image_url": "https://images.unsplash.com/photo-1571091718767-18b5b1457add?w=400"},
-        {"id": "6", "name": "Velvet Kiss", "type": "cocktail", "flavor_profile": ["fruity", "sweet"], "spirit_base": "Vodka", "description": "Smooth as velvet, sweet as a kiss. Berry-infused vodka with a silky finish.", "ingredients": ["Premium Vodka", "Mixed Berries", "Vanilla", "Lemon", "Simple Syrup"], "garnish": "Fresh berries on a pick", "molecular": False, "signature": False, "image_url": "https://images.unsplash.com/photo-1560963689-b5682b6440f8?w=400"},
-        {"id": "7", "name": "Bollywood Blast", "type": "cocktail", "flavor_profile": ["spicy", "citrus"], "spirit_base": "Rum", "description": "Vibrant and bold like a Bollywood dance number. Spiced rum with a citrus kick.", "ingredients": ["Spiced Rum", "Pineapple", "Jalapeño", "Lime", "Ginger Beer"], "garnish": "Pineapple leaf & chili", "molecular": True, "molecular_technique": "Smoke Bubble", "signature": False, "image_url": "https://images.unsplash.com/photo-1536935338788-846bb9981813?w=400"},
-        {"id": "8", "name": "Golden Toast", "type": "cocktail", "flavor_profile": ["sweet", "citrus"], "spirit_base": "Champagne", "description": "Raise a glass to forever. Champagne meets gold in this celebratory creation.", "ingredients": ["Champagne", "Grand Marnier", "Honey", "Edible Gold Flakes"], "garnish": "Sugar rim & gold flakes", "molecular": False, "signature": True, "image_url": "https://images.unsplash.com/photo-1574096079513-d8259312b785?w=400"}
-    ]
-
-def get_default_testimonials():
-    return [
-        {"id": "1", "name": "Priya & Rahul Sharma", "event_type": "Wedding", "event_date": "December 2024", "location": "Delhi", "quote": "HQ.D transformed our wedding into a cinematic experience. The molecular cocktails had our guests mesmerized, and the bar setup was absolutely stunning. Every detail was perfect.", "rating": 5, "featured": True},
-        {"id": "2", "name": "Ananya Mehta", "event_type": "Corporate Event", "event_date": "November 2024", "location": "Mumbai", "quote": "We hired HQ.D for our product launch and they exceeded all expectations. Professional, creative, and the branded cocktails were a huge hit with our clients.", "rating": 5, "featured": True},
-        {"id": "3", "name": "Vikram & Neha Kapoor", "event_type": "Wedding", "event_date": "October 2024", "location": "Jaipur", "quote": "The smoke bubble cocktails were the talk of our sangeet! HQ.D's team was incredibly professional and managed our 400-guest event flawlessly.", "rating": 5, "featured": True},
-        {"id": "4", "name": "Rohan Gupta", "event_type": "Private Party", "event_date": "September 2024", "location": "Gurgaon", "quote": "Hired HQ.D for my 30th birthday bash. The after-party bar setup was intimate yet luxurious. Best decision ever!", "rating": 5, "featured": False},
-        {"id": "5", "name": "Simran & Arjun Malhotra", "event_type": "Wedding", "event_date": "January 2025", "location": "Udaipur", "quote": "From mehendi to reception, HQ.D was with us for all 4 functions. Each setup was unique and the signature 'Forever New' cocktail they created for us was magical.", "rating": 5, "featured": True}
-    ]
-
-def get_default_gallery():
-    return [
-        {"id": "1", "title": "Royal Reception Setup", "category": "wedding", "image_url": "https://images.unsplash.com/photo-1574096079513-d8259312b785?w=800", "event_name": "Sharma Wedding", "location": "The Leela Palace, Delhi", "featured": True},
-        {"id": "2", "title": "Sangeet Night Bar", "category": "wedding", "image_url": "https://images.unsplash.com/photo-1470337458703-46ad1756a187?w=800", "event_name": "Kapoor Sangeet", "location": "Taj Falaknuma, Hyderabad", "featured": True},
-        {"id": "3", "title": "Corporate Launch Event", "category": "corporate", "image_url": "https://images.unsplash.com/photo-1566417713940-fe7c737a9ef2?w=800", "event_name": "Tech Summit 2024", "location": "Four Seasons, Mumbai", "featured": True},
-        {"id": "4", "title": "Molecular Mixology Display", "category": "wedding", "image_url": "https://images.unsplash.com/photo-1551024709-8f23befc6f87?w=800", "event_name": "Mehta Reception", "location": "ITC Grand Bharat", "featured": True},
-        {"id": "5", "title": "Poolside Cocktail Bar", "category": "private", "image_url": "https://images.unsplash.com/photo-1560963689-b5682b6440f8?w=800", "event_name": "Private Villa Party", "location": "Goa", "featured": False},
-        {"id": "6", "title": "Noir Cocktail Evening", "category": "private", "image_url": "https://images.unsplash.com/photo-1514362545857-3bc16c4c7d1b?w=800", "event_name": "Birthday Celebration", "location": "Private Residence, Delhi", "featured": False},
-        {"id": "7", "title": "Garden Wedding Bar", "category": "wedding", "image_url": "https://images.unsplash.com/photo-1519671482749-fd09be7ccebf?w=800", "event_name": "Singh Wedding", "location": "Raas Jodhpur", "featured": True},
-        {"id": "8", "title": "Brand Activation Setup", "category": "corporate", "image_url": "https://images.unsplash.com/photo-1572116469696-31de0f17cc34?w=800", "event_name": "Luxury Brand Launch", "location": "Ritz Carlton, Bangalore", "featured": False}
-    ]
-
-def get_default_packages():
-    return [
-        {"id": "1", "name": "Essential", "tier": "good", "tagline": "Perfect start for intimate gatherings", "description": "Our foundational package for smaller events. Premium service with curated selections.", "inclusions": ["Professional bartenders (2)", "Standard bar setup", "Curated menu of 8 drinks", "Premium glassware", "4-hour service", "Basic garnish station"], "best_for": "Intimate gatherings, small parties (up to 100 guests)", "highlight": None},
-        {"id": "2", "name": "Signature", "tier": "better", "tagline": "Elevated experience for memorable events", "description": "Our most popular package. Enhanced bar presence with signature drinks and molecular elements.", "inclusions": ["Professional bartenders (3-4)", "Customized bar setup", "Expanded menu of 12 drinks", "2 signature cocktails", "Basic molecular elements", "Premium glassware", "6-hour service", "Full garnish station"], "best_for": "Medium events, engagement parties (100-250 guests)", "highlight": "Most Popular"},
-        {"id": "3", "name": "Luxe", "tier": "best", "tagline": "Luxury experience for grand celebrations", "description": "Comprehensive bar experience with full molecular mixology and premium selections.", "inclusions": ["Professional bartenders (4-6)", "Premium designer bar setup", "Complete menu of 16+ drinks", "4 signature cocktails", "Full molecular mixology", "Crystal glassware", "8-hour service", "Champagne tower", "Dedicated bar manager"], "best_for": "Large weddings, corporate galas (250-400 guests)", "highlight": "Best Value"},
-        {"id": "4", "name": "Ultra", "tier": "ultra", "tagline": "The ultimate bespoke experience", "description": "Completely customized luxury bar experience. White-glove service for the most discerning clients.", "inclusions": ["Unlimited professional bartenders", "Bespoke bar design & fabrication", "Unlimited custom menu", "Personal mixologist consultation", "Complete molecular arsenal", "Premium crystal & gold glassware", "Unlimited service hours", "Multiple bar stations", "VIP lounge setup", "Dedicated event coordinator"], "best_for": "Destination weddings, ultra-luxury events (400+ guests)", "highlight": "Ultimate Luxury"}
-    ]
-
-def get_default_faqs():
-    return [
-        {"id": "1", "question": "Do you provide food or only bars?", "answer": "We specialize exclusively in bar services - cocktails and mocktails only. We do not provide food or catering services. However, we work seamlessly with caterers and event planners to ensure perfect coordination.", "category": "service", "order": 1},
-        {"id": "2", "question": "Do you offer mocktail-only packages?", "answer": "Absolutely! We have extensive mocktail menus and can create fully non-alcoholic bar experiences. Our molecular mixology techniques work beautifully with mocktails too.", "category": "service", "order": 2},
-        {"id": "3", "question": "What is molecular mixology?", "answer": "Molecular mixology uses scientific techniques to create unique drink experiences - think smoke bubbles that release aromas, foams, caviar-like spheres, and aromatic mists. It's about creating memorable moments, not just drinks.", "category": "service", "order": 3},
-        {"id": "4", "question": "How far in advance should we book?", "answer": "We recommend booking 3-6 months in advance for weddings and large events. For smaller private parties, 4-6 weeks notice is usually sufficient. Peak wedding season (October-February) books up quickly.", "category": "booking", "order": 4},
-        {"id": "5", "question": "Do you travel outside Delhi NCR?", "answer": "Yes! We service events across India and have experience with destination weddings in Udaipur, Jaipur, Goa, Kerala, and more. Travel and accommodation costs apply for outstation events.", "category": "logistics", "order": 5},
-        {"id": "6", "question": "Can we customize the menu?", "answer": "Absolutely! Menu customization is at the heart of what we do. We can create signature 'couple cocktails' for weddings, branded drinks for corporate events, and tailor menus to your theme and preferences.", "category": "service", "order": 6},
-        {"id": "7", "question": "What about alcohol procurement?", "answer": "We can either work with alcohol you provide, or assist with procurement recommendations. Final procurement and permits are the client's responsibility, but we guide you through the process.", "category": "logistics", "order": 7},
-        {"id": "8", "question": "How does pricing work?", "answer": "Every event is unique, so we provide custom quotes based on guest count, duration, setup requirements, menu complexity, and location. Contact us for a personalized quote - there's no obligation.", "category": "booking", "order": 8}
-    ]
-
-# Include router and middleware
-app.include_router(api_router)
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+async def get_faqs(request: Request, category: Optional[str] = None):
+    docs = await catalog_cache.get("faqs")
+
+    def build():
+        faqs = [f for f in docs if not category or f.get("category") == category][:50]
+        return faqs or catalog_seed.models["faqs"]
+
+    return catalog_response(request, "faqs", (category,), List[FAQ], build)
+
+# Search: one BM25 segment per catalog collection, rebuilt only when that
+# collection's cached version changes
+SEARCH_SEGMENTS = {
+    "drink": ("menus", {
+        "name": 3.0, "flavor_profile": 2.0, "spirit_base": 2.0, "type": 2.0, "molecular_technique": 1.5,
+        "ingredients": 1.0, "description": 1.0, "garnish": 0.5,
+    }),
+    "setup": ("setups", {
+        "title": 3.0, "occasion": 2.0, "style": 2.0, "molecular_tag": 1.5, "menu_highlights": 1.0,
+        "best_for": 1.0, "format": 1.0, "description": 1.0,
+    }),
+    "faq": ("faqs", {"question": 3.0, "category": 1.0, "answer": 1.0}),
+    "package": ("packages", {
+        "name": 3.0, "tagline": 2.0, "tier": 1.0, "inclusions": 1.0, "best_for": 1.0, "description": 1.0,
+    }),
+}
+SEARCH_SNIPPET_CHARS = 160
+
+_default_search_segments: Dict[str, Segment] = {}
+
+async def get_search_segments() -> List[Segment]:
+    segments = []
+    for kind, (name, fields) in SEARCH_SEGMENTS.items():
+        segment = await catalog_cache.view(name, "search", lambda docs: Segment(kind, docs, fields))
+        if not segment.docs:
+            if kind not in _default_search_segments:
+                _default_search_segments[kind] = Segment(kind, catalog_seed.docs[name], fields)
+            segment = _default_search_segments[kind]
+        segments.append(segment)
+    return segments
+
+def search_hit(kind: str, doc: dict, score: float, matched: List[str]) -> dict:
+    title, snippet, url = {
+        "drink": lambda: (doc.get("name"), doc.get("description"), "/menus"),
+        "setup": lambda: (doc.get("title"), doc.get("description"), f"/bar-setups/{doc.get('slug')}"),
+        "faq": lambda: (doc.get("question"), doc.get("answer"), "/faqs"),
+        "package": lambda: (doc.get("name"), doc.get("tagline"), "/packages"),
+    }[kind]()
+    if snippet and len(snippet) > SEARCH_SNIPPET_CHARS:
+        snippet = snippet[:SEARCH_SNIPPET_CHARS].rsplit(" ", 1)[0] + "…"
+    return {"type": kind, "id": str(doc.get("id")), "title": title or "", "snippet": snippet,
+            "url": url, "score": score, "matched": matched}
+
+@api_router.get("/search", response_model=SearchResult)
+async def search_catalog(response: Response, q: str = Query(..., min_length=1, max_length=100),
+                         types: Optional[str] = Query(None, description="Comma-separated: drink,setup,faq,package"),
+                         limit: int = Query(10, ge=1, le=50)):
+    """Typo-tolerant search; the last word also matches as a prefix (type-ahead)
+    unless the query ends with a space."""
+    kinds = [t.strip() for t in types.split(",") if t.strip()] if types else None
+    if kinds and not set(kinds) <= set(SEARCH_SEGMENTS):
+        raise HTTPException(status_code=400, detail=f"types must be among {', '.join(SEARCH_SEGMENTS)}")
+    hits, corrections = search(await get_search_segments(), q, limit=limit, kinds=kinds)
+    response.headers["Cache-Control"] = CATALOG_CACHE_CONTROL
+    return {"query": q, "corrections": corrections,
+            "hits": [search_hit(hit.kind, hit.doc, hit.score, hit.matched) for hit in hits]}
+
+# Tools: Signature Drink Generator
+_default_drink_features: Optional[DrinkFeatures] = None
+# Seeds are client-chosen (0..2^32), so generator results get their own small
+# LRU rather than evicting catalog bodies, and are only compressed cheaply
+drink_generator_cache = BodyCache(maxsize=int(os.environ.get('DRINK_GENERATOR_CACHE_SIZE', '128')))
+
+async def get_drink_features() -> DrinkFeatures:
+    global _default_drink_features
+    features = await catalog_cache.view("menus", "drink_features", DrinkFeatures)
+    if features.drinks:
+        return features
+    if _default_drink_features is None:
+        _default_drink_features = DrinkFeatures(list(catalog_seed.docs["menus"]))
+    return _default_drink_features
+
+@api_router.post("/tools/drink-generator", response_model=DrinkGeneratorResult)
+async def generate_drinks(prefs: DrinkPreferences, request: Request):
+    """Rank the drinks catalog against the guest's preferences.
+
+    The result is a pure function of (catalog version, preferences, seed),
+    so it is memoized and a shared card re-renders identically. Without a
+    seed, one is derived from the preferences.
+    """
+    features = await get_drink_features()
+    criteria = prefs.model_dump(exclude={"seed", "limit"})
+    seed = prefs.seed if prefs.seed is not None else preference_seed(**criteria)
+
+    def build():
+        matches = features.rank(seed=seed, limit=prefs.limit, **criteria)
+        drinks = [{**m.drink, "score": m.score, "reasons": m.reasons} for m in matches]
+        return {"seed": seed, "drinks": with_images(drinks)}
+
+    key = (catalog_cache.version("menus"), image_pipeline.version, tuple(criteria.values()), seed, prefs.limit)
+    body = drink_generator_cache.get_or_build(
+        key, lambda: CachedBody.from_model(DrinkGeneratorResult, build(), fast=True))
+    return conditional_response(request, body)
+
+# Tools: Wedding Hashtag Generator
+def hashtag_result(req: HashtagRequest) -> dict:
+    tags = hashtags.generate(req.name1, req.name2, req.vibe, req.year, req.limit)
+    return {"name1": req.name1, "name2": req.name2, "vibe": req.vibe, **tags}
+
+@api_router.post("/tools/hashtags", response_model=HashtagResult)
+async def generate_hashtags(req: HashtagRequest):
+    if not hashtags.normalize_name(req.name1) or not hashtags.normalize_name(req.name2):
+        raise HTTPException(status_code=400, detail="Names must contain letters")
+    return hashtag_result(req)
+
+@api_router.post("/tools/hashtags/batch", response_model=HashtagBatchResult)
+async def generate_hashtags_batch(batch: HashtagBatchRequest):
+    """Hashtags for a whole wedding calendar. Couples whose names have no
+    letters come back with empty lists rather than failing the batch."""
+    # ~1ms per uncached couple: keep big batches off the event loop
+    results = await asyncio.to_thread(lambda: [hashtag_result(req) for req in batch.couples])
+    return {"results": results}
+
+# ============ SEO PAGES ============
+
+async def sync_prerender():
+    """Re-render the pages of records changed since the last catalog version."""
+    for name in PAGE_KINDS:
+        docs = await catalog_cache.get(name) or [dict(doc) for doc in catalog_seed.docs[name]]
+        await prerender_cache.sync(name, docs, catalog_cache.version(name))
+
+async def page_response(request: Request, digest: str, media_type: str, load) -> Response:
+    headers = {"Cache-Control": CATALOG_CACHE_CONTROL, "ETag": f'"{digest}"'}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return Response(await load(), media_type=media_type, headers=headers)
+
+@page_router.get("/prerender/{path:path}")
+async def get_prerendered_page(request: Request, path: str):
+    """HTML snapshot of a setup, drink or package page; 404 for anything
+    else, which the proxy serves from the SPA."""
+    await sync_prerender()
+    found = prerender_cache.lookup("/" + path)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Page not found")
+    file, digest = found
+
+    async def load():
+        try:
+            return await asyncio.to_thread(file.read_bytes)
+        except FileNotFoundError:
+            # Replaced by a sync between the lookup and the read
+            raise HTTPException(status_code=404, detail="Page not found")
+
+    return await page_response(request, digest, "text/html; charset=utf-8", load)
+
+@page_router.get("/sitemap.xml")
+async def get_sitemap(request: Request):
+    await sync_prerender()
+    body, digest = prerender_cache.sitemap()
+
+    async def load():
+        return body
+
+    return await page_response(request, digest, "application/xml", load)
+
+# ============ APP ============
+
+# Startup warm-up budget: caches still fill lazily if it runs out
+STARTUP_WARMUP_TIMEOUT = float(os.environ.get('STARTUP_WARMUP_TIMEOUT', '20'))
+# How long shutdown waits for in-flight email sends before cancelling them
+SHUTDOWN_DRAIN_TIMEOUT = float(os.environ.get('SHUTDOWN_DRAIN_TIMEOUT', '10'))
+
+async def warm_up() -> dict:
+    """Load the catalog and build its derived indexes before the worker
+    takes traffic, so the first requests don't each pay for a cold cache."""
+    start = time.perf_counter()
+    steps = {
+        "catalog": lambda: asyncio.gather(*(catalog_cache.get(name) for name in catalog_cache.collections)),
+        "setup_facets": lambda: get_facet_index("setups", SETUP_FACETS),
+        "drink_facets": lambda: get_facet_index("menus", DRINK_FACETS),
+        "gallery": get_gallery_index,
+        "search": get_search_segments,
+        "drink_features": get_drink_features,
+        "rate_card": get_rate_card,
+        "scoring_rules": get_scoring_rules,
+        "prerender": sync_prerender,
+        "availability": lambda: availability.wait_ready(timeout=STARTUP_WARMUP_TIMEOUT),
+    }
+    failed = []
+    # In order: the later steps build on the catalog loaded by the first
+    for name, step in steps.items():
+        remaining = STARTUP_WARMUP_TIMEOUT - (time.perf_counter() - start)
+        if remaining <= 0:
+            failed.append(name)
+            continue
+        try:
+            await asyncio.wait_for(step(), timeout=remaining)
+        except Exception as e:
+            failed.append(name)
+            logger.warning(f"Warm-up step {name} failed: {e!r}")
+    seconds = round(time.perf_counter() - start, 3)
+    logger.info(f"Worker {os.getpid()} warmed up in {seconds}s" + (f", failed: {failed}" if failed else ""))
+    return {"seconds": seconds, "failed": failed}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs in each worker process: every worker owns its own pool, caches,
+    # change streams and background tasks
+    await apply_indexes(db, index_registry(lead_claims.window_seconds))
+    if SEED_CATALOG:
+        await seed_catalog(db, catalog_seed, SEED_COLLECTIONS)
+    await catalog_cache.start()
+    await availability.start()
+    await capacity_ledger.start()
+    await gallery_manifest.start()
+    app.state.warmup = await warm_up()
+    if LEAD_WRITE_BATCHING:
+        await lead_writer.start()
+    await lead_dispatcher.start()
+    await lead_fast_dispatcher.start()
+    await import_dispatcher.start()
+    await lead_rollups.start()
+    try:
+        yield
+    finally:
+        # The server has stopped accepting requests and finished in-flight
+        # ones; let claimed emails go out before tearing down the pool
+        await lead_writer.stop(timeout=SHUTDOWN_DRAIN_TIMEOUT)
+        await lead_rollups.stop()
+        await import_dispatcher.stop(timeout=SHUTDOWN_DRAIN_TIMEOUT)
+        await lead_dispatcher.stop(timeout=SHUTDOWN_DRAIN_TIMEOUT)
+        await lead_fast_dispatcher.stop(timeout=SHUTDOWN_DRAIN_TIMEOUT)
+        await email_provider.close()
+        await http_pool.close()
+        await scoring_pool.close()
+        await image_pipeline.close()
+        await gallery_manifest.stop()
+        await capacity_ledger.stop()
+        await availability.stop()
+        await catalog_cache.stop()
+        client.close()
+        logger.info(f"Worker {os.getpid()} shut down")
+
+def create_app() -> FastAPI:
+    """Build the ASGI app. ``serve.py`` runs it with one process per worker."""
+    app = FastAPI(title="HQ.D API", description="Headquarters of Drinks - Luxury Bar Services",
+                  lifespan=lifespan)
+    app.include_router(api_router)
+    app.include_router(page_router)
+    # Prometheus scrape target, outside /api so it isn't exposed via the API prefix
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "Idempotent-Replayed"],
+    )
+    app.add_middleware(PrometheusMiddleware)
+    return app
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+# `uvicorn server:app` (single process) keeps working
+app = create_app()
@@ -0,0 +1,137 @@
+"""Notification templates, compiled once.
+
+A template is a file in a ``TemplateSet`` directory (for notifications,
+``notification_templates/``) with three kinds of tags:
+
+* ``{{ name }}``: a context value, escaped for the template's format
+  (HTML-escaped in ``.html`` files, as-is in ``.txt``);
+* ``{{ name|raw }}``: a value inserted unescaped, for fragments that were
+  themselves rendered from a template;
+* ``{{> partial }}``: another template inlined at compile time. Partials
+  with no tags of their own (headers, footers, dividers) are plain text in
+  the compiled template, so static sections cost nothing per render.
+
+``TemplateSet`` compiles every file when it is created, so a missing
+partial or a malformed tag fails at startup rather than on the first lead.
+Rendering is a single join over literal chunks and looked-up values;
+fragments that repeat across leads (a section heading, an estimate line)
+can be memoized with ``fragment``.
+"""
+import html
+import re
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Hashable, List, Tuple, Union
+
+_TAG = re.compile(r"\{\{\s*(>)?\s*([A-Za-z_][\w.]*)\s*(?:\|\s*(raw))?\s*\}\}")
+
+ESCAPERS: Dict[str, Callable[[str], str]] = {
+    ".html": lambda value: html.escape(value, quote=True),
+    ".txt": lambda value: value,
+}
+
+
+class TemplateError(ValueError):
+    pass
+
+
+class Template:
+    """A compiled template: literal chunks alternating with value slots."""
+
+    def __init__(self, name: str, parts: List[Union[str, Tuple[str, bool]]], escape: Callable[[str], str]):
+        self.name = name
+        self.escape = escape
+        # Adjacent literals are merged, so a template is at most one chunk per tag
+        merged: List[Union[str, Tuple[str, bool]]] = []
+        for part in parts:
+            if isinstance(part, str) and merged and isinstance(merged[-1], str):
+                merged[-1] += part
+            elif part != "":
+                merged.append(part)
+        self.parts = tuple(merged)
+        self.fields = frozenset(part[0] for part in merged if not isinstance(part, str))
+        self.static = "".join(merged) if not self.fields else None
+
+    def render(self, context: Dict[str, object]) -> str:
+        if self.static is not None:
+            return self.static
+        out = []
+        for part in self.parts:
+            if isinstance(part, str):
+                out.append(part)
+                continue
+            name, raw = part
+            try:
+                value = context[name]
+            except KeyError:
+                raise TemplateError(f"{self.name}: no value for {name!r}") from None
+            value = "" if value is None else str(value)
+            out.append(value if raw else self.escape(value))
+        return "".join(out)
+
+
+class TemplateSet:
+    def __init__(self, directory: Path, fragment_cache_size: int = 1024):
+        self.directory = Path(directory)
+        self.fragment_cache_size = fragment_cache_size
+        self.hits = 0
+        self.misses = 0
+        self._sources = {path.name: path.read_text(encoding="utf-8")
+                         for path in sorted(self.directory.iterdir()) if path.suffix in ESCAPERS}
+        self._templates: Dict[str, Template] = {}
+        for name in self._sources:
+            self._templates[name] = Template(name, self._parse(name, ()), ESCAPERS[Path(name).suffix])
+        self._fragments: "OrderedDict[Hashable, str]" = OrderedDict()
+
+    def _parse(self, name: str, including: Tuple[str, ...]) -> List[Union[str, Tuple[str, bool]]]:
+        if name in including:
+            raise TemplateError(f"{' -> '.join(including + (name,))}: partials include each other")
+        source = self._sources.get(name)
+        if source is None:
+            raise TemplateError(f"{including[-1] if including else name}: no template {name!r}")
+        parts: List[Union[str, Tuple[str, bool]]] = []
+        position = 0
+        for match in _TAG.finditer(source):
+            parts.append(source[position:match.start()])
+            partial, field, raw = match.groups()
+            if partial:
+                # Partials take the including template's extension by default
+                partial_name = field if Path(field).suffix else field + Path(name).suffix
+                parts.extend(self._parse(partial_name, including + (name,)))
+            else:
+                parts.append((field, bool(raw)))
+            position = match.end()
+        rest = source[position:]
+        if "{{" in rest or "}}" in rest:
+            raise TemplateError(f"{name}: malformed tag near {rest[rest.find('{{'):][:40]!r}")
+        parts.append(rest)
+        return parts
+
+    def __getitem__(self, name: str) -> Template:
+        return self._templates[name]
+
+    def render(self, template: str, /, **context) -> str:
+        return self._templates[template].render(context)
+
+    def fragment(self, template: str, /, **context) -> str:
+        """``render``, memoized on the context values: for fragments whose
+        inputs repeat across many notifications."""
+        key = (template, tuple(sorted(context.items())))
+        cached = self._fragments.get(key)
+        if cached is not None:
+            self.hits += 1
+            self._fragments.move_to_end(key)
+            return cached
+        self.misses += 1
+        rendered = self._fragments[key] = self.render(template, **context)
+        if len(self._fragments) > self.fragment_cache_size:
+            self._fragments.popitem(last=False)
+        return rendered
+
+    def stats(self) -> dict:
+        return {
+            "templates": len(self._templates),
+            "fragments": len(self._fragments),
+            "fragment_hits": self.hits,
+            "fragment_misses": self.misses,
+        }
@@ -0,0 +1,185 @@
+"""Group commit for single-document inserts.
+
+``BatchWriter.insert(doc)`` queues the document and waits. A background
+task collects queued documents until ``max_batch`` are waiting or the
+oldest has waited ``max_latency`` seconds, then writes them with one
+unordered ``insert_many``. Each caller returns (or raises) only once its
+own document's write is acknowledged, so a request still never reports
+success for a lead that isn't in Mongo: a bad document fails with the same
+``WriteError`` / ``DuplicateKeyError`` ``insert_one`` would raise, without
+failing the rest of its batch.
+
+Backpressure: at most ``max_inflight`` batches are written at once and at
+most ``max_pending`` documents are queued or in flight. When Mongo slows
+down the queue fills and callers wait for room; one that waits longer than
+``queue_timeout`` gets ``WriterOverloaded`` (a 503 for the client to retry)
+instead of piling more work onto the server.
+
+While the writer is not running (not started, or stopped) ``insert`` falls
+back to ``insert_one``.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Optional, Set, Tuple
+
+from pymongo.errors import BulkWriteError, DuplicateKeyError, WriteError
+
+logger = logging.getLogger(__name__)
+
+
+class WriterOverloaded(Exception):
+    pass
+
+
+def _write_error(details: dict) -> WriteError:
+    """The error ``insert_one`` would have raised for one failed document."""
+    code = details.get("code")
+    error = DuplicateKeyError if code == 11000 else WriteError
+    return error(details.get("errmsg", "write failed"), code, details)
+
+
+class BatchWriter:
+    def __init__(self, collection, *, max_batch: int = 100, max_latency: float = 0.005,
+                 max_pending: int = 2000, max_inflight: int = 2, queue_timeout: float = 2.0):
+        self.collection = collection
+        self.max_batch = max(1, max_batch)
+        self.max_latency = max_latency
+        self.max_pending = max(self.max_batch, max_pending)
+        self.max_inflight = max(1, max_inflight)
+        self.queue_timeout = queue_timeout
+        self.batches = 0
+        self.inserted = 0
+        self.failed = 0
+        self.overloaded = 0
+        self.largest_batch = 0
+        self.last_flush_seconds: Optional[float] = None
+        self._queue: Deque[Tuple[dict, asyncio.Future]] = deque()
+        self._queued = asyncio.Event()  # at least one document waiting
+        self._full = asyncio.Event()    # a whole batch waiting
+        self._room: Optional[asyncio.Semaphore] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._flushes: Set[asyncio.Task] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._stopping
+
+    async def insert(self, doc: dict):
+        """Insert ``doc``, returning once its batch is acknowledged."""
+        if not self.running:
+            await self.collection.insert_one(doc)
+            return
+        try:
+            await asyncio.wait_for(self._room.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.overloaded += 1
+            raise WriterOverloaded(f"{len(self._queue)} inserts queued, {len(self._flushes)} batches in flight")
+        if self._stopping:
+            # Stopped while we waited for room: the flush loop may be gone
+            self._room.release()
+            await self.collection.insert_one(doc)
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((doc, future))
+        self._queued.set()
+        if len(self._queue) >= self.max_batch:
+            self._full.set()
+        await future
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._stopping = False
+        self._room = asyncio.Semaphore(self.max_pending)
+        self._slots = asyncio.Semaphore(self.max_inflight)
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Batch writer started on {self.collection.name}: "
+                    f"up to {self.max_batch} per batch, {self.max_latency * 1000:g}ms")
+
+    async def stop(self, timeout: float = 10.0):
+        """Write everything queued (up to ``timeout``), then cancel."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._queued.set()
+        self._full.set()
+        done, _ = await asyncio.wait([self._task], timeout=timeout)
+        if self._flushes:
+            await asyncio.wait(self._flushes, timeout=timeout)
+        for task in [self._task, *self._flushes]:
+            task.cancel()
+        if not done:
+            logger.error(f"Batch writer stopped with {len(self._queue)} inserts unwritten")
+        while self._queue:
+            _, future = self._queue.popleft()
+            if not future.done():
+                future.set_exception(WriterOverloaded("writer stopped"))
+        self._task = None
+
+    async def _run(self):
+        while self._queue or not self._stopping:
+            await self._queued.wait()
+            if len(self._queue) < self.max_batch and not self._stopping:
+                try:
+                    await asyncio.wait_for(self._full.wait(), timeout=self.max_latency)
+                except asyncio.TimeoutError:
+                    pass
+            batch = [self._queue.popleft() for _ in range(min(self.max_batch, len(self._queue)))]
+            if not self._queue:
+                self._queued.clear()
+            if len(self._queue) < self.max_batch and not self._stopping:
+                self._full.clear()
+            if not batch:
+                continue
+            # Holding the next batch here, rather than writing it, is what
+            # backs callers up into the queue when Mongo falls behind
+            await self._slots.acquire()
+            task = asyncio.create_task(self._flush(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch):
+        start = time.perf_counter()
+        errors = {}
+        try:
+            await self.collection.insert_many([doc for doc, _ in batch], ordered=False)
+        except BulkWriteError as e:
+            errors = {err["index"]: _write_error(err) for err in e.details.get("writeErrors", [])}
+            if not errors:
+                errors = dict.fromkeys(range(len(batch)), e)
+        except Exception as e:
+            logger.error(f"Batch insert of {len(batch)} documents failed: {e!r}")
+            errors = dict.fromkeys(range(len(batch)), e)
+        finally:
+            self._slots.release()
+        self.batches += 1
+        self.failed += len(errors)
+        self.inserted += len(batch) - len(errors)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        self.last_flush_seconds = round(time.perf_counter() - start, 4)
+        for i, (_, future) in enumerate(batch):
+            self._room.release()
+            if future.done():
+                continue  # The caller went away; the document is written regardless
+            if i in errors:
+                future.set_exception(errors[i])
+            else:
+                future.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": len(self._queue),
+            "in_flight": len(self._flushes),
+            "batches": self.batches,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "overloaded": self.overloaded,
+            "largest_batch": self.largest_batch,
+            "mean_batch": round((self.inserted + self.failed) / self.batches, 1) if self.batches else None,
+            "last_flush_seconds": self.last_flush_seconds,
+        }
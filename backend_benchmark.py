@@ -0,0 +1,271 @@
+"""HQ.D API latency benchmark.
+
+Drives concurrent, fixed-rate traffic at each endpoint and reports p50/p95/p99
+latency and throughput. Runs the app in-process by default (against MONGO_URL,
+or an in-memory mongomock stand-in with --mongomock), or against a running
+server with --base-url.
+
+    python backend_benchmark.py --mongomock --rps 200 --duration 5
+    python backend_benchmark.py --mongomock --save-baseline bench_baseline.json
+    python backend_benchmark.py --mongomock --compare bench_baseline.json
+
+POST /leads goes through the per-IP lead limiter (a burst of 5 by default), so
+against a running server every request after the burst would be a 429. With
+--base-url it is skipped unless --rate-limited is given; start the target
+with LEAD_LIMIT_IP_BURST and LEAD_LIMIT_IP_PER_HOUR raised (e.g. 1000000) for
+that. The in-process runs raise them themselves.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = Path(__file__).parent / "backend"
+
+
+def lead_payload() -> dict:
+    # Unique contact details so the dedup index doesn't collapse the traffic
+    tag = uuid.uuid4().hex[:10]
+    return {
+        "name": f"Bench {tag}",
+        "email": f"bench-{tag}@example.com",
+        "phone": f"9{int(tag, 16) % 10**9:09d}",
+        "event_type": "Wedding",
+        "event_date": "2026-12-15",
+        "city": "Delhi",
+        "guest_count": "200-300",
+        "bar_type": "both",
+    }
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: str
+    params: Optional[dict] = None
+    body: Optional[Callable[[], dict]] = None
+    expected_status: int = 200
+    admin: bool = False  # ops endpoint: sends ADMIN_TOKEN as a bearer token
+    rate_limited: bool = False  # behind the lead limiter: needs raised limits on a --base-url target
+
+
+SCENARIOS = [
+    Scenario("GET /health", "GET", "health"),
+    Scenario("GET /setups", "GET", "setups"),
+    Scenario("GET /setups?occasion", "GET", "setups", params={"occasion": "sangeet", "featured": "true"}),
+    Scenario("GET /setups/{slug}", "GET", "setups/mehendi-soiree"),
+    Scenario("GET /menus", "GET", "menus"),
+    Scenario("GET /menus?flavor", "GET", "menus", params={"type": "cocktail", "flavor": "sweet"}),
+    Scenario("GET /testimonials", "GET", "testimonials"),
+    Scenario("GET /gallery", "GET", "gallery"),
+    Scenario("GET /packages", "GET", "packages"),
+    Scenario("GET /faqs", "GET", "faqs"),
+    Scenario("POST /leads", "POST", "leads", body=lead_payload, rate_limited=True),
+    Scenario("GET /leads", "GET", "leads", params={"limit": 50}, admin=True),
+]
+
+
+def send(client: httpx.AsyncClient, scenario: Scenario, admin_token: str):
+    headers = {"Authorization": f"Bearer {admin_token}"} if scenario.admin else None
+    return client.request(scenario.method, scenario.path, params=scenario.params, headers=headers,
+                          json=scenario.body() if scenario.body else None)
+
+
+@dataclass
+class Result:
+    name: str
+    latencies_ms: List[float] = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0.0
+
+    def percentile(self, p: float) -> float:
+        if not self.latencies_ms:
+            return 0.0
+        ordered = sorted(self.latencies_ms)
+        rank = max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered) + 0.5)) - 1))
+        return ordered[rank]
+
+    def summary(self) -> dict:
+        total = len(self.latencies_ms) + self.errors
+        return {
+            "requests": total,
+            "errors": self.errors,
+            "p50_ms": round(self.percentile(50), 3),
+            "p95_ms": round(self.percentile(95), 3),
+            "p99_ms": round(self.percentile(99), 3),
+            "throughput_rps": round(len(self.latencies_ms) / self.elapsed, 1) if self.elapsed else 0.0,
+        }
+
+
+class HQDBenchmark:
+    def __init__(self, client: httpx.AsyncClient, rps: float, duration: float, concurrency: int,
+                 admin_token: str = ""):
+        self.client = client
+        self.admin_token = admin_token
+        self.rps = rps
+        self.duration = duration
+        self.concurrency = concurrency
+
+    async def _one(self, scenario: Scenario, scheduled: float, result: Result, gate: asyncio.Semaphore):
+        async with gate:
+            try:
+                response = await send(self.client, scenario, self.admin_token)
+                ok = response.status_code == scenario.expected_status
+            except httpx.HTTPError:
+                ok = False
+        # Measured from the scheduled send time, so queueing behind a slow
+        # server shows up as latency instead of silently lowering the rate
+        if ok:
+            result.latencies_ms.append((time.perf_counter() - scheduled) * 1000)
+        else:
+            result.errors += 1
+
+    async def run(self, scenario: Scenario) -> Result:
+        result = Result(scenario.name)
+        gate = asyncio.Semaphore(self.concurrency)
+        total = max(1, int(self.rps * self.duration))
+        interval = 1.0 / self.rps
+        tasks = []
+        start = time.perf_counter()
+        for i in range(total):
+            scheduled = start + i * interval
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(self._one(scenario, scheduled, result, gate)))
+        await asyncio.gather(*tasks)
+        result.elapsed = time.perf_counter() - start
+        return result
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float, floor_ms: float) -> List[str]:
+    """Regressions: p95/p99 slower, throughput lower, or new errors beyond tolerance."""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric in ("p95_ms", "p99_ms"):
+            limit = base[metric] * (1 + tolerance)
+            if current[metric] > limit and current[metric] - base[metric] > floor_ms:
+                regressions.append(f"{name}: {metric} {base[metric]} -> {current[metric]}")
+        if current["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {base['throughput_rps']} -> {current['throughput_rps']}")
+        if current["errors"] > base["errors"]:
+            regressions.append(f"{name}: errors {base['errors']} -> {current['errors']}")
+    return regressions
+
+
+def load_app(use_mongomock: bool):
+    """Import backend/server.py in-process, optionally on an in-memory Mongo."""
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("EMAIL_PROVIDER", "fake")
+    # All in-process traffic comes from one address; don't measure the lead limiter's 429s
+    os.environ.setdefault("LEAD_LIMIT_IP_BURST", "1000000")
+    os.environ.setdefault("LEAD_LIMIT_IP_PER_HOUR", "1000000")
+    os.environ.setdefault("ADMIN_TOKEN", uuid.uuid4().hex)
+    if use_mongomock:
+        import motor.motor_asyncio
+        from mongomock_motor import AsyncMongoMockClient
+        os.environ.setdefault("CATALOG_CACHE_WATCH", "false")
+        motor.motor_asyncio.AsyncIOMotorClient = lambda *args, **kwargs: AsyncMongoMockClient(tz_aware=True)
+    sys.path.insert(0, str(BACKEND_DIR))
+    import server
+    return server.app
+
+
+async def run(args) -> int:
+    selected = [s for s in SCENARIOS if not args.endpoints or any(e in s.name for e in args.endpoints)]
+    if args.base_url and not args.rate_limited:
+        skipped = [s.name for s in selected if s.rate_limited]
+        selected = [s for s in selected if not s.rate_limited]
+        if skipped:
+            print(f"⏭️  Skipping {', '.join(skipped)}: the target's lead limiter would answer 429. Raise its "
+                  f"LEAD_LIMIT_IP_BURST / LEAD_LIMIT_IP_PER_HOUR and pass --rate-limited to include them.")
+
+    async def bench(client) -> Dict[str, dict]:
+        admin_token = args.admin_token or os.environ.get("ADMIN_TOKEN", "")
+        bench = HQDBenchmark(client, args.rps, args.duration, args.concurrency, admin_token)
+        # Warm caches and connection pools before measuring
+        for scenario in selected:
+            await send(client, scenario, admin_token)
+        results = {}
+        for scenario in selected:
+            print(f"🔍 {scenario.name} @ {args.rps:g} rps for {args.duration:g}s...")
+            results[scenario.name] = (await bench.run(scenario)).summary()
+        return results
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url.rstrip("/") + "/", limits=limits, timeout=10) as client:
+            results = await bench(client)
+    else:
+        app = load_app(args.mongomock)
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench/api/", timeout=10) as client:
+                results = await bench(client)
+
+    print("\n" + "=" * 88)
+    print(f"{'Endpoint':<24}{'Requests':>9}{'Errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'Throughput':>14}")
+    print("=" * 88)
+    for name, r in results.items():
+        print(f"{name:<24}{r['requests']:>9}{r['errors']:>8}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+              f"{r['p99_ms']:>10.2f}{r['throughput_rps']:>10.1f} rps")
+
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps({
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "target": args.base_url or ("in-process/mongomock" if args.mongomock else "in-process"),
+            "python": platform.python_version(),
+            "rps": args.rps,
+            "duration": args.duration,
+            "results": results,
+        }, indent=2) + "\n")
+        print(f"\n💾 Baseline saved to {args.save_baseline}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())["results"]
+        regressions = compare(results, baseline, args.tolerance, args.floor_ms)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) vs {args.compare}:")
+            for line in regressions:
+                print(f"  • {line}")
+            return 1
+        print(f"\n✅ No regressions vs {args.compare} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="benchmark a running server, e.g. http://localhost:8001/api")
+    parser.add_argument("--admin-token", default=os.environ.get("ADMIN_TOKEN", ""),
+                        help="the target's ADMIN_TOKEN, for ops endpoints like GET /leads (default: $ADMIN_TOKEN)")
+    parser.add_argument("--rate-limited", action="store_true",
+                        help="with --base-url, also run POST /leads (the target needs raised LEAD_LIMIT_IP_* values)")
+    parser.add_argument("--mongomock", action="store_true", help="in-process app on an in-memory Mongo stand-in")
+    parser.add_argument("--rps", type=float, default=200, help="target request rate per endpoint")
+    parser.add_argument("--duration", type=float, default=5, help="seconds per endpoint")
+    parser.add_argument("--concurrency", type=int, default=64, help="max in-flight requests")
+    parser.add_argument("--endpoints", nargs="*", help="only scenarios whose name contains one of these")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH", help="fail if results regress against this baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown (default 25%%)")
+    parser.add_argument("--floor-ms", type=float, default=1.0, help="ignore latency deltas below this")
+    args = parser.parse_args()
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
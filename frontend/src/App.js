@@ -79,7 +79,9 @@ function App() {
             <Route path="/bar-setups/:slug" element={<BarSetupDetail />} />
             <Route path="/molecular" element={<MolecularMixology />} />
             <Route path="/menus" element={<Menus />} />
+            <Route path="/menus/:slug" element={<Menus />} />
             <Route path="/packages" element={<Packages />} />
+            <Route path="/packages/:tier" element={<Packages />} />
             <Route path="/gallery" element={<Gallery />} />
             <Route path="/reviews" element={<Reviews />} />
             <Route path="/about" element={<About />} />
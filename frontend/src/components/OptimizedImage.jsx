@@ -10,9 +10,11 @@ import { cn } from '@/lib/utils';
  * - Skeleton loading state
  * - Proper width/height to prevent CLS
  * - srcSet for responsive images
+ * - `image`: responsive metadata from the API (AVIF/WebP/JPEG sources, size, placeholder colour)
  */
 export const OptimizedImage = memo(function OptimizedImage({
   src,
+  image,
   alt = '',
   className = '',
   width,
@@ -28,6 +30,11 @@ export const OptimizedImage = memo(function OptimizedImage({
   const [isInView, setIsInView] = useState(priority);
   const imgRef = useRef(null);
 
+  const sources = image?.sources || [];
+  const fallback = sources[sources.length - 1];
+  width = width ?? image?.width ?? undefined;
+  height = height ?? image?.height ?? undefined;
+
   // Generate srcSet for responsive images (Unsplash/external images)
   const generateSrcSet = (url) => {
     if (!url || !url.includes('unsplash.com')) return url;
@@ -73,7 +80,10 @@ export const OptimizedImage = memo(function OptimizedImage({
     <div 
       ref={imgRef}
       className={cn('relative overflow-hidden bg-[hsl(0_0%_8%)]', className)}
-      style={{ aspectRatio: width && height ? `${width}/${height}` : undefined }}
+      style={{
+        aspectRatio: width && height ? `${width}/${height}` : undefined,
+        backgroundColor: image?.color || undefined,
+      }}
     >
       {/* Skeleton placeholder */}
       {!isLoaded && (
@@ -83,26 +93,31 @@ export const OptimizedImage = memo(function OptimizedImage({
         />
       )}
       
-      {/* Actual image */}
+      {/* Actual image: <picture> lets the browser pick the best format it supports */}
       {isInView && (
-        <motion.img
-          src={src}
-          srcSet={generateSrcSet(src)}
-          sizes={sizes}
-          alt={alt}
-          width={width}
-          height={height}
-          loading={priority ? 'eager' : 'lazy'}
-          decoding="async"
-          onLoad={handleLoad}
-          className={cn(
-            'w-full h-full object-cover transition-opacity duration-500',
-            isLoaded ? 'opacity-100' : 'opacity-0'
-          )}
-          initial={false}
-          animate={{ opacity: isLoaded ? 1 : 0 }}
-          {...props}
-        />
+        <picture>
+          {sources.slice(0, -1).map((source) => (
+            <source key={source.type} type={source.type} srcSet={source.srcset} sizes={sizes} />
+          ))}
+          <motion.img
+            src={image?.src || src}
+            srcSet={fallback ? fallback.srcset : generateSrcSet(src)}
+            sizes={sizes}
+            alt={alt}
+            width={width}
+            height={height}
+            loading={priority ? 'eager' : 'lazy'}
+            decoding="async"
+            onLoad={handleLoad}
+            className={cn(
+              'w-full h-full object-cover transition-opacity duration-500',
+              isLoaded ? 'opacity-100' : 'opacity-0'
+            )}
+            initial={false}
+            animate={{ opacity: isLoaded ? 1 : 0 }}
+            {...props}
+          />
+        </picture>
       )}
     </div>
   );
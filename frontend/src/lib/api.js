@@ -68,10 +68,24 @@ export const checkHealth = async () => {
   }
 };
 
-// Leads - This should remain as it sends data
-export const submitLead = async (leadData) => {
-  const response = await api.post('/leads', leadData);
-  return response.data;
+export const newIdempotencyKey = () =>
+  (window.crypto?.randomUUID ? window.crypto.randomUUID() : `${Date.now()}-${Math.random().toString(36).slice(2)}`);
+
+// Leads - This should remain as it sends data.
+// Network failures are retried with the same Idempotency-Key, so the
+// backend returns the original lead instead of creating a duplicate.
+export const submitLead = async (leadData, idempotencyKey = newIdempotencyKey(), retries = 2) => {
+  for (let attempt = 0; ; attempt++) {
+    try {
+      const response = await api.post('/leads', leadData, {
+        headers: { 'Idempotency-Key': idempotencyKey },
+      });
+      return response.data;
+    } catch (error) {
+      if (error.response || attempt >= retries) throw error;
+      await new Promise((resolve) => setTimeout(resolve, 500 * 2 ** attempt));
+    }
+  }
 };
 
 // Setups
@@ -108,6 +122,72 @@ export const getGallery = async (params = {}) => {
   return simulateApiCall(defaultGallery, params);
 };
 
+// Derivative URLs from the backend are root-relative to the API host
+const resolveImage = (image) => image && {
+  ...image,
+  src: image.src.startsWith('/api/') ? `${BACKEND_URL}${image.src}` : image.src,
+  sources: image.sources.map((source) => ({
+    ...source,
+    srcset: source.srcset.replaceAll('/api/images/', `${API}/images/`),
+  })),
+};
+
+// Gallery pages come from the backend manifest, one page at a time.
+// Resolves to { items, nextCursor }; nextCursor is null on the last page.
+export const getGalleryPage = async ({ category, cursor, limit = 48 } = {}) => {
+  const response = await api.get('/gallery', {
+    params: { category: category || undefined, cursor: cursor || undefined, limit },
+  });
+  return {
+    items: response.data.map((item) => ({ ...item, image: resolveImage(item.image) })),
+    nextCursor: response.headers['x-next-cursor'] || null,
+  };
+};
+
+// { total, facets: { category: { NAME: count } } }
+export const getGalleryFacets = async (params = {}) => {
+  const response = await api.get('/gallery/facets', { params });
+  return response.data;
+};
+
+// Quotes
+// Itemized estimate for every package tier from the current rate card
+export const getQuoteEstimate = async (details) => {
+  const response = await api.post('/quotes/estimate', details);
+  return response.data;
+};
+
+// Availability
+// Per-day free crew / bar units for a date range: { available, free, days: [{ date, status }] }
+export const checkAvailability = async ({ from, to, city }) => {
+  const response = await api.get('/availability', { params: { from, to, city: city || undefined } });
+  return response.data;
+};
+
+// Search
+// Drinks, bar setups, FAQs and packages in one ranked list. The last word is
+// matched as a prefix while typing; `corrections` maps misspelt words to the term used.
+export const searchCatalog = async (q, { types, limit, signal } = {}) => {
+  const response = await api.get('/search', {
+    params: { q, types: types ? types.join(',') : undefined, limit },
+    signal,
+  });
+  return response.data;
+};
+
+// Tools
+// Same preferences + seed always return the same drinks, so results can be shared by URL
+export const generateDrinks = async (prefs) => {
+  const response = await api.post('/tools/drink-generator', prefs);
+  return response.data;
+};
+
+// Ranked per group plus an overall `top` list; names without letters get a 400
+export const generateHashtags = async ({ name1, name2, vibe, year }) => {
+  const response = await api.post('/tools/hashtags', { name1, name2, vibe, year });
+  return response.data;
+};
+
 // Packages
 export const getPackages = async () => {
   return simulateApiCall(defaultPackages);
@@ -1,3 +1,5 @@
+// Generated from backend/seed_data.json by `python seed.py export`. Do not edit by hand.
+export const SEED_VERSION = 1;
 
 export const defaultSetups = [
     {"id": "1", "title": "Mehendi Soirée", "slug": "mehendi-soiree", "description": "Vibrant bar setup with colorful cocktails and traditional aesthetics. Perfect for your mehendi celebration with folk-inspired decor.", "best_for": "150-250 guests", "guest_range": "150-250", "occasion": ["mehendi", "haldi"], "style": "Royal", "format": "Both", "menu_highlights": ["Kufri", "Mango Tango", "Rose Lassi Mocktail"], "molecular_tag": "Aromatic Mists", "image_url": "https://images.unsplash.com/photo-1551024709-8f23befc6f87?w=600", "video_url": "https://customer-assets.emergentagent.com/job_ac6c9480-7211-41d1-abd8-0c6fb67adb33/artifacts/5if3jo8e_6ed5da08-8e47-4c62-95e1-594fc854688c.mp4", "featured": true},
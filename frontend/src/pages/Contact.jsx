@@ -1,8 +1,8 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { useSearchParams } from 'react-router-dom';
 import { motion } from 'framer-motion';
 import { Send, MessageCircle, CheckCircle, Loader2 } from 'lucide-react';
-import { submitLead } from '@/lib/api';
+import { submitLead, newIdempotencyKey, checkAvailability } from '@/lib/api';
 import { BRAND, EVENT_TYPES, BAR_TYPES, GUEST_RANGES, BUDGET_RANGES, getWhatsAppLink } from '@/lib/constants';
 import { Input } from '@/components/ui/input';
 import { Label } from '@/components/ui/label';
@@ -18,7 +18,13 @@ export default function Contact() {
   });
   const [loading, setLoading] = useState(false);
   const [success, setSuccess] = useState(false);
+  const [availability, setAvailability] = useState(null);
   const [error, setError] = useState('');
+  // One key per form fill: re-clicking submit after an error reuses it
+  const idempotencyKey = useRef(null);
+  // Abuse checks: bots fill the hidden field, or submit faster than a person could
+  const [honeypot, setHoneypot] = useState('');
+  const renderedAt = useRef(Date.now());
 
   useEffect(() => {
     const setup = searchParams.get('setup');
@@ -30,6 +36,19 @@ export default function Contact() {
     }
   }, [searchParams]);
 
+  // Live "Check Availability" for the chosen date and city (debounced while typing the city)
+  useEffect(() => {
+    const { event_date: day, city } = formData;
+    setAvailability(null);
+    if (!day) return undefined;
+    const timer = setTimeout(() => {
+      checkAvailability({ from: day, to: day, city })
+        .then((result) => setAvailability(result.days[0]?.status || null))
+        .catch(() => setAvailability(null));
+    }, 400);
+    return () => clearTimeout(timer);
+  }, [formData.event_date, formData.city]);
+
   const handleChange = (field, value) => setFormData(prev => ({ ...prev, [field]: value }));
 
   const handleSubmit = async (e) => {
@@ -37,10 +56,16 @@ export default function Contact() {
     setLoading(true);
     setError('');
     try {
-      await submitLead(formData);
+      idempotencyKey.current ??= newIdempotencyKey();
+      await submitLead(
+        { ...formData, website: honeypot, form_elapsed_ms: Date.now() - renderedAt.current },
+        idempotencyKey.current,
+      );
       setSuccess(true);
     } catch (err) {
-      setError('Something went wrong. Please try WhatsApp.');
+      setError(err.response?.status === 429
+        ? 'Too many inquiries from this connection. Please try again later or reach us on WhatsApp.'
+        : 'Something went wrong. Please try WhatsApp.');
     } finally {
       setLoading(false);
     }
@@ -161,6 +186,13 @@ export default function Contact() {
                       onChange={(e) => handleChange('event_date', e.target.value)}
                       className="bg-transparent border-white/10 focus-visible:ring-gold h-11"
                     />
+                    {availability && (
+                      <p className={`body-sm mt-2 ${availability === 'full' ? 'text-red-400' : 'text-gold'}`}>
+                        {availability === 'available' && 'Good news: this date is open.'}
+                        {availability === 'limited' && 'Limited availability on this date. Enquire soon.'}
+                        {availability === 'full' && 'This date is fully booked. We\'ll suggest alternatives.'}
+                      </p>
+                    )}
                   </div>
                   <div>
                     <Label className="body-sm text-[hsl(40_33%_95%)] mb-2 block">City</Label>
@@ -216,6 +248,21 @@ export default function Contact() {
                 </div>
               </div>
 
+              {/* Honeypot: hidden from people and screen readers */}
+              <div className="absolute -left-[9999px] h-0 w-0 overflow-hidden" aria-hidden="true">
+                <label>
+                  Website
+                  <input
+                    type="text"
+                    name="website"
+                    tabIndex={-1}
+                    autoComplete="off"
+                    value={honeypot}
+                    onChange={(e) => setHoneypot(e.target.value)}
+                  />
+                </label>
+              </div>
+
               {error && <p className="text-red-400 text-sm">{error}</p>}
 
               <button type="submit" disabled={loading} className="btn-primary" data-testid="contact-submit">
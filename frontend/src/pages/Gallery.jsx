@@ -1,27 +1,65 @@
-import { useEffect, useState } from 'react';
+import { useCallback, useEffect, useRef, useState } from 'react';
 import { motion } from 'framer-motion';
 import { Dialog, DialogContent } from '@/components/ui/dialog';
 import { X, ChevronLeft, ChevronRight } from 'lucide-react';
 import { cn } from '@/lib/utils';
+import { OptimizedImage } from '@/components/OptimizedImage';
+import { getGalleryFacets, getGalleryPage } from '@/lib/api';
 
-import galleryData from '../data/galleryData.json';
-
-const uniqueCategories = [...new Set(galleryData.map(item => item.category))];
-const categories = ['all', ...uniqueCategories.sort()];
+const PAGE_SIZE = 48;
 
 export default function Gallery() {
-  const [items, setItems] = useState(galleryData);
-  const [filteredItems, setFilteredItems] = useState(galleryData);
+  const [categories, setCategories] = useState(['all']);
+  const [filteredItems, setFilteredItems] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loading, setLoading] = useState(true);
   const [filter, setFilter] = useState('all');
   const [selectedIndex, setSelectedIndex] = useState(null);
+  const sentinelRef = useRef(null);
+  const requestRef = useRef(0);
 
   useEffect(() => {
-    if (filter === 'all') {
-      setFilteredItems(items);
-    } else {
-      setFilteredItems(items.filter(item => item.category === filter));
+    getGalleryFacets()
+      .then(({ facets }) => setCategories(['all', ...Object.keys(facets.category || {}).sort()]))
+      .catch(() => {});
+  }, []);
+
+  // Pages are fetched as the sentinel below the grid scrolls into view;
+  // requestRef drops responses for a filter the user already left
+  const loadPage = useCallback(async (cursor) => {
+    const request = ++requestRef.current;
+    setLoading(true);
+    try {
+      const page = await getGalleryPage({
+        category: filter === 'all' ? undefined : filter,
+        cursor,
+        limit: PAGE_SIZE,
+      });
+      if (request !== requestRef.current) return;
+      setFilteredItems((prev) => (cursor ? [...prev, ...page.items] : page.items));
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      if (request === requestRef.current) setNextCursor(null);
+    } finally {
+      if (request === requestRef.current) setLoading(false);
     }
-  }, [filter, items]);
+  }, [filter]);
+
+  useEffect(() => {
+    setFilteredItems([]);
+    setNextCursor(null);
+    loadPage(null);
+  }, [loadPage]);
+
+  useEffect(() => {
+    if (!nextCursor || loading || !sentinelRef.current) return;
+    const observer = new IntersectionObserver(
+      ([entry]) => entry.isIntersecting && loadPage(nextCursor),
+      { rootMargin: '600px' }
+    );
+    observer.observe(sentinelRef.current);
+    return () => observer.disconnect();
+  }, [nextCursor, loading, loadPage]);
 
   return (
     <div className="min-h-screen pt-20">
@@ -45,7 +83,7 @@ export default function Gallery() {
       {/* Filters */}
       <section className="sticky top-16 lg:top-20 z-30 py-4 bg-[hsl(0_0%_2%)]/95 backdrop-blur-xl border-b border-white/5">
         <div className="container-wide">
-          <div className="flex gap-2">
+          <div className="flex gap-2 overflow-x-auto">
             {categories.map((cat) => (
               <button
                 key={cat}
@@ -74,14 +112,16 @@ export default function Gallery() {
                   key={item.id}
                   initial={{ opacity: 0, scale: 0.95 }}
                   animate={{ opacity: 1, scale: 1 }}
-                  transition={{ delay: i * 0.03 }}
+                  transition={{ delay: (i % PAGE_SIZE) * 0.03 }}
                   className="aspect-square rounded-xl overflow-hidden cursor-pointer group relative"
                   onClick={() => setSelectedIndex(i)}
                 >
-                  <img
+                  <OptimizedImage
                     src={item.image_url}
+                    image={item.image}
                     alt={item.title}
-                    className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-500"
+                    sizes="(min-width: 1024px) 25vw, (min-width: 768px) 33vw, 50vw"
+                    className="w-full h-full group-hover:scale-105 transition-transform duration-500"
                   />
                   <div className="absolute inset-0 bg-gradient-to-t from-black/70 via-transparent to-transparent opacity-0 group-hover:opacity-100 transition-opacity">
                     <div className="absolute bottom-4 left-4 right-4">
@@ -91,12 +131,13 @@ export default function Gallery() {
                 </motion.div>
               ))}
             </div>
-          ) : (
+          ) : loading ? null : (
             <div className="text-center py-12">
               <p className="text-lg text-[hsl(40_33%_95%)]">More images coming soon!</p>
               <p className="text-sm text-white/50">We are currently curating our gallery for this category.</p>
             </div>
           )}
+          {nextCursor && <div ref={sentinelRef} className="h-px" aria-hidden="true" />}
         </div>
       </section>
 
@@ -106,7 +147,7 @@ export default function Gallery() {
           {selectedIndex !== null && filteredItems[selectedIndex] && (
             <div className="relative">
               <img
-                src={filteredItems[selectedIndex].image_url}
+                src={filteredItems[selectedIndex].image?.src || filteredItems[selectedIndex].image_url}
                 alt={filteredItems[selectedIndex].title}
                 className="w-full max-h-[80vh] object-contain"
               />
@@ -1,43 +1,70 @@
-import { useState } from 'react';
+import { useEffect, useState } from 'react';
+import { useSearchParams } from 'react-router-dom';
 import { motion, AnimatePresence } from 'framer-motion';
-import { Wine, GlassWater, Sparkles, ArrowRight, ArrowLeft, RefreshCw, Download } from 'lucide-react';
+import { Wine, GlassWater, Sparkles, ArrowRight, ArrowLeft, RefreshCw, Download, Shuffle, Link2 } from 'lucide-react';
 import { cn } from '@/lib/utils';
 import { FLAVOR_PROFILES, MOLECULAR_TECHNIQUES } from '@/lib/constants';
+import { generateDrinks } from '@/lib/api';
 import html2canvas from 'html2canvas';
 
 const steps = ['Type', 'Flavor', 'Sweetness', 'Molecular'];
+const PREF_FIELDS = ['type', 'flavor', 'sweetness', 'molecular'];
 
-const drinkNames = {
-  cocktail: ['Velvet Coupe', 'Golden Hour', 'Midnight Bloom', 'Crimson Silk', 'Amber Eclipse'],
-  mocktail: ['Garden Mist', 'Sunset Cloud', 'Crystal Rain', 'Meadow Breeze', 'Citrus Dream'],
-};
-
-const generateDrinks = (prefs) => {
-  const names = drinkNames[prefs.type] || drinkNames.cocktail;
-  const shuffled = [...names].sort(() => Math.random() - 0.5);
-  
-  return [0, 1, 2].map((i) => ({
-    id: i + 1,
-    name: shuffled[i],
-    type: prefs.type,
-    flavor: prefs.flavor,
-    sweetness: prefs.sweetness,
-    technique: prefs.molecular || MOLECULAR_TECHNIQUES[i % MOLECULAR_TECHNIQUES.length],
-    notes: `A ${prefs.sweetness} ${prefs.flavor} creation with ${prefs.type === 'mocktail' ? 'fresh juices' : 'premium spirits'}.`,
-    garnish: prefs.flavor === 'floral' ? 'Edible flowers' : prefs.flavor === 'citrus' ? 'Citrus wheel' : 'Fresh herbs',
-  }));
-};
+const newSeed = () => Math.floor(Math.random() * 2 ** 32);
 
 export default function DrinkGenerator() {
+  const [searchParams, setSearchParams] = useSearchParams();
   const [step, setStep] = useState(0);
   const [prefs, setPrefs] = useState({ type: '', flavor: '', sweetness: '', molecular: '' });
   const [drinks, setDrinks] = useState(null);
+  const [error, setError] = useState(null);
 
   const handleSelect = (field, value) => setPrefs(prev => ({ ...prev, [field]: value }));
 
+  // Results live in the URL (?type=&flavor=&sweetness=&molecular=&seed=),
+  // so a shared link re-generates exactly the same cards
+  const generate = async (nextPrefs, seed) => {
+    setError(null);
+    try {
+      const result = await generateDrinks({
+        type: nextPrefs.type,
+        flavor: nextPrefs.flavor || null,
+        sweetness: nextPrefs.sweetness || 'balanced',
+        molecular: nextPrefs.molecular || null,
+        seed,
+      });
+      setDrinks(result.drinks.map((d) => ({ ...d, sweetness: nextPrefs.sweetness })));
+      setSearchParams(
+        Object.fromEntries([...PREF_FIELDS.map((f) => [f, nextPrefs[f]]), ['seed', String(result.seed)]].filter(([, v]) => v !== '' && v != null)),
+        { replace: true }
+      );
+    } catch (e) {
+      setError('Could not generate drinks right now. Please try again.');
+    }
+  };
+
+  useEffect(() => {
+    if (!searchParams.get('type')) return;
+    const shared = Object.fromEntries(PREF_FIELDS.map((f) => [f, searchParams.get(f) || '']));
+    const seed = Number(searchParams.get('seed'));
+    setPrefs(shared);
+    generate(shared, Number.isInteger(seed) && searchParams.get('seed') ? seed : undefined);
+    // Only on first load; later changes to the URL come from generate() itself
+  }, []);
+
   const handleNext = () => {
     if (step < 3) setStep(step + 1);
-    else setDrinks(generateDrinks(prefs));
+    else generate(prefs, newSeed());
+  };
+
+  const handleShuffle = () => generate(prefs, newSeed());
+
+  const handleShare = async () => {
+    try {
+      await navigator.clipboard.writeText(window.location.href);
+    } catch (e) {
+      console.error(e);
+    }
   };
 
   const handleBack = () => {
@@ -49,6 +76,7 @@ export default function DrinkGenerator() {
     setStep(0);
     setPrefs({ type: '', flavor: '', sweetness: '', molecular: '' });
     setDrinks(null);
+    setSearchParams({}, { replace: true });
   };
 
   const handleSave = async () => {
@@ -199,6 +227,8 @@ export default function DrinkGenerator() {
                   </div>
                 )}
 
+                {error && <p className="text-center body-sm text-red-400 mt-6">{error}</p>}
+
                 {/* Nav */}
                 <div className="flex justify-between mt-10">
                   <button onClick={handleBack} disabled={step === 0} className="btn-ghost disabled:opacity-30">
@@ -213,9 +243,17 @@ export default function DrinkGenerator() {
               <motion.div initial={{ opacity: 0, y: 20 }} animate={{ opacity: 1, y: 0 }}>
                 <div className="flex justify-between items-center mb-8">
                   <h2 className="heading-md text-[hsl(40_33%_95%)]">Your Drinks</h2>
-                  <button onClick={handleSave} className="btn-ghost text-sm" data-testid="drink-save">
-                    <Download className="h-4 w-4" /> Save
-                  </button>
+                  <div className="flex gap-2">
+                    <button onClick={handleShuffle} className="btn-ghost text-sm" data-testid="drink-shuffle">
+                      <Shuffle className="h-4 w-4" /> Shuffle
+                    </button>
+                    <button onClick={handleShare} className="btn-ghost text-sm" data-testid="drink-share">
+                      <Link2 className="h-4 w-4" /> Share
+                    </button>
+                    <button onClick={handleSave} className="btn-ghost text-sm" data-testid="drink-save">
+                      <Download className="h-4 w-4" /> Save
+                    </button>
+                  </div>
                 </div>
 
                 <div id="drink-results" className="grid md:grid-cols-3 gap-6 p-1">
@@ -230,14 +268,15 @@ export default function DrinkGenerator() {
                     >
                       <span className="text-xs text-gold uppercase tracking-wide">{d.type}</span>
                       <h3 className="heading-md text-[hsl(40_33%_95%)] mt-2 mb-3">{d.name}</h3>
-                      <p className="body-sm mb-4">{d.notes}</p>
+                      <p className="body-sm mb-4">{d.description}</p>
                       <div className="space-y-2 text-sm">
-                        <p><span className="text-gold">Flavor:</span> {d.flavor} • {d.sweetness}</p>
+                        <p><span className="text-gold">Flavor:</span> {d.flavor_profile.join(', ')}{d.sweetness && ` • ${d.sweetness}`}</p>
+                        {d.spirit_base && <p><span className="text-gold">Base:</span> {d.spirit_base}</p>}
                         <p><span className="text-gold">Garnish:</span> {d.garnish}</p>
                       </div>
-                      {d.technique && (
+                      {d.molecular_technique && (
                         <div className="flex items-center gap-2 mt-4 pt-4 border-t border-white/10 text-sm text-gold">
-                          <Sparkles className="h-4 w-4" /> {d.technique}
+                          <Sparkles className="h-4 w-4" /> {d.molecular_technique}
                         </div>
                       )}
                     </motion.div>
@@ -5,6 +5,7 @@ import { Input } from '@/components/ui/input';
 import { Label } from '@/components/ui/label';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select';
 import { cn } from '@/lib/utils';
+import { generateHashtags } from '@/lib/api';
 
 const vibes = [
   { value: 'classic', label: 'Classic' },
@@ -13,22 +14,6 @@ const vibes = [
   { value: 'minimal', label: 'Minimal' },
 ];
 
-const generateHashtags = (n1, n2, vibe) => {
-  const name1 = n1.trim().replace(/[^a-zA-Z]/g, '');
-  const name2 = n2.trim().replace(/[^a-zA-Z]/g, '');
-  if (!name1 || !name2) return null;
-  const combo = `${name1}${name2}`;
-  
-  return {
-    elegant: [`#${combo}Forever`, `#The${combo}Wedding`, `#${name1}And${name2}`, `#${combo}SayIDo`, `#TogetherForever${combo}`, `#Celebrating${combo}`, `#${combo}LoveStory`, `#${combo}Chapter`],
-    playful: [`#Finally${combo}`, `#${combo}Hitched`, `#${name1}Got${name2}`, `#${combo}Party`, `#${combo}Vibes`, `#${name1}Says${name2}Yes`, `#${combo}Goals`, `#Cheers${combo}`],
-    short: [`#${combo}`, `#${name1}Weds${name2}`, `#${name1}${name2[0]}`, `#We${combo}`, `#${combo}25`],
-    themed: vibe === 'filmy' 
-      ? [`#Dilwale${name1}Le${name2}`, `#${combo}KiShaadi`, `#BandBaajaBaraat${combo}`, `#DDLJ${combo}`]
-      : [`#${combo}Signature`, `#House${combo}`, `#${combo}Affair`, `#${combo}Union`],
-  };
-};
-
 export default function HashtagGenerator() {
   const [name1, setName1] = useState('');
   const [name2, setName2] = useState('');
@@ -36,10 +21,22 @@ export default function HashtagGenerator() {
   const [hashtags, setHashtags] = useState(null);
   const [copiedIndex, setCopiedIndex] = useState(null);
   const [allCopied, setAllCopied] = useState(false);
+  const [loading, setLoading] = useState(false);
+  const [error, setError] = useState(null);
 
-  const handleGenerate = () => {
-    const results = generateHashtags(name1, name2, vibe);
-    setHashtags(results);
+  const handleGenerate = async () => {
+    setLoading(true);
+    setError(null);
+    try {
+      setHashtags(await generateHashtags({ name1, name2, vibe }));
+    } catch (e) {
+      console.error(e);
+      setError(e.response?.status === 400
+        ? 'Names need at least one letter each.'
+        : 'Could not generate hashtags right now. Please try again.');
+    } finally {
+      setLoading(false);
+    }
   };
 
   const copyToClipboard = (text, index) => {
@@ -124,14 +121,15 @@ export default function HashtagGenerator() {
               <div className="flex items-end">
                 <button
                   onClick={handleGenerate}
-                  disabled={!name1 || !name2}
+                  disabled={!name1 || !name2 || loading}
                   className="btn-primary w-full justify-center text-sm h-11"
                   data-testid="hashtag-generate"
                 >
-                  <Sparkles className="h-4 w-4" /> Generate
+                  <Sparkles className="h-4 w-4" /> {loading ? 'Generating...' : 'Generate'}
                 </button>
               </div>
             </div>
+            {error && <p className="body-sm text-red-400 mt-4">{error}</p>}
           </motion.div>
 
           {/* Results */}
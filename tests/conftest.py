@@ -0,0 +1,112 @@
+import os
+import sys
+from pathlib import Path
+
+import motor.motor_asyncio
+import pytest
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+from pymongo import ReturnDocument
+
+# The backend modules import each other as top-level modules (``from facets
+# import FacetIndex``), as they do when the server runs from backend/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "hqd_test")
+os.environ.setdefault("CATALOG_CACHE_WATCH", "false")  # mongomock has no change streams
+os.environ.setdefault("ADMIN_TOKEN", "test-admin-token")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+class MockCollection:
+    """A mongomock-motor collection whose ``find_one_and_update`` returns the
+    updated document. mongomock re-runs the filter after the update to find
+    it, so it misses documents whose update changed a filtered field, which
+    is exactly what a claim does."""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    async def find_one_and_update(self, filter, update, *, projection=None,
+                                  return_document=ReturnDocument.BEFORE, **kwargs):
+        if return_document != ReturnDocument.AFTER:
+            return await self._collection.find_one_and_update(
+                filter, update, projection=projection, return_document=return_document, **kwargs)
+        before = await self._collection.find_one_and_update(filter, update, projection={"_id": 1}, **kwargs)
+        if before is None:
+            return None
+        return await self._collection.find_one({"_id": before["_id"]}, projection)
+
+
+class MockDatabase:
+    def __init__(self, database):
+        self._database = database
+
+    def __getattr__(self, name):
+        return MockCollection(self._database[name])
+
+    __getitem__ = __getattr__
+
+
+@pytest.fixture
+def mongo():
+    """A fresh in-memory database."""
+    return MockDatabase(AsyncMongoMockClient(tz_aware=True)["hqd_test"])
+
+
+# Collections the API writes to; emptied after each API test (the seeded
+# catalog is kept)
+API_COLLECTIONS = ("leads", "lead_imports", "lead_claims", "bookings", "capacity_usage", "rate_limits",
+                   "lead_rollups", "analytics_state")
+
+
+@pytest.fixture(scope="session")
+def server():
+    """The server module, on an in-memory Mongo."""
+    motor.motor_asyncio.AsyncIOMotorClient = lambda *args, **kwargs: AsyncMongoMockClient(
+        *args, tz_aware=True, **kwargs)
+    import server
+    return server
+
+
+@pytest.fixture(scope="session")
+def app_client(server):
+    # One lifespan for the session: the background components bind their
+    # events and locks to the event loop they start on
+    with TestClient(server.app) as client:
+        yield client
+
+
+@pytest.fixture
+def api(server, app_client, monkeypatch):
+    """A client for the app with fresh rate limits and no leads or bookings."""
+    from rate_limit import MemoryBackend
+    monkeypatch.setattr(server.lead_limiter, "backend", MemoryBackend())
+    yield app_client
+
+    async def reset():
+        for name in API_COLLECTIONS:
+            await server.db[name].delete_many({})
+        # Nothing streams the deletes to the in-memory availability index
+        await server.availability.rebuild()
+    app_client.portal.call(reset)
+
+
+@pytest.fixture
+def lead():
+    """Builds a valid contact-form submission."""
+    def build(**fields):
+        return {
+            "name": "Asha Rao", "email": "asha@example.com", "phone": "+919876543210",
+            "event_type": "Wedding", "event_date": "2030-02-14", "guest_count": "300-500",
+            "city": "Mumbai", "message": "Cocktail bar for the sangeet", "form_elapsed_ms": 9000,
+            **fields,
+        }
+    return build
@@ -0,0 +1,110 @@
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from analytics import LeadRollups, fold_buckets, period_start, rollup_pipeline
+
+ADMIN = {"Authorization": "Bearer test-admin-token"}
+
+
+def stored_lead(created_at, **fields):
+    return {"created_at": created_at, "event_type": "Wedding", "city": "Mumbai", "bar_type": "both",
+            "source": "website", **fields}
+
+
+@pytest.mark.parametrize("interval, start", [
+    ("day", "2025-01-08"), ("week", "2025-01-06"), ("month", "2025-01-01"), ("total", None),
+])
+def test_period_start(interval, start):
+    assert period_start("2025-01-08", interval) == start
+
+
+@pytest.mark.anyio
+async def test_buckets_are_normalized(mongo):
+    await mongo.leads.insert_many([
+        stored_lead("2025-01-06T10:00:00+00:00", city=" Mumbai ", budget_range="₹3-5 Lakhs"),
+        stored_lead("2025-01-06T11:00:00+00:00", city="mumbai"),
+        stored_lead("2025-01-06T12:00:00+00:00", city="", event_type=None, budget_range=" "),
+    ])
+    groups = await mongo.leads.aggregate(rollup_pipeline("")).to_list(None)
+    buckets = sorted(fold_buckets(groups, None), key=lambda bucket: bucket["city"])
+    assert [(b["city"], b["event_type"], b["count"]) for b in buckets] == [
+        ("mumbai", "Wedding", 2), ("unknown", "unknown", 1)]
+    assert sorted(buckets[0]["budget_ranges"], key=lambda mix: mix["range"]) == [
+        {"range": "unspecified", "count": 1}, {"range": "₹3-5 Lakhs", "count": 1}]
+    assert buckets[1]["budget_ranges"] == [{"range": "unspecified", "count": 1}]
+
+
+@pytest.mark.anyio
+async def test_reruns_re_aggregate_from_the_watermark_less_lag(mongo):
+    rollups = LeadRollups(mongo, lag=86400)
+    await mongo.leads.insert_many([
+        stored_lead("2025-01-06T10:00:00+00:00"), stored_lead("2025-01-07T10:00:00+00:00"),
+        stored_lead("2025-01-12T10:00:00+00:00"), stored_lead("2025-01-13T10:00:00+00:00"),
+        stored_lead("2025-02-01T10:00:00+00:00"),
+    ])
+    first = await rollups.run_once()
+    assert first["since"] is None
+    assert first["watermark"] == "2025-02-01T10:00:00+00:00"
+
+    # Inserted late: within the lag of the watermark it is picked up, older
+    # than that it is not
+    await mongo.leads.insert_many([
+        stored_lead("2025-01-31T23:00:00+00:00"), stored_lead("2025-01-13T12:00:00+00:00"),
+    ])
+    second = await rollups.run_once()
+    assert second["since"] == "2025-01-31"
+    counts = {b["day"]: b["count"] for b in await mongo.lead_rollups.find().to_list(None)}
+    assert counts == {"2025-01-06": 1, "2025-01-07": 1, "2025-01-12": 1, "2025-01-13": 1,
+                      "2025-01-31": 1, "2025-02-01": 1}
+
+    # A day in the window that lost its leads loses its bucket
+    await mongo.leads.delete_many({"created_at": {"$gte": "2025-02-01"}})
+    third = await rollups.run_once()
+    assert third["removed"] == 1
+    days = {b["day"] for b in await mongo.lead_rollups.find().to_list(None)}
+    assert "2025-02-01" not in days and "2025-01-31" in days
+
+
+@pytest.mark.anyio
+async def test_query_rolls_days_up(mongo):
+    rollups = LeadRollups(mongo)
+    await mongo.leads.insert_many([
+        stored_lead("2025-01-06T10:00:00+00:00"), stored_lead("2025-01-07T10:00:00+00:00", city="Delhi"),
+        stored_lead("2025-01-12T10:00:00+00:00"),
+        stored_lead("2025-01-13T10:00:00+00:00", budget_range="₹5-10 Lakhs"),
+        stored_lead("2025-02-01T10:00:00+00:00"),
+    ])
+    await rollups.run_once()
+
+    async def rows(interval, **kwargs):
+        result = await rollups.query(date(2025, 1, 1), date(2025, 1, 31), interval, **kwargs)
+        return [(row["period"], row["count"]) for row in result["rows"]]
+
+    assert await rows("day") == [("2025-01-06", 1), ("2025-01-07", 1), ("2025-01-12", 1), ("2025-01-13", 1)]
+    assert await rows("week") == [("2025-01-06", 3), ("2025-01-13", 1)]
+    assert await rows("month") == [("2025-01-01", 4)]
+    assert await rows("total", filters={"city": " DELHI"}) == [(None, 1)]
+    total = await rollups.query(date(2025, 1, 1), date(2025, 2, 28), "month", group_by=["city"])
+    assert [(row["period"], row["group"], row["count"]) for row in total["rows"]] == [
+        ("2025-01-01", {"city": "mumbai"}, 3), ("2025-01-01", {"city": "delhi"}, 1),
+        ("2025-02-01", {"city": "mumbai"}, 1)]
+    assert total["rows"][0]["budget_ranges"] == {"unspecified": 2, "₹5-10 Lakhs": 1}
+
+
+def test_analytics_endpoints(api, lead):
+    today = datetime.now(timezone.utc).date()
+    params = {"from": (today - timedelta(days=7)).isoformat(), "to": today.isoformat(), "interval": "total"}
+    assert api.post("/api/leads", json=lead()).status_code == 200
+    assert api.post("/api/analytics/leads/refresh").status_code == 401
+    assert api.get("/api/analytics/leads", params=params).status_code == 401
+    for _ in range(50):  # the background run may hold the lease for a moment
+        refreshed = api.post("/api/analytics/leads/refresh", headers=ADMIN)
+        if refreshed.status_code != 409:
+            break
+        time.sleep(0.05)
+    assert refreshed.status_code == 200
+    response = api.get("/api/analytics/leads", params=params, headers=ADMIN)
+    assert response.status_code == 200
+    assert response.json()["total"] == 1
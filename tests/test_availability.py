@@ -0,0 +1,183 @@
+import asyncio
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from availability import AvailabilityIndex, CapacityLedger, _MaxTree, booking_days
+
+pytestmark = pytest.mark.anyio
+
+ADMIN = {"Authorization": "Bearer test-admin-token"}
+
+CAPACITY = [
+    {"pool": "delhi-ncr", "cities": ["Delhi", "Gurugram"], "crew": 10, "bar_units": 4},
+    {"pool": "outstation", "default": True, "crew": 5, "bar_units": 2},
+]
+
+
+def day(offset: int) -> date:
+    return date.today() + timedelta(days=offset)
+
+
+@pytest.mark.parametrize("seed", range(5))
+async def test_max_tree_matches_a_plain_list(seed):
+    rng = random.Random(seed)
+    size = rng.randint(1, 70)
+    tree, plain = _MaxTree(size), [0] * size
+    for _ in range(200):
+        lo = rng.randrange(size)
+        hi = rng.randrange(lo, size)
+        if rng.random() < 0.5:
+            value = rng.randint(-5, 5)
+            tree.update(lo, hi, value)
+            for i in range(lo, hi + 1):
+                plain[i] += value
+        else:
+            assert tree.range_max(lo, hi) == max(plain[lo:hi + 1])
+    assert tree.values(0, size - 1) == plain
+
+
+def test_booking_days():
+    assert booking_days("2025-02-27", "2025-03-01") == ["2025-02-27", "2025-02-28", "2025-03-01"]
+    assert booking_days("2025-01-01", "2025-01-01") == ["2025-01-01"]
+
+
+async def index_with(mongo, capacity=CAPACITY, bookings=()):
+    await mongo.capacity.insert_many([dict(doc) for doc in capacity])
+    if bookings:
+        await mongo.bookings.insert_many([dict(doc) for doc in bookings])
+    index = AvailabilityIndex(mongo, watch=False)
+    await index.rebuild()
+    return index
+
+
+def booking(booking_id, start, end, crew, city="Delhi", status="confirmed", bar_units=1):
+    return {"id": booking_id, "city": city, "start": day(start).isoformat(), "end": day(end).isoformat(),
+            "crew": crew, "bar_units": bar_units, "status": status}
+
+
+async def test_index_counts_active_bookings(mongo):
+    index = await index_with(mongo, bookings=[
+        booking("a", 1, 3, 4), booking("b", 3, 5, 3), booking("c", 2, 2, 9, status="cancelled"),
+        booking("d", 1, 1, 2, city="Goa"),
+    ])
+    assert index.free("delhi", day(1), day(2)) == {"crew": 6, "bar_units": 3}
+    assert index.free("Gurugram", day(3), day(3)) == {"crew": 3, "bar_units": 2}
+    assert index.free("Goa", day(1), day(5)) == {"crew": 3, "bar_units": 1}
+
+    calendar = index.calendar("Delhi", day(3), day(6), crew=5)
+    assert calendar["pool"] == "delhi-ncr"
+    assert not calendar["available"]
+    assert [d["status"] for d in calendar["days"]] == ["full", "available", "available", "available"]
+
+
+async def test_index_applies_changes(mongo):
+    index = await index_with(mongo)
+    index.apply(booking("a", 1, 2, 4))
+    assert index.free("Delhi", day(1), day(2))["crew"] == 6
+    index.apply(booking("a", 2, 2, 8))
+    assert index.free("Delhi", day(1), day(1))["crew"] == 10
+    assert index.free("Delhi", day(2), day(2))["crew"] == 2
+    index.apply(booking("a", 2, 2, 8, status="cancelled"))
+    assert index.free("Delhi", day(1), day(2))["crew"] == 10
+
+
+async def test_dated_capacity_overrides(mongo):
+    index = await index_with(mongo, capacity=[*CAPACITY, {"pool": "delhi-ncr", "date": day(4).isoformat(),
+                                                          "crew": 2}])
+    assert index.free("Delhi", day(4), day(4))["crew"] == 2
+    pool, days = index.limits("Delhi", day(3), day(4))
+    assert pool == "delhi-ncr"
+    assert days == [(day(3).isoformat(), 10, 4), (day(4).isoformat(), 2, 4)]
+
+
+async def ledger_for(mongo, index, **options):
+    ledger = CapacityLedger(mongo.capacity_usage, mongo.bookings, index, poll_interval=0, **options)
+    await ledger.ensure_built()
+    return ledger
+
+
+async def test_ledger_never_overbooks_concurrent_reservations(mongo):
+    index = await index_with(mongo)
+    ledger = await ledger_for(mongo, index)
+    pool, days = index.limits("Delhi", day(1), day(3))
+    results = await asyncio.gather(*(ledger.reserve(pool, days, 3, 1) for _ in range(6)))
+    assert sum(result is None for result in results) == 3
+    usage = await mongo.capacity_usage.find({"_id": {"$ne": "_built"}}).to_list(None)
+    assert sorted(doc["crew"] for doc in usage) == [9, 9, 9]
+
+
+async def test_ledger_gives_back_days_when_one_is_full(mongo):
+    index = await index_with(mongo)
+    ledger = await ledger_for(mongo, index)
+    pool, days = index.limits("Delhi", day(1), day(3))
+    assert await ledger.reserve(pool, days[2:], 9, 1) is None
+    assert await ledger.reserve(pool, days, 2, 1) == day(3).isoformat()
+    first = await mongo.capacity_usage.find_one({"_id": f"{pool}:{day(1).isoformat()}"})
+    assert first["crew"] == 0
+    await ledger.release(pool, [day(3).isoformat()], 9, 1)
+    assert await ledger.reserve(pool, days, 2, 1) is None
+    assert ledger.stats() == {"ready": True, "reserved": 2, "rejected": 1, "released": 1}
+
+
+async def test_ledger_counts_bookings_made_before_it(mongo):
+    index = await index_with(mongo, bookings=[booking("old", 1, 1, 8), booking("gone", 1, 1, 8, status="cancelled")])
+    ledger = await ledger_for(mongo, index)
+    pool, days = index.limits("Delhi", day(1), day(1))
+    assert await ledger.reserve(pool, days, 3, 1) == day(1).isoformat()
+    assert await ledger.reserve(pool, days, 2, 1) is None
+    # Built once: a second worker finds the marker and doesn't count them again
+    await ledger_for(mongo, index)
+    assert (await mongo.capacity_usage.find_one({"_id": f"{pool}:{day(1).isoformat()}"}))["crew"] == 10
+
+
+def book(api, **fields):
+    body = {"city": "Delhi", "start": day(30).isoformat(), "end": day(31).isoformat(), "crew": 15, **fields}
+    return api.post("/api/bookings", json=body, headers=ADMIN)
+
+
+def test_bookings_stop_at_capacity(api):
+    # The default Delhi NCR pool has 40 crew
+    assert [book(api).status_code for _ in range(3)] == [201, 201, 409]
+    assert book(api, crew=10).status_code == 201
+    calendar = api.get("/api/availability", params={"from": day(30).isoformat(), "to": day(31).isoformat(),
+                                                   "city": "Delhi"}).json()
+    assert calendar["free"]["crew"] == 0
+
+
+def test_cancelling_frees_capacity_and_reactivating_rechecks_it(api):
+    first = book(api, crew=30).json()
+    assert book(api).status_code == 409
+    cancelled = api.patch(f"/api/bookings/{first['id']}", json={"status": "cancelled"}, headers=ADMIN)
+    assert cancelled.json()["status"] == "cancelled"
+    assert book(api, crew=30).status_code == 201
+    assert api.patch(f"/api/bookings/{first['id']}", json={"status": "confirmed"}, headers=ADMIN).status_code == 409
+    assert api.patch("/api/bookings/missing", json={"status": "confirmed"}, headers=ADMIN).status_code == 404
+
+
+def test_rejected_hold_gives_back_the_days_it_took(api, server):
+    assert book(api, start=day(31).isoformat(), crew=40).status_code == 201
+    response = book(api, start=day(29).isoformat(), end=day(31).isoformat(), crew=10)
+    assert response.status_code == 409
+    assert response.json()["detail"] == f"Not enough capacity on {day(31).isoformat()}"
+    usage = api.portal.call(server.db.capacity_usage.find, {"date": {"$in": [day(29).isoformat(),
+                                                                             day(30).isoformat()]}})
+    assert [doc["crew"] for doc in api.portal.call(usage.to_list, None)] == [0, 0]
+    assert book(api, start=day(29).isoformat(), end=day(30).isoformat(), crew=40).status_code == 201
+
+
+def test_bookings_need_the_admin_token(api):
+    body = {"city": "Delhi", "start": day(30).isoformat(), "end": day(30).isoformat(), "crew": 200}
+    assert api.post("/api/bookings", json=body).status_code == 401
+    assert api.post("/api/bookings", json=body, headers={"Authorization": "Bearer wrong"}).status_code == 401
+    booking = book(api).json()
+    assert api.patch(f"/api/bookings/{booking['id']}", json={"status": "cancelled"}).status_code == 401
+    calendar = api.get("/api/availability", params={"from": day(30).isoformat(), "to": day(30).isoformat(),
+                                                   "city": "Delhi"}).json()
+    assert calendar["free"]["crew"] == 25
+
+
+def test_invalid_booking_ranges(api):
+    assert book(api, start=day(5).isoformat(), end=day(4).isoformat()).status_code == 400
+    assert book(api, start=day(-400).isoformat(), end=day(-400).isoformat()).status_code == 400
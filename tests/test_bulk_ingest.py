@@ -0,0 +1,109 @@
+import json
+from typing import List
+
+import pytest
+from pydantic import BaseModel, TypeAdapter
+from pymongo.errors import AutoReconnect
+
+from bulk_ingest import InsertInterrupted, insert_chunks, validate_rows
+
+ADMIN = {"Authorization": "Bearer test-admin-token"}
+
+
+class Row(BaseModel):
+    id: str
+    guests: int
+
+
+def test_validate_rows_reports_bad_rows_and_keeps_the_rest():
+    errors = {}
+    rows = [(0, {"id": "a", "guests": 10}), (3, {"id": "b", "guests": "many"}), (7, {"guests": 5})]
+    valid = validate_rows(TypeAdapter(List[Row]), rows, errors)
+    assert [(row, value.id) for row, value in valid] == [(0, "a")]
+    assert sorted(errors) == [3, 7]
+    assert errors[3][0].startswith("guests:")
+    assert errors[7][0].startswith("id:")
+
+
+@pytest.mark.anyio
+async def test_insert_chunks_records_duplicate_rows(mongo):
+    await mongo.leads.create_index("id", unique=True)
+    await mongo.leads.insert_one({"id": "taken"})
+    docs = [(0, {"id": "a"}), (1, {"id": "taken"}), (2, {"id": "b"}), (3, {"id": "c"})]
+    errors = {}
+    inserted = await insert_chunks(mongo.leads, docs, errors, chunk_size=2)
+    assert [doc["id"] for doc in inserted] == ["a", "b", "c"]
+    assert list(errors) == [1]
+
+
+class FailingCollection:
+    """Accepts ``ok_calls`` insert_many calls, then loses the connection."""
+
+    def __init__(self, collection, ok_calls: int):
+        self.collection = collection
+        self.ok_calls = ok_calls
+
+    async def insert_many(self, docs, ordered=True):
+        if not self.ok_calls:
+            raise AutoReconnect("connection reset")
+        self.ok_calls -= 1
+        return await self.collection.insert_many(docs, ordered=ordered)
+
+
+@pytest.mark.anyio
+async def test_insert_chunks_reports_what_was_written_before_a_failure(mongo):
+    docs = [(i, {"id": str(i)}) for i in range(5)]
+    with pytest.raises(InsertInterrupted) as raised:
+        await insert_chunks(FailingCollection(mongo.leads, ok_calls=1), docs, {}, chunk_size=2)
+    assert [doc["id"] for doc in raised.value.inserted] == ["0", "1"]
+    assert raised.value.unconfirmed == 3
+    assert isinstance(raised.value.__cause__, AutoReconnect)
+
+
+def ndjson(rows) -> bytes:
+    return b"\n".join(row if isinstance(row, bytes) else json.dumps(row).encode() for row in rows)
+
+
+def test_bulk_ndjson_upload(api, lead):
+    body = ndjson([lead(), b"{not json", lead(email="not-an-email"), lead(email="b@example.com")])
+    response = api.post("/api/leads/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["received"], result["inserted"], result["rejected"]) == (4, 2, 2)
+    assert [error["row"] for error in result["errors"]] == [1, 2]
+    assert len(api.get("/api/leads", headers=ADMIN).json()) == 2
+
+
+def test_bulk_json_array_upload(api, lead):
+    response = api.post("/api/leads/bulk", json=[lead(), lead(email="b@example.com")])
+    assert response.json()["inserted"] == 2
+    assert api.post("/api/leads/bulk", json={"not": "a list"}).status_code == 400
+
+
+def test_bulk_upload_size_limits(api, server, lead, monkeypatch):
+    monkeypatch.setattr(server, "LEADS_BULK_MAX_BYTES", 2048)
+    big = json.dumps([lead() for _ in range(20)])
+    assert api.post("/api/leads/bulk", content=big, headers={"Content-Type": "application/json"}).status_code == 413
+    long_line = ndjson([lead(message="x" * (server.LEAD_MAX_BODY_BYTES + 1))])
+    monkeypatch.setattr(server, "LEADS_BULK_MAX_BYTES", 10 * len(long_line))
+    response = api.post("/api/leads/bulk", content=long_line, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 413
+
+
+def test_bulk_uploads_are_rate_limited(api, lead):
+    statuses = [api.post("/api/leads/bulk", json=[lead()]).status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+
+
+def test_interrupted_import_is_recorded(api, server, lead, monkeypatch):
+    async def interrupted(collection, docs, errors):
+        await collection.insert_many([doc for _, doc in docs[:1]])
+        raise InsertInterrupted([docs[0][1]], len(docs) - 1, AutoReconnect("connection reset"))
+    monkeypatch.setattr(server, "insert_chunks", interrupted)
+
+    response = api.post("/api/leads/bulk", json=[lead(), lead(email="b@example.com")])
+    assert response.status_code == 500
+    record = api.portal.call(server.db.lead_imports.find_one, {}, {"_id": 0})
+    assert record["status"] == "interrupted"
+    assert (record["inserted"], record["unconfirmed"]) == (1, 1)
+    assert "notify" in record
@@ -0,0 +1,73 @@
+import pytest
+
+from catalog_cache import CatalogCache
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_reads_are_served_from_memory(mongo):
+    await mongo.faqs.insert_many([{"question": "b", "order": 2}, {"question": "a", "order": 1}])
+    cache = CatalogCache(mongo, watch=False)
+    first = await cache.get("faqs")
+    assert [faq["question"] for faq in first] == ["a", "b"]  # loaded in the configured order
+    assert "_id" not in first[0]
+    await mongo.faqs.insert_one({"question": "c", "order": 3})
+    assert await cache.get("faqs") is first
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.version("faqs") == 1
+    assert cache.version("setups") == 0
+
+
+async def test_invalidation_reloads_and_bumps_the_version(mongo):
+    await mongo.setups.insert_one({"slug": "a"})
+    cache = CatalogCache(mongo, watch=False)
+    builds = []
+
+    def slugs(docs):
+        builds.append(len(docs))
+        return [doc["slug"] for doc in docs]
+
+    view = await cache.view("setups", "slugs", slugs)
+    assert await cache.view("setups", "slugs", slugs) is view
+    await mongo.setups.insert_one({"slug": "b"})
+
+    cache.invalidate(["setups", "not-a-catalog"])
+    assert cache.invalidations == 1
+    assert cache.version("setups") == 1  # until the next read
+    assert await cache.view("setups", "slugs", slugs) == ["a", "b"]
+    assert cache.version("setups") == 2
+    assert builds == [1, 2]
+
+
+async def test_entries_expire_without_a_change_stream(mongo, monkeypatch):
+    await mongo.packages.insert_one({"tier": "good"})
+    cache = CatalogCache(mongo, ttl=60, watch=False)
+    clock = [1000.0]
+    monkeypatch.setattr("catalog_cache.time.monotonic", lambda: clock[0])
+    await cache.get("packages")
+    clock[0] += 59
+    await cache.get("packages")
+    assert cache.version("packages") == 1
+    clock[0] += 2
+    await cache.get("packages")
+    assert cache.version("packages") == 2
+    assert cache.stats()["mode"] == "ttl"
+
+
+def test_etag_follows_catalog_changes(api, server):
+    def etag():
+        response = api.get("/api/faqs")
+        assert response.status_code == 200
+        return response.headers["ETag"]
+
+    before = etag()
+    faq = api.portal.call(server.db.faqs.find_one, {}, {"_id": 0})
+    api.portal.call(server.db.faqs.update_one, {"question": faq["question"]}, {"$set": {"answer": "Changed."}})
+    try:
+        assert etag() == before  # served from the cache until it is invalidated
+        server.catalog_cache.invalidate(["faqs"])
+        assert etag() != before
+    finally:
+        api.portal.call(server.db.faqs.update_one, {"question": faq["question"]}, {"$set": {"answer": faq["answer"]}})
+        server.catalog_cache.invalidate(["faqs"])
+    assert etag() == before
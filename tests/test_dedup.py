@@ -0,0 +1,55 @@
+import pytest
+
+from dedup import LeadClaims, idempotency_claim, lead_dedup_key, wait_for_lead
+
+ADMIN = {"Authorization": "Bearer test-admin-token"}
+
+
+def test_dedup_key_normalizes_contact_details():
+    key = lead_dedup_key("Asha@Example.com ", "+91 98765-43210", "2030-02-14")
+    assert key == lead_dedup_key("asha@example.com", "9876543210", " 2030-02-14")
+    assert key != lead_dedup_key("asha@example.com", "9876543210", "2030-02-15")
+    assert key.startswith("lead:")
+
+
+def test_idempotency_claim():
+    assert idempotency_claim(" abc ") == "idem:abc"
+
+
+@pytest.mark.anyio
+async def test_claims(mongo):
+    claims = LeadClaims(mongo.lead_claims)
+    assert await claims.claim(["k1", "k2"], "lead-1") is None
+    # A repeat of either key points at the original lead, and new keys follow it
+    assert await claims.claim(["k2", "k3"], "lead-2") == "lead-1"
+    assert (await mongo.lead_claims.find_one({"_id": "k3"}))["lead_id"] == "lead-1"
+
+    await claims.release(["k1", "k2", "k3"], "lead-2")
+    assert await mongo.lead_claims.count_documents({}) == 3
+    await claims.release(["k1", "k2", "k3"], "lead-1")
+    assert await claims.claim(["k1"], "lead-3") is None
+
+
+@pytest.mark.anyio
+async def test_wait_for_lead(mongo):
+    await mongo.leads.insert_one({"id": "a", "name": "Asha"})
+    assert await wait_for_lead(mongo.leads, "a", {"_id": 0}) == {"id": "a", "name": "Asha"}
+    assert await wait_for_lead(mongo.leads, "missing", {"_id": 0}, attempts=2, delay=0) is None
+
+
+def test_duplicate_submission_is_replayed(api, lead):
+    first = api.post("/api/leads", json=lead())
+    again = api.post("/api/leads", json=lead(name="Asha R.", email="ASHA@example.com"))
+    assert again.status_code == 200
+    assert again.headers["Idempotent-Replayed"] == "true"
+    assert again.json()["id"] == first.json()["id"]
+    assert again.json()["name"] == "Asha Rao"
+    assert len(api.get("/api/leads", headers=ADMIN).json()) == 1
+
+
+def test_idempotency_key_replays_the_original(api, lead):
+    headers = {"Idempotency-Key": "form-123"}
+    first = api.post("/api/leads", json=lead(), headers=headers)
+    retry = api.post("/api/leads", json=lead(email="other@example.com"), headers=headers)
+    assert retry.json()["id"] == first.json()["id"]
+    assert "Idempotent-Replayed" not in first.headers
@@ -0,0 +1,30 @@
+from drink_generator import preference_seed
+
+
+def generate(api, **prefs):
+    return api.post("/api/tools/drink-generator", json={"flavor": "citrus", **prefs})
+
+
+def test_seed_reproduces_the_card(api):
+    first = generate(api, seed=7, limit=4)
+    assert first.status_code == 200
+    assert first.json()["seed"] == 7
+    assert len(first.json()["drinks"]) == 4
+    again = generate(api, seed=7, limit=4)
+    assert again.json() == first.json()
+    assert again.headers["ETag"] == first.headers["ETag"]
+
+
+def test_unseeded_request_derives_the_seed_from_preferences(api):
+    body = generate(api, sweetness="dry").json()
+    assert body["seed"] == preference_seed("cocktail", "citrus", "dry", None, None)
+
+
+def test_random_seeds_do_not_evict_catalog_bodies(api, server, monkeypatch):
+    monkeypatch.setattr(server.drink_generator_cache, "maxsize", 4)
+    assert api.get("/api/setups").status_code == 200
+    catalog_bodies = len(server.body_cache)
+    for seed in range(10):
+        assert generate(api, seed=seed).status_code == 200
+    assert len(server.body_cache) == catalog_bodies
+    assert len(server.drink_generator_cache) == 4
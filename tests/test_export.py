@@ -0,0 +1,83 @@
+import pytest
+
+from export import csv_chunks, csv_safe, ndjson_chunks
+
+ADMIN = {"Authorization": "Bearer test-admin-token"}
+
+
+def export(api, **params):
+    return api.get("/api/leads/export", params=params, headers=ADMIN)
+
+
+async def cursor(docs):
+    for doc in docs:
+        yield doc
+
+
+async def collect(chunks) -> str:
+    return b"".join([chunk async for chunk in chunks]).decode()
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("=HYPERLINK(\"http://x\")", "'=HYPERLINK(\"http://x\")"),
+    ("+919876543210", "'+919876543210"),
+    ("-2+3", "'-2+3"),
+    ("@SUM(A1)", "'@SUM(A1)"),
+    ("\tx", "'\tx"),
+    ("Mumbai", "Mumbai"),
+    ("", ""),
+    (-5, -5),
+    (None, None),
+])
+def test_csv_safe(value, expected):
+    assert csv_safe(value) == expected
+
+
+@pytest.mark.anyio
+async def test_csv_chunks_escapes_and_splits():
+    docs = [{"id": str(i), "name": "=cmd" if i == 1 else f"n{i}", "extra": "dropped"} for i in range(5)]
+    chunks = [chunk async for chunk in csv_chunks(cursor(docs), ["id", "name"], rows_per_chunk=2)]
+    assert len(chunks) == 3
+    lines = b"".join(chunks).decode().splitlines()
+    assert lines == ["id,name", "0,n0", "1,'=cmd", "2,n2", "3,n3", "4,n4"]
+
+
+@pytest.mark.anyio
+async def test_ndjson_chunks():
+    text = await collect(ndjson_chunks(cursor([{"a": 1}, {"b": "é"}]), rows_per_chunk=1))
+    assert text == '{"a": 1}\n{"b": "é"}\n'
+
+
+def test_export_date_range(api, lead):
+    assert api.post("/api/leads", json=lead(name="=1+1")).status_code == 200
+    text = export(api, format="csv", since="2020-01-01").text
+    assert "'=1+1" in text.splitlines()[1]
+    assert export(api, until="2020-01-01").text == ""
+    assert export(api, since="2020-01-01T05:30:00+05:30").text.count("\n") == 1
+
+
+@pytest.mark.parametrize("params", [{"since": "yesterday"}, {"until": "2025-13-01"}])
+def test_export_rejects_invalid_dates(api, params):
+    response = export(api, **params)
+    assert response.status_code == 400
+
+
+def test_lead_listing_pages_by_cursor(api, lead):
+    for i in range(3):
+        assert api.post("/api/leads", json=lead(email=f"guest{i}@example.com")).status_code == 200
+    first = api.get("/api/leads", params={"limit": 2}, headers=ADMIN)
+    second = api.get("/api/leads", params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]},
+                     headers=ADMIN)
+    assert len(first.json()) == 2
+    assert len(second.json()) == 1
+    assert "X-Next-Cursor" not in second.headers
+    assert {x["id"] for x in first.json()}.isdisjoint(x["id"] for x in second.json())
+    assert api.get("/api/leads", params={"cursor": "WzEsMl0"}, headers=ADMIN).status_code == 400
+
+
+def test_leads_need_the_admin_token(api, lead):
+    api.post("/api/leads", json=lead())
+    assert api.get("/api/leads").status_code == 401
+    assert api.get("/api/leads", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert api.get("/api/leads/export").status_code == 401
+    assert api.get("/api/leads/export", params={"format": "csv"}).status_code == 401
@@ -0,0 +1,57 @@
+from facets import FacetIndex, facet_key
+
+DOCS = [
+    {"id": "a", "category": "bar", "premium": True, "occasion": ["wedding", "corporate"]},
+    {"id": "b", "category": "bar", "premium": False, "occasion": ["wedding"]},
+    {"id": "c", "category": "lounge", "premium": True, "occasion": []},
+    {"id": "d", "category": "lounge", "premium": None},
+]
+
+
+def ids(docs):
+    return [doc["id"] for doc in docs]
+
+
+def test_match_ands_criteria_and_ignores_none():
+    index = FacetIndex(DOCS, ["category", "premium", "occasion"])
+    assert ids(index.filter(category="bar")) == ["a", "b"]
+    assert ids(index.filter(category="bar", premium=True)) == ["a"]
+    assert ids(index.filter(category=None, premium=True)) == ["a", "c"]
+    assert index.match(category="bar", premium=True, occasion="birthday") == 0
+
+
+def test_list_fields_post_every_element():
+    index = FacetIndex(DOCS, ["occasion"])
+    assert ids(index.filter(occasion="wedding")) == ["a", "b"]
+    assert ids(index.filter(occasion="corporate")) == ["a"]
+
+
+def test_select_keeps_catalog_order_and_limit():
+    index = FacetIndex(DOCS, ["category"])
+    assert ids(index.select(index.all)) == ["a", "b", "c", "d"]
+    assert ids(index.select(index.all, limit=3)) == ["a", "b", "c"]
+    assert index.select(0) == []
+
+
+def test_counts_within_mask():
+    index = FacetIndex(DOCS, ["category", "premium"])
+    assert index.counts() == {
+        "category": {"bar": 2, "lounge": 2},
+        "premium": {"true": 2, "false": 1},
+    }
+    assert index.counts(index.match(premium=True)) == {
+        "category": {"bar": 1, "lounge": 1},
+        "premium": {"true": 2},
+    }
+
+
+def test_empty_catalog():
+    index = FacetIndex([], ["category"])
+    assert index.filter(category="bar") == []
+    assert index.counts() == {"category": {}}
+
+
+def test_facet_key():
+    assert facet_key(True) == "true"
+    assert facet_key(False) == "false"
+    assert facet_key(3) == "3"
@@ -0,0 +1,40 @@
+import base64
+import json
+
+import pytest
+
+
+def pages(api, **params):
+    cursor = None
+    while True:
+        response = api.get("/api/gallery", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        yield response.json()
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return
+
+
+def test_cursor_paging_covers_the_gallery_once(api):
+    total = api.get("/api/gallery/facets").json()["total"]
+    large = [item["id"] for page in pages(api, limit=100) for item in page]
+    small = [item["id"] for page in pages(api, limit=7) for item in page]
+    assert len(large) == total > 100
+    assert small == large
+    assert len(set(small)) == total
+
+
+def test_category_filter_and_facets(api):
+    counts = api.get("/api/gallery/facets").json()["facets"]["category"]
+    category, count = next(iter(counts.items()))
+    items = [item for page in pages(api, category=category, limit=2) for item in page]
+    assert len(items) == count
+    assert {item["category"] for item in items} == {category}
+
+
+@pytest.mark.parametrize("value", [[1, 2, 3], ["a", None, "c"], ["a", "b"], {"a": 1}])
+def test_malformed_cursor_is_a_bad_request(api, value):
+    cursor = base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+    response = api.get("/api/gallery", params={"cursor": cursor})
+    assert response.status_code == 400
+    assert api.get("/api/gallery", params={"cursor": "%%%"}).status_code == 400
@@ -0,0 +1,81 @@
+import string
+
+import pytest
+
+import hashtags
+from hashtags import FAMILIES, GROUPS, _blend, _expand, generate, normalize_name
+
+
+def render(template, **values):
+    """What a template reads as, or None when it needs a slot without a value."""
+    slots = [field for _, field, _, _ in string.Formatter().parse(template) if field]
+    if not all(values.get(slot) for slot in slots):
+        return None
+    return template.format(**values)
+
+
+@pytest.mark.parametrize("year", [2026, None])
+def test_trie_renders_every_template(year):
+    values = {"a": "Priya", "b": "Rahul", "a1": "P", "b1": "R", "blend": "Prihul",
+              "year": str(year) if year else None, "yy": f"{year % 100:02d}" if year else None}
+    expanded = _expand("Priya", "Rahul", year)
+    for family, templates in FAMILIES.items():
+        expected = [(i, render(t, **values)) for i, t in enumerate(templates) if render(t, **values)]
+        assert sorted(expanded[family]) == expected
+    assert any("{year}" in t for t in FAMILIES["elegant"])
+
+
+def test_templates_share_trie_prefixes():
+    after_a = hashtags._TRIE.children[("slot", "a")]
+    assert ("slot", "b") in after_a.children
+    terminals = []
+    stack = [hashtags._TRIE]
+    while stack:
+        node = stack.pop()
+        terminals.extend(node.terminals)
+        stack.extend(node.children.values())
+    assert len(terminals) == sum(len(templates) for templates in FAMILIES.values())
+
+
+def test_names_and_blend():
+    assert normalize_name("  anya  d'souza ") == "AnyaDsouza"
+    assert normalize_name("42 !!") == ""
+    assert _blend("Priya", "Rahul") == "Prihul"
+
+
+@pytest.mark.parametrize("vibe", ["classic", "fun", "filmy", "minimal"])
+def test_tags_are_unique_across_groups(vibe):
+    result = generate("Priya", "Rahul", vibe, 2026, 20)
+    tags = [tag.lower() for group in GROUPS for tag in result[group]]
+    assert len(tags) == len(set(tags))
+    assert all(len(result[group]) <= 20 for group in GROUPS)
+    assert set(result["top"]) <= {tag for group in GROUPS for tag in result[group]}
+    assert all(tag.startswith("#") for tag in tags)
+
+
+def test_given_name_order_ranks_first():
+    result = generate("Priya", "Rahul", "minimal", None, 4)
+    assert result["short"][0] == "#PriyaRahul"
+    assert "#RahulPriya" not in result["top"]
+
+
+def test_filmy_vibe_swaps_the_themed_group():
+    assert any("Shaadi" in tag or "Baraat" in tag or "DDLJ" in tag
+               for tag in generate("Priya", "Rahul", "filmy", None, 20)["themed"])
+
+
+def test_results_are_memoized():
+    assert generate("Asha", "Dev", "fun", None, 8) is generate("Asha", "Dev", "fun", None, 8)
+    assert generate("!!", "Dev") == {**{group: () for group in GROUPS}, "top": ()}
+
+
+def test_hashtag_endpoints(api):
+    response = api.post("/api/tools/hashtags", json={"name1": "Priya", "name2": "Rahul", "year": 2026})
+    assert response.status_code == 200
+    assert response.json()["top"]
+    assert api.post("/api/tools/hashtags", json={"name1": "123", "name2": "Rahul"}).status_code == 400
+    batch = api.post("/api/tools/hashtags/batch", json={"couples": [
+        {"name1": "Priya", "name2": "Rahul"}, {"name1": "123", "name2": "Rahul"}]})
+    assert batch.status_code == 200
+    first, second = batch.json()["results"]
+    assert first["top"] and second["top"] == []
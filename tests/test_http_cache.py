@@ -0,0 +1,96 @@
+import gzip
+import json
+
+import pytest
+from starlette.requests import Request
+
+from http_cache import MIN_COMPRESS_SIZE, BodyCache, CachedBody, brotli, conditional_response
+
+BIG = json.dumps([{"name": f"Setup {i}", "description": "Copper bar with a smoked glass back"}
+                  for i in range(40)]).encode()
+
+
+def request(**headers):
+    return Request({"type": "http", "method": "GET", "path": "/", "query_string": b"",
+                    "headers": [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()]})
+
+
+def test_small_bodies_are_not_compressed():
+    body = CachedBody(b"[]")
+    assert list(body.encodings) == ["identity"]
+    assert len(BIG) >= MIN_COMPRESS_SIZE
+
+
+def test_each_encoding_has_its_own_etag():
+    body = CachedBody(BIG)
+    assert gzip.decompress(body.encodings["gzip"]) == BIG
+    tags = {body.tag(encoding) for encoding in body.encodings}
+    assert len(tags) == len(body.encodings)
+    assert body.tag("identity") == body.etag
+    assert body.tag("gzip") == body.etag[:-1] + '-gzip"'
+
+    plain = conditional_response(request(), body)
+    zipped = conditional_response(request(accept_encoding="gzip;q=1, br;q=0"), body)
+    assert plain.headers["ETag"] == body.etag
+    assert "content-encoding" not in plain.headers
+    assert zipped.headers["ETag"] == body.tag("gzip")
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert zipped.body == body.encodings["gzip"]
+    for response in (plain, zipped):
+        assert response.headers["Vary"] == "Accept-Encoding"
+
+
+@pytest.mark.skipif(brotli is None, reason="brotli is optional")
+def test_brotli_is_preferred():
+    body = CachedBody(BIG)
+    response = conditional_response(request(accept_encoding="gzip, deflate, br"), body)
+    assert response.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(response.body) == BIG
+
+
+def test_fast_bodies_keep_the_etag():
+    assert CachedBody(BIG, fast=True).etag == CachedBody(BIG).etag
+
+
+@pytest.mark.parametrize("if_none_match", ["*", "{etag}", 'W/{etag}', '"other", {gzip}'])
+def test_if_none_match_gives_304(if_none_match):
+    body = CachedBody(BIG)
+    header = if_none_match.format(etag=body.etag, gzip=body.tag("gzip"))
+    response = conditional_response(request(if_none_match=header), body, "public, max-age=60")
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["ETag"] == body.etag
+    assert response.headers["Cache-Control"] == "public, max-age=60"
+
+
+def test_stale_etag_gets_the_body():
+    response = conditional_response(request(if_none_match='"stale"'), CachedBody(BIG))
+    assert response.status_code == 200
+    assert response.body == BIG
+
+
+def test_body_cache_evicts_least_recently_used():
+    cache = BodyCache(maxsize=2)
+    built = []
+
+    def build(key):
+        built.append(key)
+        return CachedBody(key.encode())
+
+    a = cache.get_or_build("a", lambda: build("a"))
+    cache.get_or_build("b", lambda: build("b"))
+    assert cache.get_or_build("a", lambda: build("a")) is a  # "a" is now the most recent
+    cache.get_or_build("c", lambda: build("c"))
+    assert len(cache) == 2
+    cache.get_or_build("a", lambda: build("a"))
+    cache.get_or_build("b", lambda: build("b"))
+    assert built == ["a", "b", "c", "b"]
+
+
+def test_catalog_endpoint_revalidates(api):
+    first = api.get("/api/setups", headers={"Accept-Encoding": "gzip"})
+    assert first.status_code == 200
+    assert first.headers["Vary"] == "Accept-Encoding"
+    again = api.get("/api/setups", headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.headers["Cache-Control"] == first.headers["Cache-Control"]
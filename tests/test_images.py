@@ -0,0 +1,78 @@
+import pytest
+
+from images import ImagePipeline, build_derivatives
+
+pytest.importorskip("PIL")
+
+
+@pytest.fixture
+def source(tmp_path):
+    from PIL import Image
+
+    path = tmp_path / "public" / "gallary-images" / "bar.png"
+    path.parent.mkdir(parents=True)
+    Image.new("RGB", (400, 200), (180, 90, 30)).save(path)
+    return path
+
+
+@pytest.fixture
+def pipeline(tmp_path, source):
+    return ImagePipeline(tmp_path / "public", tmp_path / "cache", widths=(100, 320, 640), formats=("jpeg",))
+
+
+def build(pipeline, path, **overrides):
+    settings = {"widths": pipeline.widths, "formats": pipeline.formats, "quality": pipeline.quality, **overrides}
+    return build_derivatives(str(path), str(pipeline.cache_dir), settings["widths"], settings["formats"],
+                             settings["quality"])
+
+
+def test_derivatives_are_content_addressed(pipeline, source, monkeypatch):
+    meta = build(pipeline, source)
+    assert meta["widths"] == [100, 320, 400]  # never upscaled past the original
+    assert (meta["width"], meta["height"]) == (400, 200)
+    assert pipeline.derivative_path(meta["digest"], "320.jpeg").is_file()
+
+    # Same bytes and settings: served from meta.json without decoding the image
+    monkeypatch.setattr("PIL.Image.open", lambda *args: pytest.fail("re-encoded a cached image"))
+    assert build(pipeline, source) == meta
+    monkeypatch.undo()
+
+    assert build(pipeline, source, quality=50)["digest"] != meta["digest"]
+    source.write_bytes(source.read_bytes() + b"\0")
+    assert build(pipeline, source)["digest"] != meta["digest"]
+
+
+@pytest.mark.parametrize("digest, name", [
+    ("../../../../etc", "passwd"),
+    ("0123456789abcdef01234567", "../meta.json"),
+    ("0123456789abcdef01234567", "meta.json"),
+    ("0123456789abcdef01234567", "320.png"),
+    ("0123456789abcdef01234567/..", "320.jpeg"),
+    ("0123456789ABCDEF01234567", "320.jpeg"),
+    ("0123456789abcdef", "320.jpeg"),
+])
+def test_derivative_path_rejects_anything_but_a_derivative(pipeline, digest, name):
+    assert pipeline.derivative_path(digest, name) is None
+
+
+def test_derivative_path_needs_the_file(pipeline):
+    assert pipeline.derivative_path("0123456789abcdef01234567", "320.jpeg") is None
+
+
+@pytest.mark.parametrize("url", [
+    "/../cache/x.png", "/gallary-images/../../secret.png", "/%2e%2e/secret.png",
+    "//evil.example.com/bar.png", "https://example.com/bar.png", "/gallary-images/notes.txt",
+])
+def test_sources_stay_under_the_public_directory(pipeline, url):
+    assert pipeline._source(url) is None
+    assert pipeline.lookup(url) is None
+
+
+def test_source_resolves_url_encoding(pipeline, source):
+    assert pipeline._source("/gallary-images/bar.png?v=2") == source.resolve()
+    assert pipeline._source("/gallary-images/b%61r.png") == source.resolve()
+
+
+def test_image_route_404s_on_bad_names(api):
+    assert api.get("/api/images/0123456789abcdef01234567/meta.json").status_code == 404
+    assert api.get("/api/images/0123456789abcdef01234567/..%2Fmeta.json").status_code == 404
@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+
+from prometheus_client import REGISTRY
+
+from metrics import MongoCommandMetrics, MongoPoolMetrics
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def command_event(name, command, request_id, duration_micros=1500):
+    return SimpleNamespace(command_name=name, command=command, connection_id=("localhost", 27017),
+                           request_id=request_id, duration_micros=duration_micros)
+
+
+def test_requests_are_labelled_by_route_template(api):
+    labels = {"method": "GET", "route": "/api/setups/{slug}", "status": "404"}
+    before = sample("hqd_http_requests_total", **labels)
+    assert api.get("/api/setups/no-such-setup").status_code == 404
+    assert api.get("/api/setups/another-missing-one").status_code == 404
+    assert sample("hqd_http_requests_total", **labels) == before + 2
+    assert sample("hqd_http_requests_total", method="GET", route="/api/setups/no-such-setup", status="404") == 0
+    unmatched = {"method": "GET", "route": "unmatched", "status": "404"}
+    before = sample("hqd_http_requests_total", **unmatched)
+    api.get("/no/such/route")
+    assert sample("hqd_http_requests_total", **unmatched) == before + 1
+    assert sample("hqd_http_requests_in_flight", method="GET") == 0
+
+
+def test_metrics_exposes_mongo_collectors(api):
+    commands = MongoCommandMetrics()
+    commands.started(command_event("find", {"find": "leads"}, 1))
+    commands.succeeded(command_event("find", {"find": "leads"}, 1))
+    commands.started(command_event("getMore", {"getMore": 7, "collection": "leads"}, 2))
+    commands.failed(command_event("getMore", {"getMore": 7, "collection": "leads"}, 2))
+    commands.started(command_event("ping", {"ping": 1}, 3))
+    commands.succeeded(command_event("ping", {"ping": 1}, 3))
+
+    pool = MongoPoolMetrics()
+    pool.connection_created(None)
+    pool.connection_checked_out(None)
+    try:
+        text = api.get("/metrics").text
+    finally:
+        pool.connection_checked_in(None)
+        pool.connection_closed(None)
+
+    assert 'hqd_mongo_command_duration_seconds_count{collection="leads",command="find"}' in text
+    assert 'hqd_mongo_command_failures_total{collection="leads",command="getMore"}' in text
+    assert 'hqd_mongo_command_duration_seconds_count{collection="-",command="ping"}' in text
+    assert "hqd_mongo_pool_connections_open 1.0" in text
+    assert "hqd_mongo_pool_connections_in_use 1.0" in text
+    assert "hqd_catalog_cache_hits_total" in text
+
+
+def test_health_is_503_when_mongo_is_unreachable(api, server, monkeypatch):
+    assert api.get("/api/health").json()["status"] == "healthy"
+
+    async def ping(*args, **kwargs):
+        raise ConnectionError("no primary")
+
+    monkeypatch.setattr(server.db, "command", ping)
+    response = api.get("/api/health")
+    assert response.status_code == 503
+    assert response.json()["status"] == "unhealthy"
+    assert response.json()["mongo"]["status"] == "unavailable"
+    assert response.json()["mongo"]["error"] == "ConnectionError"
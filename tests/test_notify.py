@@ -0,0 +1,69 @@
+import httpx
+import pytest
+
+from notify import ChatWebhook, DeliveryError, Fanout, FakeTransport, HttpPool, MessagingWebhook, ResendEmail, \
+    slack_escape
+from outbox import EmailMessage
+
+pytestmark = pytest.mark.anyio
+
+MESSAGE = EmailMessage(subject="New inquiry", html="<p>Hi</p>", to=["ops@example.com"], sender="hq@example.com",
+                       lead_ids=["lead-1"], text="New inquiry from <Asha> & co")
+
+
+async def test_channels_share_one_client():
+    transport = FakeTransport(latency=0)
+    pool = HttpPool(transport=transport)
+    try:
+        assert await ResendEmail(pool, "key").send(MESSAGE) == "fake-1"
+        await ChatWebhook(pool, "https://hooks.example.com/chat").send(MESSAGE)
+        await MessagingWebhook(pool, "https://sms.example.com/send", ["+911", "+912"], token="t").send(MESSAGE)
+        client = pool.client
+        assert pool.client is client
+    finally:
+        await pool.close()
+    requests = list(transport.requests)
+    assert [host for host, _ in requests] == ["api.resend.com", "hooks.example.com", "sms.example.com",
+                                              "sms.example.com"]
+    assert requests[0][1]["html"] == "<p>Hi</p>"
+    assert requests[1][1] == {"text": "New inquiry from &lt;Asha&gt; &amp; co"}
+    assert {payload["to"] for _, payload in requests[2:]} == {"+911", "+912"}
+
+
+async def test_http_errors_raise():
+    pool = HttpPool(transport=FakeTransport(latency=0, failure_rate=1.0))
+    try:
+        with pytest.raises(DeliveryError, match="503"):
+            await ResendEmail(pool, "key").send(MESSAGE)
+    finally:
+        await pool.close()
+
+
+class Channel:
+    def __init__(self, name, fail=False):
+        self.name = name
+        self.fail = fail
+        self.sent = []
+
+    async def send(self, message):
+        if self.fail:
+            raise httpx.ConnectError("unreachable")
+        self.sent.append(message)
+        return f"{self.name}-id"
+
+
+async def test_fanout_only_the_primary_decides():
+    primary, chat, sms = Channel("email"), Channel("chat", fail=True), Channel("sms")
+    fanout = Fanout(primary, [chat, sms])
+    assert await fanout.send(MESSAGE) == "email-id"
+    assert fanout.stats() == {"channels": "email+chat+sms", "sent": {"chat": 0, "sms": 1},
+                              "failed": {"chat": 1, "sms": 0}}
+
+    down = Fanout(Channel("email", fail=True), [sms])
+    with pytest.raises(httpx.ConnectError):
+        await down.send(MESSAGE)
+    assert len(sms.sent) == 1  # Extras wait for the primary, so a retry doesn't repeat them
+
+
+def test_slack_escape():
+    assert slack_escape("<@here> & <http://x|y>") == "&lt;@here&gt; &amp; &lt;http://x|y&gt;"
@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from outbox import EmailMessage, EmailProvider, OutboxDispatcher, new_notification
+
+pytestmark = pytest.mark.anyio
+
+
+class RecordingProvider(EmailProvider):
+    name = "recording"
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.messages = []
+
+    async def send(self, message):
+        if self.fail:
+            raise RuntimeError("provider down")
+        self.messages.append(message)
+        return f"msg-{len(self.messages)}"
+
+
+def render(docs):
+    for doc in docs:
+        if doc.get("bad"):
+            raise ValueError("unrenderable")
+    return EmailMessage(subject=f"{len(docs)} lead(s)", html="", to=["ops@example.com"], sender="hq@example.com",
+                        lead_ids=[doc["id"] for doc in docs])
+
+
+@pytest.fixture
+def leads(mongo):
+    return mongo.leads
+
+
+async def add(leads, lead_id, **fields):
+    await leads.insert_one({"id": lead_id, "notify": new_notification(), **fields})
+
+
+def dispatcher(leads, provider, **options):
+    return OutboxDispatcher(leads, provider, render, rate_per_sec=0, **options)
+
+
+async def notify(leads, lead_id):
+    return (await leads.find_one({"id": lead_id}))["notify"]
+
+
+async def test_delivers_and_marks_sent(leads):
+    await add(leads, "a")
+    provider = RecordingProvider()
+    outbox = dispatcher(leads, provider)
+    assert await outbox.run_once() == 1
+    state = await notify(leads, "a")
+    assert state["status"] == "sent"
+    assert state["provider_id"] == "msg-1"
+    assert "lease_until" not in state
+    assert await outbox.run_once() == 0
+    assert outbox.stats()["leads_sent"] == 1
+
+
+async def test_backlog_is_folded_into_digests(leads):
+    for lead_id in "abc":
+        await add(leads, lead_id)
+    provider = RecordingProvider()
+    outbox = dispatcher(leads, provider, digest_size=2)
+    assert await outbox.run_once() == 2
+    assert await outbox.run_once() == 1
+    assert [m.lead_ids for m in provider.messages] == [["a", "b"], ["c"]]
+
+
+async def test_failed_send_is_retried_with_backoff(leads):
+    await add(leads, "a")
+    outbox = dispatcher(leads, RecordingProvider(fail=True), base_backoff=60)
+    await outbox.run_once()
+    state = await notify(leads, "a")
+    assert state["status"] == "pending"
+    assert state["attempts"] == 1
+    assert state["last_error"] == "provider down"
+    assert state["next_attempt_at"] > datetime.now(timezone.utc) + timedelta(seconds=30)
+    # Not due yet
+    assert await outbox.run_once() == 0
+
+
+async def test_last_attempt_fails_permanently(leads):
+    await add(leads, "a")
+    outbox = dispatcher(leads, RecordingProvider(fail=True), max_attempts=1)
+    await outbox.run_once()
+    assert (await notify(leads, "a"))["status"] == "failed"
+    assert outbox.stats()["failed"] == 1
+
+
+async def test_render_failure_does_not_hold_back_the_digest(leads):
+    await add(leads, "a")
+    await add(leads, "b", bad=True)
+    await add(leads, "c")
+    provider = RecordingProvider()
+    outbox = dispatcher(leads, provider, digest_size=3)
+    assert await outbox.run_once() == 3
+    assert [m.lead_ids for m in provider.messages] == [["a"], ["c"]]
+    state = await notify(leads, "b")
+    assert state["status"] == "pending"
+    assert state["last_error"].startswith("render failed")
+
+
+async def test_expired_lease_is_reclaimed_until_max_attempts(leads):
+    expired = datetime.now(timezone.utc) - timedelta(seconds=1)
+    await leads.insert_one({"id": "retry", "notify": {
+        "status": "sending", "attempts": 1, "lease_until": expired, "next_attempt_at": expired}})
+    await leads.insert_one({"id": "dead", "notify": {
+        "status": "sending", "attempts": 3, "lease_until": expired, "next_attempt_at": expired}})
+    provider = RecordingProvider()
+    outbox = dispatcher(leads, provider, max_attempts=3)
+    assert await outbox.run_once() == 1
+    assert provider.messages[0].lead_ids == ["retry"]
+    assert (await notify(leads, "retry"))["attempts"] == 2
+    state = await notify(leads, "dead")
+    assert state["status"] == "failed"
+    assert state["last_error"] == "lease expired on attempt 3"
+
+
+async def test_dispatcher_only_claims_its_lane(leads):
+    await add(leads, "standard")
+    await leads.insert_one({"id": "fast", "notify": new_notification(lane="fast")})
+    provider = RecordingProvider()
+    fast = dispatcher(leads, provider, lane="fast")
+    assert await fast.run_once() == 1
+    assert provider.messages[0].lead_ids == ["fast"]
+    assert (await notify(leads, "standard"))["status"] == "pending"
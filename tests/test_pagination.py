@@ -0,0 +1,45 @@
+import base64
+import json
+
+import pytest
+
+from pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_filter
+
+
+def raw_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(["2025-01-01T00:00:00+00:00", "lead-1"])
+    assert "=" not in cursor
+    assert decode_cursor(cursor, (str, str)) == ["2025-01-01T00:00:00+00:00", "lead-1"]
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    raw_cursor({"a": 1}),
+    raw_cursor(["only one"]),
+    raw_cursor([1, 2, 3]),
+    raw_cursor(["a", None, "c"]),
+    raw_cursor([True, "b", "c"]),
+])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, (str, str, str))
+
+
+def test_cursor_types_can_be_mixed():
+    assert decode_cursor(encode_cursor([3, "x"]), (int, str)) == [3, "x"]
+    with pytest.raises(InvalidCursor):
+        decode_cursor(encode_cursor(["3", "x"]), (int, str))
+
+
+def test_keyset_filter():
+    sort = [("created_at", -1), ("id", -1)]
+    assert keyset_filter(sort, None) == {}
+    assert keyset_filter(sort, ["t", "i"]) == {"$or": [
+        {"created_at": {"$lt": "t"}},
+        {"created_at": "t", "id": {"$lt": "i"}},
+    ]}
+    assert keyset_filter([("category", 1)], ["bar"]) == {"$or": [{"category": {"$gt": "bar"}}]}
@@ -0,0 +1,104 @@
+import json
+import re
+from xml.etree import ElementTree
+
+import pytest
+
+from prerender import STATIC_ROUTES, PrerenderCache, Shell, drink_paths
+
+pytestmark = pytest.mark.anyio
+
+SITE = "https://example.com"
+HOSTILE = '<!--<script></script><script>alert("x")</script>'
+
+
+def setup(slug, **fields):
+    return {"slug": slug, "title": slug.replace("-", " ").title(), "description": "A bar.",
+            "best_for": "Weddings", "occasion": ["wedding"], "menu_highlights": ["Negroni"],
+            "image_url": f"/gallary-images/{slug}.webp", **fields}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PrerenderCache(tmp_path, SITE + "/", Shell(None))
+
+
+def html_files(cache):
+    return sorted(path.name for path in cache.directory.glob("*.html"))
+
+
+async def test_only_changed_records_are_re_rendered(cache, tmp_path):
+    docs = [setup("copper-bar"), setup("mirror-bar")]
+    assert await cache.sync("setups", docs, 1) == {"rendered": 2, "removed": 0, "unchanged": 0}
+    assert await cache.sync("setups", docs, 1) is None  # version already synced
+    first = html_files(cache)
+
+    docs[1] = setup("mirror-bar", description="Now with a glass top.")
+    assert await cache.sync("setups", docs, 2) == {"rendered": 1, "removed": 0, "unchanged": 1}
+    assert len(html_files(cache)) == 2 and html_files(cache) != first
+
+    # A restart reads the manifest and renders nothing
+    restarted = PrerenderCache(tmp_path, SITE, Shell(None))
+    assert await restarted.sync("setups", docs, 1) == {"rendered": 0, "removed": 0, "unchanged": 2}
+    assert await restarted.sync("setups", docs[:1], 2) == {"rendered": 0, "removed": 1, "unchanged": 1}
+    assert restarted.lookup("/bar-setups/mirror-bar") is None
+    path, digest = restarted.lookup("/bar-setups/copper-bar/")
+    assert path.name == f"{digest}.html"
+    assert len(html_files(restarted)) == 1
+
+
+async def test_a_new_shell_re_renders(cache, tmp_path):
+    await cache.sync("setups", [setup("copper-bar")], 1)
+    shell = Shell('<html><head><title>HQ.D</title></head><body><div id="root"></div></body></html>')
+    assert (await PrerenderCache(tmp_path, SITE, shell).sync("setups", [setup("copper-bar")], 1))["rendered"] == 1
+
+
+async def test_record_fields_are_escaped(cache):
+    doc = setup("copper-bar", title=HOSTILE, description='Say "cheers" & <b>toast</b>',
+                image_url='/x.webp" onerror="alert(1)')
+    await cache.sync("setups", [doc], 1)
+    path, _ = cache.lookup("/bar-setups/copper-bar")
+    page = path.read_text(encoding="utf-8")
+
+    assert "<script>alert" not in page and "<!--" not in page
+    assert page.count("<script") == 2  # the two JSON-LD blocks
+    assert '<meta name="description" content="Say &quot;cheers&quot; &amp; &lt;b&gt;toast&lt;/b&gt;" />' in page
+    assert 'onerror="alert' not in page
+    assert f"<h1>{HOSTILE}</h1>" not in page
+
+    blocks = re.findall(r'<script type="application/ld\+json">(.*?)</script>', page, re.S)
+    service = json.loads(blocks[0])
+    assert service["name"] == HOSTILE  # round-trips once the escaped "<" is decoded
+    assert service["url"] == SITE + "/bar-setups/copper-bar"
+    assert json.loads(blocks[1])["itemListElement"][-1]["name"] == HOSTILE
+
+
+async def test_sitemap_lists_static_and_catalog_pages(cache):
+    await cache.sync("setups", [setup("copper-bar"), setup("bar-&-co")], 1)
+    body, digest = cache.sitemap()
+    assert cache.sitemap() == (body, digest)
+    ns = {"s": "http://www.sitemaps.org/schemas/sitemap/0.9", "i": "http://www.google.com/schemas/sitemap-image/1.1"}
+    urls = ElementTree.fromstring(body).findall("s:url", ns)
+    locs = [url.findtext("s:loc", namespaces=ns) for url in urls]
+    assert locs[:len(STATIC_ROUTES)] == [SITE + path for path, *_ in STATIC_ROUTES]
+    assert locs[len(STATIC_ROUTES):] == [SITE + "/bar-setups/bar-&-co", SITE + "/bar-setups/copper-bar"]
+    page = urls[-1]
+    assert page.findtext("s:priority", namespaces=ns) == "0.8"
+    assert page.findtext("i:image/i:loc", namespaces=ns) == SITE + "/gallary-images/copper-bar.webp"
+    listing = urls[[path for path, *_ in STATIC_ROUTES].index("/bar-setups")]
+    assert listing.findtext("s:lastmod", namespaces=ns) == page.findtext("s:lastmod", namespaces=ns)
+
+    await cache.sync("setups", [setup("copper-bar")], 2)
+    assert cache.sitemap()[1] != digest
+
+
+def test_duplicate_drink_names_get_distinct_paths():
+    docs = [{"id": "1", "name": "Old Fashioned"}, {"id": "2", "name": "Old Fashioned"}, {"id": "3", "name": "Mojito"}]
+    assert drink_paths(docs) == ["/menus/old-fashioned-1", "/menus/old-fashioned-2", "/menus/mojito"]
+
+
+def test_prerender_routes(api):
+    assert api.get("/prerender/bar-setups/no-such-setup").status_code == 404
+    sitemap = api.get("/sitemap.xml")
+    assert sitemap.status_code == 200
+    assert "<urlset" in sitemap.text
@@ -0,0 +1,123 @@
+import copy
+import math
+
+import pytest
+
+from pricing import DEFAULT_RATE_CARD, MAX_GUESTS, TIERS, RateCard, parse_budget, parse_guests, parse_hours
+
+ADMIN = {"Authorization": "Bearer test-admin-token"}
+
+
+@pytest.mark.parametrize("text, guests", [
+    ("Up to 50", 50), ("50-100", 100), ("500+", 600), ("1,000", 1000), ("", math.nan), (None, math.nan),
+])
+def test_parse_guests(text, guests):
+    assert parse_guests(text) == pytest.approx(guests, nan_ok=True)
+
+
+def test_parse_hours_and_budget():
+    assert parse_hours("4-5 hrs") == 5
+    assert math.isnan(parse_hours("all night"))
+    assert math.isnan(parse_hours("48 hours"))
+    assert parse_budget("₹3-5 Lakhs") == 500000
+    assert parse_budget("₹10 Lakhs+") == math.inf
+    assert parse_budget("1 Cr") == 1e7
+    assert math.isnan(parse_budget("Flexible"))
+
+
+def test_small_home_city_event():
+    card = RateCard(DEFAULT_RATE_CARD)
+    good = card.quote({"guest_count": "50", "bar_type": "cocktail", "city": "Delhi"})["tiers"][0]
+    # 25,000 base + 2 bartenders x 4 h x 1,500 + 50 x 450, plus 18% tax, to the nearest 1,000
+    assert good["breakdown"] == {"base": 25000, "staff": 12000, "consumables": 22500, "molecular": 0, "travel": 0}
+    assert good["subtotal"] == 59500
+    assert good["total"] == 70000
+
+
+def test_outstation_molecular_and_overtime():
+    card = RateCard(DEFAULT_RATE_CARD)
+    home = card.quote({"guest_count": "100", "city": "Delhi"})
+    away = card.quote({"guest_count": "100", "city": "Goa", "duration": "8 hours",
+                       "message": "molecular shots please"})
+    assert away["outstation"] and away["molecular"]
+    for near, far in zip(home["tiers"], away["tiers"]):
+        assert far["breakdown"]["travel"] > 0
+        assert far["total"] > near["total"]
+    # Good includes 4 hours; the other 4 are billed at 1.5x
+    assert away["tiers"][0]["breakdown"]["staff"] == 2 * 1500 * (4 + 4 * 1.5)
+
+
+def test_budget_picks_the_highest_tier_that_fits():
+    card = RateCard(DEFAULT_RATE_CARD)
+    totals = [tier["total"] for tier in card.quote({"guest_count": "150"})["tiers"]]
+    quote = card.quote({"guest_count": "150", "budget_range": str(totals[2])})
+    assert (quote["recommended"], quote["within_budget"]) == ("best", True)
+    quote = card.quote({"guest_count": "150", "budget_range": "1000"})
+    assert (quote["recommended"], quote["within_budget"]) == ("good", False)
+    assert card.quote({"guest_count": "1000"})["recommended"] == "ultra"
+
+
+def test_batch_estimates_match_single_quotes():
+    card = RateCard(DEFAULT_RATE_CARD)
+    leads = [
+        {"guest_count": "Up to 50", "city": "Noida"},
+        {"guest_count": "300-500", "city": "Mumbai", "bar_type": "mocktail", "budget_range": "₹5-10 Lakhs"},
+        {"guest_count": "500+", "duration": "10 hours", "theme": "Molecular lab"},
+    ]
+    for lead, estimate in zip(leads, card.estimate_leads(leads)):
+        quote = card.quote(lead)
+        assert estimate["totals"] == {tier["tier"]: tier["total"] for tier in quote["tiers"]}
+        assert estimate["recommended"] == quote["recommended"]
+        assert estimate["within_budget"] == quote["within_budget"]
+    assert card.estimate_leads([]) == []
+
+
+def test_absurd_guest_counts_are_clamped():
+    card = RateCard(DEFAULT_RATE_CARD)
+    huge, capped, unknown = card.estimate_leads([
+        {"guest_count": "9" * 400}, {"guest_count": str(MAX_GUESTS)}, {"guest_count": None},
+    ])
+    assert huge["totals"] == unknown["totals"]  # "9" * 400 parses as inf
+    assert all(0 < total for total in capped["totals"].values())
+    assert card.quote({"guest_count": "9" * 39})["guests"] == MAX_GUESTS
+
+
+def test_lead_guest_count_is_bounded(api, lead):
+    assert api.post("/api/leads", json=lead(guest_count="9" * 41)).status_code == 422
+
+
+def test_invalid_rate_card():
+    card = copy.deepcopy(DEFAULT_RATE_CARD)
+    card["base_fee"] = card["base_fee"][:2]
+    with pytest.raises(ValueError):
+        RateCard(card)
+
+
+def test_quote_endpoint(api):
+    response = api.post("/api/quotes/estimate", json={"guest_count": "100-200", "city": "Pune"})
+    assert response.status_code == 200
+    quote = response.json()
+    assert [tier["tier"] for tier in quote["tiers"]] == list(TIERS)
+    assert quote["outstation"] is True
+
+
+def test_estimate_is_stored_but_not_returned(api, lead):
+    created = api.post("/api/leads", json=lead(budget_range="₹3-5 Lakhs"))
+    assert created.status_code == 200
+    assert "estimate" not in created.json()
+    stored, = api.get("/api/leads", headers=ADMIN).json()
+    assert stored["estimate"]["rate_card"] == DEFAULT_RATE_CARD["version"]
+
+
+def test_reprice_needs_the_admin_token(api, lead):
+    api.post("/api/leads", json=lead())
+    assert api.post("/api/leads/reprice").status_code == 401
+    assert api.post("/api/leads/reprice", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    response = api.post("/api/leads/reprice", params={"force": True}, headers=ADMIN)
+    assert response.status_code == 200
+    assert response.json()["repriced"] == 1
+
+
+def test_reprice_is_disabled_without_a_token(api, server, monkeypatch):
+    monkeypatch.setattr(server, "ADMIN_TOKEN", "")
+    assert api.post("/api/leads/reprice", headers={"Authorization": "Bearer "}).status_code == 403
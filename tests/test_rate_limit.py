@@ -0,0 +1,88 @@
+import pytest
+from pymongo.errors import AutoReconnect
+
+import rate_limit
+from rate_limit import Limit, MemoryBackend, RateLimiter, TrustedProxies
+
+pytestmark = pytest.mark.anyio
+
+ADMIN = {"Authorization": "Bearer test-admin-token"}
+
+HOURLY = Limit("ip", rate=10 / 3600, burst=3)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    return now
+
+
+async def test_bucket_allows_a_burst_then_refills(clock):
+    backend = MemoryBackend()
+    assert [await backend.take("1.2.3.4", HOURLY) for _ in range(3)] == [0, 0, 0]
+    assert await backend.take("1.2.3.4", HOURLY) == pytest.approx(360)
+    # Other keys and other limits have their own buckets
+    assert await backend.take("5.6.7.8", HOURLY) == 0
+    assert await backend.take("1.2.3.4", Limit("email", HOURLY.rate, 1)) == 0
+    clock[0] += 360
+    assert await backend.take("1.2.3.4", HOURLY) == 0
+    assert await backend.take("1.2.3.4", HOURLY) > 0
+
+
+async def test_refill_is_capped_at_the_burst(clock):
+    backend = MemoryBackend()
+    await backend.take("k", HOURLY)
+    clock[0] += 10 * 3600
+    assert [await backend.take("k", HOURLY) for _ in range(4)][-1] > 0
+
+
+async def test_memory_backend_is_bounded(clock):
+    backend = MemoryBackend(max_keys=2)
+    for key in "abc":
+        await backend.take(key, HOURLY)
+    assert len(backend) == 2
+
+
+class BrokenBackend:
+    async def take(self, key, limit, cost=1.0):
+        raise AutoReconnect("mongo is down")
+
+
+async def test_limiter_fails_open():
+    limiter = RateLimiter(BrokenBackend(), [HOURLY])
+    assert await limiter.check("ip", "1.2.3.4") == 0
+    assert limiter.stats()["errors"] == 1
+
+
+def test_trusted_proxies():
+    proxies = TrustedProxies(["10.0.0.0/8", " ", "::1/128"])
+    # Through the ingress: the client is the last untrusted hop
+    assert proxies.client_ip("10.0.0.5", "6.6.6.6, 203.0.113.9, 10.0.0.7") == "203.0.113.9"
+    # A direct client can't choose its address with the header
+    assert proxies.client_ip("198.51.100.1", "203.0.113.9") == "198.51.100.1"
+    assert proxies.client_ip("10.0.0.5", None) == "10.0.0.5"
+    assert proxies.client_ip("10.0.0.5", "10.0.0.6") == "10.0.0.5"
+    assert proxies.client_ip("::1", "2001:db8::1") == "2001:db8::1"
+    assert proxies.client_ip(None, "203.0.113.9") == "unknown"
+    assert not proxies.trusted("testclient")
+
+
+def test_lead_form_is_limited_per_ip(api, lead):
+    statuses = [api.post("/api/leads", json=lead(email=f"guest{i}@example.com")).status_code for i in range(6)]
+    assert statuses == [200] * 5 + [429]
+    response = api.post("/api/leads", json=lead(email="late@example.com"))
+    assert int(response.headers["Retry-After"]) > 0
+
+
+def test_lead_form_is_limited_per_email(api, lead):
+    statuses = [api.post("/api/leads", json=lead(phone=f"+9198765432{i:02d}")).status_code for i in range(4)]
+    assert statuses == [200, 200, 200, 429]
+
+
+def test_bot_checks(api, server, lead):
+    assert api.post("/api/leads", json=lead(website="http://spam.example")).status_code == 400
+    assert api.post("/api/leads", json=lead(form_elapsed_ms=500)).status_code == 400
+    padded = lead(message="x" * server.LEAD_MAX_BODY_BYTES)
+    assert api.post("/api/leads", json=padded).status_code == 413
+    assert api.get("/api/leads", headers=ADMIN).json() == []
@@ -0,0 +1,99 @@
+from datetime import date, timedelta
+
+import pytest
+
+from scoring import DEFAULT_SCORING_RULES, ScoringPool, ScoringRules
+
+TODAY = date(2025, 6, 1)
+ADMIN = {"Authorization": "Bearer test-admin-token"}
+
+SPEC = {
+    "version": "t1",
+    "rules": [
+        {"name": "big", "when": {"guests": {"gte": 300}}, "points": 40},
+        {"name": "soon", "when": {"days_to_event": {"gte": 0, "lte": 30}}, "points": 30},
+        {"name": "goa wedding", "when": {"city": {"in": ["Goa"]}, "event_type": {"contains": "wedding"}},
+         "points": 20},
+        {"name": "no setup", "when": {"setup_interest": {"present": False}}, "points": -5},
+    ],
+    "tiers": [{"name": "hot", "min_score": 60}, {"name": "warm", "min_score": 20}, {"name": "cold"}],
+    "fast_lane": ["hot"],
+}
+
+
+def test_scores_tiers_and_reasons():
+    rules = ScoringRules(SPEC)
+    leads = [
+        {"guest_count": "300-500", "event_date": "2025-06-20", "city": "goa", "event_type": "Beach Wedding",
+         "setup_interest": "Floral bar"},
+        {"guest_count": "50", "event_date": "2025-06-10"},
+        {"guest_count": "500+", "event_date": "not a date"},
+        {},
+    ]
+    scores = rules.score_leads(leads, TODAY)
+    assert [(s["score"], s["tier"], s["fast_lane"]) for s in scores] == [
+        (90, "hot", True), (25, "warm", False), (35, "warm", False), (-5, "cold", False),
+    ]
+    assert scores[0]["reasons"] == ["big", "soon", "goa wedding"]
+    assert scores[0]["rules"] == "t1"
+    assert scores[0]["scored_on"] == "2025-06-01"
+    assert rules.score_leads([], TODAY) == []
+
+
+def test_tier_thresholds_are_inclusive():
+    rules = ScoringRules({**SPEC, "rules": [{"name": "flat", "when": {"guests": {"gte": 0}}, "points": 60}]})
+    assert rules.score_leads([{"guest_count": "10"}], TODAY)[0]["tier"] == "hot"
+
+
+@pytest.mark.parametrize("change", [
+    {"rules": []},
+    {"rules": [{"name": "x", "when": {"mood": {"in": ["happy"]}}, "points": 1}]},
+    {"rules": [{"name": "x", "when": {"guests": {"between": 1}}, "points": 1}]},
+    {"rules": [{"name": "x", "when": {"city": {"like": "goa"}}, "points": 1}]},
+    {"tiers": [{"name": "warm", "min_score": 20}, {"name": "hot", "min_score": 60}, {"name": "cold"}]},
+    {"tiers": [{"name": "hot"}, {"name": "cold"}]},
+])
+def test_invalid_rules(change):
+    with pytest.raises(ValueError):
+        ScoringRules({**SPEC, **change})
+
+
+def test_default_rules_compile():
+    rules = ScoringRules(DEFAULT_SCORING_RULES)
+    soon = (date.today() + timedelta(days=10)).isoformat()
+    score, = rules.score_leads([{"guest_count": "500+", "budget_range": "₹10 Lakhs+", "event_date": soon}])
+    assert score["tier"] == "hot"
+
+
+@pytest.mark.anyio
+async def test_pool_scores_large_batches_in_worker_processes():
+    rules = ScoringRules(SPEC)
+    leads = [{"guest_count": str(n * 50), "event_date": "2025-06-15"} for n in range(12)]
+    pool = ScoringPool(max_workers=1, inline_below=10)
+    try:
+        assert await pool.score(rules, leads, TODAY) == rules.score_leads(leads, TODAY)
+        assert pool.stats()["started"]
+        assert await pool.score(rules, leads[:2], TODAY) == rules.score_leads(leads[:2], TODAY)
+    finally:
+        await pool.close()
+
+
+def test_score_is_stored_but_not_returned(api, server, lead):
+    soon = (date.today() + timedelta(days=10)).isoformat()
+    created = api.post("/api/leads", json=lead(guest_count="500+", budget_range="₹10 Lakhs+", event_date=soon))
+    assert created.status_code == 200
+    assert "score" not in created.json()
+    replayed = api.post("/api/leads", json=lead(guest_count="500+", budget_range="₹10 Lakhs+", event_date=soon))
+    assert "score" not in replayed.json()
+    stored, = api.get("/api/leads", headers=ADMIN).json()
+    assert stored["score"]["tier"] == "hot"
+    doc = api.portal.call(server.db.leads.find_one, {"id": stored["id"]})
+    assert doc["notify"]["lane"] == "fast"
+
+
+def test_rescore_needs_the_admin_token(api, lead):
+    api.post("/api/leads", json=lead())
+    assert api.post("/api/leads/rescore").status_code == 401
+    response = api.post("/api/leads/rescore", params={"force": True}, headers=ADMIN)
+    assert response.status_code == 200
+    assert response.json()["rescored"] == 1
@@ -0,0 +1,83 @@
+import pytest
+
+from search import Segment, edit_distance, search, stem, tokenize
+
+DRINKS = [
+    {"id": "d1", "name": "Whisky Sour", "description": "Bourbon, lemon and egg white", "ingredients": ["bourbon"]},
+    {"id": "d2", "name": "Smoked Old Fashioned", "description": "Whiskey stirred over smoke"},
+    {"id": "d3", "name": "Berry Mojito", "description": "Mint, lime and fresh berries", "ingredients": ["rum"]},
+]
+FAQS = [
+    {"id": "f1", "question": "Do you serve mocktails?", "answer": "Yes, a full mocktail menu."},
+    {"id": "f2", "question": "Which cities do you cover?", "answer": "Delhi NCR and outstation events."},
+]
+
+
+@pytest.fixture(scope="module")
+def segments():
+    return [
+        Segment("drink", DRINKS, {"name": 3.0, "description": 1.0, "ingredients": 2.0}),
+        Segment("faq", FAQS, {"question": 2.0, "answer": 1.0}),
+    ]
+
+
+def ids(hits):
+    return [hit.doc["id"] for hit in hits]
+
+
+def test_tokenize_folds_accents_plurals_and_stopwords():
+    assert tokenize("Crème Brûlée for the Mocktails") == ["creme", "brulee", "mocktail"]
+    assert stem("berries") == "berry"
+    assert stem("glass") == "glass"
+
+
+def test_edit_distance():
+    assert edit_distance("whisky", "whiksy", 2) == 1  # transposition
+    assert edit_distance("mojito", "mojitos", 2) == 1
+    assert edit_distance("gin", "bourbon", 2) == 3
+
+
+def test_exact_match_ranks_the_stronger_field_first(segments):
+    hits, corrections = search(segments, "bourbon ")
+    assert ids(hits) == ["d1"]
+    assert hits[0].matched == ["bourbon"]
+    assert corrections == {}
+
+
+def test_plural_query_matches_singular(segments):
+    hits, _ = search(segments, "mocktails ")
+    assert ids(hits) == ["f1"]
+
+
+def test_last_word_is_a_prefix(segments):
+    hits, _ = search(segments, "whis")
+    assert set(ids(hits)) == {"d1", "d2"}
+    # Ending with a space turns type-ahead off
+    assert search(segments, "whis ")[0] == []
+
+
+def test_typos_are_corrected(segments):
+    hits, corrections = search(segments, "mojtio ")
+    assert ids(hits) == ["d3"]
+    assert corrections == {"mojtio": "mojito"}
+
+
+def test_documents_matching_more_words_come_first(segments):
+    hits, _ = search(segments, "smoked whiskey ")
+    assert ids(hits)[0] == "d2"
+
+
+def test_kinds_filter_and_empty_queries(segments):
+    hits, _ = search(segments, "delhi ", kinds=["drink"])
+    assert hits == []
+    assert ids(search(segments, "delhi ", kinds=["faq"])[0]) == ["f2"]
+    assert search(segments, "the and ") == ([], {})
+
+
+def test_search_endpoint(api):
+    response = api.get("/api/search", params={"q": "mocktial "})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["hits"]
+    assert body["corrections"]
+    assert api.get("/api/search", params={"q": "gin", "types": "drink,cocktail"}).status_code == 400
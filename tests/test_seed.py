@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+from pydantic import BaseModel, ConfigDict
+from pymongo.errors import AutoReconnect
+
+from seed import SeedData, seed_catalog
+
+pytestmark = pytest.mark.anyio
+
+
+class Item(BaseModel):
+    model_config = ConfigDict(frozen=True)
+    id: str
+    name: str
+
+
+def dataset(version, *names):
+    return SeedData(version, {"setups": tuple(Item(id=f"s{i}", name=name) for i, name in enumerate(names))})
+
+
+class FailingWrites:
+    """A database whose catalog bulk writes fail the way a dropped connection would."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __getattr__(self, name):
+        return self.db[name]
+
+    def __getitem__(self, name):
+        collection = self.db[name]
+
+        async def bulk_write(*args, **kwargs):
+            raise AutoReconnect("connection reset")
+
+        collection.bulk_write = bulk_write
+        return collection
+
+
+async def test_concurrent_seeds_write_once(mongo):
+    seed = dataset(1, "Copper Bar", "Mirror Bar")
+    results = await asyncio.gather(*(seed_catalog(mongo, seed, ["setups"]) for _ in range(4)))
+    assert sorted(results, key=len) == [{}, {}, {}, {"setups": 2}]
+    assert await mongo.setups.count_documents({}) == 2
+
+
+async def test_reruns_are_no_ops_until_the_version_changes(mongo):
+    assert await seed_catalog(mongo, dataset(1, "Copper Bar"), ["setups"]) == {"setups": 1}
+    await mongo.setups.update_one({"id": "s0"}, {"$set": {"name": "Edited"}})
+    assert await seed_catalog(mongo, dataset(1, "Copper Bar"), ["setups"]) == {}
+    assert await seed_catalog(mongo, dataset(2, "Copper Bar", "Mirror Bar"), ["setups"]) == {"setups": 1}
+    names = {doc["id"]: doc["name"] for doc in await mongo.setups.find().to_list(None)}
+    assert names == {"s0": "Edited", "s1": "Mirror Bar"}  # edits made in the database are kept
+    assert (await mongo.catalog_seed.find_one({"_id": "setups"}))["version"] == 2
+
+
+async def test_failed_write_releases_the_claim(mongo):
+    with pytest.raises(AutoReconnect):
+        await seed_catalog(FailingWrites(mongo), dataset(1, "Copper Bar"), ["setups"])
+    assert await mongo.catalog_seed.find_one({"_id": "setups"}) is None
+    assert await seed_catalog(mongo, dataset(1, "Copper Bar"), ["setups"]) == {"setups": 1}
+
+    with pytest.raises(AutoReconnect):
+        await seed_catalog(FailingWrites(mongo), dataset(2, "Copper Bar", "Mirror Bar"), ["setups"])
+    assert (await mongo.catalog_seed.find_one({"_id": "setups"}))["version"] == 1
+    assert await seed_catalog(mongo, dataset(2, "Copper Bar", "Mirror Bar"), ["setups"]) == {"setups": 1}
@@ -0,0 +1,68 @@
+import pytest
+
+from templates import TemplateError, TemplateSet
+
+
+def template_set(tmp_path, **files):
+    for name, source in files.items():
+        (tmp_path / name.replace("__", ".")).write_text(source, encoding="utf-8")
+    return TemplateSet(tmp_path, fragment_cache_size=2)
+
+
+def test_html_is_escaped_and_text_is_not(tmp_path):
+    templates = template_set(tmp_path, page__html="<p>{{ name }}</p>", page__txt="{{name}}")
+    assert templates.render("page.html", name="<b>Tom & \"Jerry\"</b>") == \
+        "<p>&lt;b&gt;Tom &amp; &quot;Jerry&quot;&lt;/b&gt;</p>"
+    assert templates.render("page.txt", name="<b>Tom</b>") == "<b>Tom</b>"
+
+
+def test_raw_values_and_missing_values(tmp_path):
+    templates = template_set(tmp_path, page__html="{{ body|raw }}{{ note }}")
+    assert templates.render("page.html", body="<i>ok</i>", note=None) == "<i>ok</i>"
+    with pytest.raises(TemplateError, match="note"):
+        templates.render("page.html", body="")
+
+
+def test_static_partials_are_inlined(tmp_path):
+    templates = template_set(tmp_path, _header__html="<h1>HQ.D</h1>", _footer__html="<hr>",
+                             page__html="{{> _header }}<p>{{ name }}</p>{{> _footer.html }}",
+                             plain__html="{{> _header }}")
+    page = templates["page.html"]
+    assert page.parts == ("<h1>HQ.D</h1><p>", ("name", False), "</p><hr>")
+    assert templates["plain.html"].static == "<h1>HQ.D</h1>"
+    # A context key may be called "name" or "template" without clashing
+    assert templates.render("page.html", name="x", template="y") == "<h1>HQ.D</h1><p>x</p><hr>"
+
+
+@pytest.mark.parametrize("files, message", [
+    ({"page__html": "{{> missing }}"}, "no template"),
+    ({"a__html": "{{> b }}", "b__html": "{{> a }}"}, "include each other"),
+    ({"page__html": "{{ not closed"}, "malformed"),
+    ({"page__html": "{{ two words }}"}, "malformed"),
+])
+def test_bad_templates_fail_when_loaded(tmp_path, files, message):
+    with pytest.raises(TemplateError, match=message):
+        template_set(tmp_path, **files)
+
+
+def test_fragments_are_memoized_in_a_bounded_cache(tmp_path):
+    templates = template_set(tmp_path, line__html="<b>{{ n }}</b>")
+    assert [templates.fragment("line.html", n=n) for n in (1, 1, 2, 3, 1)] == \
+        ["<b>1</b>", "<b>1</b>", "<b>2</b>", "<b>3</b>", "<b>1</b>"]
+    assert templates.stats() == {"templates": 1, "fragments": 2, "fragment_hits": 1, "fragment_misses": 4}
+
+
+def test_lead_notification_escapes_form_input(server):
+    doc = {
+        "id": "lead-1", "name": "<script>alert(1)</script>", "email": "a@example.com", "phone": "+911234567890",
+        "event_type": "Wedding", "city": "Goa", "message": "Cheers & <b>thanks</b>", "source": "website",
+        "status": "new", "created_at": "2025-01-01T00:00:00+00:00",
+    }
+    message = server.render_lead_notification([doc])
+    assert "<script>" not in message.html
+    assert "&lt;script&gt;alert(1)&lt;/script&gt;" in message.html
+    assert "Cheers &amp; &lt;b&gt;thanks&lt;/b&gt;" in message.html
+    assert "<script>alert(1)</script>" in message.text
+    assert message.lead_ids == ["lead-1"]
+    digest = server.render_lead_notification([doc, {**doc, "id": "lead-2"}])
+    assert digest.subject == "HQ.D | 2 New Event Inquiries"
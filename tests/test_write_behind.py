@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from write_behind import BatchWriter, WriterOverloaded
+
+pytestmark = pytest.mark.anyio
+
+ADMIN = {"Authorization": "Bearer test-admin-token"}
+
+
+async def test_concurrent_inserts_share_batches(mongo):
+    writer = BatchWriter(mongo.leads, max_batch=4, max_latency=0.05)
+    await writer.start()
+    await asyncio.gather(*(writer.insert({"id": str(i)}) for i in range(10)))
+    await writer.stop()
+    assert await mongo.leads.count_documents({}) == 10
+    stats = writer.stats()
+    assert (stats["inserted"], stats["largest_batch"]) == (10, 4)
+    assert stats["batches"] == 3
+
+
+async def test_a_bad_document_fails_alone(mongo):
+    await mongo.leads.create_index("id", unique=True)
+    await mongo.leads.insert_one({"id": "taken"})
+    writer = BatchWriter(mongo.leads, max_batch=3, max_latency=0.05)
+    await writer.start()
+    results = await asyncio.gather(*(writer.insert({"id": i}) for i in ("a", "taken", "b")),
+                                   return_exceptions=True)
+    await writer.stop()
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], DuplicateKeyError)
+    assert writer.stats()["failed"] == 1
+    assert await mongo.leads.count_documents({}) == 3
+
+
+async def test_inserts_directly_when_not_running(mongo):
+    writer = BatchWriter(mongo.leads)
+    await writer.insert({"id": "a"})
+    assert await mongo.leads.count_documents({}) == 1
+    assert writer.stats()["batches"] == 0
+
+
+class StalledCollection:
+    name = "stalled"
+
+    def __init__(self):
+        self.resume = asyncio.Event()
+
+    async def insert_many(self, docs, ordered=True):
+        await self.resume.wait()
+
+
+async def test_callers_are_turned_away_when_the_queue_is_full():
+    collection = StalledCollection()
+    writer = BatchWriter(collection, max_batch=1, max_latency=0, max_pending=2, max_inflight=1, queue_timeout=0.05)
+    await writer.start()
+    waiting = [asyncio.create_task(writer.insert({"id": i})) for i in range(2)]
+    await asyncio.sleep(0.01)
+    with pytest.raises(WriterOverloaded):
+        await writer.insert({"id": "late"})
+    assert writer.stats()["overloaded"] == 1
+    collection.resume.set()
+    await asyncio.gather(*waiting)
+    await writer.stop()
+    assert writer.stats()["inserted"] == 2
+
+
+async def test_stop_writes_what_is_queued(mongo):
+    writer = BatchWriter(mongo.leads, max_batch=100, max_latency=10)
+    await writer.start()
+    pending = [asyncio.create_task(writer.insert({"id": str(i)})) for i in range(5)]
+    await asyncio.sleep(0)
+    await writer.stop()
+    await asyncio.gather(*pending)
+    assert await mongo.leads.count_documents({}) == 5
+    assert not writer.running
+
+
+def test_lead_form_through_the_writer(api, server, lead):
+    api.portal.call(server.lead_writer.start)
+    try:
+        assert api.post("/api/leads", json=lead()).status_code == 200
+    finally:
+        api.portal.call(server.lead_writer.stop)
+    assert server.lead_writer.stats()["inserted"] == 1
+    assert len(api.get("/api/leads", headers=ADMIN).json()) == 1